@@ -3,15 +3,21 @@ import SwiftUI
 @MainActor
 final class DiscoverViewModel: ObservableObject {
     @Published private(set) var pois: [Poi] = [] {
-        didSet { applyFilters() }
+        didSet {
+            poisById = Dictionary(pois.map { ($0.id, $0) }, uniquingKeysWith: { first, _ in first })
+            applyFilters()
+        }
     }
     @Published var filteredPois: [Poi] = []
     @Published var selectedArea: String = ""
+    @Published var query: String = ""
     @Published var isLoading = false
     @Published var errorMessage: String?
 
     private let service: PoiServiceProtocol
     private let itineraryRepository: ItineraryRepository
+    private var searchIndex: PoiSearchIndex?
+    private var poisById: [String: Poi] = [:]
 
     init(service: PoiServiceProtocol, itineraryRepository: ItineraryRepository) {
         self.service = service
@@ -23,6 +29,7 @@ final class DiscoverViewModel: ObservableObject {
         errorMessage = nil
         do {
             let results = try await service.fetchPois()
+            searchIndex = await service.searchIndex()
             self.pois = results
             self.isLoading = false
         } catch {
@@ -31,12 +38,19 @@ final class DiscoverViewModel: ObservableObject {
         }
     }
 
+    /// Uses the bundled search index, which returns matches best rated
+    /// first, when it covers the loaded POIs; otherwise scans them.
     func applyFilters() {
-        guard !selectedArea.isEmpty else {
-            filteredPois = pois
+        let area = selectedArea.isEmpty ? nil : selectedArea
+        if let searchIndex, searchIndex.ids.count == pois.count {
+            filteredPois = searchIndex.search(query, area: area).compactMap { poisById[$0] }
             return
         }
-        filteredPois = pois.filter { $0.area == selectedArea }
+        let text = query.trimmingCharacters(in: .whitespacesAndNewlines)
+        filteredPois = pois.filter { poi in
+            (area == nil || poi.area == area)
+                && (text.isEmpty || poi.nameEN.localizedCaseInsensitiveContains(text) || poi.nameTH.contains(text))
+        }
     }
 
     var availableAreas: [String] {
@@ -94,6 +108,8 @@ struct DiscoverView: View {
         }
         .padding()
         .navigationTitle(settings.localized("discover.title"))
+        .searchable(text: $viewModel.query, prompt: settings.localized("discover.search"))
+        .onChange(of: viewModel.query) { _ in viewModel.applyFilters() }
         .task {
             if viewModel.pois.isEmpty {
                 await viewModel.load()
@@ -5,6 +5,7 @@ import MapKit
 final class RailViewModel: ObservableObject {
     @Published private(set) var stations: [RailStation] = []
     @Published private(set) var lines: [RailLine] = []
+    @Published private(set) var geometry: RailLineGeometry?
     @Published var fromStationId: String?
     @Published var toStationId: String?
     @Published private(set) var estimate: RailFareEstimate?
@@ -25,6 +26,7 @@ final class RailViewModel: ObservableObject {
             let loadedStations = try await railService.stations()
             stations = loadedStations
             lines = try await railService.lines()
+            geometry = await railService.lineGeometry()
             fromStationId = loadedStations.first?.id
             toStationId = loadedStations.dropFirst().first?.id ?? loadedStations.first?.id
             isLoading = false
@@ -62,6 +64,12 @@ final class RailViewModel: ObservableObject {
         return lines.filter { $0.system == from.system }
     }
 
+    /// The simplified polyline for `line` at a map scale of `metersPerPoint`,
+    /// falling back to the full coordinates when none was precomputed.
+    func polyline(for line: RailLine, metersPerPoint: Double) -> [CLLocationCoordinate2D] {
+        geometry?.polyline(for: line.id, maxDeviationMeters: metersPerPoint) ?? line.polyline
+    }
+
     func region() -> MKCoordinateRegion {
         if let from = selectedStation(id: fromStationId), let to = selectedStation(id: toStationId) {
             let minLat = min(from.lat, to.lat)
@@ -81,17 +89,26 @@ struct RailView: View {
     @EnvironmentObject private var settings: AppSettings
     @Environment(\.locale) private var locale
     @State private var mapPosition: MapCameraPosition
+    @State private var metersPerPoint: Double
+
+    private static let mapHeight: CGFloat = 260
 
     init(viewModel: RailViewModel) {
         self.viewModel = viewModel
-        _mapPosition = State(initialValue: .region(viewModel.region()))
+        let region = viewModel.region()
+        _mapPosition = State(initialValue: .region(region))
+        _metersPerPoint = State(initialValue: Self.metersPerPoint(in: region))
+    }
+
+    private static func metersPerPoint(in region: MKCoordinateRegion) -> Double {
+        region.span.latitudeDelta * 111_320 / Double(mapHeight)
     }
 
     var body: some View {
         ScrollView {
             VStack(alignment: .leading, spacing: 20) {
                 railMap
-                    .frame(height: 260)
+                    .frame(height: Self.mapHeight)
                     .clipShape(RoundedRectangle(cornerRadius: 18, style: .continuous))
 
                 pickerSection
@@ -144,7 +161,7 @@ struct RailView: View {
     private var railMap: some View {
         Map(position: $mapPosition) {
             ForEach(viewModel.highlightedLines()) { line in
-                MapPolyline(line.polyline)
+                MapPolyline(coordinates: viewModel.polyline(for: line, metersPerPoint: metersPerPoint))
                     .stroke(color(for: line.system), style: StrokeStyle(lineWidth: 5, lineCap: .round, lineJoin: .round))
             }
             ForEach(viewModel.stations) { station in
@@ -162,6 +179,9 @@ struct RailView: View {
             }
         }
         .mapStyle(.standard)
+        .onMapCameraChange { context in
+            metersPerPoint = Self.metersPerPoint(in: context.region)
+        }
         .accessibilityLabel(settings.localized("rail.map"))
         .onChange(of: viewModel.fromStationId) { _ in
             mapPosition = .region(viewModel.region())
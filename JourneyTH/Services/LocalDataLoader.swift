@@ -8,12 +8,19 @@ struct LocalDataLoader: DataLoading {
     private final class BundleMarker {}
 
     func load<T: Decodable>(_ filename: String, as type: T.Type) throws -> T {
-        let bundle = Bundle.main.path(forResource: filename, ofType: "json") != nil ? Bundle.main : Bundle(for: BundleMarker.self)
-        guard let url = bundle.url(forResource: filename, withExtension: "json") else {
-            throw DataLoaderError.fileNotFound(filename)
+        // The app bundle carries binary plists compiled from the JSON at build
+        // time (bundletools/data.py); JSON is still read when no plist is found.
+        for bundle in [Bundle.main, Bundle(for: BundleMarker.self)] {
+            if let url = bundle.url(forResource: filename, withExtension: "plist") {
+                let data = try Data(contentsOf: url)
+                return try PropertyListDecoder().decode(T.self, from: data)
+            }
+            if let url = bundle.url(forResource: filename, withExtension: "json") {
+                let data = try Data(contentsOf: url)
+                return try JSONDecoder().decode(T.self, from: data)
+            }
         }
-        let data = try Data(contentsOf: url)
-        return try JSONDecoder().decode(T.self, from: data)
+        throw DataLoaderError.fileNotFound(filename)
     }
 }
 
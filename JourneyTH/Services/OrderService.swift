@@ -12,6 +12,7 @@ protocol RailFareServicing {
     func estimate(from: RailStation, to: RailStation) async throws -> RailFareEstimate
     func lines() async throws -> [RailLine]
     func stations() async throws -> [RailStation]
+    func lineGeometry() async -> RailLineGeometry?
 }
 
 struct RailFareService: RailFareServicing {
@@ -31,8 +32,16 @@ struct RailFareService: RailFareServicing {
         try await dataService.lines()
     }
 
+    func lineGeometry() async -> RailLineGeometry? {
+        await dataService.lineGeometry()
+    }
+
     func estimate(from: RailStation, to: RailStation) async throws -> RailFareEstimate {
-        let distance = distanceBetween(from, to)
+        let route = await dataService.precomputedRoute(from: from.id, to: to.id)
+        let distance = route?.distanceKm ?? distanceBetween(from, to)
+        if from.system == to.system, from.system != "SRT", let stops = route?.stops, let price = route?.fare {
+            return RailFareEstimate(system: from.system, distanceKm: distance, stops: stops, price: price, isUrban: true)
+        }
         let railConfig = try await fareService.railConfiguration()
         if from.system == to.system, from.system != "SRT" {
             let stops = try await stopCount(from: from, to: to)
@@ -1,17 +1,125 @@
+import CoreLocation
 import Foundation
 
 protocol RailDataProviding {
     func stations() async throws -> [RailStation]
     func lines() async throws -> [RailLine]
+    func nearestStation(to coordinate: CLLocationCoordinate2D) async throws -> (station: RailStation, distanceKm: Double)?
+    func precomputedRoute(from: String, to: String) async -> RailRoute?
+    func lineGeometry() async -> RailLineGeometry?
 }
 
 actor RailDataStore {
     var payload: StationsPayload?
 }
 
+/// One origin/destination pair from `RailMatrix`; nil fields were not
+/// precomputed for the pair.
+struct RailRoute: Equatable {
+    let stops: Int?
+    let distanceKm: Double?
+    let fare: Double?
+}
+
+/// All-pairs stops, track distances and urban fares precomputed by
+/// `bundletools/rail.py`. Each array is little-endian and row major over
+/// `stationIds`; the all-ones value of each type marks a missing entry.
+struct RailMatrix: Codable {
+    let stationIds: [String]
+    let stops: Data
+    let distanceMeters: Data
+    let fareSatang: Data
+
+    func route(at offset: Int) -> RailRoute {
+        let stops = self.stops.withUnsafeBytes { UInt16(littleEndian: $0.loadUnaligned(fromByteOffset: offset * 2, as: UInt16.self)) }
+        let meters = distanceMeters.withUnsafeBytes { UInt32(littleEndian: $0.loadUnaligned(fromByteOffset: offset * 4, as: UInt32.self)) }
+        let satang = fareSatang.withUnsafeBytes { UInt32(littleEndian: $0.loadUnaligned(fromByteOffset: offset * 4, as: UInt32.self)) }
+        return RailRoute(
+            stops: stops == .max ? nil : Int(stops),
+            distanceKm: meters == .max ? nil : Double(meters) / 1000,
+            fare: satang == .max ? nil : Double(satang) / 100
+        )
+    }
+}
+
+/// Rail line polylines simplified by `bundletools/polylines.py`, one level
+/// per entry in `toleranceMeters`. Each blob holds lat/lng pairs in 1e-6
+/// degrees, every value the zigzag varint of its delta from the previous one.
+struct RailLineGeometry: Codable {
+    let toleranceMeters: [Double]
+    let lines: [String: [Data]]
+
+    /// The coarsest level of `lineId` that stays within `maxDeviationMeters`
+    /// of the full line, or nil when the line was not simplified.
+    func polyline(for lineId: String, maxDeviationMeters: Double) -> [CLLocationCoordinate2D]? {
+        guard let levels = lines[lineId], !levels.isEmpty else { return nil }
+        let level = toleranceMeters.lastIndex { $0 <= maxDeviationMeters } ?? 0
+        return Self.decode(levels[min(level, levels.count - 1)])
+    }
+
+    static func decode(_ data: Data) -> [CLLocationCoordinate2D] {
+        var values: [Int64] = []
+        var value: UInt64 = 0
+        var shift: UInt64 = 0
+        for byte in data {
+            value |= UInt64(byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80 {
+                values.append(Int64(bitPattern: value >> 1) ^ -Int64(bitPattern: value & 1))
+                value = 0
+                shift = 0
+            }
+        }
+        var coordinates: [CLLocationCoordinate2D] = []
+        coordinates.reserveCapacity(values.count / 2)
+        var lat: Int64 = 0
+        var lng: Int64 = 0
+        for index in stride(from: 0, to: values.count - 1, by: 2) {
+            lat += values[index]
+            lng += values[index + 1]
+            coordinates.append(CLLocationCoordinate2D(latitude: Double(lat) / 1e6, longitude: Double(lng) / 1e6))
+        }
+        return coordinates
+    }
+}
+
+actor RailLineGeometryStore {
+    private var geometry: RailLineGeometry?
+    private var unavailable = false
+
+    func geometry(using loader: DataLoading) -> RailLineGeometry? {
+        if geometry == nil, !unavailable {
+            geometry = try? loader.load("line_geometry", as: RailLineGeometry.self)
+            unavailable = geometry == nil
+        }
+        return geometry
+    }
+}
+
+actor RailMatrixStore {
+    private var matrix: RailMatrix?
+    private var positions: [String: Int] = [:]
+    private var unavailable = false
+
+    /// The precomputed route, or nil when the bundle ships no matrix or
+    /// does not know one of the stations.
+    func route(from: String, to: String, using loader: DataLoading) -> RailRoute? {
+        if matrix == nil, !unavailable {
+            matrix = try? loader.load("rail_matrix", as: RailMatrix.self)
+            unavailable = matrix == nil
+            positions = Dictionary(uniqueKeysWithValues: (matrix?.stationIds ?? []).enumerated().map { ($1, $0) })
+        }
+        guard let matrix, let row = positions[from], let column = positions[to] else { return nil }
+        return matrix.route(at: row * matrix.stationIds.count + column)
+    }
+}
+
 struct RailDataService: RailDataProviding {
     private let loader: DataLoading
     private let store = RailDataStore()
+    private let spatialStore = SpatialIndexStore()
+    private let matrixStore = RailMatrixStore()
+    private let geometryStore = RailLineGeometryStore()
 
     init(loader: DataLoading) {
         self.loader = loader
@@ -25,6 +133,22 @@ struct RailDataService: RailDataProviding {
         try await ensurePayload().lines
     }
 
+    func nearestStation(to coordinate: CLLocationCoordinate2D) async throws -> (station: RailStation, distanceKm: Double)? {
+        guard let nearest = try await spatialStore.index(using: loader).stations.nearest(to: coordinate),
+              let station = try await stations().first(where: { $0.id == nearest.id }) else {
+            return nil
+        }
+        return (station, nearest.distanceKm)
+    }
+
+    func precomputedRoute(from: String, to: String) async -> RailRoute? {
+        await matrixStore.route(from: from, to: to, using: loader)
+    }
+
+    func lineGeometry() async -> RailLineGeometry? {
+        await geometryStore.geometry(using: loader)
+    }
+
     private func ensurePayload() async throws -> StationsPayload {
         if let payload = await store.payload {
             return payload
@@ -1,8 +1,11 @@
+import CoreLocation
 import Foundation
 
 protocol PoiServiceProtocol {
     func fetchPois() async throws -> [Poi]
     func poi(with id: String) async throws -> Poi?
+    func pois(near coordinate: CLLocationCoordinate2D, radiusKm: Double) async throws -> [Poi]
+    func searchIndex() async -> PoiSearchIndex?
 }
 
 actor PoiStore {
@@ -16,6 +19,8 @@ actor PoiStore {
 struct MockPoiService: PoiServiceProtocol {
     private let loader: DataLoading
     private let store = PoiStore()
+    private let spatialStore = SpatialIndexStore()
+    private let searchStore = PoiSearchIndexStore()
 
     init(loader: DataLoading) {
         self.loader = loader
@@ -37,4 +42,15 @@ struct MockPoiService: PoiServiceProtocol {
         let pois = try await fetchPois()
         return pois.first { $0.id == id }
     }
+
+    func pois(near coordinate: CLLocationCoordinate2D, radiusKm: Double) async throws -> [Poi] {
+        let nearby = try await spatialStore.index(using: loader).pois.within(radiusKm, of: coordinate)
+        let pois = try await fetchPois()
+        let byId = Dictionary(uniqueKeysWithValues: pois.map { ($0.id, $0) })
+        return nearby.compactMap { byId[$0.id] }
+    }
+
+    func searchIndex() async -> PoiSearchIndex? {
+        await searchStore.index(using: loader)
+    }
 }
@@ -0,0 +1,147 @@
+import Foundation
+
+/// Inverted index over POI names, areas and tags built by
+/// `bundletools/search.py`. Documents are numbered in rating order, best
+/// first, and term `k` owns `postings[offsets[k]..<offsets[k + 1]]`, both
+/// little-endian UInt32 arrays, so every result comes out already ranked.
+struct PoiSearchIndex: Codable {
+    let gramLength: Int
+    let ids: [String]
+    let keys: [String]
+    /// Sorted by code point, which is also UTF-8 byte order.
+    let terms: [String]
+    let offsets: Data
+    let postings: Data
+
+    /// POI ids matching every given filter, best rated first. Queries of
+    /// `gramLength` or more scalars match any part of either name; shorter
+    /// ones match the start of a word.
+    func search(_ query: String, area: String? = nil, tag: String? = nil) -> [String] {
+        let text = Self.normalize(query)
+        var terms: [String] = []
+        if let area, !area.isEmpty {
+            terms.append("area:\(area)")
+        }
+        if let tag, !tag.isEmpty {
+            terms.append("tag:\(tag.lowercased())")
+        }
+        if !text.isEmpty, text.count < gramLength {
+            terms.append("prefix:" + Self.string(text[...]))
+        }
+        if terms.isEmpty, text.count < gramLength {
+            return ids
+        }
+        var lists = terms.map(range(of:))
+        if text.count >= gramLength {
+            // The key check below is exact, so the two rarest grams narrow enough.
+            let grams = Set((0...(text.count - gramLength)).map { Self.string(text[$0..<($0 + gramLength)]) })
+            lists += grams.map { range(of: "gram:" + $0) }.sorted { $0.count < $1.count }.prefix(2)
+        }
+        lists.sort { $0.count < $1.count }
+        var documents = lists[0].map(document(at:))
+        for list in lists.dropFirst() where !documents.isEmpty {
+            documents = documents.filter { contains($0, in: list) }
+        }
+        if text.count >= gramLength {
+            documents = documents.filter { Self.contains(text, in: keys[$0]) }
+        }
+        return documents.map { ids[$0] }
+    }
+
+    /// NFKC, lower case, and runs of whitespace, punctuation and control
+    /// characters folded to one space, as `bundletools/search.py` does.
+    static func normalize(_ text: String) -> [Unicode.Scalar] {
+        var scalars: [Unicode.Scalar] = []
+        for scalar in text.precomposedStringWithCompatibilityMapping.lowercased().unicodeScalars {
+            switch scalar.properties.generalCategory {
+            case .spaceSeparator, .lineSeparator, .paragraphSeparator,
+                 .connectorPunctuation, .dashPunctuation, .openPunctuation, .closePunctuation,
+                 .initialPunctuation, .finalPunctuation, .otherPunctuation,
+                 .control, .format, .surrogate, .privateUse, .unassigned:
+                if let last = scalars.last, last != " " {
+                    scalars.append(" ")
+                }
+            default:
+                scalars.append(scalar)
+            }
+        }
+        if scalars.last == " " {
+            scalars.removeLast()
+        }
+        return scalars
+    }
+
+    private static func string(_ scalars: ArraySlice<Unicode.Scalar>) -> String {
+        var string = ""
+        string.unicodeScalars.append(contentsOf: scalars)
+        return string
+    }
+
+    // Compared scalar by scalar: a Thai query may end between a consonant
+    // and its vowel mark, which Character comparison would not match.
+    private static func contains(_ needle: [Unicode.Scalar], in key: String) -> Bool {
+        let haystack = Array(key.unicodeScalars)
+        guard let first = needle.first, haystack.count >= needle.count else { return false }
+        for start in 0...(haystack.count - needle.count) where haystack[start] == first {
+            if haystack[start..<(start + needle.count)].elementsEqual(needle) {
+                return true
+            }
+        }
+        return false
+    }
+
+    private func offset(_ index: Int) -> Int {
+        Int(offsets.withUnsafeBytes { UInt32(littleEndian: $0.loadUnaligned(fromByteOffset: index * 4, as: UInt32.self)) })
+    }
+
+    private func document(at position: Int) -> Int {
+        Int(postings.withUnsafeBytes { UInt32(littleEndian: $0.loadUnaligned(fromByteOffset: position * 4, as: UInt32.self)) })
+    }
+
+    /// The postings of `term`, empty when it is not indexed.
+    private func range(of term: String) -> Range<Int> {
+        var low = 0
+        var high = terms.count
+        while low < high {
+            let middle = (low + high) / 2
+            if terms[middle].utf8.lexicographicallyPrecedes(term.utf8) {
+                low = middle + 1
+            } else {
+                high = middle
+            }
+        }
+        guard low < terms.count, terms[low].utf8.elementsEqual(term.utf8) else { return 0..<0 }
+        return offset(low)..<offset(low + 1)
+    }
+
+    private func contains(_ document: Int, in list: Range<Int>) -> Bool {
+        var low = list.lowerBound
+        var high = list.upperBound
+        while low < high {
+            let middle = (low + high) / 2
+            let value = self.document(at: middle)
+            if value == document {
+                return true
+            }
+            if value < document {
+                low = middle + 1
+            } else {
+                high = middle
+            }
+        }
+        return false
+    }
+}
+
+actor PoiSearchIndexStore {
+    private var index: PoiSearchIndex?
+    private var unavailable = false
+
+    func index(using loader: DataLoading) -> PoiSearchIndex? {
+        if index == nil, !unavailable {
+            index = try? loader.load("search_index", as: PoiSearchIndex.self)
+            unavailable = index == nil
+        }
+        return index
+    }
+}
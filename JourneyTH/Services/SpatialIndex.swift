@@ -0,0 +1,139 @@
+import CoreLocation
+import Foundation
+
+/// Uniform lat/lng grid precomputed by `bundletools/spatial.py`.
+/// Points are sorted by cell, row major; cell `c` holds the points in
+/// `cellStart[c]..<cellStart[c + 1]`.
+struct SpatialGrid: Codable {
+    let cellDegrees: Double
+    let minLat: Double
+    let minLng: Double
+    let rows: Int
+    let columns: Int
+    let cellStart: [Int]
+    let ids: [String]
+    let lat: [Double]
+    let lng: [Double]
+
+    static let earthRadiusKm = 6371.0
+
+    static func distanceKm(_ lat1: Double, _ lng1: Double, _ lat2: Double, _ lng2: Double) -> Double {
+        let phi1 = lat1 * Double.pi / 180
+        let phi2 = lat2 * Double.pi / 180
+        let dLat = phi2 - phi1
+        let dLon = (lng2 - lng1) * Double.pi / 180
+        let a = pow(sin(dLat / 2), 2) + cos(phi1) * cos(phi2) * pow(sin(dLon / 2), 2)
+        return 2 * earthRadiusKm * asin(min(1, sqrt(a)))
+    }
+
+    /// The closest point to `coordinate`, searching rings of cells outward
+    /// until nothing beyond the ring can be closer.
+    func nearest(to coordinate: CLLocationCoordinate2D) -> (id: String, distanceKm: Double)? {
+        guard !ids.isEmpty else { return nil }
+        let (lat, lng) = (coordinate.latitude, coordinate.longitude)
+        var best: (index: Int, distanceKm: Double)?
+        let consider = { (index: Int) in
+            let distance = Self.distanceKm(lat, lng, self.lat[index], self.lng[index])
+            if distance < best?.distanceKm ?? .infinity {
+                best = (index, distance)
+            }
+        }
+        if wraps(lng) {
+            ids.indices.forEach(consider)
+        } else {
+            let (row, column) = cell(lat, lng)
+            let first = max(0, row - (rows - 1), -row, column - (columns - 1), -column)
+            let last = max(row, rows - 1 - row, column, columns - 1 - column)
+            let maxAbsLat = max(abs(minLat), abs(minLat + Double(rows) * cellDegrees))
+            let cosMin = cos(max(abs(lat), maxAbsLat) * Double.pi / 180)
+            for ring in first...last {
+                forEachInRing(row: row, column: column, ring: ring, consider)
+                if let best, best.distanceKm <= bound(ring: ring, cosMin: cosMin) {
+                    break
+                }
+            }
+        }
+        return best.map { (ids[$0.index], $0.distanceKm) }
+    }
+
+    /// Every point within `radiusKm` of `coordinate`, closest first.
+    func within(_ radiusKm: Double, of coordinate: CLLocationCoordinate2D) -> [(id: String, distanceKm: Double)] {
+        let (lat, lng) = (coordinate.latitude, coordinate.longitude)
+        let delta = radiusKm / Self.earthRadiusKm
+        let cosLat = cos(lat * Double.pi / 180)
+        let lngDegrees = delta >= Double.pi / 2 || sin(delta) >= cosLat ? 360 : asin(sin(delta) / cosLat) * 180 / Double.pi
+        let latDegrees = delta * 180 / Double.pi
+        let (firstRow, firstColumn) = cell(lat - latDegrees, lng - lngDegrees)
+        let (lastRow, lastColumn) = cell(lat + latDegrees, lng + lngDegrees)
+        let columnRange = wraps(lng, reach: lngDegrees) ? (0, columns - 1) : (firstColumn, lastColumn)
+        var found: [(id: String, distanceKm: Double)] = []
+        forEachInCells(rows: (firstRow, lastRow), columns: columnRange) { index in
+            let distance = Self.distanceKm(lat, lng, self.lat[index], self.lng[index])
+            if distance <= radiusKm {
+                found.append((ids[index], distance))
+            }
+        }
+        return found.sorted { ($0.distanceKm, $0.id) < ($1.distanceKm, $1.id) }
+    }
+
+    private func cell(_ lat: Double, _ lng: Double) -> (row: Int, column: Int) {
+        (Int(((lat - minLat) / cellDegrees).rounded(.down)), Int(((lng - minLng) / cellDegrees).rounded(.down)))
+    }
+
+    // Past the antimeridian cell distances no longer track real ones, so
+    // such queries scan every point.
+    private func wraps(_ lng: Double, reach: Double = 0) -> Bool {
+        max(abs(lng - minLng), abs(lng - minLng - Double(columns) * cellDegrees)) + reach > 180
+    }
+
+    private func forEachInCells(rows rowRange: (Int, Int), columns columnRange: (Int, Int), _ body: (Int) -> Void) {
+        let firstRow = max(rowRange.0, 0), lastRow = min(rowRange.1, rows - 1)
+        let firstColumn = max(columnRange.0, 0), lastColumn = min(columnRange.1, columns - 1)
+        guard firstRow <= lastRow, firstColumn <= lastColumn else { return }
+        for row in firstRow...lastRow {
+            for column in firstColumn...lastColumn {
+                let cell = row * columns + column
+                for index in cellStart[cell]..<cellStart[cell + 1] {
+                    body(index)
+                }
+            }
+        }
+    }
+
+    private func forEachInRing(row: Int, column: Int, ring: Int, _ body: (Int) -> Void) {
+        if ring == 0 {
+            forEachInCells(rows: (row, row), columns: (column, column), body)
+            return
+        }
+        forEachInCells(rows: (row - ring, row - ring), columns: (column - ring, column + ring), body)
+        forEachInCells(rows: (row + ring, row + ring), columns: (column - ring, column + ring), body)
+        for side in [column - ring, column + ring] {
+            forEachInCells(rows: (row - ring + 1, row + ring - 1), columns: (side, side), body)
+        }
+    }
+
+    // Points outside the rings searched so far are at least `ring` cells
+    // away in latitude or longitude, and sin(d/2) >= cos(lat) * sin(dLng/2).
+    private func bound(ring: Int, cosMin: Double) -> Double {
+        let half = min(Double(ring) * cellDegrees, 180) * Double.pi / 360
+        return 2 * Self.earthRadiusKm * asin(min(1, cosMin * sin(half)))
+    }
+}
+
+struct SpatialIndex: Codable {
+    let pois: SpatialGrid
+    let stations: SpatialGrid
+}
+
+actor SpatialIndexStore {
+    private var cached: SpatialIndex?
+
+    func index(using loader: DataLoading) throws -> SpatialIndex {
+        if let cached {
+            return cached
+        }
+        let index = try loader.load("spatial_index", as: SpatialIndex.self)
+        cached = index
+        return index
+    }
+}
@@ -8,6 +8,41 @@ protocol FareEstimatorServicing {
 
 actor FareConfigurationStore {
     var bundle: FareConfigurationBundle?
+    private(set) var tables: FareTables?
+    private(set) var tablesLoaded = false
+
+    func setTables(_ tables: FareTables?) {
+        self.tables = tables
+        tablesLoaded = true
+    }
+}
+
+/// Fares tabulated every `stepKm` from 0 km by `bundletools/fares.py`, as
+/// little-endian Float32. Every fare is piecewise linear with breakpoints on
+/// the grid, so interpolating between entries reproduces the formulas.
+struct FareTables: Codable {
+    let stepKm: Double
+    let taxi: Data
+    let tukTukMin: Data
+    let tukTukMax: Data
+    let moto: Data
+
+    /// Interpolated fares at `distance`, or nil beyond the tables.
+    func fares(at distance: Double) -> (taxi: Double, tukTukMin: Double, tukTukMax: Double, moto: Double)? {
+        let count = taxi.count / 4
+        let position = distance / stepKm
+        guard count >= 2, position >= 0, position <= Double(count - 1) else { return nil }
+        let index = min(Int(position), count - 2)
+        let fraction = position - Double(index)
+        func value(_ table: Data) -> Double {
+            table.withUnsafeBytes { bytes in
+                let lower = Float(bitPattern: UInt32(littleEndian: bytes.loadUnaligned(fromByteOffset: index * 4, as: UInt32.self)))
+                let upper = Float(bitPattern: UInt32(littleEndian: bytes.loadUnaligned(fromByteOffset: index * 4 + 4, as: UInt32.self)))
+                return Double(lower) + (Double(upper) - Double(lower)) * fraction
+            }
+        }
+        return (value(taxi), value(tukTukMin), value(tukTukMax), value(moto))
+    }
 }
 
 struct FareEstimatorService: FareEstimatorServicing {
@@ -29,6 +64,15 @@ struct FareEstimatorService: FareEstimatorServicing {
     func estimateFares(for distanceKm: Double) async throws -> FareEstimates {
         let config = try await fareConfiguration()
         let distance = max(distanceKm, 0)
+        if let fares = await ensureTables()?.fares(at: distance) {
+            return FareEstimates(
+                taxi: fares.taxi,
+                tukTukMin: fares.tukTukMin,
+                tukTukMax: fares.tukTukMax,
+                moto: fares.moto,
+                motoNotes: config.moto.surcharges
+            )
+        }
         let taxiFare = calculateTaxiFare(distance: distance, tiers: config.taxi)
         let tukTukMin = config.tuktuk.baseMin + distance * config.tuktuk.perKmMin
         let tukTukMax = config.tuktuk.baseMax + distance * config.tuktuk.perKmMax
@@ -51,6 +95,16 @@ struct FareEstimatorService: FareEstimatorServicing {
         return bundle
     }
 
+    private func ensureTables() async -> FareTables? {
+        if await store.tablesLoaded {
+            return await store.tables
+        }
+        let tables = try? loader.load("fare_tables", as: FareTables.self)
+        await store.setTables(tables)
+        return tables
+    }
+
+    // bundletools/fares.py ports these two for its parity check; keep them in step.
     private func calculateTaxiFare(distance: Double, tiers: [TaxiTier]) -> Double {
         guard let first = tiers.first else { return 0 }
         var total = first.rate
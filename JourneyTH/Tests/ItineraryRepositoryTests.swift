@@ -34,4 +34,13 @@ final class ItineraryRepositoryTests: XCTestCase {
         let total = try repository.totalMinutes(from: [poiA, poiB])
         XCTAssertEqual(total, 75)
     }
+
+    func testItemFetchesAreIndexed() throws {
+        let model = PersistenceController(inMemory: true).container.managedObjectModel
+        let indexes = try XCTUnwrap(model.entitiesByName["ItineraryItem"]).indexes.map { index in
+            index.elements.compactMap { $0.property?.name }
+        }
+        XCTAssertTrue(indexes.contains(["id"]))
+        XCTAssertTrue(indexes.contains(["itineraryId", "order"]))
+    }
 }
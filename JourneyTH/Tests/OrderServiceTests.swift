@@ -1,3 +1,4 @@
+import CoreLocation
 import XCTest
 @testable import JourneyTH
 
@@ -35,4 +36,84 @@ final class OrderServiceTests: XCTestCase {
         XCTAssertGreaterThan(estimate.distanceKm, 50)
         XCTAssertGreaterThan(estimate.price, 0)
     }
+
+    func testIntercityFareFollowsTrackDistance() async throws {
+        // Hua Lamphong to Ayutthaya: 69.06 km in a straight line, 69.4 km
+        // along the Northern Line, at 1.8 THB/km plus the 40 THB class fee.
+        let loader = LocalDataLoader()
+        let fareService = FareEstimatorService(loader: loader)
+        let dataService = RailDataService(loader: loader)
+        let stations = try await dataService.stations()
+        guard let from = stations.first(where: { $0.id == "srt_hua_lamphong" }),
+              let to = stations.first(where: { $0.id == "srt_ayutthaya" }) else {
+            XCTFail("Missing stations")
+            return
+        }
+        let straightLine = RailFareService(dataService: NoMatrixRailData(base: dataService), fareService: fareService)
+        let before = try await straightLine.estimate(from: from, to: to)
+        XCTAssertEqual(before.distanceKm, 69.06, accuracy: 0.01)
+        XCTAssertEqual(before.price, 164.31, accuracy: 0.01)
+
+        let alongTrack = RailFareService(dataService: dataService, fareService: fareService)
+        let after = try await alongTrack.estimate(from: from, to: to)
+        XCTAssertEqual(after.distanceKm, 69.4, accuracy: 0.001)
+        XCTAssertEqual(after.price, 164.92, accuracy: 0.001)
+    }
+
+    func testPrecomputedRouteMatchesLineOrder() async throws {
+        let dataService = RailDataService(loader: LocalDataLoader())
+        guard let route = await dataService.precomputedRoute(from: "bts_mo_chit", to: "bts_asok") else {
+            XCTFail("Missing rail matrix")
+            return
+        }
+        XCTAssertEqual(route.stops, 2)
+        XCTAssertEqual(route.fare ?? 0, 23, accuracy: 0.001)
+        let crossSystem = await dataService.precomputedRoute(from: "bts_mo_chit", to: "mrt_queen")
+        XCTAssertNil(crossSystem?.stops)
+        XCTAssertNotNil(crossSystem?.distanceKm)
+    }
+
+    func testLineGeometryKeepsEndpoints() async throws {
+        let dataService = RailDataService(loader: LocalDataLoader())
+        let lines = try await dataService.lines()
+        guard let geometry = await dataService.lineGeometry(), let line = lines.first else {
+            XCTFail("Missing line geometry")
+            return
+        }
+        let full = try XCTUnwrap(geometry.polyline(for: line.id, maxDeviationMeters: 0))
+        XCTAssertEqual(full.count, line.coordinates.count)
+        for (decoded, source) in zip(full, line.coordinates) {
+            XCTAssertEqual(decoded.latitude, source[0], accuracy: 1e-6)
+            XCTAssertEqual(decoded.longitude, source[1], accuracy: 1e-6)
+        }
+        let coarse = try XCTUnwrap(geometry.polyline(for: line.id, maxDeviationMeters: .infinity))
+        XCTAssertLessThanOrEqual(coarse.count, full.count)
+        XCTAssertEqual(coarse.last?.latitude ?? 0, full.last?.latitude ?? 1, accuracy: 1e-9)
+    }
+}
+
+/// Rail data without the precomputed matrix, as before rail_matrix.plist
+/// carried track distances.
+private struct NoMatrixRailData: RailDataProviding {
+    let base: RailDataProviding
+
+    func stations() async throws -> [RailStation] {
+        try await base.stations()
+    }
+
+    func lines() async throws -> [RailLine] {
+        try await base.lines()
+    }
+
+    func nearestStation(to coordinate: CLLocationCoordinate2D) async throws -> (station: RailStation, distanceKm: Double)? {
+        try await base.nearestStation(to: coordinate)
+    }
+
+    func precomputedRoute(from: String, to: String) async -> RailRoute? {
+        nil
+    }
+
+    func lineGeometry() async -> RailLineGeometry? {
+        await base.lineGeometry()
+    }
 }
@@ -31,6 +31,36 @@ final class PoiViewModelTests: XCTestCase {
         XCTAssertTrue(viewModel.filteredPois.allSatisfy { $0.area == firstArea })
     }
 
+    @MainActor
+    func testSearchMatchesEitherName() async throws {
+        let (viewModel, _) = makeViewModel()
+        await viewModel.load()
+        viewModel.query = "arun"
+        viewModel.applyFilters()
+        XCTAssertEqual(viewModel.filteredPois.map(\.id), ["poi_wat_arun"])
+        viewModel.query = "วัดอรุ"
+        viewModel.applyFilters()
+        XCTAssertEqual(viewModel.filteredPois.map(\.id), ["poi_wat_arun"])
+    }
+
+    func testSearchIndexMatchesLinearScan() async throws {
+        let service = MockPoiService(loader: LocalDataLoader())
+        let pois = try await service.fetchPois()
+        guard let index = await service.searchIndex() else {
+            XCTFail("Missing search index")
+            return
+        }
+        XCTAssertEqual(index.search("").count, pois.count)
+        for poi in pois {
+            let area = index.search("", area: poi.area)
+            XCTAssertEqual(Set(area), Set(pois.filter { $0.area == poi.area }.map(\.id)))
+            let ratings = area.compactMap { id in pois.first { $0.id == id }?.rating }
+            XCTAssertEqual(ratings, ratings.sorted(by: >))
+            XCTAssertTrue(index.search(poi.nameEN).contains(poi.id))
+            XCTAssertTrue(index.search(String(poi.nameTH.unicodeScalars.prefix(4))).contains(poi.id))
+        }
+    }
+
     @MainActor
     func testAddToItineraryPersistsItem() async throws {
         let (viewModel, repository) = makeViewModel()
@@ -0,0 +1,35 @@
+import CoreLocation
+import XCTest
+@testable import JourneyTH
+
+final class SpatialIndexTests: XCTestCase {
+    private let probes = [
+        CLLocationCoordinate2D(latitude: 13.7563, longitude: 100.5018),
+        CLLocationCoordinate2D(latitude: 13.9, longitude: 100.6),
+        CLLocationCoordinate2D(latitude: 14.35, longitude: 100.57),
+        CLLocationCoordinate2D(latitude: 18.79, longitude: 98.98),
+    ]
+
+    func testNearestStationMatchesLinearScan() async throws {
+        let dataService = RailDataService(loader: LocalDataLoader())
+        let stations = try await dataService.stations()
+        for probe in probes {
+            guard let nearest = try await dataService.nearestStation(to: probe) else {
+                XCTFail("No station found")
+                return
+            }
+            let expected = stations.map { SpatialGrid.distanceKm(probe.latitude, probe.longitude, $0.lat, $0.lng) }.min()
+            XCTAssertEqual(nearest.distanceKm, expected ?? .infinity, accuracy: 1e-9)
+        }
+    }
+
+    func testPoisNearMatchLinearScan() async throws {
+        let service = MockPoiService(loader: LocalDataLoader())
+        let pois = try await service.fetchPois()
+        for probe in probes {
+            let found = try await service.pois(near: probe, radiusKm: 5)
+            let expected = pois.filter { SpatialGrid.distanceKm(probe.latitude, probe.longitude, $0.lat, $0.lng) <= 5 }
+            XCTAssertEqual(Set(found.map(\.id)), Set(expected.map(\.id)))
+        }
+    }
+}
@@ -16,4 +16,16 @@ final class TransportViewModelTests: XCTestCase {
         XCTAssertGreaterThan(estimates.tukTukMax, estimates.tukTukMin)
         XCTAssertGreaterThan(estimates.moto, 0)
     }
+
+    func testFareTablesMatchTierWalk() throws {
+        let tables = try LocalDataLoader().load("fare_tables", as: FareTables.self)
+        guard let fares = tables.fares(at: 12.34) else {
+            XCTFail("12.34 km is inside the tables")
+            return
+        }
+        // 35 flat to 1 km, 6.5/km to 10 km, then 7.5/km.
+        XCTAssertEqual(fares.taxi, 35 + 9 * 6.5 + 2.34 * 7.5, accuracy: 0.01)
+        XCTAssertEqual(fares.moto, 25 + 3 * 8 + 7.34 * 10, accuracy: 0.01)
+        XCTAssertNil(tables.fares(at: 250))
+    }
 }
@@ -0,0 +1 @@
+"""Build-time compilers for the data JourneyTH ships in its app bundle."""
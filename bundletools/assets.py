@@ -0,0 +1,298 @@
+"""Shrink the raster images in Assets.xcassets and fill in their scale variants.
+
+    python -m bundletools.assets [--jobs N] [--quality 85] [--min-psnr 40] [--force]
+
+For each ``*.imageset`` the largest-scale file listed in its Contents.json is
+the source. Pillow, when installed, resizes it into every other ``scale``
+the Contents.json lists (``<name>@2x.png`` and so on, filled in there) and
+tries a lossy re-encode of each file: JPEG at ``--quality``, PNG quantized
+to a 256-colour palette. A lossy result is kept only if it is smaller and
+its PSNR against the original is at least ``--min-psnr`` dB. Every PNG is
+then recompressed losslessly: text and timestamp chunks are dropped and the
+image data deflated again at level 9, keeping the row filters. That step
+needs only zlib, so without Pillow the catalog still shrinks but missing
+variants are reported instead of generated.
+
+Imagesets are processed in a ProcessPoolExecutor. ``.build-cache/assets.json``
+holds a content hash of each imageset as it was left, together with the
+settings, so unchanged imagesets are never handed to a worker. It also
+lists the hash of every file the pipeline wrote, and those files are never
+re-encoded lossily again, even with ``--force``.
+
+Each ``image`` in pois.json is also checked against the catalog. A key with
+no imageset is fine when PoiSymbolPalette draws it as a symbol; otherwise
+the row falls back to the default pin, and that is an error.
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from pbxgen.cache import write_if_changed
+
+from .data import DATA_DIR
+
+try:
+    from PIL import Image, ImageChops, ImageStat
+except ImportError:
+    Image = None
+
+CATALOG = Path("JourneyTH/Resources/Assets.xcassets")
+PALETTE_SOURCE = Path("JourneyTH/Features/Shared/SharedComponents.swift")
+CACHE_PATH = Path(".build-cache/assets.json")
+CACHE_VERSION = 1
+RASTER = {".png", ".jpg", ".jpeg"}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Ancillary chunks that change how the pixels render; the rest are dropped.
+PNG_KEEP = {b"IHDR", b"PLTE", b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"IEND"}
+
+
+def recompress_png(data):
+    """The same pixels in fewer bytes, or ``data`` when that is not smaller.
+
+    Animated PNGs and files this reader does not understand come back as is.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+    chunks, idat, position = [], [], len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        position += 12 + length
+        if kind == b"acTL":
+            return data
+        if kind == b"IDAT":
+            if not idat:
+                chunks.append((b"IDAT", None))
+            idat.append(body)
+        elif kind in PNG_KEEP:
+            chunks.append((kind, body))
+        if kind == b"IEND":
+            break
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error:
+        return data
+    candidates = []
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidates.append(compressor.compress(raw) + compressor.flush())
+    deflated = min(candidates, key=len)
+    out = bytearray(PNG_SIGNATURE)
+    for kind, body in chunks:
+        body = deflated if body is None else body
+        out += struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+    return bytes(out) if len(out) < len(data) else data
+
+
+def _psnr(original, candidate):
+    difference = ImageChops.difference(original.convert("RGBA"), candidate.convert("RGBA"))
+    mse = sum(value for value in ImageStat.Stat(difference).sum2) / (4 * original.width * original.height)
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def _encode(image, suffix, quality=None):
+    buffer = BytesIO()
+    if suffix == ".png":
+        image.save(buffer, "PNG", optimize=True)
+    else:
+        image.convert("RGB").save(buffer, "JPEG", quality=quality or 95, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _lossy(data, suffix, quality, min_psnr):
+    """Pillow's lossy re-encode of ``data`` if it passes the PSNR bar and is
+    smaller; otherwise ``data``."""
+    original = Image.open(BytesIO(data))
+    original.load()
+    if suffix == ".png":
+        if original.mode == "P":
+            return data
+        candidate = original.convert("RGBA").quantize(256, method=Image.Quantize.FASTOCTREE)
+    else:
+        candidate = original
+    encoded = _encode(candidate, suffix, quality)
+    if len(encoded) < len(data) and _psnr(original, Image.open(BytesIO(encoded))) >= min_psnr:
+        return encoded
+    return data
+
+
+def _scale(entry):
+    match = re.fullmatch(r"(\d+)x", entry.get("scale", ""))
+    return int(match.group(1)) if match else None
+
+
+def process_imageset(path, quality, min_psnr, settled=frozenset()):
+    """Fill in and shrink one imageset; runs in a worker process.
+
+    Files whose SHA-256 is in ``settled`` already came out of a lossy pass
+    and only get the lossless one, so re-runs do not stack up generation
+    loss. Returns ``{"name", "before", "after", "written", "notes",
+    "settled"}``, the last being the hashes of the files as left.
+    """
+    path = Path(path)
+    contents_path = path / "Contents.json"
+    contents = json.loads(contents_path.read_text(encoding="utf-8"))
+    images = contents.get("images", [])
+    report = {"name": path.stem, "before": 0, "after": 0, "written": [], "notes": [], "settled": []}
+    groups = {}
+    for entry in images:
+        if _scale(entry):
+            key = (entry.get("idiom"), json.dumps(entry.get("appearances"), sort_keys=True))
+            groups.setdefault(key, []).append(entry)
+    changed_contents = False
+    for entries in groups.values():
+        present = [entry for entry in entries if entry.get("filename") and (path / entry["filename"]).is_file()]
+        raster = [entry for entry in present if Path(entry["filename"]).suffix.lower() in RASTER]
+        if not raster:
+            continue
+        source = max(raster, key=_scale)
+        suffix = Path(source["filename"]).suffix.lower()
+        for entry in entries:
+            if entry in present:
+                continue
+            if Image is None:
+                report["notes"].append(f"{entry['scale']} variant missing (install Pillow to generate it)")
+                continue
+            image = Image.open(path / source["filename"])
+            ratio = _scale(entry) / _scale(source)
+            size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+            entry["filename"] = f"{path.stem}@{entry['scale']}{suffix}" if _scale(entry) > 1 else f"{path.stem}{suffix}"
+            (path / entry["filename"]).write_bytes(_encode(image.resize(size, Image.Resampling.LANCZOS), suffix))
+            report["written"].append(entry["filename"])
+            present.append(entry)
+            changed_contents = True
+        for entry in present:
+            file = path / entry["filename"]
+            if file.suffix.lower() not in RASTER:
+                continue
+            data = file.read_bytes()
+            report["before"] += len(data)
+            smaller = data
+            if Image is not None and hashlib.sha256(data).hexdigest() not in settled:
+                smaller = _lossy(smaller, file.suffix.lower(), quality, min_psnr)
+            if file.suffix.lower() == ".png":
+                smaller = recompress_png(smaller)
+            report["after"] += len(smaller)
+            report["settled"].append(hashlib.sha256(smaller).hexdigest())
+            if write_if_changed(file, smaller) and file.name not in report["written"]:
+                report["written"].append(file.name)
+    if changed_contents:
+        write_if_changed(contents_path, json.dumps(contents, indent=2) + "\n")
+    return report
+
+
+def imageset_digest(path, settings):
+    digest = hashlib.sha256(repr(settings).encode("utf-8"))
+    for file in sorted(Path(path).iterdir()):
+        if file.is_file():
+            digest.update(file.name.encode("utf-8") + b"\0")
+            digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def _load_cache(cache_path):
+    try:
+        data = json.loads(Path(cache_path).read_text())
+    except (OSError, ValueError):
+        return {}, set()
+    if data.get("version") != CACHE_VERSION:
+        return {}, set()
+    return data.get("imagesets", {}), set(data.get("settled", []))
+
+
+def optimize(catalog=CATALOG, quality=85, min_psnr=40.0, jobs=None, cache_path=CACHE_PATH, force=False):
+    """Process every imageset whose content hash changed; returns the worker
+    reports and the number of imagesets skipped.
+
+    ``force`` ignores the imageset hashes but still skips the lossy pass for
+    files it produced.
+    """
+    settings = (quality, min_psnr, Image is not None, Path(__file__).read_bytes())
+    imagesets = sorted(Path(catalog).rglob("*.imageset"))
+    cached, settled = _load_cache(cache_path)
+    digests = {path: imageset_digest(path, settings) for path in imagesets}
+    pending = [path for path in imagesets if force or cached.get(path.as_posix()) != digests[path]]
+    arguments = ([quality] * len(pending), [min_psnr] * len(pending), [frozenset(settled)] * len(pending))
+    if len(pending) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            reports = list(pool.map(process_imageset, pending, *arguments))
+    else:
+        reports = list(map(process_imageset, pending, *arguments))
+    for path in pending:
+        digests[path] = imageset_digest(path, settings)
+    for report in reports:
+        settled.update(report["settled"])
+    payload = {
+        "version": CACHE_VERSION,
+        "imagesets": {path.as_posix(): digest for path, digest in digests.items()},
+        "settled": sorted(settled),
+    }
+    write_if_changed(cache_path, json.dumps(payload, indent=2, sort_keys=True) + "\n")
+    return reports, len(imagesets) - len(pending)
+
+
+def palette_keys(source=PALETTE_SOURCE):
+    """Image keys PoiSymbolPalette.symbol(for:) maps to an SF Symbol."""
+    try:
+        text = Path(source).read_text(encoding="utf-8")
+    except OSError:
+        return set()
+    body = text.split("static func symbol(for", 1)[-1].split("static func", 1)[0]
+    return set(re.findall(r'case\s+"([^"]+)"\s*:', body))
+
+
+def cross_check(catalog=CATALOG, data_dir=DATA_DIR, palette_source=PALETTE_SOURCE):
+    """Return ``(missing, symbol_only)`` for the pois.json ``image`` keys:
+    keys with neither an imageset nor a palette symbol, and keys drawn as
+    symbols because there is no imageset."""
+    source = Path(data_dir) / "pois.json"
+    if not source.is_file():
+        return [], []
+    keys = sorted({poi["image"] for poi in json.loads(source.read_bytes()) if poi.get("image")})
+    imagesets = {path.stem for path in Path(catalog).rglob("*.imageset")}
+    symbols = palette_keys(palette_source)
+    missing = [key for key in keys if key not in imagesets and key not in symbols]
+    symbol_only = [key for key in keys if key not in imagesets and key in symbols]
+    return missing, symbol_only
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", type=Path, default=CATALOG, help="asset catalog (default: %(default)s)")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding pois.json (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality for lossy re-encodes (default: %(default)s)")
+    parser.add_argument("--min-psnr", type=float, default=40.0, help="lowest PSNR in dB a lossy re-encode may have (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="process every imageset, ignoring the cache")
+    args = parser.parse_args(argv)
+
+    reports, skipped = optimize(args.catalog, args.quality, args.min_psnr, args.jobs, force=args.force)
+    before = after = 0
+    for report in reports:
+        before += report["before"]
+        after += report["after"]
+        written = f", wrote {', '.join(report['written'])}" if report["written"] else ""
+        print(f"{report['name']}: {report['before']} -> {report['after']} bytes{written}")
+        for note in report["notes"]:
+            print(f"{report['name']}: {note}")
+    print(f"{len(reports)} imagesets processed, {skipped} unchanged; {before} -> {after} bytes" + ("" if Image else " (Pillow not installed: lossless PNG only)"))
+
+    missing, symbol_only = cross_check(args.catalog, args.data_dir)
+    if symbol_only:
+        print(f"{len(symbol_only)} pois.json images have no imageset and are drawn by PoiSymbolPalette: {', '.join(symbol_only)}")
+    if missing:
+        print(f"bundletools.assets: pois.json images with no imageset or symbol: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
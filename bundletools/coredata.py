@@ -0,0 +1,252 @@
+"""Find Core Data fetches that filter or sort on unindexed attributes.
+
+    python -m bundletools.coredata [--write] [--strict]
+
+The current version of ``JourneyTH.xcdatamodeld`` (named by its
+``.xccurrentversion``) is parsed for entities, attributes and existing
+``<fetchIndex>`` elements. The Swift sources are scanned for fetch
+requests: a variable declared as ``NSFetchRequest<...> = Entity.fetchRequest()``
+(or ``NSFetchRequest(entityName: "Entity")``), then the ``predicate`` and
+``sortDescriptors`` assigned to it. A request's key is the attributes its
+predicate compares with ``==``, in name order, then those it compares any
+other way, then its sort keys. SQLite can use an index for a request when
+the index's leading elements are that key, and one index serves every
+request whose key is a prefix of it, so proposals that are a prefix of
+another proposal are folded into it. Sort direction does not matter: an
+ascending index is walked backwards for descending sorts.
+
+``--write`` adds the proposed indexes to a new model version,
+``<model> N+1.xcdatamodel``, and makes it current. Adding indexes is a
+lightweight migration, which NSPersistentContainer infers by default. The
+``.xcdatamodeld`` wrapper already in the generator's ``file_refs`` covers
+every version inside it, so the project does not change.
+"""
+import argparse
+import plistlib
+import re
+import sys
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+from pbxgen.cache import write_if_changed
+
+MODEL = Path("JourneyTH/CoreData/JourneyTH.xcdatamodeld")
+SOURCE_DIR = Path("JourneyTH")
+CURRENT_VERSION = ".xccurrentversion"
+
+DECLARATION = re.compile(
+    r"\b(?:let|var)\s+(\w+)\s*(?::\s*NSFetchRequest<[^>]*>\s*)?=\s*"
+    r"(?:(\w+)\.fetchRequest\(\)|NSFetchRequest<[^>]*>\(entityName:\s*\"(\w+)\"\))"
+)
+PREDICATE = re.compile(r"\b(\w+)\.predicate\s*=\s*NSPredicate\(format:\s*\"((?:[^\"\\]|\\.)*)\"([^)\n]*)\)")
+SORTS = re.compile(r"\b(\w+)\.sortDescriptors\s*=\s*\[([^\]]*)\]")
+SORT_KEY = re.compile(r"NSSortDescriptor\((?:key:\s*\"(\w+)\"|keyPath:\s*\\\w+\.(\w+))")
+COMPARISON = re.compile(
+    r"(%K|[A-Za-z_]\w*)\s*(==|=|!=|<>|<=|>=|=<|=>|<|>|\b(?:BEGINSWITH|ENDSWITH|CONTAINS|LIKE|MATCHES|IN|BETWEEN)\b(?:\[\w+\])?)",
+    re.IGNORECASE,
+)
+KEYWORDS = {"AND", "OR", "NOT", "ANY", "ALL", "NONE", "SOME", "TRUE", "FALSE", "YES", "NO", "NIL", "NULL", "SELF"}
+
+
+class CoreDataError(ValueError):
+    pass
+
+
+class Entity:
+    def __init__(self, name, attributes, indexes):
+        self.name = name
+        self.attributes = attributes
+        # {index name: [property]}
+        self.indexes = indexes
+
+
+class Fetch:
+    """One fetch request found in the Swift sources."""
+
+    def __init__(self, entity, where):
+        self.entity = entity
+        self.where = where
+        self.equal = []
+        self.other = []
+        self.sorts = []
+
+    @property
+    def key(self):
+        return tuple(sorted(set(self.equal))) + tuple(dict.fromkeys(a for a in self.other if a not in self.equal)) + tuple(
+            a for a in dict.fromkeys(self.sorts) if a not in self.equal and a not in self.other
+        )
+
+
+def current_model(model=MODEL):
+    """Path of the current ``.xcdatamodel`` inside ``model``."""
+    model = Path(model)
+    marker = model / CURRENT_VERSION
+    if marker.is_file():
+        return model / plistlib.loads(marker.read_bytes())["_XCCurrentVersionName"]
+    versions = sorted(model.glob("*.xcdatamodel"))
+    if len(versions) != 1:
+        raise CoreDataError(f"{model}: {len(versions)} versions and no {CURRENT_VERSION}")
+    return versions[0]
+
+
+def load_entities(version):
+    """``{name: Entity}`` from a ``.xcdatamodel``'s contents."""
+    try:
+        root = ElementTree.parse(Path(version) / "contents").getroot()
+    except (OSError, ElementTree.ParseError) as error:
+        raise CoreDataError(f"{version}: {error}") from error
+    entities = {}
+    for node in root.iter("entity"):
+        attributes = {attribute.get("name") for attribute in node.iter("attribute")}
+        indexes = {
+            index.get("name"): [element.get("property") for element in index.iter("fetchIndexElement")]
+            for index in node.iter("fetchIndex")
+        }
+        entities[node.get("name")] = Entity(node.get("name"), attributes, indexes)
+    return entities
+
+
+def _line(text, offset):
+    return text.count("\n", 0, offset) + 1
+
+
+def find_fetches(source_dir=SOURCE_DIR):
+    """Every fetch request in the Swift sources, in source order."""
+    fetches = []
+    for path in sorted(Path(source_dir).rglob("*.swift")):
+        text = path.read_text(encoding="utf-8")
+        events = []
+        for match in DECLARATION.finditer(text):
+            events.append((match.start(), "declare", match))
+        for match in PREDICATE.finditer(text):
+            events.append((match.start(), "predicate", match))
+        for match in SORTS.finditer(text):
+            events.append((match.start(), "sorts", match))
+        live = {}
+        for offset, kind, match in sorted(events, key=lambda event: event[0]):
+            if kind == "declare":
+                fetch = Fetch(match.group(2) or match.group(3), f"{path}:{_line(text, offset)}")
+                live[match.group(1)] = fetch
+                fetches.append(fetch)
+                continue
+            fetch = live.get(match.group(1))
+            if fetch is None:
+                continue
+            if kind == "predicate":
+                names = iter(re.findall(r"\"(\w+)\"", match.group(3)))
+                for name, operator in COMPARISON.findall(match.group(2)):
+                    if name == "%K":
+                        name = next(names, None)
+                    if name is None or name.upper() in KEYWORDS:
+                        continue
+                    (fetch.equal if operator in ("==", "=") else fetch.other).append(name)
+            else:
+                fetch.sorts.extend(a or b for a, b in SORT_KEY.findall(match.group(2)))
+    return fetches
+
+
+def index_name(properties):
+    return "by" + "".join(name[0].upper() + name[1:] for name in properties) + "Index"
+
+
+def analyze(entities, fetches):
+    """Return ``(rows, proposals, warnings)``.
+
+    ``rows`` is ``[(fetch, covering index name or None)]``; ``proposals`` is
+    ``{entity: {index name: [property]}}`` for the uncovered keys.
+    """
+    rows, warnings, wanted = [], [], {}
+    for fetch in fetches:
+        entity = entities.get(fetch.entity)
+        if entity is None:
+            warnings.append(f"{fetch.where}: {fetch.entity} is not an entity in the model")
+            continue
+        unknown = [name for name in fetch.key if name not in entity.attributes]
+        if unknown:
+            warnings.append(f"{fetch.where}: {fetch.entity} has no attribute {', '.join(unknown)}")
+        key = tuple(name for name in fetch.key if name in entity.attributes)
+        if not key:
+            rows.append((fetch, None))
+            continue
+        covering = next((name for name, properties in entity.indexes.items() if tuple(properties[:len(key)]) == key), None)
+        rows.append((fetch, covering))
+        if covering is None:
+            wanted.setdefault(fetch.entity, set()).add(key)
+    proposals = {}
+    for entity, keys in sorted(wanted.items()):
+        kept = [key for key in keys if not any(other != key and other[:len(key)] == key for other in keys)]
+        proposals[entity] = {index_name(key): list(key) for key in sorted(kept)}
+    return rows, proposals, warnings
+
+
+def add_indexes(contents, proposals):
+    """``contents`` with a ``<fetchIndex>`` per proposal before each entity's
+    closing tag, in the layout Xcode writes."""
+    for entity, indexes in proposals.items():
+        match = re.search(rf'(<entity name="{re.escape(entity)}"[^>]*>.*?)(\n(\s*)</entity>)', contents, re.DOTALL)
+        if match is None:
+            raise CoreDataError(f"no <entity name={entity!r}> to index")
+        indent = match.group(3)
+        blocks = []
+        for name, properties in indexes.items():
+            blocks.append(f'\n{indent}    <fetchIndex name="{name}">')
+            blocks.extend(
+                f'\n{indent}        <fetchIndexElement property="{prop}" type="Binary" order="ascending"/>' for prop in properties
+            )
+            blocks.append(f"\n{indent}    </fetchIndex>")
+        contents = contents[:match.end(1)] + "".join(blocks) + contents[match.end(1):]
+    return contents
+
+
+def write_version(model, version, proposals):
+    """Copy ``version`` to the next version with ``proposals`` added, make it
+    current, and return its path."""
+    model = Path(model)
+    base = re.sub(r" \d+$", "", model.stem)
+    numbers = [int(match.group(1)) for path in model.glob("*.xcdatamodel") if (match := re.fullmatch(rf"{re.escape(base)} (\d+)", path.stem))]
+    number = max(numbers, default=1) + 1
+    target = model / f"{base} {number}.xcdatamodel"
+    contents = add_indexes((Path(version) / "contents").read_text(encoding="utf-8"), proposals)
+    contents = re.sub(r'userDefinedModelVersionIdentifier="[^"]*"', f'userDefinedModelVersionIdentifier="{number}"', contents, count=1)
+    write_if_changed(target / "contents", contents)
+    write_if_changed(model / CURRENT_VERSION, plistlib.dumps({"_XCCurrentVersionName": target.name}))
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=Path, default=MODEL, help="the .xcdatamodeld to analyze (default: %(default)s)")
+    parser.add_argument("--sources", type=Path, default=SOURCE_DIR, help="Swift sources to scan for fetch requests (default: %(default)s)")
+    parser.add_argument("--write", action="store_true", help="add the proposed indexes to a new current model version")
+    parser.add_argument("--strict", action="store_true", help="exit 1 when a fetch has no index")
+    args = parser.parse_args(argv)
+
+    try:
+        version = current_model(args.model)
+        entities = load_entities(version)
+        rows, proposals, warnings = analyze(entities, find_fetches(args.sources))
+    except CoreDataError as error:
+        parser.exit(1, f"bundletools.coredata: {error}\n")
+    for warning in warnings:
+        print(f"warning: {warning}", file=sys.stderr)
+    print(f"{version.name}: {len(entities)} entities, {len(rows)} fetch requests")
+    for fetch, covering in rows:
+        key = ", ".join(fetch.key) or "-"
+        status = covering or ("no filter or sort" if not fetch.key else "NOT INDEXED")
+        print(f"  {fetch.where}: {fetch.entity} [{key}] {status}")
+    for entity in sorted(set(entities) - {fetch.entity for fetch, _ in rows}):
+        print(f"  {entity}: never fetched")
+    for entity, indexes in proposals.items():
+        for name, properties in indexes.items():
+            print(f"propose {entity}.{name}: {', '.join(properties)}")
+    if proposals and args.write:
+        try:
+            target = write_version(args.model, version, proposals)
+        except CoreDataError as error:
+            parser.exit(1, f"bundletools.coredata: {error}\n")
+        print(f"wrote {target} and made it the current version")
+    return 1 if proposals and args.strict and not args.write else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
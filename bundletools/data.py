@@ -0,0 +1,251 @@
+"""Validate the bundled JSON data and compile it to binary property lists.
+
+    python -m bundletools.data [--check]
+
+Each bundle in ``BUNDLES`` is checked against a schema that mirrors the Swift
+Codable model it decodes into (key names, required and optional fields, Int
+versus Double) plus a few cross-record checks, then written next to its JSON
+as ``<name>.plist`` in binary plist format. generate_pbx.py runs the
+compiler before it generates the project and puts the .plist files in the
+app's Resources phase instead of the JSON, which stays in the project as the
+source of truth. LocalDataLoader prefers the .plist and falls back to JSON.
+
+A binary plist stores numbers as fixed-width values and every distinct
+string once, so the app skips text scanning and number parsing at launch.
+The report lists bytes saved per bundle and an estimated decode time for
+each format; the estimate is bytes over an assumed decoder throughput, so
+pass figures measured on a device to ``--json-rate``/``--plist-rate``.
+"""
+import argparse
+import json
+import plistlib
+from collections import namedtuple
+from pathlib import Path
+
+from pbxgen.cache import write_if_changed
+
+DATA_DIR = Path("JourneyTH/Resources/Data")
+# Assumed decoder throughput in MB/s, for the estimate only.
+JSON_RATE = 25.0
+PLIST_RATE = 100.0
+
+Optional = namedtuple("Optional", "kind")
+Map = namedtuple("Map", "kind")
+Bundle = namedtuple("Bundle", "name schema checks")
+Compiled = namedtuple("Compiled", "name source output json_bytes plist_bytes written")
+
+
+class SchemaError(ValueError):
+    pass
+
+
+POI = {
+    "id": str,
+    "nameTH": str,
+    "nameEN": str,
+    "area": str,
+    "rating": float,
+    "tags": [str],
+    "minutes": int,
+    "lat": float,
+    "lng": float,
+    "image": str,
+}
+
+RAIL_STATION = {
+    "id": str,
+    "nameTH": str,
+    "nameEN": str,
+    "system": str,
+    "lat": float,
+    "lng": float,
+    "line": str,
+}
+
+RAIL_LINE = {
+    "id": str,
+    "name": str,
+    "system": str,
+    "stationIds": [str],
+    "coordinates": [[float]],
+}
+
+FARE_CONFIGURATION = {
+    "fareConfig": {
+        "taxi": [{"upToKm": Optional(float), "rate": float}],
+        "tuktuk": {"baseMin": float, "baseMax": float, "perKmMin": float, "perKmMax": float},
+        "moto": {
+            "base2km": float,
+            "perKm_2_5": float,
+            "perKm_gt5": float,
+            "surcharges": [{"reason": str, "amount": float}],
+        },
+    },
+    "railConfig": {
+        "urbanRail": Map({"base": float, "perStop": [float], "max": float}),
+        "intercityRail": {"basePerKm": Map(float), "classSurcharge": Map(float), "nightSurcharge": float},
+    },
+}
+
+
+def _unique_ids(records, where):
+    seen = set()
+    for position, record in enumerate(records):
+        if record["id"] in seen:
+            raise SchemaError(f"{where}[{position}].id: duplicate id {record['id']!r}")
+        seen.add(record["id"])
+
+
+def _coordinates(records, where):
+    for position, record in enumerate(records):
+        if not (-90 <= record["lat"] <= 90 and -180 <= record["lng"] <= 180):
+            raise SchemaError(f"{where}[{position}]: lat/lng out of range")
+
+
+def check_pois(pois):
+    _unique_ids(pois, "pois")
+    _coordinates(pois, "pois")
+
+
+def check_stations(payload):
+    _unique_ids(payload["stations"], "stations.stations")
+    _coordinates(payload["stations"], "stations.stations")
+    known = {station["id"] for station in payload["stations"]}
+    for position, line in enumerate(payload["lines"]):
+        where = f"stations.lines[{position}]"
+        for station in line["stationIds"]:
+            if station not in known:
+                raise SchemaError(f"{where}.stationIds: unknown station {station!r}")
+        # RailLine.polyline reads $0[0] and $0[1].
+        for point, pair in enumerate(line["coordinates"]):
+            if len(pair) != 2:
+                raise SchemaError(f"{where}.coordinates[{point}]: expected [lat, lng]")
+
+
+def check_fares(bundle):
+    previous = 0.0
+    taxi = bundle["fareConfig"]["taxi"]
+    for position, tier in enumerate(taxi):
+        where = f"fares_config.fareConfig.taxi[{position}]"
+        if tier.get("upToKm") is None:
+            if position != len(taxi) - 1:
+                raise SchemaError(f"{where}: only the last tier may omit upToKm")
+        elif tier["upToKm"] <= previous:
+            raise SchemaError(f"{where}.upToKm: tiers must increase")
+        else:
+            previous = tier["upToKm"]
+
+
+BUNDLES = [
+    Bundle("fares_config", FARE_CONFIGURATION, check_fares),
+    Bundle("pois", [POI], check_pois),
+    Bundle("stations", {"stations": [RAIL_STATION], "lines": [RAIL_LINE]}, check_stations),
+]
+
+
+def _kind(value):
+    return {dict: "an object", list: "an array", str: "a string", bool: "a boolean", type(None): "null"}.get(type(value), "a number")
+
+
+def validate(value, schema, where):
+    """Check ``value`` against ``schema`` and return it shaped for a plist.
+
+    Double fields become floats (JSON ``1`` would otherwise be stored as a
+    plist integer) and absent or null optionals are left out, since a plist
+    has no null and decodeIfPresent treats a missing key as nil.
+    """
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            raise SchemaError(f"{where}: expected an object, found {_kind(value)}")
+        unknown = sorted(value.keys() - schema.keys())
+        if unknown:
+            raise SchemaError(f"{where}: {', '.join(unknown)} not in the Swift model")
+        shaped = {}
+        for key, kind in schema.items():
+            if isinstance(kind, Optional):
+                if value.get(key) is None:
+                    continue
+                kind = kind.kind
+            elif key not in value:
+                raise SchemaError(f"{where}: missing {key}")
+            shaped[key] = validate(value[key], kind, f"{where}.{key}")
+        return shaped
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            raise SchemaError(f"{where}: expected an array, found {_kind(value)}")
+        return [validate(item, schema[0], f"{where}[{position}]") for position, item in enumerate(value)]
+    if isinstance(schema, Map):
+        if not isinstance(value, dict):
+            raise SchemaError(f"{where}: expected an object, found {_kind(value)}")
+        return {key: validate(item, schema.kind, f"{where}.{key}") for key, item in value.items()}
+    if schema is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SchemaError(f"{where}: expected a number, found {_kind(value)}")
+        return float(value)
+    if schema is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise SchemaError(f"{where}: expected an integer, found {_kind(value)}")
+        return value
+    if not isinstance(value, schema):
+        raise SchemaError(f"{where}: expected {_kind(schema())}, found {_kind(value)}")
+    return value
+
+
+def compile_bundle(bundle, directory=DATA_DIR, write=True):
+    source = Path(directory) / f"{bundle.name}.json"
+    raw = source.read_bytes()
+    try:
+        value = json.loads(raw)
+    except ValueError as error:
+        raise SchemaError(f"{source}: {error}") from None
+    shaped = validate(value, bundle.schema, bundle.name)
+    bundle.checks(shaped)
+    data = plistlib.dumps(shaped, fmt=plistlib.FMT_BINARY, sort_keys=True)
+    output = source.with_suffix(".plist")
+    written = write_if_changed(output, data) if write else False
+    return Compiled(bundle.name, source, output, len(raw), len(data), written)
+
+
+def compile_bundles(directory=DATA_DIR, bundles=BUNDLES, write=True):
+    """Compile every bundle whose JSON exists under ``directory``.
+
+    Raises SchemaError on the first bundle that does not match its model.
+    """
+    return [
+        compile_bundle(bundle, directory, write)
+        for bundle in bundles
+        if (Path(directory) / f"{bundle.name}.json").is_file()
+    ]
+
+
+def report(results, json_rate=JSON_RATE, plist_rate=PLIST_RATE):
+    lines = [f"{'bundle':<14} {'json':>9} {'plist':>9} {'saved':>9} {'json ms':>8} {'plist ms':>8}"]
+    for result in results:
+        json_ms = result.json_bytes / (json_rate * 1000)
+        plist_ms = result.plist_bytes / (plist_rate * 1000)
+        lines.append(
+            f"{result.name:<14} {result.json_bytes:>9} {result.plist_bytes:>9} "
+            f"{result.json_bytes - result.plist_bytes:>9} {json_ms:>8.3f} {plist_ms:>8.3f}"
+        )
+    lines.append(f"decode times are estimates at {json_rate:g} MB/s (JSON) and {plist_rate:g} MB/s (binary plist)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON bundles (default: %(default)s)")
+    parser.add_argument("--check", action="store_true", help="validate only; do not write .plist files")
+    parser.add_argument("--json-rate", type=float, default=JSON_RATE, metavar="MB/S", help="JSONDecoder throughput for the estimate")
+    parser.add_argument("--plist-rate", type=float, default=PLIST_RATE, metavar="MB/S", help="PropertyListDecoder throughput for the estimate")
+    args = parser.parse_args(argv)
+
+    try:
+        results = compile_bundles(args.data_dir, write=not args.check)
+    except SchemaError as error:
+        parser.exit(1, f"bundletools.data: {error}\n")
+    print("\n".join(report(results, args.json_rate, args.plist_rate)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,196 @@
+"""Tabulate the taxi, tuk-tuk and moto fares from fares_config.json.
+
+    python -m bundletools.fares [--check]
+
+Every fare in ``fareConfig`` is a continuous piecewise-linear function of
+distance, so ``fare_tables.plist`` stores each one at every ``STEP_KM`` up to
+``MAX_KM`` as little-endian Float32 arrays and FareEstimatorService
+interpolates between neighbouring entries instead of walking the tiers. The
+tables are built by accumulating the per-step rate; the parity check then
+evaluates a line-by-line port of the Swift tier walk at every step and every
+midpoint and fails the build if any entry, or any interpolated value, is off
+by more than ``TOLERANCE``. A tier boundary that is not a multiple of the
+step shows up there as an interpolation error.
+"""
+import argparse
+import json
+import plistlib
+import struct
+from pathlib import Path
+
+from pbxgen.cache import Manifest, fingerprint, write_if_changed
+
+from .data import DATA_DIR
+
+OUTPUT_NAME = "fare_tables.plist"
+MANIFEST_PATH = Path(".build-cache/fare_tables.json")
+STEPS_PER_KM = 10
+STEP_KM = 1 / STEPS_PER_KM
+MAX_KM = 200
+TOLERANCE = 0.01  # baht
+TABLES = ("taxi", "tukTukMin", "tukTukMax", "moto")
+
+
+class FareParityError(ValueError):
+    pass
+
+
+# Ports of FareEstimatorService. Keep them in step with the Swift.
+
+
+def _upper(tier, default):
+    # Swift decodes a missing and a null upToKm alike, as nil.
+    upper = tier.get("upToKm")
+    return default if upper is None else upper
+
+
+def swift_taxi_fare(distance, tiers):
+    if not tiers:
+        return 0.0
+    total = tiers[0]["rate"]
+    previous_upper = _upper(tiers[0], 1.0)
+    if distance <= previous_upper:
+        return total
+    for tier in tiers[1:]:
+        upper = _upper(tier, float("inf"))
+        segment = max(min(distance, upper) - previous_upper, 0.0)
+        if segment > 0:
+            total += segment * tier["rate"]
+            previous_upper += segment
+        if distance <= upper:
+            break
+        previous_upper = upper
+    return total
+
+
+def swift_moto_fare(distance, moto):
+    if distance <= 2:
+        return moto["base2km"]
+    if distance <= 5:
+        return moto["base2km"] + (distance - 2) * moto["perKm_2_5"]
+    return moto["base2km"] + 3 * moto["perKm_2_5"] + (distance - 5) * moto["perKm_gt5"]
+
+
+def swift_fares(distance, config):
+    tuktuk = config["tuktuk"]
+    return {
+        "taxi": swift_taxi_fare(distance, config["taxi"]),
+        "tukTukMin": tuktuk["baseMin"] + distance * tuktuk["perKmMin"],
+        "tukTukMax": tuktuk["baseMax"] + distance * tuktuk["perKmMax"],
+        "moto": swift_moto_fare(distance, config["moto"]),
+    }
+
+
+def _taxi_rate(distance, tiers):
+    # Per-km rate in force just below ``distance``; the first tier is a flat fare.
+    lower = _upper(tiers[0], 1.0)
+    if distance <= lower:
+        return 0.0
+    for tier in tiers[1:]:
+        upper = _upper(tier, float("inf"))
+        if distance <= upper:
+            return tier["rate"]
+        lower = upper
+    return 0.0
+
+
+def _moto_rate(distance, moto):
+    if distance <= 2:
+        return 0.0
+    return moto["perKm_2_5"] if distance <= 5 else moto["perKm_gt5"]
+
+
+def build_tables(config):
+    """``{name: [fare at 0, STEP_KM, 2 * STEP_KM, ... MAX_KM]}``."""
+    count = MAX_KM * STEPS_PER_KM + 1
+    tuktuk = config["tuktuk"]
+    tables = {
+        "taxi": [config["taxi"][0]["rate"] if config["taxi"] else 0.0],
+        "tukTukMin": [tuktuk["baseMin"] + i / STEPS_PER_KM * tuktuk["perKmMin"] for i in range(count)],
+        "tukTukMax": [tuktuk["baseMax"] + i / STEPS_PER_KM * tuktuk["perKmMax"] for i in range(count)],
+        "moto": [config["moto"]["base2km"]],
+    }
+    for i in range(1, count):
+        midpoint = (i - 0.5) / STEPS_PER_KM
+        tables["taxi"].append(tables["taxi"][-1] + STEP_KM * (_taxi_rate(midpoint, config["taxi"]) if config["taxi"] else 0.0))
+        tables["moto"].append(tables["moto"][-1] + STEP_KM * _moto_rate(midpoint, config["moto"]))
+    return tables
+
+
+def _float32(values):
+    return list(struct.unpack(f"<{len(values)}f", struct.pack(f"<{len(values)}f", *values)))
+
+
+def check_parity(tables, config):
+    """Compare the Float32 tables with the Swift formulas at every step and
+    midpoint; returns the largest difference seen."""
+    stored = {name: _float32(values) for name, values in tables.items()}
+    worst = 0.0
+    for i in range(MAX_KM * STEPS_PER_KM):
+        for fraction in (0.0, 0.5):
+            distance = (i + fraction) / STEPS_PER_KM
+            expected = swift_fares(distance, config)
+            for name in TABLES:
+                table = stored[name]
+                value = table[i] + (table[i + 1] - table[i]) * fraction
+                difference = abs(value - expected[name])
+                if difference > TOLERANCE:
+                    raise FareParityError(
+                        f"{name} at {distance:.2f} km: table gives {value:.4f}, formula {expected[name]:.4f}"
+                    )
+                worst = max(worst, difference)
+    return worst
+
+
+def write_tables(directory=DATA_DIR, manifest_path=MANIFEST_PATH, force=False):
+    """Build, check and write ``fare_tables.plist``; returns ``(path, worst)``.
+
+    The parity check is the slow part, so nothing is rebuilt while
+    fares_config.json and this file are unchanged; ``worst`` is then None.
+    Returns ``(None, 0.0)`` when fares_config.json is missing.
+    """
+    source = Path(directory) / "fares_config.json"
+    if not source.is_file():
+        return None, 0.0
+    output = Path(directory) / OUTPUT_NAME
+    manifest = Manifest(manifest_path)
+    inputs = fingerprint(sources=[Path(__file__), source])
+    if not force and manifest.is_current(inputs):
+        return output, None
+    config = json.loads(source.read_bytes())["fareConfig"]
+    tables = build_tables(config)
+    worst = check_parity(tables, config)
+    data = {"stepKm": STEP_KM, **{name: struct.pack(f"<{len(values)}f", *values) for name, values in tables.items()}}
+    write_if_changed(output, plistlib.dumps(data, fmt=plistlib.FMT_BINARY, sort_keys=True))
+    manifest.record(inputs, [output])
+    return output, worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON bundles (default: %(default)s)")
+    parser.add_argument("--check", action="store_true", help="run the parity check without writing the tables")
+    parser.add_argument("--force", action="store_true", help="rebuild even when the inputs match the last build")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.check:
+            config = json.loads((args.data_dir / "fares_config.json").read_bytes())["fareConfig"]
+            output, worst = None, check_parity(build_tables(config), config)
+        else:
+            output, worst = write_tables(args.data_dir, force=args.force)
+            if output is None:
+                parser.exit(1, f"bundletools.fares: no fares_config.json under {args.data_dir}\n")
+    except FareParityError as error:
+        parser.exit(1, f"bundletools.fares: {error}\n")
+    if worst is None:
+        print(f"{output} is up to date (--force to rebuild and re-check)")
+        return 0
+    print(f"parity ok: largest difference {worst:.6f} baht over {MAX_KM * STEPS_PER_KM} steps of {STEP_KM:g} km")
+    if output:
+        print(f"wrote {output} ({output.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,272 @@
+"""Simplify the rail line geometry in stations.json at several map scales.
+
+    python -m bundletools.polylines [--force] [--synthetic VERTICES]
+
+Each line's ``coordinates`` are rounded to 1e-6 degrees and run through
+Douglas-Peucker once per entry in ``TOLERANCES_M``; the distances are
+measured in metres in a local equirectangular plane centred on the line,
+and the inner loop is vectorized with NumPy when it is installed. Level
+``k`` keeps every vertex that is more than ``TOLERANCES_M[k]`` away from the
+simplified line, so RailView can draw the coarsest level whose tolerance
+is still under one screen point.
+
+``line_geometry.plist`` holds ``toleranceMeters`` and, under ``lines``, one
+``Data`` blob per level for every line id. A blob is the level's vertices
+as lat/lng pairs in 1e-6 degree units, each value stored as the zigzag
+LEB128 varint of its difference from the previous vertex (the first from
+zero), which keeps a dense line to two or three bytes per coordinate.
+
+The report lists, per level, the vertex count kept across all lines and
+the largest distance in metres from an original vertex to the simplified
+line. The shipped lines are short, so ``--synthetic`` reports on a noisy
+line of the given size instead.
+"""
+import argparse
+import json
+import math
+import plistlib
+import random
+from pathlib import Path
+
+from pbxgen.cache import Manifest, fingerprint, write_if_changed
+
+from . import spatial
+from .data import DATA_DIR
+from .spatial import EARTH_RADIUS_KM
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+OUTPUT_NAME = "line_geometry.plist"
+MANIFEST_PATH = Path(".build-cache/line_geometry.json")
+SCALE = 1_000_000
+# Roughly two zoom levels apart; the first is street level.
+TOLERANCES_M = (1.0, 5.0, 20.0, 80.0, 320.0)
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+
+class PolylineError(ValueError):
+    pass
+
+
+def _project(points, reference=None):
+    """Metres east and north of the first vertex of ``reference`` (default
+    ``points``), scaled at its mean latitude."""
+    reference = reference or points
+    lat0, lng0 = reference[0]
+    scale = math.cos(math.radians(sum(lat for lat, _ in reference) / len(reference)))
+    xs = [math.radians(lng - lng0) * scale * EARTH_RADIUS_M for _, lng in points]
+    ys = [math.radians(lat - lat0) * EARTH_RADIUS_M for lat, _ in points]
+    return xs, ys
+
+
+def _segment_distances(xs, ys, start, end, px, py):
+    """Distance from each ``(px, py)`` to the segment ``start``-``end``."""
+    (ax, ay), (bx, by) = (xs[start], ys[start]), (xs[end], ys[end])
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    if np is not None:
+        px, py = np.asarray(px) - ax, np.asarray(py) - ay
+        t = np.zeros_like(px) if length == 0 else np.clip((px * dx + py * dy) / length, 0.0, 1.0)
+        return np.hypot(px - t * dx, py - t * dy)
+    distances = []
+    for x, y in zip(px, py):
+        x, y = x - ax, y - ay
+        t = 0.0 if length == 0 else min(1.0, max(0.0, (x * dx + y * dy) / length))
+        distances.append(math.hypot(x - t * dx, y - t * dy))
+    return distances
+
+
+def douglas_peucker(xs, ys, tolerance):
+    """Indices of the vertices kept at ``tolerance`` metres, in order."""
+    count = len(xs)
+    if count <= 2:
+        return list(range(count))
+    if np is not None:
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(xs, ys, start, end, xs[start + 1:end], ys[start + 1:end])
+        if np is not None:
+            farthest = int(np.argmax(distances))
+        else:
+            farthest = max(range(len(distances)), key=distances.__getitem__)
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((split, end))
+            stack.append((start, split))
+    return [index for index, kept in enumerate(keep) if kept]
+
+
+def max_deviation(xs, ys, kept):
+    """Largest distance from an original vertex to the segment of the
+    simplified line that replaced it."""
+    worst = 0.0
+    for start, end in zip(kept, kept[1:]):
+        if end - start < 2:
+            continue
+        distances = _segment_distances(xs, ys, start, end, xs[start + 1:end], ys[start + 1:end])
+        worst = max(worst, float(max(distances)))
+    return worst
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def encode(points):
+    """Delta-encode ``[(lat, lng)]`` in 1e-6 degrees as zigzag varints."""
+    out = bytearray()
+    previous = (0, 0)
+    for lat, lng in points:
+        current = (round(lat * SCALE), round(lng * SCALE))
+        for value, last in zip(current, previous):
+            value = _zigzag(value - last)
+            while value >= 0x80:
+                out.append(value & 0x7F | 0x80)
+                value >>= 7
+            out.append(value)
+        previous = current
+    return bytes(out)
+
+
+def decode(data):
+    values, value, shift = [], 0, 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            values.append((value >> 1) ^ -(value & 1))
+            value, shift = 0, 0
+    points, lat, lng = [], 0, 0
+    for dlat, dlng in zip(values[::2], values[1::2]):
+        lat, lng = lat + dlat, lng + dlng
+        points.append((lat / SCALE, lng / SCALE))
+    return points
+
+
+def simplify_line(coordinates, tolerances=TOLERANCES_M):
+    """Return ``[(blob, kept_count, max_deviation_m)]``, one per tolerance.
+
+    Simplification runs on the rounded coordinates, so the deviation is
+    measured between what ships and the unrounded source.
+    """
+    rounded = [(round(lat * SCALE) / SCALE, round(lng * SCALE) / SCALE) for lat, lng in coordinates]
+    xs, ys = _project(rounded)
+    source_xs, source_ys = _project([tuple(point) for point in coordinates], rounded)
+    levels = []
+    for tolerance in tolerances:
+        kept = douglas_peucker(xs, ys, tolerance)
+        blob = encode([rounded[index] for index in kept])
+        if decode(blob) != [rounded[index] for index in kept]:
+            raise PolylineError("varint round trip changed the vertices")
+        # Rounding moves a vertex by at most ~0.08 m; measure against the source.
+        shipped_xs = list(source_xs)
+        shipped_ys = list(source_ys)
+        for index in kept:
+            shipped_xs[index], shipped_ys[index] = xs[index], ys[index]
+        levels.append((blob, len(kept), max_deviation(shipped_xs, shipped_ys, kept)))
+    return levels
+
+
+def build_geometry(payload, tolerances=TOLERANCES_M):
+    """Return ``(plist dict, report rows)``; a row is ``(tolerance, before,
+    after, worst_m, bytes)`` summed over every line."""
+    lines = {}
+    totals = [[tolerance, 0, 0, 0.0, 0] for tolerance in tolerances]
+    for line in payload["lines"]:
+        coordinates = line["coordinates"]
+        if len(coordinates) < 2:
+            continue
+        if any(len(point) != 2 for point in coordinates):
+            raise PolylineError(f"line {line['id']}: coordinates must be [lat, lng] pairs")
+        levels = simplify_line(coordinates, tolerances)
+        lines[line["id"]] = [blob for blob, _, _ in levels]
+        for total, (blob, kept, worst) in zip(totals, levels):
+            total[1] += len(coordinates)
+            total[2] += kept
+            total[3] = max(total[3], worst)
+            total[4] += len(blob)
+    return {"toleranceMeters": list(tolerances), "lines": lines}, [tuple(total) for total in totals]
+
+
+def format_report(rows):
+    out = [f"{'tolerance m':>11} {'vertices':>14} {'reduction':>9} {'max dev m':>9} {'bytes':>7}"]
+    for tolerance, before, after, worst, size in rows:
+        reduction = 1 - after / before if before else 0.0
+        out.append(f"{tolerance:>11g} {after:>6} / {before:<6} {reduction:>8.1%} {worst:>9.2f} {size:>7}")
+    return out
+
+
+def synthetic_line(vertices, seed=0):
+    """A wandering line about 30 km long with metre-scale jitter, like a
+    surveyed track."""
+    rng = random.Random(seed)
+    lat, lng, heading = 13.70, 100.45, 0.6
+    step = 30.0 / vertices / 111.32
+    points = []
+    for _ in range(vertices):
+        heading += rng.gauss(0, 0.02)
+        lat += step * math.cos(heading) + rng.gauss(0, 2e-6)
+        lng += step * math.sin(heading) + rng.gauss(0, 2e-6)
+        points.append([lat, lng])
+    return points
+
+
+def write_geometry(directory=DATA_DIR, manifest_path=MANIFEST_PATH, force=False):
+    """Rebuild ``line_geometry.plist`` if its inputs changed.
+
+    Returns ``(path, report rows)``; the rows are None when nothing was
+    rebuilt, and the path is None when stations.json is missing.
+    """
+    source = Path(directory) / "stations.json"
+    if not source.is_file():
+        return None, None
+    output = Path(directory) / OUTPUT_NAME
+    manifest = Manifest(manifest_path)
+    # spatial.py supplies the earth radius, so it is an input too.
+    inputs = fingerprint(sources=[Path(__file__), Path(spatial.__file__), source])
+    if not force and manifest.is_current(inputs):
+        return output, None
+    geometry, rows = build_geometry(json.loads(source.read_bytes()))
+    write_if_changed(output, plistlib.dumps(geometry, fmt=plistlib.FMT_BINARY, sort_keys=True))
+    manifest.record(inputs, [output])
+    return output, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON bundles (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="rebuild even when the inputs match the last build")
+    parser.add_argument("--synthetic", type=int, metavar="VERTICES", help="report on a synthetic line of this many vertices instead")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.synthetic:
+            _, rows = build_geometry({"lines": [{"id": "synthetic", "coordinates": synthetic_line(args.synthetic)}]})
+            output = None
+        else:
+            output, rows = write_geometry(args.data_dir, force=args.force)
+            if output is None:
+                parser.exit(1, f"bundletools.polylines: no stations.json under {args.data_dir}\n")
+    except PolylineError as error:
+        parser.exit(1, f"bundletools.polylines: {error}\n")
+    if rows is None:
+        print(f"{output} is up to date (--force to rebuild)")
+        return 0
+    print("\n".join(format_report(rows)))
+    if output:
+        print(f"wrote {output} ({output.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+"""Precompute stop counts, track distances and urban fares for every station pair.
+
+    python -m bundletools.rail [--force]
+
+The network comes from the ``lines`` in stations.json: consecutive
+``stationIds`` are one stop apart, and the track distance between them is
+measured along the line's ``coordinates`` (each station is projected onto
+the polyline). Stations on different lines within ``INTERCHANGE_KM`` of each
+other are joined by a walking transfer that adds distance but no stops.
+
+For each ordered pair ``rail_matrix.plist`` holds, as little-endian arrays
+packed row major over ``stationIds``:
+
+    stops           UInt16  stops within one system (BFS over that system's
+                            lines and transfers), NO_STOPS otherwise
+    distanceMeters  UInt32  shortest track distance over the whole network,
+                            NO_DISTANCE when unreachable
+    fareSatang      UInt32  the ``railConfig.urbanRail`` fare for ``stops``,
+                            computed the way RailFareService does, NO_FARE
+                            when the pair is not an urban single-system trip
+
+so RailFareService answers a fare preview with three array reads. Shortest
+distances use a NumPy Floyd-Warshall when NumPy is installed and Dijkstra
+from every station otherwise. The matrix is rebuilt only when stations.json,
+fares_config.json, this file or bundletools/spatial.py (its haversine)
+changes; a manifest in .build-cache/ records what it was built from.
+"""
+import argparse
+import heapq
+import json
+import math
+import plistlib
+import struct
+from collections import deque
+from pathlib import Path
+
+from pbxgen.cache import Manifest, fingerprint, write_if_changed
+
+from . import spatial
+from .data import DATA_DIR
+from .spatial import haversine
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+OUTPUT_NAME = "rail_matrix.plist"
+MANIFEST_PATH = Path(".build-cache/rail_matrix.json")
+INTERCHANGE_KM = 0.3
+# The app treats SRT as intercity even when both ends are on it.
+INTERCITY_SYSTEMS = ("SRT",)
+NO_STOPS = 0xFFFF
+NO_DISTANCE = 0xFFFFFFFF
+NO_FARE = 0xFFFFFFFF
+
+
+class RailNetworkError(ValueError):
+    pass
+
+
+def _arc_positions(line, stations):
+    """Distance in km along ``line``'s polyline to each of its stations."""
+    points = line["coordinates"]
+    cumulative = [0.0]
+    for (lat1, lng1), (lat2, lng2) in zip(points, points[1:]):
+        cumulative.append(cumulative[-1] + haversine(lat1, lng1, lat2, lng2))
+    positions = []
+    for station_id in line["stationIds"]:
+        station = stations[station_id]
+        scale = math.cos(math.radians(station["lat"]))
+        best = (math.inf, 0.0)
+        for index, ((lat1, lng1), (lat2, lng2)) in enumerate(zip(points, points[1:])):
+            # Project in a local equirectangular plane; plenty for a station
+            # a few hundred metres from its track.
+            dx, dy = (lng2 - lng1) * scale, lat2 - lat1
+            px, py = (station["lng"] - lng1) * scale, station["lat"] - lat1
+            length = dx * dx + dy * dy
+            t = 0.0 if length == 0 else min(1.0, max(0.0, (px * dx + py * dy) / length))
+            gap = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            if gap < best[0]:
+                best = (gap, cumulative[index] + t * (cumulative[index + 1] - cumulative[index]))
+        positions.append(best[1])
+    return positions
+
+
+def build_network(payload):
+    """Return ``(ids, systems, edges)``; edges are ``(a, b, stops, km)``."""
+    stations = {station["id"]: station for station in payload["stations"]}
+    ids = [station["id"] for station in payload["stations"]]
+    position = {station_id: index for index, station_id in enumerate(ids)}
+    systems = [stations[station_id]["system"] for station_id in ids]
+    edges = []
+    line_of = {}
+    for line in payload["lines"]:
+        for station_id in line["stationIds"]:
+            if station_id not in stations:
+                raise RailNetworkError(f"line {line['id']}: unknown station {station_id!r}")
+            line_of.setdefault(station_id, line["id"])
+        if len(line["coordinates"]) >= 2:
+            arcs = _arc_positions(line, stations)
+        else:
+            arcs = None
+        for k, (a, b) in enumerate(zip(line["stationIds"], line["stationIds"][1:])):
+            km = abs(arcs[k + 1] - arcs[k]) if arcs else 0.0
+            if km == 0.0:
+                # No usable geometry between the two; fall back to a straight line.
+                km = haversine(stations[a]["lat"], stations[a]["lng"], stations[b]["lat"], stations[b]["lng"])
+            edges.append((position[a], position[b], 1, km))
+    for i, a in enumerate(ids):
+        for b in ids[i + 1:]:
+            if line_of.get(a) == line_of.get(b):
+                continue
+            km = haversine(stations[a]["lat"], stations[a]["lng"], stations[b]["lat"], stations[b]["lng"])
+            if km <= INTERCHANGE_KM:
+                edges.append((position[a], position[b], 0, km))
+    return ids, systems, edges
+
+
+def _adjacency(count, edges):
+    adjacent = [[] for _ in range(count)]
+    for a, b, stops, km in edges:
+        adjacent[a].append((b, stops, km))
+        adjacent[b].append((a, stops, km))
+    return adjacent
+
+
+def stop_counts(ids, systems, edges):
+    """Row-major stop counts; only same-system pairs are filled in.
+
+    A 0-1 BFS, since transfers cost no stops.
+    """
+    count = len(ids)
+    adjacent = _adjacency(count, edges)
+    stops = [NO_STOPS] * (count * count)
+    for source in range(count):
+        system = systems[source]
+        row = source * count
+        stops[row + source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbour, cost, _ in adjacent[node]:
+                if systems[neighbour] != system:
+                    continue
+                value = stops[row + node] + cost
+                if value < stops[row + neighbour]:
+                    stops[row + neighbour] = value
+                    (queue.appendleft if cost == 0 else queue.append)(neighbour)
+    return stops
+
+
+def track_distances(count, edges):
+    """Row-major shortest distances in km; ``math.inf`` when unreachable."""
+    if np is not None:
+        matrix = np.full((count, count), np.inf)
+        np.fill_diagonal(matrix, 0.0)
+        for a, b, _, km in edges:
+            matrix[a, b] = matrix[b, a] = min(matrix[a, b], km)
+        for k in range(count):
+            np.minimum(matrix, matrix[:, k, None] + matrix[None, k, :], out=matrix)
+        return matrix.ravel().tolist()
+    adjacent = _adjacency(count, edges)
+    distances = [math.inf] * (count * count)
+    for source in range(count):
+        row = source * count
+        distances[row + source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            km, node = heapq.heappop(heap)
+            if km > distances[row + node]:
+                continue
+            for neighbour, _, step in adjacent[node]:
+                candidate = km + step
+                if candidate < distances[row + neighbour]:
+                    distances[row + neighbour] = candidate
+                    heapq.heappush(heap, (candidate, neighbour))
+    return distances
+
+
+def urban_fare(pricing, stops):
+    """RailFareService.urbanPrice for one system's pricing."""
+    total = pricing["base"]
+    per_stop = pricing["perStop"]
+    for i in range(stops):
+        total += per_stop[i] if i < len(per_stop) else (per_stop[-1] if per_stop else 0.0)
+        if total >= pricing["max"]:
+            return pricing["max"]
+    return min(total, pricing["max"])
+
+
+def build_matrix(payload, fares):
+    ids, systems, edges = build_network(payload)
+    count = len(ids)
+    stops = stop_counts(ids, systems, edges)
+    distances = track_distances(count, edges)
+    urban = fares["railConfig"]["urbanRail"]
+    fare_satang = [NO_FARE] * (count * count)
+    for a in range(count):
+        for b in range(count):
+            system = systems[a]
+            hops = stops[a * count + b]
+            if system == systems[b] and system not in INTERCITY_SYSTEMS and system in urban and hops != NO_STOPS:
+                fare_satang[a * count + b] = round(urban_fare(urban[system], hops) * 100)
+    return {
+        "stationIds": ids,
+        "stops": struct.pack(f"<{count * count}H", *stops),
+        "distanceMeters": struct.pack(
+            f"<{count * count}I",
+            *(NO_DISTANCE if math.isinf(km) else round(km * 1000) for km in distances),
+        ),
+        "fareSatang": struct.pack(f"<{count * count}I", *fare_satang),
+    }
+
+
+def write_matrix(directory=DATA_DIR, manifest_path=MANIFEST_PATH, force=False):
+    """Rebuild ``rail_matrix.plist`` if its inputs changed; returns its path.
+
+    Returns None when stations.json or fares_config.json is missing.
+    """
+    directory = Path(directory)
+    stations, fares = directory / "stations.json", directory / "fares_config.json"
+    if not (stations.is_file() and fares.is_file()):
+        return None
+    output = directory / OUTPUT_NAME
+    manifest = Manifest(manifest_path)
+    # spatial.py supplies haversine, so it is an input too.
+    inputs = fingerprint(sources=[Path(__file__), Path(spatial.__file__), stations, fares])
+    if not force and manifest.is_current(inputs):
+        return output
+    matrix = build_matrix(json.loads(stations.read_bytes()), json.loads(fares.read_bytes()))
+    write_if_changed(output, plistlib.dumps(matrix, fmt=plistlib.FMT_BINARY, sort_keys=True))
+    manifest.record(inputs, [output])
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON bundles (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="rebuild even when the inputs match the last build")
+    args = parser.parse_args(argv)
+
+    try:
+        output = write_matrix(args.data_dir, force=args.force)
+    except RailNetworkError as error:
+        parser.exit(1, f"bundletools.rail: {error}\n")
+    if output is None:
+        parser.exit(1, f"bundletools.rail: stations.json or fares_config.json missing under {args.data_dir}\n")
+    matrix = plistlib.loads(output.read_bytes())
+    print(f"{len(matrix['stationIds'])} stations, {output.stat().st_size} bytes in {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
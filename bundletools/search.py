@@ -0,0 +1,308 @@
+"""Build the inverted index behind POI search and the Discover filters.
+
+    python -m bundletools.search [--force] [--bench 10000,50000]
+
+POIs are numbered by rating, best first (ties by English name, then id), so
+every posting list is a sorted array of document numbers and any
+intersection of them is already in rating order. ``search_index.plist``
+holds ``gramLength`` and:
+
+    ids        POI id for each document
+    keys       the normalized ``nameEN`` and ``nameTH`` joined by a newline,
+               used to confirm substring matches
+    terms      ``area:<area>``, ``tag:<tag>``, ``gram:<n-gram>`` and
+               ``prefix:<up to gramLength - 1 scalars>``
+    offsets    UInt32, terms + 1 entries; term ``k`` owns
+               ``postings[offsets[k]..<offsets[k + 1]]``
+    postings   UInt32 document numbers, ascending within each term
+
+Names are normalized with NFKC and lower-cased, with runs of whitespace and
+punctuation folded to one space, and split into Unicode scalars rather than
+words: Thai is written without spaces, so every ``GRAM``-scalar window of a
+name is a term. A query of ``GRAM`` or more scalars intersects the postings
+of its ``GRAM_LISTS`` rarest grams and then checks each candidate's key, so
+it matches any substring of either name. Shorter queries match the start of
+a word through the ``prefix:`` terms. Area and tag filters intersect the
+same way.
+
+Every build is checked against a linear scan over the POIs, with queries
+cut from the POIs' own names, and is skipped while pois.json and this file
+are unchanged.
+"""
+import argparse
+import json
+import plistlib
+import random
+import struct
+import time
+import unicodedata
+from pathlib import Path
+
+from pbxgen.cache import Manifest, fingerprint, write_if_changed
+
+from .data import DATA_DIR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+OUTPUT_NAME = "search_index.plist"
+MANIFEST_PATH = Path(".build-cache/search_index.json")
+GRAM = 3
+PREFIXES = tuple(range(1, GRAM))
+GRAM_LISTS = 2
+VERIFY_QUERIES = 2000
+
+
+class SearchIndexError(ValueError):
+    pass
+
+
+def normalize(text):
+    """NFKC, lower case, whitespace and punctuation folded to one space."""
+    out = []
+    for char in unicodedata.normalize("NFKC", text).lower():
+        if unicodedata.category(char)[0] in "ZPC":
+            if out and out[-1] != " ":
+                out.append(" ")
+        else:
+            out.append(char)
+    return "".join(out).strip()
+
+
+def grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def prefixes(text):
+    return {word[:length] for word in text.split(" ") for length in PREFIXES if len(word) >= length}
+
+
+def rating_order(pois):
+    return sorted(pois, key=lambda poi: (-poi["rating"], poi["nameEN"], poi["id"]))
+
+
+def build_index(pois):
+    ordered = rating_order(pois)
+    postings = {}
+    keys = []
+    for document, poi in enumerate(ordered):
+        names = [normalize(poi["nameEN"]), normalize(poi["nameTH"])]
+        keys.append("\n".join(names))
+        terms = {f"area:{poi['area']}"} | {f"tag:{tag.lower()}" for tag in poi["tags"]}
+        for name in names:
+            terms |= {f"gram:{gram}" for gram in grams(name)}
+            terms |= {f"prefix:{prefix}" for prefix in prefixes(name)}
+        for term in terms:
+            postings.setdefault(term, []).append(document)
+    terms = sorted(postings)
+    offsets = [0]
+    for term in terms:
+        offsets.append(offsets[-1] + len(postings[term]))
+    return {
+        "gramLength": GRAM,
+        "ids": [poi["id"] for poi in ordered],
+        "keys": keys,
+        "terms": terms,
+        "offsets": struct.pack(f"<{len(offsets)}I", *offsets),
+        "postings": struct.pack(f"<{offsets[-1]}I", *(document for term in terms for document in postings[term])),
+    }
+
+
+class Index:
+    """The Python side of PoiSearchIndex, for checks and benchmarks."""
+
+    def __init__(self, data):
+        self.ids = data["ids"]
+        self.keys = data["keys"]
+        offsets = struct.unpack(f"<{len(data['offsets']) // 4}I", data["offsets"])
+        if np is not None:
+            postings = np.frombuffer(data["postings"], dtype="<u4")
+        else:
+            postings = struct.unpack(f"<{len(data['postings']) // 4}I", data["postings"])
+        self.postings = {term: postings[offsets[k]:offsets[k + 1]] for k, term in enumerate(data["terms"])}
+
+    def search(self, query="", area=None, tag=None):
+        """Document numbers matching every given filter, in rating order."""
+        text = normalize(query)
+        terms = []
+        if area:
+            terms.append(f"area:{area}")
+        if tag:
+            terms.append(f"tag:{tag.lower()}")
+        if text and len(text) < GRAM:
+            terms.append(f"prefix:{text}")
+        if not terms and len(text) < GRAM:
+            return list(range(len(self.ids)))
+        found = [self.postings.get(term, ()) for term in terms]
+        # The key check is exact, so the two rarest grams narrow enough.
+        found += sorted((self.postings.get(f"gram:{gram}", ()) for gram in grams(text)), key=len)[:GRAM_LISTS]
+        found.sort(key=len)
+        result = found[0]
+        for other in found[1:]:
+            if not len(result):
+                break
+            result = _intersect(result, other)
+        if len(text) >= GRAM:
+            return [int(document) for document in result if text in self.keys[document]]
+        return [int(document) for document in result]
+
+
+def _intersect(a, b):
+    # ``a`` is the shorter list; look each of its entries up in ``b``.
+    if np is not None:
+        if not len(b):
+            return b
+        positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+        return a[b[positions] == a]
+    out, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            out.append(a[i])
+            i += 1
+            j += 1
+    return out
+
+
+def linear_search(ordered, query="", area=None, tag=None):
+    """What the index answers, by scanning POIs already in rating order;
+    returns ids."""
+    text = normalize(query)
+    found = []
+    for poi in ordered:
+        if area and poi["area"] != area:
+            continue
+        if tag and tag.lower() not in {candidate.lower() for candidate in poi["tags"]}:
+            continue
+        names = [normalize(poi["nameEN"]), normalize(poi["nameTH"])]
+        if len(text) >= GRAM and not any(text in name for name in names):
+            continue
+        if 0 < len(text) < GRAM and not any(word.startswith(text) for name in names for word in name.split(" ")):
+            continue
+        found.append(poi["id"])
+    return found
+
+
+def _queries(pois, rng, count):
+    queries = []
+    areas = sorted({poi["area"] for poi in pois})
+    tags = sorted({tag for poi in pois for tag in poi["tags"]})
+    for _ in range(count):
+        name = normalize(rng.choice(pois)[rng.choice(("nameEN", "nameTH"))])
+        length = rng.randint(1, min(8, len(name))) if name else 0
+        start = 0 if length < GRAM else rng.randint(0, len(name) - length)
+        queries.append((
+            name[start:start + length],
+            rng.choice(areas) if rng.random() < 0.3 else None,
+            rng.choice(tags) if tags and rng.random() < 0.2 else None,
+        ))
+    return queries
+
+
+def verify(index, pois, queries):
+    ordered = rating_order(pois)
+    for query, area, tag in queries:
+        found = [index.ids[document] for document in index.search(query, area, tag)]
+        expected = linear_search(ordered, query, area, tag)
+        if found != expected:
+            raise SearchIndexError(f"query {query!r} area={area} tag={tag}: index gives {len(found)} POIs, linear scan {len(expected)}")
+
+
+def write_index(directory=DATA_DIR, manifest_path=MANIFEST_PATH, force=False):
+    """Build, verify and write ``search_index.plist`` if pois.json or this
+    file changed; returns its path, or None when pois.json is missing."""
+    source = Path(directory) / "pois.json"
+    if not source.is_file():
+        return None
+    output = Path(directory) / OUTPUT_NAME
+    manifest = Manifest(manifest_path)
+    inputs = fingerprint(sources=[Path(__file__), source])
+    if not force and manifest.is_current(inputs):
+        return output
+    pois = json.loads(source.read_bytes())
+    data = build_index(pois)
+    verify(Index(data), pois, [("", None, None)] + _queries(pois, random.Random(0), min(20 * len(pois), VERIFY_QUERIES)))
+    write_if_changed(output, plistlib.dumps(data, fmt=plistlib.FMT_BINARY, sort_keys=True))
+    manifest.record(inputs, [output])
+    return output
+
+
+ENGLISH_WORDS = ("wat", "market", "night", "river", "temple", "old", "town", "palace", "park", "beach", "garden", "museum", "golden", "royal", "floating")
+THAI_WORDS = ("วัด", "ตลาด", "กลางคืน", "แม่น้ำ", "เมือง", "เก่า", "พระราชวัง", "สวน", "หาด", "พิพิธภัณฑ์", "ทอง", "หลวง", "น้ำ")
+AREAS = ("Bangkok", "Chiang Mai", "Phuket", "Krabi", "Ayutthaya", "Pattaya")
+TAGS = ("Temple", "Food", "Market", "Beach", "Nature", "Nightlife", "History", "Shopping")
+
+
+def synthetic_pois(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"poi_{i}",
+            "nameEN": " ".join(rng.choice(ENGLISH_WORDS).title() for _ in range(rng.randint(2, 4))) + f" {i}",
+            "nameTH": "".join(rng.choice(THAI_WORDS) for _ in range(rng.randint(2, 4))) + f" {i}",
+            "area": rng.choice(AREAS),
+            "rating": round(rng.uniform(3, 5), 1),
+            "tags": rng.sample(TAGS, rng.randint(1, 3)),
+        }
+        for i in range(count)
+    ]
+
+
+def _timed(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(*query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def bench(sizes, query_count, seed=0):
+    """Per-query microseconds for the index and the linear scan."""
+    lines = [f"{'pois':>8} {'build ms':>9} {'index KB':>9} {'index us':>9} {'linear us':>10}  (intersection: {'numpy' if np is not None else 'pure Python'})"]
+    for size in sizes:
+        rng = random.Random(seed + size)
+        pois = synthetic_pois(size, seed + size)
+        queries = _queries(pois, rng, query_count)
+        start = time.perf_counter()
+        data = build_index(pois)
+        build_ms = (time.perf_counter() - start) * 1000
+        index = Index(data)
+        verify(index, pois, queries[:50])
+        size_kb = len(plistlib.dumps(data, fmt=plistlib.FMT_BINARY)) / 1024
+        ordered = rating_order(pois)
+        lines.append(
+            f"{size:>8} {build_ms:>9.0f} {size_kb:>9.0f} "
+            f"{_timed(index.search, queries):>9.1f} "
+            f"{_timed(lambda *query: linear_search(ordered, *query), queries[:max(1, query_count // 10)]):>10.1f}"
+        )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON bundles (default: %(default)s)")
+    parser.add_argument("--bench", metavar="SIZES", help="benchmark on synthetic POIs instead, e.g. 10000,50000")
+    parser.add_argument("--force", action="store_true", help="rebuild even when the inputs match the last build")
+    parser.add_argument("--queries", type=int, default=1000, help="queries per benchmark size (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.bench:
+            print("\n".join(bench([int(size) for size in args.bench.split(",") if size], max(1, args.queries))), flush=True)
+            return 0
+        output = write_index(args.data_dir, force=args.force)
+    except SearchIndexError as error:
+        parser.exit(1, f"bundletools.search: {error}\n")
+    if output is None:
+        parser.exit(1, f"bundletools.search: no pois.json under {args.data_dir}\n")
+    data = plistlib.loads(output.read_bytes())
+    print(f"{len(data['ids'])} POIs, {len(data['terms'])} terms, {len(data['postings']) // 4} postings in {output} ({output.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,369 @@
+"""Precompute a lat/lng grid over the stations and POIs for the app to query.
+
+    python -m bundletools.spatial [--force] [--full-check]
+    python -m bundletools.spatial --bench 10000,100000
+
+The index is a uniform grid in degrees, sized for about ``POINTS_PER_CELL``
+points per cell, stored as compressed rows: points sorted by cell (row
+major) with ``cellStart[c]`` the first point of cell ``c``. It is written as
+``spatial_index.plist`` beside the data it indexes and copied into the app,
+where ``SpatialGrid`` answers nearest-point queries by searching rings of
+cells outward and radius queries by scanning only the cells the circle can
+reach. ``Grid`` here is the same algorithm, used to verify every build
+against brute force and for the benchmark.
+
+Each build checks a lattice of queries around the points and a sample of
+the indexed points against brute force; ``--full-check`` queries every
+indexed point. The index is rebuilt only when stations.json, pois.json or
+this file changes; a manifest in .build-cache/ records what it was built
+from.
+
+NumPy is optional: with it, cell assignment and the brute-force Haversine
+used for checking and benchmarking are vectorized; without it both run in
+plain Python and give the same results.
+"""
+import argparse
+import json
+import math
+import plistlib
+import random
+import time
+from pathlib import Path
+
+from pbxgen.cache import Manifest, fingerprint, write_if_changed
+
+from .data import DATA_DIR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EARTH_RADIUS_KM = 6371.0  # the app's haversine uses the same radius
+POINTS_PER_CELL = 4
+MIN_CELL_DEGREES = 0.001
+OUTPUT_NAME = "spatial_index.plist"
+MANIFEST_PATH = Path(".build-cache/spatial_index.json")
+# Indexed points queried back on each build; --full-check queries them all.
+CHECK_SAMPLE = 64
+# (grid name, bundle, records in the decoded JSON)
+SOURCES = [
+    ("pois", "pois.json", lambda pois: pois),
+    ("stations", "stations.json", lambda payload: payload["stations"]),
+]
+# Synthetic benchmark points fall inside Thailand's bounding box.
+BENCH_BOUNDS = (5.6, 20.5, 97.3, 105.7)
+BENCH_RADIUS_KM = 2.0
+
+
+class SpatialIndexError(ValueError):
+    pass
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """Distances in km from one point to every point in ``lats``/``lngs``."""
+    if np is None:
+        return [haversine(lat, lng, other_lat, other_lng) for other_lat, other_lng in zip(lats, lngs)]
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.asarray(lngs) - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def _argmin(values):
+    if np is not None:
+        return int(np.argmin(values))
+    return min(range(len(values)), key=values.__getitem__)
+
+
+class Grid:
+    def __init__(self, cell_degrees, min_lat, min_lng, rows, columns, cell_start, ids, lat, lng):
+        self.cell_degrees = cell_degrees
+        self.min_lat = min_lat
+        self.min_lng = min_lng
+        self.rows = rows
+        self.columns = columns
+        self.cell_start = cell_start
+        self.ids = ids
+        self.lat = lat
+        self.lng = lng
+        self.max_abs_lat = max(abs(min_lat), abs(min_lat + rows * cell_degrees))
+
+    @classmethod
+    def build(cls, ids, lats, lngs):
+        if not ids:
+            return cls(1.0, 0.0, 0.0, 1, 1, [0, 0], [], [], [])
+        min_lat, min_lng = min(lats), min(lngs)
+        span_lat, span_lng = max(lats) - min_lat, max(lngs) - min_lng
+        area = max(span_lat, MIN_CELL_DEGREES) * max(span_lng, MIN_CELL_DEGREES)
+        cell = max(math.sqrt(area * POINTS_PER_CELL / len(ids)), MIN_CELL_DEGREES)
+        rows = math.floor(span_lat / cell) + 1
+        columns = math.floor(span_lng / cell) + 1
+        if np is not None:
+            row = np.floor((np.asarray(lats) - min_lat) / cell).astype(np.int64)
+            column = np.floor((np.asarray(lngs) - min_lng) / cell).astype(np.int64)
+            cells = row * columns + column
+            order = np.argsort(cells, kind="stable").tolist()
+            counts = np.bincount(cells, minlength=rows * columns)
+            cell_start = [0, *np.cumsum(counts).tolist()]
+        else:
+            cells = [math.floor((la - min_lat) / cell) * columns + math.floor((ln - min_lng) / cell) for la, ln in zip(lats, lngs)]
+            order = sorted(range(len(ids)), key=cells.__getitem__)
+            counts = [0] * (rows * columns)
+            for index in cells:
+                counts[index] += 1
+            cell_start = [0]
+            for count in counts:
+                cell_start.append(cell_start[-1] + count)
+        return cls(
+            cell,
+            min_lat,
+            min_lng,
+            rows,
+            columns,
+            cell_start,
+            [ids[i] for i in order],
+            [float(lats[i]) for i in order],
+            [float(lngs[i]) for i in order],
+        )
+
+    def to_plist(self):
+        return {
+            "cellDegrees": self.cell_degrees,
+            "minLat": self.min_lat,
+            "minLng": self.min_lng,
+            "rows": self.rows,
+            "columns": self.columns,
+            "cellStart": self.cell_start,
+            "ids": self.ids,
+            "lat": self.lat,
+            "lng": self.lng,
+        }
+
+    def _cell(self, lat, lng):
+        return math.floor((lat - self.min_lat) / self.cell_degrees), math.floor((lng - self.min_lng) / self.cell_degrees)
+
+    def _cells(self, first_row, last_row, first_column, last_column):
+        for row in range(max(first_row, 0), min(last_row, self.rows - 1) + 1):
+            for column in range(max(first_column, 0), min(last_column, self.columns - 1) + 1):
+                cell = row * self.columns + column
+                yield from range(self.cell_start[cell], self.cell_start[cell + 1])
+
+    def _ring(self, row, column, ring):
+        # The square of cells at Chebyshev distance ``ring``: full top and
+        # bottom rows, only the two side columns in between.
+        if ring == 0:
+            yield from self._cells(row, row, column, column)
+            return
+        yield from self._cells(row - ring, row - ring, column - ring, column + ring)
+        yield from self._cells(row + ring, row + ring, column - ring, column + ring)
+        for side in (column - ring, column + ring):
+            yield from self._cells(row - ring + 1, row + ring - 1, side, side)
+
+    def _bound(self, ring, cos_min):
+        # Anything outside the rings searched so far is at least ``ring``
+        # cells away in latitude or longitude. sin(d/2) >= cos(lat) sin(dlng/2)
+        # for any two points, and a latitude gap is never shorter.
+        half = math.radians(min(ring * self.cell_degrees, 180.0)) / 2
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, cos_min * math.sin(half)))
+
+    def _wraps(self, lng, reach=0.0):
+        # Cell distances stop tracking real distances once a longitude gap
+        # can pass the antimeridian; such queries scan every point.
+        return max(abs(lng - self.min_lng), abs(lng - self.min_lng - self.columns * self.cell_degrees)) + reach > 180.0
+
+    def nearest(self, lat, lng):
+        """``(id, km)`` of the closest point, or None for an empty grid."""
+        if not self.ids:
+            return None
+        if self._wraps(lng):
+            best = min(range(len(self.ids)), key=lambda i: haversine(lat, lng, self.lat[i], self.lng[i]))
+            return self.ids[best], haversine(lat, lng, self.lat[best], self.lng[best])
+        row, column = self._cell(lat, lng)
+        first = max(0, row - (self.rows - 1), -row, column - (self.columns - 1), -column)
+        last = max(row, self.rows - 1 - row, column, self.columns - 1 - column)
+        cos_min = math.cos(math.radians(max(abs(lat), self.max_abs_lat)))
+        best, best_km = None, math.inf
+        for ring in range(first, last + 1):
+            for i in self._ring(row, column, ring):
+                km = haversine(lat, lng, self.lat[i], self.lng[i])
+                if km < best_km:
+                    best, best_km = i, km
+            if best is not None and best_km <= self._bound(ring, cos_min):
+                break
+        return self.ids[best], best_km
+
+    def within(self, lat, lng, radius_km):
+        """``(id, km)`` of every point within ``radius_km``, closest first."""
+        delta = radius_km / EARTH_RADIUS_KM
+        cos_lat = math.cos(math.radians(lat))
+        if delta >= math.pi / 2 or math.sin(delta) >= cos_lat:
+            lng_degrees = 360.0
+        else:
+            lng_degrees = math.degrees(math.asin(math.sin(delta) / cos_lat))
+        lat_degrees = math.degrees(delta)
+        first_row, first_column = self._cell(lat - lat_degrees, lng - lng_degrees)
+        last_row, last_column = self._cell(lat + lat_degrees, lng + lng_degrees)
+        if self._wraps(lng, lng_degrees):
+            first_column, last_column = 0, self.columns - 1
+        found = []
+        for i in self._cells(first_row, last_row, first_column, last_column):
+            km = haversine(lat, lng, self.lat[i], self.lng[i])
+            if km <= radius_km:
+                found.append((km, self.ids[i]))
+        return [(point, km) for km, point in sorted(found)]
+
+
+def brute_nearest(lat, lng, lats, lngs):
+    distances = haversine_many(lat, lng, lats, lngs)
+    best = _argmin(distances)
+    return best, float(distances[best])
+
+
+def brute_within(lat, lng, lats, lngs, radius_km):
+    distances = haversine_many(lat, lng, lats, lngs)
+    if np is not None:
+        return np.nonzero(distances <= radius_km)[0].tolist()
+    return [i for i, km in enumerate(distances) if km <= radius_km]
+
+
+def verify(grid, ids, lats, lngs, queries, radius_km=BENCH_RADIUS_KM):
+    """Check ``grid`` against brute force at every ``(lat, lng)`` query."""
+    for lat, lng in queries:
+        best, best_km = brute_nearest(lat, lng, lats, lngs)
+        _, km = grid.nearest(lat, lng)
+        if abs(km - best_km) > 1e-9:
+            raise SpatialIndexError(f"nearest({lat}, {lng}): index found {km} km, brute force {ids[best]} at {best_km} km")
+        expected = sorted(ids[i] for i in brute_within(lat, lng, lats, lngs, radius_km))
+        if sorted(point for point, _ in grid.within(lat, lng, radius_km)) != expected:
+            raise SpatialIndexError(f"within({lat}, {lng}, {radius_km}): index and brute force disagree")
+    return len(queries)
+
+
+def _lattice(lats, lngs, steps=8, pad=0.05):
+    lat0, lat1 = min(lats) - pad, max(lats) + pad
+    lng0, lng1 = min(lngs) - pad, max(lngs) + pad
+    return [
+        (lat0 + (lat1 - lat0) * i / (steps - 1), lng0 + (lng1 - lng0) * j / (steps - 1))
+        for i in range(steps)
+        for j in range(steps)
+    ]
+
+
+def build_index(directory=DATA_DIR, full_check=False):
+    """Build and verify one grid per source; returns ``{name: Grid}``.
+
+    Verification queries the lattice around the points and an evenly spaced
+    sample of ``CHECK_SAMPLE`` indexed points, or every indexed point with
+    ``full_check``.
+    """
+    grids = {}
+    for name, bundle, records in SOURCES:
+        source = Path(directory) / bundle
+        if not source.is_file():
+            continue
+        points = records(json.loads(source.read_bytes()))
+        ids = [point["id"] for point in points]
+        lats = [float(point["lat"]) for point in points]
+        lngs = [float(point["lng"]) for point in points]
+        grid = Grid.build(ids, lats, lngs)
+        if ids:
+            step = 1 if full_check else max(1, len(ids) // CHECK_SAMPLE)
+            verify(grid, ids, lats, lngs, [*zip(lats[::step], lngs[::step]), *_lattice(lats, lngs)])
+        grids[name] = grid
+    return grids
+
+
+def write_index(directory=DATA_DIR, manifest_path=MANIFEST_PATH, force=False, full_check=False):
+    """Rebuild ``spatial_index.plist`` if its inputs changed; returns its path.
+
+    Returns None when there is nothing to index.
+    """
+    directory = Path(directory)
+    sources = [directory / bundle for _, bundle, _ in SOURCES if (directory / bundle).is_file()]
+    if not sources:
+        return None
+    output = directory / OUTPUT_NAME
+    manifest = Manifest(manifest_path)
+    inputs = fingerprint(sources=[Path(__file__), *sources])
+    if not (force or full_check) and manifest.is_current(inputs):
+        return output
+    grids = build_index(directory, full_check)
+    data = {name: grid.to_plist() for name, grid in grids.items()}
+    write_if_changed(output, plistlib.dumps(data, fmt=plistlib.FMT_BINARY, sort_keys=True))
+    manifest.record(inputs, [output])
+    return output
+
+
+def _timed(function, queries):
+    start = time.perf_counter()
+    for lat, lng in queries:
+        function(lat, lng)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def bench(sizes, query_count, seed=0):
+    """Per-query microseconds for the grid and brute force at each size."""
+    lat0, lat1, lng0, lng1 = BENCH_BOUNDS
+    lines = [
+        f"{'points':>8} {'build ms':>9} {'nearest us':>11} {'brute us':>9} {'within us':>10} {'brute us':>9}"
+        f"  (brute force: {'numpy' if np is not None else 'pure Python'})"
+    ]
+    for size in sizes:
+        rng = random.Random(seed + size)
+        lats = [rng.uniform(lat0, lat1) for _ in range(size)]
+        lngs = [rng.uniform(lng0, lng1) for _ in range(size)]
+        ids = [f"p{i}" for i in range(size)]
+        queries = [(rng.uniform(lat0, lat1), rng.uniform(lng0, lng1)) for _ in range(query_count)]
+        if np is not None:
+            lats_array, lngs_array = np.asarray(lats), np.asarray(lngs)
+        else:
+            lats_array, lngs_array = lats, lngs
+
+        start = time.perf_counter()
+        grid = Grid.build(ids, lats, lngs)
+        build_ms = (time.perf_counter() - start) * 1000
+        verify(grid, ids, lats_array, lngs_array, queries[:100])
+
+        lines.append(
+            f"{size:>8} {build_ms:>9.1f} "
+            f"{_timed(grid.nearest, queries):>11.1f} "
+            f"{_timed(lambda la, ln: brute_nearest(la, ln, lats_array, lngs_array), queries):>9.1f} "
+            f"{_timed(lambda la, ln: grid.within(la, ln, BENCH_RADIUS_KM), queries):>10.1f} "
+            f"{_timed(lambda la, ln: brute_within(la, ln, lats_array, lngs_array, BENCH_RADIUS_KM), queries):>9.1f}"
+        )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory holding the JSON bundles (default: %(default)s)")
+    parser.add_argument("--bench", metavar="SIZES", help="benchmark on synthetic points instead, e.g. 10000,100000")
+    parser.add_argument("--queries", type=int, default=1000, help="queries per benchmark size (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="rebuild even when the inputs match the last build")
+    parser.add_argument("--full-check", action="store_true", help="rebuild and check every indexed point against brute force, not a sample")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        print("\n".join(bench([int(size) for size in args.bench.split(",") if size], max(1, args.queries))), flush=True)
+        return 0
+    try:
+        output = write_index(args.data_dir, force=args.force, full_check=args.full_check)
+    except SpatialIndexError as error:
+        parser.exit(1, f"bundletools.spatial: {error}\n")
+    if output is None:
+        parser.exit(1, f"bundletools.spatial: no data under {args.data_dir}\n")
+    for name, grid in plistlib.loads(output.read_bytes()).items():
+        print(f"{name}: {len(grid['ids'])} points, {grid['rows']}x{grid['columns']} cells of {grid['cellDegrees']:.4f} deg")
+    print(f"{output.stat().st_size} bytes in {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
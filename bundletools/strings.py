@@ -0,0 +1,322 @@
+"""Check the Localizable.strings tables for parity and usage.
+
+    python -m bundletools.strings [--strict] [--output DIR] [--force]
+
+Every ``<lang>.lproj/Localizable.strings`` under ``LOCALIZATIONS_DIR`` is
+parsed once and the tables are checked together:
+
+    errors    a key missing from some languages, a key defined twice in one
+              table, or a value whose format specifiers (``%@``, ``%d``,
+              ``%.1f``, ``%1$@``...) differ from the base language's
+    warnings  a key no Swift source mentions, or a ``localized("...")`` or
+              ``NSLocalizedString("...")`` key that no table defines
+
+``--strict`` turns warnings into errors. ``--output`` compiles the tables
+to binary plists under ``DIR/<lang>.lproj/`` and reports the size and load
+time of both forms; the files are for measurement only and nothing in the
+build uses them. What ships is whatever Xcode's strings copy step writes.
+Checks are skipped while the tables, the Swift sources and this file are
+unchanged; ``.build-cache/strings.json`` records what was checked.
+"""
+import argparse
+import plistlib
+import re
+import sys
+import time
+from pathlib import Path
+
+from pbxgen.cache import Manifest, fingerprint, write_if_changed
+
+LOCALIZATIONS_DIR = Path("JourneyTH/Resources/Localizations")
+SOURCE_DIR = Path("JourneyTH")
+TABLE = "Localizable.strings"
+BASE_LANGUAGE = "en"
+MANIFEST_PATH = Path(".build-cache/strings.json")
+
+FORMAT = re.compile(r"%(?:(\d+)\$)?[-+ #0']*(?:\d+|\*)?(?:\.(?:\d+|\*))?(hh|h|ll|l|q|z|t|j|L)?([@dDiuUxXoOfFeEgGaAcCsSp%])")
+# Calls that take a literal key; the arguments may pick between literals.
+LOOKUP = re.compile(r"\b(?:localized|NSLocalizedString)\(((?:[^()]|\([^()]*\))*)\)")
+LITERAL = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\", "'": "'", "a": "\a", "b": "\b", "f": "\f", "v": "\v"}
+
+
+class StringsError(ValueError):
+    pass
+
+
+class Entry:
+    __slots__ = ("key", "value", "line")
+
+    def __init__(self, key, value, line):
+        self.key = key
+        self.value = value
+        self.line = line
+
+
+def parse(text, where):
+    """``[Entry]`` for an old-style ``"key" = "value";`` strings file, in file
+    order, duplicates included."""
+    entries = []
+    position, line, length = 0, 1, len(text)
+
+    def fail(message):
+        raise StringsError(f"{where}:{line}: {message}")
+
+    def skip():
+        nonlocal position, line
+        while position < length:
+            char = text[position]
+            if char in " \t\r\n\ufeff":
+                line += char == "\n"
+                position += 1
+            elif text.startswith("/*", position):
+                end = text.find("*/", position + 2)
+                if end < 0:
+                    fail("unterminated comment")
+                line += text.count("\n", position, end)
+                position = end + 2
+            elif text.startswith("//", position):
+                end = text.find("\n", position)
+                position = length if end < 0 else end
+            else:
+                return
+
+    def token():
+        nonlocal position, line
+        if position >= length:
+            fail("unexpected end of file")
+        if text[position] != '"':
+            match = re.compile(r"[A-Za-z0-9_.$:/-]+").match(text, position)
+            if not match:
+                fail(f"unexpected {text[position]!r}")
+            position = match.end()
+            return match.group()
+        out = []
+        position += 1
+        while True:
+            if position >= length:
+                fail("unterminated string")
+            char = text[position]
+            if char == '"':
+                position += 1
+                return "".join(out)
+            if char == "\\":
+                escape = text[position + 1:position + 2]
+                if escape in ESCAPES:
+                    out.append(ESCAPES[escape])
+                    position += 2
+                elif escape in ("U", "u"):
+                    digits = text[position + 2:position + 6]
+                    if not re.fullmatch(r"[0-9A-Fa-f]{4}", digits):
+                        fail(f"bad \\{escape} escape")
+                    out.append(chr(int(digits, 16)))
+                    position += 6
+                elif escape.isdigit():
+                    digits = re.compile(r"[0-7]{1,3}").match(text, position + 1).group()
+                    out.append(chr(int(digits, 8)))
+                    position += 1 + len(digits)
+                else:
+                    out.append(escape)
+                    position += 2
+                continue
+            line += char == "\n"
+            out.append(char)
+            position += 1
+
+    def expect(char):
+        nonlocal position
+        skip()
+        if text[position:position + 1] != char:
+            fail(f"expected {char!r}")
+        position += 1
+
+    while True:
+        skip()
+        if position >= length:
+            return entries
+        start = line
+        key = token()
+        skip()
+        if text[position:position + 1] == ";":
+            # ``"key";`` maps the key to itself.
+            position += 1
+            entries.append(Entry(key, key, start))
+            continue
+        expect("=")
+        skip()
+        value = token()
+        expect(";")
+        entries.append(Entry(key, value, start))
+
+
+def specifiers(value):
+    """The format arguments ``value`` consumes as ``[(position, type)]``."""
+    found, implicit = [], 0
+    for match in FORMAT.finditer(value):
+        position, modifier, conversion = match.groups()
+        if conversion == "%":
+            continue
+        if position is None:
+            implicit += 1
+            position = implicit
+        conversion = {"i": "d", "D": "d", "F": "f", "U": "u", "O": "o"}.get(conversion, conversion)
+        found.append((int(position), (modifier or "") + conversion))
+    return sorted(found)
+
+
+def load_tables(directory=LOCALIZATIONS_DIR):
+    """``{language: [Entry]}`` for every ``<lang>.lproj/Localizable.strings``."""
+    tables = {}
+    for path in sorted(Path(directory).glob(f"*.lproj/{TABLE}")):
+        raw = path.read_bytes()
+        if raw.startswith((b"\xff\xfe", b"\xfe\xff")):
+            text = raw.decode("utf-16")
+        else:
+            text = raw.decode("utf-8-sig")
+        tables[path.parent.stem] = parse(text, path)
+    return tables
+
+
+def swift_keys(source_dir=SOURCE_DIR):
+    """``(looked_up, prefixes, literals)`` from the Swift sources.
+
+    ``looked_up`` maps each literal key passed to ``localized`` or
+    ``NSLocalizedString`` to where it is used; ``prefixes`` holds the
+    literal part of keys built at runtime (``"rail.urban." + system`` or an
+    interpolation); ``literals`` is every string literal, for keys chosen
+    through a variable.
+    """
+    looked_up, prefixes, literals = {}, set(), set()
+    for path in sorted(Path(source_dir).rglob("*.swift")):
+        text = path.read_text(encoding="utf-8")
+        for match in LITERAL.finditer(text):
+            literals.add(match.group(1))
+        for call in LOOKUP.finditer(text):
+            arguments = call.group(1).split("comment:")[0]
+            for literal in LITERAL.finditer(arguments):
+                key = literal.group(1)
+                if "\\(" in key:
+                    prefixes.add(key.split("\\(")[0])
+                elif arguments[literal.end():].lstrip().startswith("+"):
+                    prefixes.add(key)
+                else:
+                    line = text.count("\n", 0, call.start()) + 1
+                    looked_up.setdefault(key, f"{path}:{line}")
+    return looked_up, prefixes, literals
+
+
+def check(tables, looked_up=None, prefixes=(), literals=(), base=BASE_LANGUAGE):
+    """Return ``(errors, warnings)``, lists of messages."""
+    errors, warnings = [], []
+    if base not in tables:
+        return [f"no {base}.lproj/{TABLE}"], warnings
+    merged = {}
+    for language, entries in tables.items():
+        for entry in entries:
+            per_key = merged.setdefault(entry.key, {})
+            if language in per_key:
+                errors.append(f"{language}: {entry.key!r} defined on lines {per_key[language].line} and {entry.line}")
+            else:
+                per_key[language] = entry
+    languages = sorted(tables)
+    for key, per_key in merged.items():
+        missing = [language for language in languages if language not in per_key]
+        if missing:
+            errors.append(f"{key!r} missing from {', '.join(missing)}")
+        if base not in per_key:
+            continue
+        expected = specifiers(per_key[base].value)
+        for language, entry in sorted(per_key.items()):
+            if language != base and specifiers(entry.value) != expected:
+                errors.append(
+                    f"{language}: {key!r} line {entry.line} formats {_describe(entry.value)}, {base} has {_describe(per_key[base].value)}"
+                )
+    if looked_up is not None:
+        for key, where in sorted(looked_up.items()):
+            if key not in merged:
+                warnings.append(f"{where}: {key!r} is not in any {TABLE}")
+        for key in sorted(merged):
+            if key not in looked_up and key not in literals and not key.startswith(tuple(prefixes)):
+                warnings.append(f"{key!r} is not used in the Swift sources")
+    return errors, warnings
+
+
+def _describe(value):
+    return " ".join(f"%{position}${kind}" for position, kind in specifiers(value)) or "nothing"
+
+
+def compile_table(entries):
+    return plistlib.dumps({entry.key: entry.value for entry in entries}, fmt=plistlib.FMT_BINARY, sort_keys=True)
+
+
+def run(directory=LOCALIZATIONS_DIR, source_dir=SOURCE_DIR, manifest_path=MANIFEST_PATH, force=False):
+    """Check the tables unless nothing changed since the last clean check.
+
+    Returns ``(errors, warnings, tables)``; ``tables`` is None when the
+    check was skipped. A run with errors is not recorded, so it repeats.
+    """
+    strings = sorted(Path(directory).glob(f"*.lproj/{TABLE}"))
+    manifest = Manifest(manifest_path)
+    inputs = fingerprint(sources=[Path(__file__), *strings, *sorted(Path(source_dir).rglob("*.swift"))])
+    if not force and manifest.is_current(inputs):
+        return [], [], None
+    tables = load_tables(directory)
+    errors, warnings = check(tables, *swift_keys(source_dir))
+    if not errors:
+        # Manifest only trusts a fingerprint with files to stat; the tables
+        # themselves will do.
+        manifest.record(inputs, strings)
+    return errors, warnings, tables
+
+
+def write_tables(tables, output_dir, directory=LOCALIZATIONS_DIR):
+    """Write each table as a binary plist; returns ``[(language, text bytes,
+    binary bytes, text ms, binary ms)]``."""
+    rows = []
+    for language, entries in sorted(tables.items()):
+        data = compile_table(entries)
+        output = Path(output_dir) / f"{language}.lproj" / TABLE
+        write_if_changed(output, data)
+        text = (Path(directory) / f"{language}.lproj" / TABLE).read_text(encoding="utf-8-sig")
+        rows.append((language, len(text.encode("utf-8")), len(data), _timed(parse, text, language), _timed(plistlib.loads, data)))
+    return rows
+
+
+def _timed(function, *args, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--localizations", type=Path, default=LOCALIZATIONS_DIR, help="directory holding the .lproj folders (default: %(default)s)")
+    parser.add_argument("--sources", type=Path, default=SOURCE_DIR, help="Swift sources to scan for keys (default: %(default)s)")
+    parser.add_argument("--strict", action="store_true", help="treat unused and undefined keys as errors")
+    parser.add_argument("--output", type=Path, metavar="DIR", help="also write the binary tables under DIR/<lang>.lproj/")
+    parser.add_argument("--force", action="store_true", help="check even when nothing changed since the last clean run")
+    args = parser.parse_args(argv)
+
+    try:
+        errors, warnings, tables = run(args.localizations, args.sources, force=args.force or bool(args.output))
+    except StringsError as error:
+        parser.exit(1, f"bundletools.strings: {error}\n")
+    if tables is None:
+        print(f"{TABLE} tables unchanged since the last check (--force to re-check)")
+        return 0
+    for warning in warnings:
+        print(f"warning: {warning}", file=sys.stderr)
+    for error in errors:
+        print(f"error: {error}", file=sys.stderr)
+    if errors or (args.strict and warnings):
+        return 1
+    print(f"{len(tables)} languages, {len(next(iter(tables.values()), []))} keys each, {len(warnings)} warnings")
+    if args.output:
+        for language, text_bytes, binary_bytes, text_ms, binary_ms in write_tables(tables, args.output, args.localizations):
+            print(f"{language}: {text_bytes} -> {binary_bytes} bytes, parse {text_ms:.3f} ms -> {binary_ms:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,58 @@
+import argparse
+import functools
 import json
+import subprocess
+import sys
 from pathlib import Path
 
+from bundletools import assets, fares, polylines, rail, search, spatial, strings
+from bundletools.data import BUNDLES, DATA_DIR, SchemaError, compile_bundles
+from pbxgen.cache import AtomicWriter, Manifest, fingerprint, write_if_changed
+from pbxgen.emitter import Emitter
+from pbxgen.frameworks import module_errors, split_frameworks
+from pbxgen.ids import IdCollisionError, normalize_id
+from pbxgen.model import (
+    BuildConfiguration,
+    BuildFile,
+    BuildPhase,
+    ConfigurationList,
+    FileReference,
+    Group,
+    ModelError,
+    ObjectIndex,
+    PackageProduct,
+    PackageReference,
+    Project,
+    Target,
+    TargetDependency,
+    VariantGroup,
+    package_resolved,
+)
+from pbxgen.patch import PatchError, patch_project
+from pbxgen.pins import Pin, PinError, load_pins, requirement_errors, verify as verify_pins, write_config as write_mirrors_config
+from pbxgen.profile import DEFAULT_REPORT_PATH, Profiler, format_report, write_report
+from pbxgen.scan import scan_tree
+from pbxgen.shards import HISTORY_PATH as TEST_TIMINGS_PATH, load_history, split_test_shards
+from pbxgen.validate import Node, validate
+from pbxgen.variants import VariantError, generate_variants, load_manifest
+from pbxgen.watch import watch
+from pbxgen.xcconfig import format_report as format_settings, layer_settings, write_files as write_xcconfigs
+
+PROJECT_PATH = Path("JourneyTH.xcodeproj/project.pbxproj")
+RESOLVED_PATH = Path("JourneyTH.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved")
+MANIFEST_PATH = Path(".build-cache/generate_pbx.json")
+CONFIGS_DIR = Path("Configs")
+GENERATOR_SOURCES = [
+    Path(__file__),
+    *sorted((Path(__file__).parent / "pbxgen").glob("*.py")),
+    *sorted((Path(__file__).parent / "bundletools").glob("*.py")),
+]
+
 build_files = [
-    ("0B401BE29AC547BE97B2BBC9B6627BB6", "fares_config.json in Resources", "DF962B16DC574B18864520BB6C8F7B71", "fares_config.json"),
+    ("7FA500FFDFEEF4BD20F1C502", "fares_config.plist in Resources", "570F0CF8B07F26F75ECBAB6A", "fares_config.plist"),
     ("0F94DB5B0FFD414B94AD397F66E56566", "SharedComponents.swift in Sources", "C9BE5809471D4ACAA1CA31ABC1A828CF", "SharedComponents.swift"),
     ("1929634F6BC04705965471981ED5791D", "PaymentsFeature.swift in Sources", "5E07DDF5C5684C05B2C6180FD987004E", "PaymentsFeature.swift"),
-    ("1B6300A431CB49C9B9C9AE33DFCDB2AA", "stations.json in Resources", "91072CA6FE4546D1B11A026EA69CFD82", "stations.json"),
+    ("55D7B98C2018B918D558C655", "stations.plist in Resources", "CA04BAA0867289D9ABCF8173", "stations.plist"),
     ("2440393F08554AB9A76B5F8E2510A5BA", "PoiService.swift in Sources", "36EF10CCC0CE4398B9EB7064F895E64A", "PoiService.swift"),
     ("45D007163FE0497FAB2C8BA754485F1C", "DiscoverFeature.swift in Sources", "C726873733654A5AAAF6C20DC82E409C", "DiscoverFeature.swift"),
     ("4B108C3A7DAF479093E851E79F1FA206", "JourneyTHApp.swift in Sources", "B1FAABA271344FB88FE4C5787F826043", "JourneyTHApp.swift"),
@@ -15,7 +62,7 @@ build_files = [
     ("7A7795B785544A33BD9E6A684293CD1C", "TransportRoute.swift in Sources", "F5A56803A65249C3A5630D2CC1411923", "TransportRoute.swift"),
     ("8F7AD27BF2F4478791EAD2E08A94FB06", "ItineraryFeature.swift in Sources", "A56820073EF24CBD8E17952FC55E21CF", "ItineraryFeature.swift"),
     ("9B334F16F8394AE1A85A13EB87239E3D", "EsimFeature.swift in Sources", "E606100D0DF34F5294D288409D91ED2A", "EsimFeature.swift"),
-    ("9DF485B541FB495BA3AB03F3FA70DAFE", "pois.json in Resources", "91C05ECBF1644A69BB0977C6EC8BB656", "pois.json"),
+    ("3CA1225ABA74A90A274EC90C", "pois.plist in Resources", "09556B72F597C5FCC86D7BB1", "pois.plist"),
     ("AA8829520D574593B2BE06F9A2D5252F", "Persistence.swift in Sources", "9A986428DD23477AAC6355BDD9A2D5C9", "Persistence.swift"),
     ("B3E3EF69B8714C8EB3E12813A98B3C34", "OrderModel.swift in Sources", "5D77BEDAEFF74199B55147D585E814C2", "OrderModel.swift"),
     ("BA964D783A6C4FC49CB22A946A016EB8", "AccountFeature.swift in Sources", "BD8927F09F3C46BFA3E1AB54A2573C45", "AccountFeature.swift"),
@@ -26,6 +73,13 @@ build_files = [
     ("F870F5C828DA4AE3A8AB3B43507FA391", "TransportFeature.swift in Sources", "76BAEE7AA8CD42888B6B8297F411B8A2", "TransportFeature.swift"),
     ("FF192049B2AC4E7BB21949AF6945662E", "JourneyTH.xcdatamodeld in Resources", "6ADEDD1F99744762AAA2BC49BD418770", "JourneyTH.xcdatamodeld"),
     ("A94D8F43BA194F0D94B5602F00D5F01E", "Localizable.strings in Resources", "814928D0D8DD4EE3B92B8702FFA15231", "Localizable.strings"),
+    ("E46A858FB9B1B3CD4C57F513", "spatial_index.plist in Resources", "9ACE8B0BE4BD5736287B8EFD", "spatial_index.plist"),
+    ("2F246442622BFA66BC80E90F", "rail_matrix.plist in Resources", "6DCC27311AE7326A128B87E5", "rail_matrix.plist"),
+    ("C50E3450327F7BDD80E88C77", "fare_tables.plist in Resources", "3DDA3A4713B06A52F34221EB", "fare_tables.plist"),
+    ("908B604E6212507F969D91E5", "line_geometry.plist in Resources", "C9B46F3813B4F1D1B1295D37", "line_geometry.plist"),
+    ("1A3874A8100CD380B267902F", "SpatialIndex.swift in Sources", "96B1403592D9D38E20B78EA4", "SpatialIndex.swift"),
+    ("B6A8C791E42BDE413C1FB700", "search_index.plist in Resources", "1BF16C77677C53A55F45D285", "search_index.plist"),
+    ("A6C8E509360657BD8633AC26", "SearchIndex.swift in Sources", "5ED0CBA0859415F13796DBD6", "SearchIndex.swift"),
 ]
 
 test_build_files = [
@@ -33,15 +87,21 @@ test_build_files = [
     ("6408A3AF5B424F7B8302A613E58108AF", "PoiViewModelTests.swift in Sources", "AFF06062C05041329C88A5C549D9C188", "PoiViewModelTests.swift"),
     ("3ABCFA3A7D0D4E4EAE2866772E2F8201", "ItineraryRepositoryTests.swift in Sources", "F66E467385C24E37AC1397AF80F041C9", "ItineraryRepositoryTests.swift"),
     ("05833FE86B234D20AAE4651C70D84BE2", "OrderServiceTests.swift in Sources", "52A4D820998E4546898C8695748D6604", "OrderServiceTests.swift"),
+    ("813BE26122E0EEE8A0E9B7FC", "SpatialIndexTests.swift in Sources", "BCA8FFE85D15895833B245FC", "SpatialIndexTests.swift"),
 ]
 
 resource_build_files = [
-    "0B401BE29AC547BE97B2BBC9B6627BB6",
-    "1B6300A431CB49C9B9C9AE33DFCDB2AA",
-    "9DF485B541FB495BA3AB03F3FA70DAFE",
+    "7FA500FFDFEEF4BD20F1C502",
+    "55D7B98C2018B918D558C655",
+    "3CA1225ABA74A90A274EC90C",
     "5801E565694C43B4AEBD4E24883BDE5C",
     "FF192049B2AC4E7BB21949AF6945662E",
     "A94D8F43BA194F0D94B5602F00D5F01E",
+    "E46A858FB9B1B3CD4C57F513",
+    "2F246442622BFA66BC80E90F",
+    "C50E3450327F7BDD80E88C77",
+    "908B604E6212507F969D91E5",
+    "B6A8C791E42BDE413C1FB700",
 ]
 
 package_build_files = [
@@ -59,11 +119,6 @@ package_references = [
 app_framework_files = [pkg[0] for pkg in package_build_files]
 test_framework_files = []
 
-package_reference_map = {
-    rid: (name, url, min_version, revision)
-    for rid, name, url, min_version, revision in package_references
-}
-
 app_sources = [
     "4B108C3A7DAF479093E851E79F1FA206",
     "0F94DB5B0FFD414B94AD397F66E56566",
@@ -83,6 +138,8 @@ app_sources = [
     "E12A73A08ECD47DF8681D9109908DC95",
     "EF419844F2084FC0904F53003C96382B",
     "F870F5C828DA4AE3A8AB3B43507FA391",
+    "1A3874A8100CD380B267902F",
+    "A6C8E509360657BD8633AC26",
 ]
 
 app_resources_phase = "9B844106FEE54C71BEEC7E23B667677E"
@@ -93,17 +150,6 @@ test_sources_phase = "0BA224D65BD8452A922D1A28C536C5DF"
 test_resources_phase = "4B95F9C09D234038868F3462F44F64AB"
 test_frameworks_phase = "C68CE1376718499FB02CD49079B41642"
 
-build_file_map = {
-    bid: (comment, file_ref, file_comment)
-    for bid, comment, file_ref, file_comment in build_files + test_build_files
-}
-package_build_file_map = {
-    bid: (comment, product_ref)
-    for bid, comment, product_ref in package_build_files
-}
-for bid, (comment, _) in package_build_file_map.items():
-    build_file_map[bid] = (comment, None, None)
-
 project_debug_settings = [
     ("ALWAYS_SEARCH_USER_PATHS", "NO"),
     ("CLANG_WARN_DOCUMENTATION_COMMENTS", "YES"),
@@ -153,6 +199,7 @@ app_debug_settings = [
     ("MARKETING_VERSION", "1.0"),
     ("PRODUCT_BUNDLE_IDENTIFIER", "com.example.JourneyTH"),
     ("PRODUCT_NAME", "\"$(TARGET_NAME)\""),
+    ("STRINGS_FILE_OUTPUT_ENCODING", "binary"),
     ("SWIFT_EMIT_LOC_STRINGS", "YES"),
     ("SWIFT_VERSION", "5.9"),
     ("TARGETED_DEVICE_FAMILY", "1"),
@@ -169,6 +216,7 @@ app_release_settings = [
     ("MARKETING_VERSION", "1.0"),
     ("PRODUCT_BUNDLE_IDENTIFIER", "com.example.JourneyTH"),
     ("PRODUCT_NAME", "\"$(TARGET_NAME)\""),
+    ("STRINGS_FILE_OUTPUT_ENCODING", "binary"),
     ("SWIFT_EMIT_LOC_STRINGS", "YES"),
     ("SWIFT_OPTIMIZATION_LEVEL", "\"-Owholemodule\""),
     ("SWIFT_VERSION", "5.9"),
@@ -187,20 +235,39 @@ test_debug_settings = [
 
 test_release_settings = list(test_debug_settings)
 
+# The "frameworks" report: (target, directory, dependencies). Everything
+# under a directory would move out of the app target; dependencies come first.
+framework_targets = [
+    ("JourneyTHModels", "JourneyTH/Models", []),
+    ("JourneyTHServices", "JourneyTH/Services", ["JourneyTHModels"]),
+    ("JourneyTHShared", "JourneyTH/Features/Shared", ["JourneyTHModels", "JourneyTHServices"]),
+    ("JourneyTHAccount", "JourneyTH/Features/Account", ["JourneyTHServices", "JourneyTHShared"]),
+    ("JourneyTHDiscover", "JourneyTH/Features/Discover", ["JourneyTHModels", "JourneyTHServices", "JourneyTHShared"]),
+    ("JourneyTHEsim", "JourneyTH/Features/Esim", ["JourneyTHModels", "JourneyTHServices", "JourneyTHShared"]),
+    ("JourneyTHItinerary", "JourneyTH/Features/Itinerary", ["JourneyTHModels", "JourneyTHServices", "JourneyTHShared"]),
+    ("JourneyTHPayments", "JourneyTH/Features/Payments", ["JourneyTHShared"]),
+    ("JourneyTHTransport", "JourneyTH/Features/Transport", ["JourneyTHModels", "JourneyTHServices", "JourneyTHShared"]),
+]
 
-def normalize_id(identifier):
-    if not isinstance(identifier, str):
-        return identifier
-    if len(identifier) == 32 and all(c in "0123456789ABCDEF" for c in identifier):
-        return identifier[:24]
-    return identifier
-
-
-def add(lines, text="", indent=0):
-    if text:
-        lines.append("\t" * indent + text)
-    else:
-        lines.append("")
+framework_settings = [
+    ("CODE_SIGN_STYLE", "Automatic"),
+    ("CURRENT_PROJECT_VERSION", "1"),
+    ("DEFINES_MODULE", "YES"),
+    ("DYLIB_COMPATIBILITY_VERSION", "1"),
+    ("DYLIB_CURRENT_VERSION", "1"),
+    ("DYLIB_INSTALL_NAME_BASE", "\"@rpath\""),
+    ("GENERATE_INFOPLIST_FILE", "YES"),
+    ("INSTALL_PATH", "\"$(LOCAL_LIBRARY_DIR)/Frameworks\""),
+    ("IPHONEOS_DEPLOYMENT_TARGET", "17.0"),
+    ("LD_RUNPATH_SEARCH_PATHS", "\"$(inherited) @executable_path/Frameworks @loader_path/Frameworks\""),
+    ("MARKETING_VERSION", "1.0"),
+    ("PRODUCT_NAME", "\"$(TARGET_NAME:c99extidentifier)\""),
+    ("SKIP_INSTALL", "YES"),
+    ("SWIFT_EMIT_LOC_STRINGS", "YES"),
+    ("SWIFT_VERSION", "5.9"),
+    ("TARGETED_DEVICE_FAMILY", "1"),
+    ("VERSIONING_SYSTEM", "\"apple-generic\""),
+]
 
 
 file_refs = {
@@ -223,22 +290,35 @@ file_refs = {
     "16245B883427418D8E6EB5E715C2608D": ("OrderService.swift", "sourcecode.swift", "OrderService.swift", "<group>", None),
     "9A986428DD23477AAC6355BDD9A2D5C9": ("Persistence.swift", "sourcecode.swift", "Persistence.swift", "<group>", None),
     "FC46CE28CE744A56B56D012F8855A4DA": ("PlanLoader.swift", "sourcecode.swift", "PlanLoader.swift", "<group>", None),
+    "96B1403592D9D38E20B78EA4": ("SpatialIndex.swift", "sourcecode.swift", "SpatialIndex.swift", "<group>", None),
+    "5ED0CBA0859415F13796DBD6": ("SearchIndex.swift", "sourcecode.swift", "SearchIndex.swift", "<group>", None),
     "DF962B16DC574B18864520BB6C8F7B71": ("fares_config.json", "text.json", "fares_config.json", "<group>", None),
     "91C05ECBF1644A69BB0977C6EC8BB656": ("pois.json", "text.json", "pois.json", "<group>", None),
     "91072CA6FE4546D1B11A026EA69CFD82": ("stations.json", "text.json", "stations.json", "<group>", None),
+    "570F0CF8B07F26F75ECBAB6A": ("fares_config.plist", "text.plist.xml", "fares_config.plist", "<group>", None),
+    "09556B72F597C5FCC86D7BB1": ("pois.plist", "text.plist.xml", "pois.plist", "<group>", None),
+    "CA04BAA0867289D9ABCF8173": ("stations.plist", "text.plist.xml", "stations.plist", "<group>", None),
+    "9ACE8B0BE4BD5736287B8EFD": ("spatial_index.plist", "text.plist.xml", "spatial_index.plist", "<group>", None),
+    "6DCC27311AE7326A128B87E5": ("rail_matrix.plist", "text.plist.xml", "rail_matrix.plist", "<group>", None),
+    "3DDA3A4713B06A52F34221EB": ("fare_tables.plist", "text.plist.xml", "fare_tables.plist", "<group>", None),
+    "C9B46F3813B4F1D1B1295D37": ("line_geometry.plist", "text.plist.xml", "line_geometry.plist", "<group>", None),
+    "1BF16C77677C53A55F45D285": ("search_index.plist", "text.plist.xml", "search_index.plist", "<group>", None),
     "9BDE6A65E50B42DAA7F0FCACE4E92175": ("Assets.xcassets", "folder.assetcatalog", "Assets.xcassets", "<group>", None),
     "6ADEDD1F99744762AAA2BC49BD418770": ("JourneyTH.xcdatamodeld", "wrapper.xcdatamodeld", "JourneyTH.xcdatamodeld", "<group>", None),
     "AD9639B5FA9442EF8C93471C274351F2": ("TransportViewModelTests.swift", "sourcecode.swift", "TransportViewModelTests.swift", "<group>", None),
     "AFF06062C05041329C88A5C549D9C188": ("PoiViewModelTests.swift", "sourcecode.swift", "PoiViewModelTests.swift", "<group>", None),
     "F66E467385C24E37AC1397AF80F041C9": ("ItineraryRepositoryTests.swift", "sourcecode.swift", "ItineraryRepositoryTests.swift", "<group>", None),
     "52A4D820998E4546898C8695748D6604": ("OrderServiceTests.swift", "sourcecode.swift", "OrderServiceTests.swift", "<group>", None),
+    "BCA8FFE85D15895833B245FC": ("SpatialIndexTests.swift", "sourcecode.swift", "SpatialIndexTests.swift", "<group>", None),
     "2C5C847824774C5C86885E19AD6D7FAB": ("en", "text.plist.strings", "en.lproj/Localizable.strings", "<group>", "en"),
     "B44213AB2E084C7DA4A40A73796DD149": ("th", "text.plist.strings", "th.lproj/Localizable.strings", "<group>", "th"),
     "EDEFAF81E471449BA01CDB83D7DE73CF": ("JourneyTH.app", "wrapper.application", "JourneyTH.app", "BUILT_PRODUCTS_DIR", None),
     "C460CDD0F8484BC9B1898F4E32831B7B": ("JourneyTHTests.xctest", "wrapper.cfbundle", "JourneyTHTests.xctest", "BUILT_PRODUCTS_DIR", None),
 }
 
-variant_group = ("814928D0D8DD4EE3B92B8702FFA15231", "Localizable.strings", ["2C5C847824774C5C86885E19AD6D7FAB", "B44213AB2E084C7DA4A40A73796DD149"])
+variant_groups = {
+    "814928D0D8DD4EE3B92B8702FFA15231": ("Localizable.strings", ["2C5C847824774C5C86885E19AD6D7FAB", "B44213AB2E084C7DA4A40A73796DD149"]),
+}
 
 # PBXGroup definitions
 groups = {
@@ -253,18 +333,16 @@ groups = {
     "3DD0AAD2ED104C8081D3774D9D1F9C22": ("Payments", "Payments", ["5E07DDF5C5684C05B2C6180FD987004E"]),
     "DC925BCF35A948FCA68A9EFA95DF95AC": ("Account", "Account", ["BD8927F09F3C46BFA3E1AB54A2573C45"]),
     "64E0E4D8BF444CE7B22882C10CCBCC8E": ("Models", "Models", ["F5A56803A65249C3A5630D2CC1411923", "491BAA9C25A8486C8B4A912173BDFF9C", "F458FA79BA7C4F54BE5D37BA6F10D472", "5D77BEDAEFF74199B55147D585E814C2"]),
-    "4B25A2265D8A459BAA10F887997A1334": ("Services", "Services", ["F5E25C83484E4C5D85F2759A83C8B002", "6CD204A9303E4AEA898B8870E6A3EA6A", "36EF10CCC0CE4398B9EB7064F895E64A", "16245B883427418D8E6EB5E715C2608D", "9A986428DD23477AAC6355BDD9A2D5C9", "FC46CE28CE744A56B56D012F8855A4DA"]),
+    "4B25A2265D8A459BAA10F887997A1334": ("Services", "Services", ["F5E25C83484E4C5D85F2759A83C8B002", "6CD204A9303E4AEA898B8870E6A3EA6A", "36EF10CCC0CE4398B9EB7064F895E64A", "16245B883427418D8E6EB5E715C2608D", "9A986428DD23477AAC6355BDD9A2D5C9", "FC46CE28CE744A56B56D012F8855A4DA", "5ED0CBA0859415F13796DBD6", "96B1403592D9D38E20B78EA4"]),
     "F733CF0E84FC4FCA86536ADB9C26B44D": ("Resources", "Resources", ["AA1467DA18A6437DB8006AD167FD3E01", "3E73571D642847898629AB66C51C48A9", "9BDE6A65E50B42DAA7F0FCACE4E92175"]),
-    "AA1467DA18A6437DB8006AD167FD3E01": ("Data", "Data", ["DF962B16DC574B18864520BB6C8F7B71", "91C05ECBF1644A69BB0977C6EC8BB656", "91072CA6FE4546D1B11A026EA69CFD82"]),
+    "AA1467DA18A6437DB8006AD167FD3E01": ("Data", "Data", ["3DDA3A4713B06A52F34221EB", "DF962B16DC574B18864520BB6C8F7B71", "570F0CF8B07F26F75ECBAB6A", "C9B46F3813B4F1D1B1295D37", "91C05ECBF1644A69BB0977C6EC8BB656", "09556B72F597C5FCC86D7BB1", "6DCC27311AE7326A128B87E5", "1BF16C77677C53A55F45D285", "9ACE8B0BE4BD5736287B8EFD", "91072CA6FE4546D1B11A026EA69CFD82", "CA04BAA0867289D9ABCF8173"]),
     "3E73571D642847898629AB66C51C48A9": ("Localizations", "Localizations", ["814928D0D8DD4EE3B92B8702FFA15231"]),
     "47E0D37270D244A89682C822C4E78EF9": ("CoreData", "CoreData", ["6ADEDD1F99744762AAA2BC49BD418770"]),
-    "15705C559F48472EAD723162B86AC98F": ("Tests", "Tests", ["AD9639B5FA9442EF8C93471C274351F2", "AFF06062C05041329C88A5C549D9C188", "F66E467385C24E37AC1397AF80F041C9", "52A4D820998E4546898C8695748D6604"]),
+    "15705C559F48472EAD723162B86AC98F": ("Tests", "JourneyTH/Tests", ["AD9639B5FA9442EF8C93471C274351F2", "AFF06062C05041329C88A5C549D9C188", "F66E467385C24E37AC1397AF80F041C9", "52A4D820998E4546898C8695748D6604", "BCA8FFE85D15895833B245FC"]),
     "462D4819A0CB4833AE150112EF7A29AB": ("Products", None, ["EDEFAF81E471449BA01CDB83D7DE73CF", "C460CDD0F8484BC9B1898F4E32831B7B"]),
     "49EE75DF10BF469FB5DB19617997EA50": ("Frameworks", None, []),
 }
 
-variant_group_id, variant_name, variant_children = variant_group
-
 app_target = "39B43CB0CC254B7EB0DC56A68B1B3DA8"
 test_target = "7D5E5DEE4D09405DA95019C510A45B34"
 project_id = "37088684A8C14E49AF159A3CB05ADBDB"
@@ -272,390 +350,608 @@ project_id = "37088684A8C14E49AF159A3CB05ADBDB"
 app_product = "EDEFAF81E471449BA01CDB83D7DE73CF"
 test_product = "C460CDD0F8484BC9B1898F4E32831B7B"
 
-app_resources_phase = normalize_id(app_resources_phase)
-app_sources_phase = normalize_id(app_sources_phase)
-app_frameworks_phase = normalize_id(app_frameworks_phase)
-
-test_sources_phase = normalize_id(test_sources_phase)
-test_resources_phase = normalize_id(test_resources_phase)
-test_frameworks_phase = normalize_id(test_frameworks_phase)
-
-app_target = normalize_id(app_target)
-test_target = normalize_id(test_target)
-project_id = normalize_id(project_id)
-app_product = normalize_id(app_product)
-test_product = normalize_id(test_product)
-
-project_build_config_list = normalize_id("48FE4AC96B74498194B0D75F4A2105CF")
-app_build_config_list = normalize_id("A94D40C2F8FC42629F640CD095B796A5")
-test_build_config_list = normalize_id("BA4170AD04464A4E9E8BC6AA57094B2D")
-
-project_debug_config = normalize_id("745C0DB40D0B43FC9FEE81AF97CC6BBC")
-project_release_config = normalize_id("3ADF79AEEBEA4A0ABD6660461B4FFA29")
-app_debug_config = normalize_id("BD36F355AE5D404DB99FE11F5B38BE68")
-app_release_config = normalize_id("2A02174B22884437BA2130EFCF1DAA63")
-test_debug_config = normalize_id("0B53C482991D4CB3A5D001140109523E")
-test_release_config = normalize_id("77E183D9A2774B0D8B985CED6707BC7F")
-
-container_proxy_id = normalize_id("0277F47312AB481FBD115BB4A9F61D96")
-target_dependency_id = normalize_id("4359A57CB6D84B00A3060827FA3B678F")
-
-main_group_id = normalize_id("C82283E8BE864528A747D2F7A83317C0")
-product_ref_group_id = normalize_id("462D4819A0CB4833AE150112EF7A29AB")
-
-lines = []
-add(lines, "// !$*UTF8*$!")
-add(lines, "{")
-add(lines, "archiveVersion = 1;", 1)
-add(lines, "classes = {", 1)
-add(lines, "};", 1)
-add(lines, "objectVersion = 56;", 1)
-add(lines, "objects = {", 1)
-add(lines)
-
-add(lines, "/* Begin PBXBuildFile section */")
-for bid, comment, file_ref, file_comment in build_files + test_build_files:
-    add(
-        lines,
-        f"{normalize_id(bid)} /* {comment} */ = {{isa = PBXBuildFile; fileRef = {normalize_id(file_ref)} /* {file_comment} */; }};",
-        2,
-    )
-for bid, comment, product_ref in package_build_files:
-    add(
-        lines,
-        f"{normalize_id(bid)} /* {comment} */ = {{isa = PBXBuildFile; productRef = {normalize_id(product_ref)} /* {comment.split(' in ')[0]} */; }};",
-        2,
-    )
-add(lines, "/* End PBXBuildFile section */")
-add(lines)
-
-add(lines, "/* Begin PBXContainerItemProxy section */")
-add(lines, f"{container_proxy_id} /* PBXContainerItemProxy */ = {{", 2)
-add(lines, "isa = PBXContainerItemProxy;", 3)
-add(lines, f"containerPortal = {project_id} /* Project object */;", 3)
-add(lines, "proxyType = 1;", 3)
-add(lines, f"remoteGlobalIDString = {app_target};", 3)
-add(lines, "remoteInfo = JourneyTH;", 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXContainerItemProxy section */")
-add(lines)
-
-add(lines, "/* Begin PBXFileReference section */")
-for fid, (comment, ftype, path, source_tree, name) in file_refs.items():
-    normalized_fid = normalize_id(fid)
-    attrs = ["isa = PBXFileReference", f"lastKnownFileType = {ftype}"]
-    if name is not None:
-        attrs.append(f"name = {name}")
-    attrs.append(f"path = {path}")
-    tree_value = f'"{source_tree}"' if source_tree == "<group>" else source_tree
-    attrs.append(f"sourceTree = {tree_value}")
-    add(lines, f"{normalized_fid} /* {comment} */ = {{{'; '.join(attrs)}; }};", 2)
-add(lines, "/* End PBXFileReference section */")
-add(lines)
-
-add(lines, "/* Begin PBXFrameworksBuildPhase section */")
-for phase, file_ids in ((app_frameworks_phase, app_framework_files), (test_frameworks_phase, test_framework_files)):
-    add(lines, f"{phase} /* Frameworks */ = {{", 2)
-    add(lines, "isa = PBXFrameworksBuildPhase;", 3)
-    add(lines, "buildActionMask = 2147483647;", 3)
-    add(lines, "files = (", 3)
-    for fid in file_ids:
-        comment = build_file_map[fid][0]
-        add(lines, f"{normalize_id(fid)} /* {comment} */,", 4)
-    add(lines, ");", 3)
-    add(lines, "runOnlyForDeploymentPostprocessing = 0;", 3)
-    add(lines, "};", 2)
-add(lines, "/* End PBXFrameworksBuildPhase section */")
-add(lines)
-
-add(lines, "/* Begin PBXGroup section */")
-for gid, (name, path, children) in groups.items():
-    normalized_gid = normalize_id(gid)
-    add(lines, f"{normalized_gid} = {{", 2)
-    add(lines, "isa = PBXGroup;", 3)
-    add(lines, "children = (", 3)
-    for child in children:
-        if child in file_refs:
-            comment = file_refs[child][0]
-        elif child == variant_group_id:
-            comment = variant_name
-        else:
-            comment = groups[child][0]
-        if not comment:
-            comment = child
-        add(lines, f"{normalize_id(child)} /* {comment} */,", 4)
-    add(lines, ");", 3)
-    if name:
-        add(lines, f"name = {name};", 3)
-    if path:
-        add(lines, f"path = {path};", 3)
-    add(lines, 'sourceTree = "<group>";', 3)
-    add(lines, "};", 2)
-add(lines, "/* End PBXGroup section */")
-add(lines)
-
-add(lines, "/* Begin PBXNativeTarget section */")
-add(lines, f"{app_target} /* JourneyTH */ = {{", 2)
-add(lines, "isa = PBXNativeTarget;", 3)
-add(lines, f"buildConfigurationList = {app_build_config_list} /* Build configuration list for PBXNativeTarget \"JourneyTH\" */;", 3)
-add(lines, "buildPhases = (", 3)
-add(lines, f"{app_frameworks_phase} /* Frameworks */,", 4)
-add(lines, f"{app_sources_phase} /* Sources */,", 4)
-add(lines, f"{app_resources_phase} /* Resources */,", 4)
-add(lines, ");", 3)
-add(lines, "buildRules = (", 3)
-add(lines, ");", 3)
-add(lines, "dependencies = (", 3)
-add(lines, ");", 3)
-if package_product_dependencies:
-    add(lines, "packageProductDependencies = (", 3)
-    for pid, name, _ in package_product_dependencies:
-        add(lines, f"{normalize_id(pid)} /* {name} */,", 4)
-    add(lines, ");", 3)
-add(lines, "name = JourneyTH;", 3)
-add(lines, "productName = JourneyTH;", 3)
-add(lines, f"productReference = {app_product} /* JourneyTH.app */;", 3)
-add(lines, 'productType = "com.apple.product-type.application";', 3)
-add(lines, "};", 2)
-add(lines, f"{test_target} /* JourneyTHTests */ = {{", 2)
-add(lines, "isa = PBXNativeTarget;", 3)
-add(lines, f"buildConfigurationList = {test_build_config_list} /* Build configuration list for PBXNativeTarget \"JourneyTHTests\" */;", 3)
-add(lines, "buildPhases = (", 3)
-add(lines, f"{test_frameworks_phase} /* Frameworks */,", 4)
-add(lines, f"{test_sources_phase} /* Sources */,", 4)
-add(lines, f"{test_resources_phase} /* Resources */,", 4)
-add(lines, ");", 3)
-add(lines, "buildRules = (", 3)
-add(lines, ");", 3)
-add(lines, "dependencies = (", 3)
-add(lines, f"{target_dependency_id} /* PBXTargetDependency */,", 4)
-add(lines, ");", 3)
-add(lines, "name = JourneyTHTests;", 3)
-add(lines, "productName = JourneyTHTests;", 3)
-add(lines, f"productReference = {test_product} /* JourneyTHTests.xctest */;", 3)
-add(lines, 'productType = "com.apple.product-type.bundle.unit-test";', 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXNativeTarget section */")
-add(lines)
-
-add(lines, "/* Begin PBXProject section */")
-add(lines, f"{project_id} /* Project object */ = {{", 2)
-add(lines, "isa = PBXProject;", 3)
-add(lines, "attributes = {", 3)
-add(lines, "BuildIndependentTargetsInParallel = YES;", 4)
-add(lines, "LastSwiftUpdateCheck = 1500;", 4)
-add(lines, "LastUpgradeCheck = 1500;", 4)
-add(lines, "TargetAttributes = {", 4)
-add(lines, f"{app_target} = {{CreatedOnToolsVersion = 15.0;}};", 5)
-add(lines, f"{test_target} = {{CreatedOnToolsVersion = 15.0; TestTargetID = {app_target};}};", 5)
-add(lines, "};", 4)
-add(lines, "};", 3)
-add(lines, f"buildConfigurationList = {project_build_config_list} /* Build configuration list for PBXProject \"JourneyTH\" */;", 3)
-add(lines, 'compatibilityVersion = "Xcode 15.0";', 3)
-add(lines, "developmentRegion = en;", 3)
-add(lines, "hasScannedForEncodings = 0;", 3)
-add(lines, "knownRegions = (", 3)
-add(lines, "en,", 4)
-add(lines, "Base,", 4)
-add(lines, "th,", 4)
-add(lines, ");", 3)
-if package_references:
-    add(lines, "packageReferences = (", 3)
-    for rid, name, *_ in package_references:
-        add(lines, f"{normalize_id(rid)} /* XCRemoteSwiftPackageReference \"{name}\" */,", 4)
-    add(lines, ");", 3)
-add(lines, f"mainGroup = {main_group_id};", 3)
-add(lines, f"productRefGroup = {product_ref_group_id};", 3)
-add(lines, 'projectDirPath = "";', 3)
-add(lines, 'projectRoot = "";', 3)
-add(lines, "targets = (", 3)
-add(lines, f"{app_target} /* JourneyTH */,", 4)
-add(lines, f"{test_target} /* JourneyTHTests */,", 4)
-add(lines, ");", 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXProject section */")
-add(lines)
-
-add(lines, "/* Begin PBXResourcesBuildPhase section */")
-add(lines, f"{app_resources_phase} /* Resources */ = {{", 2)
-add(lines, "isa = PBXResourcesBuildPhase;", 3)
-add(lines, "buildActionMask = 2147483647;", 3)
-add(lines, "files = (", 3)
-for fid in resource_build_files:
-    comment, _, _ = build_file_map[fid]
-    add(lines, f"{normalize_id(fid)} /* {comment} */,", 4)
-add(lines, ");", 3)
-add(lines, "runOnlyForDeploymentPostprocessing = 0;", 3)
-add(lines, "};", 2)
-add(lines, f"{test_resources_phase} /* Resources */ = {{", 2)
-add(lines, "isa = PBXResourcesBuildPhase;", 3)
-add(lines, "buildActionMask = 2147483647;", 3)
-add(lines, "files = (", 3)
-add(lines, ");", 3)
-add(lines, "runOnlyForDeploymentPostprocessing = 0;", 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXResourcesBuildPhase section */")
-add(lines)
-
-add(lines, "/* Begin PBXSourcesBuildPhase section */")
-add(lines, f"{app_sources_phase} /* Sources */ = {{", 2)
-add(lines, "isa = PBXSourcesBuildPhase;", 3)
-add(lines, "buildActionMask = 2147483647;", 3)
-add(lines, "files = (", 3)
-for fid in app_sources:
-    comment, _, _ = build_file_map[fid]
-    add(lines, f"{normalize_id(fid)} /* {comment} */,", 4)
-add(lines, ");", 3)
-add(lines, "runOnlyForDeploymentPostprocessing = 0;", 3)
-add(lines, "};", 2)
-add(lines, f"{test_sources_phase} /* Sources */ = {{", 2)
-add(lines, "isa = PBXSourcesBuildPhase;", 3)
-add(lines, "buildActionMask = 2147483647;", 3)
-add(lines, "files = (", 3)
-for fid, _, _, _ in test_build_files:
-    comment, _, _ = build_file_map[fid]
-    add(lines, f"{normalize_id(fid)} /* {comment} */,", 4)
-add(lines, ");", 3)
-add(lines, "runOnlyForDeploymentPostprocessing = 0;", 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXSourcesBuildPhase section */")
-add(lines)
-
-add(lines, "/* Begin PBXTargetDependency section */")
-add(lines, f"{target_dependency_id} /* PBXTargetDependency */ = {{", 2)
-add(lines, f"isa = PBXTargetDependency;", 3)
-add(lines, f"target = {app_target} /* JourneyTH */;", 3)
-add(lines, f"targetProxy = {container_proxy_id} /* PBXContainerItemProxy */;", 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXTargetDependency section */")
-add(lines)
-
-add(lines, "/* Begin PBXVariantGroup section */")
-add(lines, f"{normalize_id(variant_group_id)} /* {variant_name} */ = {{", 2)
-add(lines, "isa = PBXVariantGroup;", 3)
-add(lines, "children = (", 3)
-for child in variant_children:
-    child_comment = file_refs[child][0]
-    add(lines, f"{normalize_id(child)} /* {child_comment} */,", 4)
-add(lines, ");", 3)
-add(lines, f"name = {variant_name};", 3)
-add(lines, 'sourceTree = "<group>";', 3)
-add(lines, "};", 2)
-add(lines, "/* End PBXVariantGroup section */")
-add(lines)
-
-if package_product_dependencies:
-    add(lines, "/* Begin XCSwiftPackageProductDependency section */")
-    for pid, name, package_id in package_product_dependencies:
-        package_name = package_reference_map[package_id][0]
-        add(lines, f"{normalize_id(pid)} /* {name} */ = {{", 2)
-        add(lines, "isa = XCSwiftPackageProductDependency;", 3)
-        add(lines, f"package = {normalize_id(package_id)} /* XCRemoteSwiftPackageReference \"{package_name}\" */;", 3)
-        add(lines, f"productName = {name};", 3)
-        add(lines, "};", 2)
-    add(lines, "/* End XCSwiftPackageProductDependency section */")
-    add(lines)
-
-if package_references:
-    add(lines, "/* Begin XCRemoteSwiftPackageReference section */")
-    for rid, name, url, min_version, _ in package_references:
-        add(lines, f"{normalize_id(rid)} /* XCRemoteSwiftPackageReference \"{name}\" */ = {{", 2)
-        add(lines, "isa = XCRemoteSwiftPackageReference;", 3)
-        add(lines, f"repositoryURL = \"{url}\";", 3)
-        add(lines, "requirement = {", 3)
-        add(lines, "kind = upToNextMajorVersion;", 4)
-        add(lines, f"minimumVersion = {min_version};", 4)
-        add(lines, "};", 3)
-        add(lines, "};", 2)
-    add(lines, "/* End XCRemoteSwiftPackageReference section */")
-    add(lines)
-
-add(lines, "/* Begin XCBuildConfiguration section */")
-for identifier, name, settings in [
-    (project_debug_config, "Debug", project_debug_settings),
-    (project_release_config, "Release", project_release_settings),
-    (app_debug_config, "Debug", app_debug_settings),
-    (app_release_config, "Release", app_release_settings),
-    (test_debug_config, "Debug", test_debug_settings),
-    (test_release_config, "Release", test_release_settings),
-]:
-    add(lines, f"{identifier} /* {name} */ = {{", 2)
-    add(lines, "isa = XCBuildConfiguration;", 3)
-    add(lines, "buildSettings = {", 3)
-    for key, value in settings:
-        add(lines, f"{key} = {value};", 4)
-    add(lines, "};", 3)
-    add(lines, f"name = {name};", 3)
-    add(lines, "};", 2)
-add(lines, "/* End XCBuildConfiguration section */")
-add(lines)
-
-add(lines, "/* Begin XCConfigurationList section */")
-add(
-    lines,
-    f"{project_build_config_list} /* Build configuration list for PBXProject \"JourneyTH\" */ = {{",
-    2,
+main_group_id = "C82283E8BE864528A747D2F7A83317C0"
+product_ref_group_id = "462D4819A0CB4833AE150112EF7A29AB"
+
+parser = argparse.ArgumentParser(description="Generate JourneyTH.xcodeproj/project.pbxproj.")
+parser.add_argument(
+    "--scan",
+    action="store_true",
+    help="derive file references, build files and groups from the JourneyTH/ tree instead of the tables above",
 )
-add(lines, "isa = XCConfigurationList;", 3)
-add(lines, "buildConfigurations = (", 3)
-add(lines, f"{project_debug_config} /* Debug */,", 4)
-add(lines, f"{project_release_config} /* Release */,", 4)
-add(lines, ");", 3)
-add(lines, "defaultConfigurationIsVisible = 0;", 3)
-add(lines, "defaultConfigurationName = Release;", 3)
-add(lines, "};", 2)
-add(
-    lines,
-    f"{app_build_config_list} /* Build configuration list for PBXNativeTarget \"JourneyTH\" */ = {{",
-    2,
+parser.add_argument(
+    "--test-shards",
+    type=int,
+    default=1,
+    metavar="N",
+    help="split the unit tests into N targets balanced by the run times in test_timings.json (see pbxgen.shards)",
 )
-add(lines, "isa = XCConfigurationList;", 3)
-add(lines, "buildConfigurations = (", 3)
-add(lines, f"{app_debug_config} /* Debug */,", 4)
-add(lines, f"{app_release_config} /* Release */,", 4)
-add(lines, ");", 3)
-add(lines, "defaultConfigurationIsVisible = 0;", 3)
-add(lines, "defaultConfigurationName = Release;", 3)
-add(lines, "};", 2)
-add(
-    lines,
-    f"{test_build_config_list} /* Build configuration list for PBXNativeTarget \"JourneyTHTests\" */ = {{",
-    2,
+parser.add_argument(
+    "--variants",
+    type=Path,
+    metavar="MANIFEST",
+    help="also write a JourneyTH-<name>.xcodeproj for each variant in MANIFEST, in parallel where fork is the default (see pbxgen.variants)",
 )
-add(lines, "isa = XCConfigurationList;", 3)
-add(lines, "buildConfigurations = (", 3)
-add(lines, f"{test_debug_config} /* Debug */,", 4)
-add(lines, f"{test_release_config} /* Release */,", 4)
-add(lines, ");", 3)
-add(lines, "defaultConfigurationIsVisible = 0;", 3)
-add(lines, "defaultConfigurationName = Release;", 3)
-add(lines, "};", 2)
-add(lines, "/* End XCConfigurationList section */")
-add(lines)
-
-add(lines, "};", 1)
-add(lines, f"rootObject = {project_id} /* Project object */;", 1)
-add(lines, "}")
-
-with open("JourneyTH.xcodeproj/project.pbxproj", "w") as f:
-    f.write("\n".join(lines) + "\n")
-
-if package_references:
-    resolved = {
-        "pins": [
-            {
-                "identity": name,
-                "kind": "remoteSourceControl",
-                "location": url,
-                "state": {
-                    "revision": revision,
-                    "version": min_version,
-                },
-            }
-            for _, name, url, min_version, revision in package_references
+parser.add_argument(
+    "--verify-pins",
+    action="store_true",
+    help="check each package pin against a local git mirror, offline, and point SwiftPM and Xcode at the mirrors (see pbxgen.pins)",
+)
+parser.add_argument(
+    "--force",
+    action="store_true",
+    help="regenerate even when the inputs match the last run",
+)
+parser.add_argument(
+    "--check-strings",
+    action="store_true",
+    help="check Localizable.strings key parity, format specifiers and usage first (see bundletools.strings)",
+)
+parser.add_argument(
+    "--optimize-assets",
+    action="store_true",
+    help="shrink changed imagesets and check pois.json images against the catalog first (see bundletools.assets)",
+)
+parser.add_argument(
+    "--profile",
+    nargs="?",
+    type=Path,
+    const=DEFAULT_REPORT_PATH,
+    metavar="JSON",
+    help="time each phase and emitted section, with allocations, object counts and bytes written; "
+    "prints a table and writes JSON (default: %(const)s). Implies --force",
+)
+parser.add_argument(
+    "--cprofile",
+    type=Path,
+    metavar="FILE",
+    help="also dump cProfile stats for the whole run to FILE (for pstats or snakeviz); implies --profile",
+)
+commands = parser.add_subparsers(dest="command", metavar="command")
+patch_parser = commands.add_parser(
+    "patch",
+    help="add or remove files in the existing project.pbxproj without regenerating it",
+    description="Edit only the objects a file touches. IDs match --scan, so a later full scan agrees. "
+    "Needs a project last generated with --scan: a table-mode run would drop the patch.",
+)
+patch_parser.add_argument("--add", action="append", default=[], metavar="PATH", help="file to add (repeatable)")
+patch_parser.add_argument("--remove", action="append", default=[], metavar="PATH", help="file to remove (repeatable)")
+watch_parser = commands.add_parser(
+    "watch",
+    help="keep project.pbxproj in step with JourneyTH/ as files are added, removed and renamed",
+    description="Patch the project in place after each burst of changes; falls back to a full regeneration, "
+    "with the options given before 'watch', when needed. Needs --scan.",
+)
+watch_parser.add_argument("--debounce", type=float, default=0.2, metavar="SECONDS", help="quiet time that ends a burst (default: %(default)s)")
+watch_parser.add_argument("--poll", action="store_true", help="poll directory mtimes instead of using inotify")
+watch_parser.add_argument("--interval", type=float, default=0.5, metavar="SECONDS", help="polling interval (default: %(default)s)")
+commands.add_parser(
+    "frameworks",
+    help="report what the Swift sources need before the framework_targets split would compile",
+    description="Split the model into the framework targets listed in framework_targets, in memory only, and list "
+    "every missing import, non-public name used from another module and use against the dependency order. "
+    "Writes nothing; exits 1 while anything is listed.",
+)
+settings_parser = commands.add_parser(
+    "settings",
+    help="print the effective build settings of every configuration",
+    description="Resolve each configuration through Project.xcconfig, its target's .xcconfig files and its inline overrides.",
+)
+settings_parser.add_argument("--diff", action="store_true", help="only settings whose value differs between configurations")
+settings_parser.add_argument("--target", action="append", default=[], metavar="NAME", help="only this target, or 'project' (repeatable)")
+settings_parser.add_argument("--json", action="store_true", help="print JSON with the layer each value comes from")
+args = parser.parse_args()
+
+if args.command == "patch":
+    if Manifest(MANIFEST_PATH).mode != "scan":
+        # A table-mode run rebuilds the project from the tables above and
+        # would drop the patch without a word.
+        parser.exit(
+            1,
+            f"generate_pbx.py patch: {PROJECT_PATH} was not last generated with --scan, so the next "
+            "generate would undo the patch; run 'generate_pbx.py --scan' first, or edit the tables\n",
+        )
+    try:
+        changes = patch_project(PROJECT_PATH, args.add, args.remove)
+    except PatchError as error:
+        parser.exit(1, f"generate_pbx.py patch: {error}\n")
+    print("\n".join(changes))
+    raise SystemExit(0)
+
+if args.command == "watch":
+    if not args.scan:
+        # Patches to a table-mode project are undone by the next table run.
+        parser.exit(
+            1,
+            "generate_pbx.py watch: needs --scan (python3 generate_pbx.py --scan watch); "
+            "in table mode the next generate would undo every patch\n",
+        )
+
+    # Regenerate with the options watch was started with, so the pre-build
+    # hook agrees with it. --profile is left out: it would force every run,
+    # including the first.
+    def regenerate(force):
+        flags = [
+            "--scan",
+            *([f"--test-shards={args.test_shards}"] if args.test_shards > 1 else []),
+            *([f"--variants={args.variants}"] if args.variants else []),
+            *(["--verify-pins"] if args.verify_pins else []),
+            *(["--check-strings"] if args.check_strings else []),
+            *(["--optimize-assets"] if args.optimize_assets else []),
+            *(["--force"] if force or args.force else []),
+        ]
+        subprocess.run([sys.executable, __file__, *flags], check=True)
+
+    try:
+        watch(PROJECT_PATH, "JourneyTH", regenerate, args.debounce, args.poll, args.interval)
+    except subprocess.CalledProcessError:
+        # The regeneration has already said why it failed.
+        parser.exit(1, "generate_pbx.py watch: regeneration failed; stopping\n")
+    raise SystemExit(0)
+
+
+def string_sources():
+    """What --check-strings reads: the tables and the Swift sources."""
+    return [
+        *sorted(strings.LOCALIZATIONS_DIR.glob(f"*.lproj/{strings.TABLE}")),
+        *sorted(strings.SOURCE_DIR.rglob("*.swift")),
+    ]
+
+
+def asset_sources():
+    """What --optimize-assets reads: every file in the catalog and the symbol palette."""
+    return [
+        *sorted(path for path in assets.CATALOG.rglob("*") if path.is_file()),
+        *([assets.PALETTE_SOURCE] if assets.PALETTE_SOURCE.is_file() else []),
+    ]
+
+
+profiler = Profiler(args.profile is not None, args.cprofile)
+profiler.start()
+
+bundle_sources = [DATA_DIR / f"{bundle.name}.json" for bundle in BUNDLES if (DATA_DIR / f"{bundle.name}.json").is_file()]
+manifest = Manifest(MANIFEST_PATH)
+with profiler.phase("fingerprint"):
+    input_fingerprint = fingerprint(
+        sources=[
+            *GENERATOR_SOURCES,
+            *bundle_sources,
+            *(string_sources() if args.check_strings else []),
+            *(asset_sources() if args.optimize_assets else []),
+            *([TEST_TIMINGS_PATH] if args.test_shards > 1 and TEST_TIMINGS_PATH.is_file() else []),
+            *([args.variants] if args.variants else []),
+            *([RESOLVED_PATH] if args.verify_pins and RESOLVED_PATH.is_file() else []),
+        ],
+        values=[
+            args.scan,
+            args.test_shards,
+            str(args.variants),
+            args.verify_pins,
+            args.check_strings,
+            args.optimize_assets,
+            build_files,
+            test_build_files,
+            resource_build_files,
+            app_sources,
+            file_refs,
+            groups,
+            variant_groups,
+            package_build_files,
+            package_product_dependencies,
+            package_references,
+            project_debug_settings,
+            project_release_settings,
+            app_debug_settings,
+            app_release_settings,
+            test_debug_settings,
+            test_release_settings,
         ],
-        "version": 2,
-    }
-    resolved_path = Path("JourneyTH.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved")
-    resolved_path.parent.mkdir(parents=True, exist_ok=True)
-    resolved_path.write_text(json.dumps(resolved, indent=2) + "\n")
+        trees=["JourneyTH"] if args.scan else [],
+    )
+# A profile of the early exit would show nothing, so --profile regenerates.
+# Nothing else has run yet: the data bundles, strings check and asset pass
+# are all inputs to this fingerprint, so a no-op run stops here.
+if not (args.force or profiler.enabled or args.command in ("settings", "frameworks")) and manifest.is_current(input_fingerprint):
+    raise SystemExit(0)
+
+if args.check_strings:
+    try:
+        string_errors, string_warnings, _ = profiler.call("check strings", strings.run)
+    except strings.StringsError as error:
+        parser.exit(1, f"generate_pbx.py: {error}\n")
+    for message in string_warnings:
+        print(f"generate_pbx.py: warning: {message}", file=sys.stderr)
+    if string_errors:
+        parser.exit(1, "".join(f"generate_pbx.py: {message}\n" for message in string_errors))
+
+if args.optimize_assets:
+    asset_reports, _ = profiler.call("optimize assets", assets.optimize)
+    for report in asset_reports:
+        for note in report["notes"]:
+            print(f"generate_pbx.py: warning: {report['name']}: {note}", file=sys.stderr)
+    missing_images, _ = assets.cross_check()
+    if missing_images:
+        parser.exit(1, f"generate_pbx.py: pois.json images with no imageset or symbol: {', '.join(missing_images)}\n")
+
+# The JSON data ships as binary plists compiled here, with the spatial index,
+# rail matrix, fare tables, simplified line geometry and POI search index
+# built from it, before the scan so --scan sees them; unchanged outputs are
+# not rewritten.
+try:
+    with profiler.phase("data bundles"):
+        compiled = profiler.call("compile JSON", compile_bundles)
+        spatial_index = profiler.call("spatial index", spatial.write_index)
+        rail_matrix = profiler.call("rail matrix", rail.write_matrix)
+        fare_tables, _ = profiler.call("fare tables", fares.write_tables)
+        line_geometry, _ = profiler.call("line geometry", polylines.write_geometry)
+        search_index = profiler.call("search index", search.write_index)
+except (
+    SchemaError,
+    spatial.SpatialIndexError,
+    rail.RailNetworkError,
+    fares.FareParityError,
+    polylines.PolylineError,
+    search.SearchIndexError,
+) as error:
+    parser.exit(1, f"generate_pbx.py: {error}\n")
+
+if args.scan:
+    with profiler.phase("scan") as record:
+        tree = scan_tree(
+            "JourneyTH",
+            ".",
+            [("JourneyTH.app", "wrapper.application"), ("JourneyTHTests.xctest", "wrapper.cfbundle")],
+            compiled=[bundle.source.as_posix() for bundle in compiled],
+        )
+        record["objects"] = len(tree.file_refs) + len(tree.groups) + len(tree.variant_groups)
+    build_files = tree.build_files
+    test_build_files = tree.test_build_files
+    resource_build_files = tree.resource_build_files
+    app_sources = tree.app_sources
+    file_refs = tree.file_refs
+    groups = tree.groups
+    variant_groups = tree.variant_groups
+    main_group_id = tree.main_group
+    product_ref_group_id = tree.product_group
+    app_product, test_product = tree.products
+
+# Two hand-written IDs that agree in their first 24 digits would be one object.
+try:
+    app_resources_phase = normalize_id(app_resources_phase)
+    app_sources_phase = normalize_id(app_sources_phase)
+    app_frameworks_phase = normalize_id(app_frameworks_phase)
+
+    test_sources_phase = normalize_id(test_sources_phase)
+    test_resources_phase = normalize_id(test_resources_phase)
+    test_frameworks_phase = normalize_id(test_frameworks_phase)
+
+    app_target = normalize_id(app_target)
+    test_target = normalize_id(test_target)
+    project_id = normalize_id(project_id)
+    app_product = normalize_id(app_product)
+    test_product = normalize_id(test_product)
+
+    project_build_config_list = normalize_id("48FE4AC96B74498194B0D75F4A2105CF")
+    app_build_config_list = normalize_id("A94D40C2F8FC42629F640CD095B796A5")
+    test_build_config_list = normalize_id("BA4170AD04464A4E9E8BC6AA57094B2D")
+
+    project_debug_config = normalize_id("745C0DB40D0B43FC9FEE81AF97CC6BBC")
+    project_release_config = normalize_id("3ADF79AEEBEA4A0ABD6660461B4FFA29")
+    app_debug_config = normalize_id("BD36F355AE5D404DB99FE11F5B38BE68")
+    app_release_config = normalize_id("2A02174B22884437BA2130EFCF1DAA63")
+    test_debug_config = normalize_id("0B53C482991D4CB3A5D001140109523E")
+    test_release_config = normalize_id("77E183D9A2774B0D8B985CED6707BC7F")
+
+    container_proxy_id = normalize_id("0277F47312AB481FBD115BB4A9F61D96")
+    target_dependency_id = normalize_id("4359A57CB6D84B00A3060827FA3B678F")
+
+    main_group_id = normalize_id(main_group_id)
+    product_ref_group_id = normalize_id(product_ref_group_id)
+except IdCollisionError as error:
+    parser.exit(1, f"generate_pbx.py: {error}\n")
+
+
+def table_nodes():
+    """The tables as pbxgen.validate nodes, with their IDs as written."""
+    for fid, (comment, _, path, source_tree, name) in file_refs.items():
+        yield Node(fid, "PBXFileReference", comment, [], path, name, source_tree)
+    for vid, (variant_name, children) in variant_groups.items():
+        yield Node(vid, "PBXVariantGroup", variant_name, [("children", child) for child in children], None, variant_name)
+    for gid, (name, path, children) in groups.items():
+        yield Node(gid, "PBXGroup", name or gid, [("children", child) for child in children], path, name, "<group>")
+    for bid, comment, file_ref, _ in build_files + test_build_files:
+        yield Node(bid, "PBXBuildFile", comment, [("fileRef", file_ref)])
+    for bid, comment, product_ref in package_build_files:
+        yield Node(bid, "PBXBuildFile", comment, [("productRef", product_ref)])
+    for pid, name, package_id in package_product_dependencies:
+        yield Node(pid, "XCSwiftPackageProductDependency", name, [("package", package_id)])
+    for rid, name, *_ in package_references:
+        yield Node(rid, "XCRemoteSwiftPackageReference", name, [])
+    for target, name, product, phases in [
+        (app_target, "JourneyTH", app_product, [
+            (app_frameworks_phase, "Frameworks", app_framework_files),
+            (app_sources_phase, "Sources", app_sources),
+            (app_resources_phase, "Resources", resource_build_files),
+        ]),
+        (test_target, "JourneyTHTests", test_product, [
+            (test_frameworks_phase, "Frameworks", test_framework_files),
+            (test_sources_phase, "Sources", [bid for bid, *_ in test_build_files]),
+            (test_resources_phase, "Resources", []),
+        ]),
+    ]:
+        for phase_id, kind, files in phases:
+            yield Node(phase_id, f"PBX{kind}BuildPhase", f"{name} {kind}", [("files", bid) for bid in files])
+        refs = [("buildPhases", phase_id) for phase_id, _, _ in phases] + [("productReference", product)]
+        if target == app_target:
+            refs += [("packageProductDependencies", pid) for pid, *_ in package_product_dependencies]
+        yield Node(target, "PBXNativeTarget", name, refs)
+    yield Node(project_id, "PBXProject", "Project object", [
+        ("mainGroup", main_group_id),
+        ("productRefGroup", product_ref_group_id),
+        ("targets", app_target),
+        ("targets", test_target),
+        *(("packageReferences", rid) for rid, *_ in package_references),
+    ])
+
+
+def build_index():
+    """Turn the tables into model objects, resolving every ID once."""
+    index = ObjectIndex()
+    add = index.add
+
+    for fid, (comment, ftype, path, source_tree, name) in file_refs.items():
+        add(FileReference(normalize_id(fid), comment, ftype, path, source_tree, name))
+    for vid, (variant_name, children) in variant_groups.items():
+        owner = f"PBXVariantGroup {variant_name}"
+        add(VariantGroup(
+            normalize_id(vid),
+            variant_name,
+            [index.resolve(normalize_id(child), FileReference, owner) for child in children],
+        ))
+    # Groups refer to each other in any order: register them all, then link.
+    group_objects = [add(Group(normalize_id(gid), name, path, [])) for gid, (name, path, _) in groups.items()]
+    for group, (_, _, children) in zip(group_objects, groups.values()):
+        owner = f"PBXGroup {group.comment}"
+        group.children = [
+            index.resolve(normalize_id(child), (Group, FileReference, VariantGroup), owner) for child in children
+        ]
+
+    package_objects = [
+        add(PackageReference(normalize_id(rid), name, url, min_version, revision))
+        for rid, name, url, min_version, revision in package_references
+    ]
+    product_objects = [
+        add(PackageProduct(normalize_id(pid), name, index.resolve(normalize_id(package_id), PackageReference, name)))
+        for pid, name, package_id in package_product_dependencies
+    ]
+    for bid, comment, file_ref, _ in build_files + test_build_files:
+        add(BuildFile(normalize_id(bid), comment, file=index.resolve(normalize_id(file_ref), (FileReference, VariantGroup), comment)))
+    for bid, comment, product_ref in package_build_files:
+        add(BuildFile(normalize_id(bid), comment, product=index.resolve(normalize_id(product_ref), PackageProduct, comment)))
+
+    def phase(identifier, kind, file_ids, owner):
+        files = [index.resolve(normalize_id(fid), BuildFile, f"{owner} {kind} phase") for fid in file_ids]
+        return add(BuildPhase(identifier, kind, files))
+
+    def configuration_list(identifier, owner, configurations):
+        built = [add(BuildConfiguration(cid, name, settings)) for cid, name, settings in configurations]
+        return add(ConfigurationList(identifier, owner, built))
+
+    app_phases = [
+        phase(app_frameworks_phase, "Frameworks", app_framework_files, "JourneyTH"),
+        phase(app_sources_phase, "Sources", app_sources, "JourneyTH"),
+        phase(app_resources_phase, "Resources", resource_build_files, "JourneyTH"),
+    ]
+    test_phases = [
+        phase(test_frameworks_phase, "Frameworks", test_framework_files, "JourneyTHTests"),
+        phase(test_sources_phase, "Sources", [bid for bid, *_ in test_build_files], "JourneyTHTests"),
+        phase(test_resources_phase, "Resources", [], "JourneyTHTests"),
+    ]
+
+    project_configs = configuration_list(project_build_config_list, 'PBXProject "JourneyTH"', [
+        (project_debug_config, "Debug", project_debug_settings),
+        (project_release_config, "Release", project_release_settings),
+    ])
+    app_configs = configuration_list(app_build_config_list, 'PBXNativeTarget "JourneyTH"', [
+        (app_debug_config, "Debug", app_debug_settings),
+        (app_release_config, "Release", app_release_settings),
+    ])
+    test_configs = configuration_list(test_build_config_list, 'PBXNativeTarget "JourneyTHTests"', [
+        (test_debug_config, "Debug", test_debug_settings),
+        (test_release_config, "Release", test_release_settings),
+    ])
+
+    app = add(Target(
+        app_target,
+        "JourneyTH",
+        index.resolve(app_product, FileReference, "JourneyTH"),
+        "com.apple.product-type.application",
+        app_configs,
+        app_phases,
+        packages=product_objects,
+    ))
+    tests = add(Target(
+        test_target,
+        "JourneyTHTests",
+        index.resolve(test_product, FileReference, "JourneyTHTests"),
+        "com.apple.product-type.bundle.unit-test",
+        test_configs,
+        test_phases,
+        test_host=app,
+    ))
+    tests.dependencies.append(add(TargetDependency(target_dependency_id, container_proxy_id, app, project_id)))
+
+    main_group = index.resolve(main_group_id, Group, "PBXProject")
+    product_group = index.resolve(product_ref_group_id, Group, "PBXProject")
+    frameworks = []
+    if args.command == "frameworks":
+        frameworks = split_frameworks(
+            index,
+            app,
+            framework_targets,
+            main_group,
+            product_group,
+            project_id,
+            framework_settings,
+            "com.example.JourneyTH",
+        )
+
+    shards = []
+    if args.test_shards > 1:
+        shards = split_test_shards(
+            index,
+            tests,
+            args.test_shards,
+            main_group,
+            product_group,
+            project_id,
+            load_history(TEST_TIMINGS_PATH),
+        )
+
+    project = add(Project(project_id, main_group, product_group, project_configs, [app, *frameworks, tests, *shards], package_objects))
+    return index, project
+
+
+def object_rows(objects):
+    for obj in objects:
+        yield from obj.rows()
+
+
+def write_project(emitter, index, project, profiler):
+    section = index.section
+
+    def emit(isa, rows, objects):
+        with profiler.phase(isa, len(objects)):
+            emitter.section(isa, rows)
+
+    emitter.line("// !$*UTF8*$!")
+    emitter.line("{")
+    emitter.line("archiveVersion = 1;", 1)
+    emitter.line("classes = {", 1)
+    emitter.line("};", 1)
+    emitter.line("objectVersion = 56;", 1)
+    emitter.line("objects = {", 1)
+    emitter.line()
+    emit("PBXBuildFile", object_rows(section("PBXBuildFile")), section("PBXBuildFile"))
+    emit(
+        "PBXContainerItemProxy",
+        (row for dependency in section("PBXTargetDependency") for row in dependency.proxy_rows()),
+        section("PBXTargetDependency"),
+    )
+    if section("PBXCopyFilesBuildPhase"):
+        emit("PBXCopyFilesBuildPhase", object_rows(section("PBXCopyFilesBuildPhase")), section("PBXCopyFilesBuildPhase"))
+    for isa in [
+        "PBXFileReference",
+        "PBXFrameworksBuildPhase",
+        "PBXGroup",
+        "PBXNativeTarget",
+        "PBXProject",
+        "PBXResourcesBuildPhase",
+        "PBXSourcesBuildPhase",
+        "PBXTargetDependency",
+        "PBXVariantGroup",
+    ]:
+        emit(isa, object_rows(section(isa)), section(isa))
+    for isa in ["XCSwiftPackageProductDependency", "XCRemoteSwiftPackageReference"]:
+        if section(isa):
+            emit(isa, object_rows(section(isa)), section(isa))
+    for isa in ["XCBuildConfiguration", "XCConfigurationList"]:
+        emit(isa, object_rows(section(isa)), section(isa))
+    emitter.line("};", 1)
+    emitter.line(f"rootObject = {project.id} /* Project object */;", 1)
+    emitter.line("}")
+
+
+# Every broken table reference at once, before build_index stops at the first.
+with profiler.phase("validate tables"):
+    table_errors, table_warnings = validate(table_nodes(), project_id)
+for message in table_warnings:
+    print(f"generate_pbx.py: warning: {message}", file=sys.stderr)
+if table_errors:
+    parser.exit(1, "".join(f"generate_pbx.py: {message}\n" for message in table_errors))
+
+mirror_configs = []
+if args.verify_pins and package_references:
+    references = [Pin(name, url, min_version, revision) for _, name, url, min_version, revision in package_references]
+    with profiler.phase("verify pins", len(references)):
+        try:
+            # The pins Xcode resolved, which need not be the tables' own.
+            pins = load_pins(RESOLVED_PATH)
+            problems = requirement_errors(pins, references)
+            if not problems:
+                verify_pins(pins)
+        except PinError as error:
+            problems = str(error).splitlines()
+        if problems:
+            parser.exit(1, "".join(f"generate_pbx.py: {line}\n" for line in problems))
+        mirror_configs = write_mirrors_config(pins)
+
+variant_outputs = []
+try:
+    with profiler.phase("build object index") as record:
+        index, project = build_index()
+        record["objects"] = len(index)
+    # Variants share the base model's objects, so they are derived before
+    # layering rewrites its settings in place.
+    if args.variants and args.command is None:
+        with profiler.phase("variants") as record:
+            variants = generate_variants(index, project, load_manifest(args.variants), functools.partial(write_project, profiler=Profiler()))
+            record["objects"] = sum(objects for _, _, objects, _, _ in variants)
+        for name, paths, objects, shared, ms in variants:
+            print(f"{paths[0].parent}: {objects} objects, {shared} shared with {PROJECT_PATH.parent}, {ms:.0f} ms")
+            variant_outputs.extend(paths)
+    # Shared settings move to Configs/*.xcconfig; only per-configuration
+    # overrides stay in the project.
+    layering = layer_settings(index, project, CONFIGS_DIR)
+except (ModelError, IdCollisionError, VariantError) as error:
+    parser.exit(1, f"generate_pbx.py: {error}\n")
+
+if args.command == "frameworks":
+    # The split only moves build files; the sources decide whether it builds.
+    problems = module_errors(project.targets, project.main_group)
+    for problem in problems:
+        print(problem)
+    if problems:
+        parser.exit(1, f"generate_pbx.py frameworks: {len(problems)} source changes needed before the split compiles\n")
+    print(f"the sources are ready for the {len(framework_targets)}-framework split")
+    raise SystemExit(0)
+
+if args.command == "settings":
+    report = layering.report()
+    if args.json:
+        selected = {owner: configurations for owner, configurations in report.items() if not args.target or owner in args.target}
+        print(json.dumps(
+            {
+                owner: {name: {key: {"value": value, "layer": layer} for key, (value, layer) in sorted(settings.items())} for name, settings in configurations.items()}
+                for owner, configurations in selected.items()
+            },
+            indent=2,
+        ))
+    else:
+        print("\n".join(format_settings(report, args.diff, args.target)), end="")
+    raise SystemExit(0)
+
+with profiler.phase(PROJECT_PATH.name, len(index)):
+    with AtomicWriter(PROJECT_PATH) as handle:
+        write_project(Emitter(profiler.track(handle)), index, project, profiler)
+with profiler.phase(f"{CONFIGS_DIR}/*.xcconfig", len(layering.files)) as record:
+    xcconfigs = write_xcconfigs(layering, CONFIGS_DIR)
+    record["bytes"] = sum(len(text.encode("utf-8")) for text in layering.files.values())
+outputs = [PROJECT_PATH, *xcconfigs, *(bundle.output for bundle in compiled), *(path for path in (spatial_index, rail_matrix, fare_tables, line_geometry, search_index) if path)]
+
+if project.packages:
+    with profiler.phase(RESOLVED_PATH.name, len(project.packages)) as record:
+        resolved_text = package_resolved(project.packages)
+        write_if_changed(RESOLVED_PATH, resolved_text)
+        record["bytes"] = len(resolved_text.encode("utf-8"))
+    outputs.append(RESOLVED_PATH)
+outputs.extend(variant_outputs)
+outputs.extend(mirror_configs)
+
+# patch and watch edit the project in place, which only lasts under --scan.
+manifest.record(input_fingerprint, outputs, mode="scan" if args.scan else "tables")
+
+if profiler.enabled:
+    report = profiler.finish(scan=args.scan, objects=len(index))
+    print("\n".join(format_report(report)))
+    write_report(report, args.profile or DEFAULT_REPORT_PATH)
@@ -0,0 +1 @@
+"""Helpers behind generate_pbx.py for building JourneyTH.xcodeproj."""
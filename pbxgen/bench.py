@@ -0,0 +1,242 @@
+"""Benchmark generate_pbx.py on synthetic JourneyTH-shaped trees.
+
+    python -m pbxgen.bench --sizes 100,1000,10000,100000 --output bench.json
+
+Each size gets a fresh tree under a temporary directory: a JourneyTH/ source
+root with nested Features/Models/Services groups, Swift sources, JSON data,
+an asset catalog, localized .strings tables and a Tests folder. The package
+dependencies come from generate_pbx.py's own tables. For every tree the
+generator runs as a child process in ``--scan`` mode, measuring:
+
+    full          --scan --force on the fresh tree
+    noop          --scan again with nothing changed (fingerprint hit)
+    patch-add     patch --add of one new Swift file
+    patch-remove  patch --remove of that file again
+
+Wall time, peak RSS of the child and the size of project.pbxproj are written
+as JSON. ``--profile`` adds one ``--profile`` run per size and keeps its
+per-section report (see pbxgen.profile) under ``profiles``. ``--baseline``
+compares against an earlier results file and prints the ratio per
+measurement, and per section when both files have profiles. No Xcode is
+needed.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+GENERATOR = Path(__file__).resolve().parent.parent / "generate_pbx.py"
+PROJECT = Path("JourneyTH.xcodeproj/project.pbxproj")
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+FILES_PER_GROUP = 50
+FEATURES = ["Account", "Discover", "Esim", "Itinerary", "Payments", "Transport"]
+LANGUAGES = ["en", "th"]
+
+
+def _chunks(count, size=FILES_PER_GROUP):
+    """Split ``count`` files into groups of at most ``size``."""
+    return [min(size, count - start) for start in range(0, count, size)]
+
+
+def _write_swift(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (directory / f"{name}.swift").write_text(f"import Foundation\n\nstruct {name} {{}}\n")
+
+
+def synthesize(root, file_count):
+    """Create a JourneyTH/ tree under ``root`` with about ``file_count`` files.
+
+    Returns the number of files actually written.
+    """
+    source = Path(root) / "JourneyTH"
+    tests = max(1, file_count // 10)
+    data = max(1, file_count // 20)
+    tables = max(1, file_count // 100)
+    models = max(1, file_count // 10)
+    services = max(1, file_count // 10)
+    features = max(len(FEATURES), file_count - tests - data - tables * len(LANGUAGES) - models - services - 1)
+    written = 1
+
+    _write_swift(source, ["JourneyTHApp"])
+    per_feature = _chunks(features, -(-features // len(FEATURES)))
+    for feature, count in zip(FEATURES, per_feature):
+        for part, chunk in enumerate(_chunks(count)):
+            kind = "Views" if part % 2 == 0 else "ViewModels"
+            names = [f"{feature}{kind}{part}_{i}" for i in range(chunk)]
+            _write_swift(source / "Features" / feature / kind / f"Part{part}", names)
+            written += chunk
+    for folder, count in (("Models", models), ("Services", services)):
+        for part, chunk in enumerate(_chunks(count)):
+            _write_swift(source / folder / f"Part{part}", [f"{folder[:-1]}{part}_{i}" for i in range(chunk)])
+            written += chunk
+
+    resources = source / "Resources"
+    (resources / "Assets.xcassets").mkdir(parents=True, exist_ok=True)
+    (resources / "Assets.xcassets" / "Contents.json").write_text('{"info":{"author":"xcode","version":1}}\n')
+    written += 1
+    for part, chunk in enumerate(_chunks(data)):
+        directory = resources / "Data" / f"Part{part}"
+        directory.mkdir(parents=True, exist_ok=True)
+        for i in range(chunk):
+            (directory / f"data{part}_{i}.json").write_text("{}\n")
+        written += chunk
+    for language in LANGUAGES:
+        directory = resources / "Localizations" / f"{language}.lproj"
+        directory.mkdir(parents=True, exist_ok=True)
+        for i in range(tables):
+            (directory / f"Table{i}.strings").write_text('"key" = "value";\n')
+        written += tables
+
+    for part, chunk in enumerate(_chunks(tests)):
+        _write_swift(source / "Tests" / f"Part{part}", [f"Case{part}_{i}Tests" for i in range(chunk)])
+        written += chunk
+    return written
+
+
+def _run(args, cwd):
+    """Run the generator; return (seconds, peak RSS in bytes, project bytes)."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, str(GENERATOR), *args], cwd=cwd, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, [str(GENERATOR), *args])
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return elapsed, rss, (cwd / PROJECT).stat().st_size
+
+
+def _summarize(scenario, runs):
+    wall = sorted(seconds for seconds, _, _ in runs)
+    return {
+        "scenario": scenario,
+        "wall_s": round(wall[len(wall) // 2], 4),
+        "wall_min_s": round(wall[0], 4),
+        "peak_rss_bytes": max(rss for _, rss, _ in runs),
+        "output_bytes": runs[-1][2],
+    }
+
+
+def bench_size(file_count, repeat, workdir):
+    root = Path(workdir) / f"size-{file_count}"
+    files = synthesize(root, file_count)
+    (root / PROJECT.parent).mkdir(parents=True, exist_ok=True)
+    results = [
+        _summarize("full", [_run(["--scan", "--force"], root) for _ in range(repeat)]),
+        _summarize("noop", [_run(["--scan"], root) for _ in range(repeat)]),
+    ]
+
+    new_file = root / "JourneyTH" / "Services" / "Part0" / "BenchPatch.swift"
+    rel = str(new_file.relative_to(root))
+    added, removed = [], []
+    for _ in range(repeat):
+        new_file.write_text("struct BenchPatch {}\n")
+        added.append(_run(["patch", "--add", rel], root))
+        new_file.unlink()
+        removed.append(_run(["patch", "--remove", rel], root))
+    results.append(_summarize("patch-add", added))
+    results.append(_summarize("patch-remove", removed))
+
+    for result in results:
+        result["files"] = files
+        result["size"] = file_count
+    return results
+
+
+def profile_size(file_count, workdir):
+    """The generator's own ``--profile`` report for the tree of this size."""
+    root = Path(workdir) / f"size-{file_count}"
+    report_path = root / ".build-cache" / "profile.json"
+    _run(["--scan", "--profile", str(report_path)], root)
+    return json.loads(report_path.read_text())
+
+
+def compare_profiles(profiles, baseline):
+    """Per-phase wall time ratios against ``baseline``'s profiles."""
+    lines = []
+    for size, report in profiles.items():
+        old = {record["name"]: record for record in baseline.get(size, {}).get("phases", [])}
+        for record in report["phases"]:
+            previous = old.get(record["name"])
+            if previous and previous["ms"]:
+                lines.append(f"{size:>7} {record['name']:<33} ms x{record['ms'] / previous['ms']:.2f}")
+    return lines
+
+
+def compare(results, baseline):
+    """Lines showing each measurement against the same one in ``baseline``."""
+    previous = {(r["size"], r["scenario"]): r for r in baseline["results"]}
+    lines = []
+    for result in results:
+        old = previous.get((result["size"], result["scenario"]))
+        if old is None:
+            continue
+        parts = []
+        for key in ("wall_s", "peak_rss_bytes", "output_bytes"):
+            if old[key]:
+                parts.append(f"{key} x{result[key] / old[key]:.2f}")
+        lines.append(f"{result['size']:>7} {result['scenario']:<13} " + "  ".join(parts))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma-separated file counts (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the median is reported")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="earlier --output file to compare against")
+    parser.add_argument("--keep", type=Path, help="build the trees here and leave them in place")
+    parser.add_argument("--profile", action="store_true", help="also keep a per-section generator profile for each size")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    workdir = args.keep or Path(tempfile.mkdtemp(prefix="pbxgen-bench-"))
+    try:
+        results = []
+        profiles = {}
+        for size in sizes:
+            for result in bench_size(size, max(1, args.repeat), workdir):
+                results.append(result)
+                print(
+                    f"{result['size']:>7} {result['scenario']:<13} {result['wall_s']:>8.3f}s "
+                    f"{result['peak_rss_bytes'] / 2**20:>8.1f} MiB {result['output_bytes']:>11} bytes",
+                    flush=True,
+                )
+            if args.profile:
+                profiles[str(size)] = profile_size(size, workdir)
+                slowest = sorted((record for record in profiles[str(size)]["phases"] if record["depth"]), key=lambda record: -record["ms"])[:3]
+                print(f"{size:>7} slowest: " + ", ".join(f"{record['name']} {record['ms']:.1f} ms" for record in slowest), flush=True)
+    finally:
+        if args.keep is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if profiles:
+        report["profiles"] = profiles
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        print("\n".join(compare(results, baseline) + compare_profiles(profiles, baseline.get("profiles", {}))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
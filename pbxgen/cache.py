@@ -0,0 +1,154 @@
+"""Input fingerprints and write-skip for generated files.
+
+generate_pbx.py runs from pre-build hooks, so an unchanged project must cost
+next to nothing and must never bump the mtime of project.pbxproj (Xcode
+reloads the project on every rewrite). The manifest records a fingerprint of
+everything the generator reads plus the size and mtime of each file it wrote;
+a run whose fingerprint matches and whose outputs are untouched can stop
+before generating anything. It can also note the mode the outputs were made
+in, for tools that edit them afterwards.
+"""
+import filecmp
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def _default_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _replace(tmp, path):
+    # mkstemp creates 0600 files; keep the mode the target already had.
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = _default_mode()
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def fingerprint(sources=(), values=(), trees=()):
+    """Hash generator source files, in-memory tables and directory listings."""
+    digest = hashlib.sha256()
+    for path in sources:
+        digest.update(str(path).encode("utf-8") + b"\0")
+        digest.update(Path(path).read_bytes())
+    for value in values:
+        digest.update(repr(value).encode("utf-8") + b"\0")
+    for root in trees:
+        _hash_tree(digest, root)
+    return digest.hexdigest()
+
+
+def _hash_tree(digest, root):
+    # Only names matter to the scanner, so listing directories is enough;
+    # file contents are never read.
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            entries = sorted((e for e in it if not e.name.startswith(".")), key=lambda e: e.name)
+        digest.update(directory.encode("utf-8") + b"\0")
+        for entry in entries:
+            digest.update(entry.name.encode("utf-8") + b"/")
+            if entry.is_dir():
+                stack.append(entry.path)
+
+
+def write_if_changed(path, data):
+    """Atomically replace ``path`` with ``data`` unless it already holds it.
+
+    Returns True when the file was written.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        _replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+class AtomicWriter:
+    """Stream text into a temp file beside ``path`` and swap it in on exit.
+
+    The existing file is left alone (same bytes, same mtime) when the new
+    content is identical; ``changed`` reports which happened.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.changed = False
+        self._tmp = None
+        self._handle = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        self._handle = open(fd, "w", encoding="utf-8", newline="\n", buffering=1 << 16)
+        return self._handle
+
+    def __exit__(self, exc_type, exc, tb):
+        self._handle.close()
+        if exc_type is not None or (self.path.exists() and filecmp.cmp(self._tmp, self.path, shallow=False)):
+            os.unlink(self._tmp)
+            return False
+        _replace(self._tmp, self.path)
+        self.changed = True
+        return False
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") != MANIFEST_VERSION:
+            data = {}
+        self.fingerprint = data.get("fingerprint")
+        self.outputs = data.get("outputs", {})
+        self.mode = data.get("mode")
+
+    def is_current(self, fingerprint):
+        if fingerprint != self.fingerprint or not self.outputs:
+            return False
+        for path, (size, mtime_ns) in self.outputs.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                return False
+        return True
+
+    def record(self, fingerprint, paths, mode=None):
+        self.fingerprint = fingerprint
+        self.mode = mode
+        self.outputs = {}
+        for path in paths:
+            st = os.stat(path)
+            self.outputs[str(path)] = [st.st_size, st.st_mtime_ns]
+        payload = {"version": MANIFEST_VERSION, "fingerprint": fingerprint, "outputs": self.outputs}
+        if mode is not None:
+            payload["mode"] = mode
+        write_if_changed(self.path, json.dumps(payload, indent=2, sort_keys=True) + "\n")
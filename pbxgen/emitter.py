@@ -0,0 +1,37 @@
+"""Streaming writer for the OpenStep plist text of project.pbxproj.
+
+Sections are plain generators yielding ``(indent, text)`` rows. The emitter
+pulls rows one at a time and writes them straight to a buffered handle, so no
+list of lines or joined document is ever held in memory and peak memory stays
+flat however many objects the project has.
+"""
+
+_INDENTS = tuple("\t" * depth for depth in range(16))
+
+
+class Emitter:
+    def __init__(self, handle):
+        self._write = handle.write
+
+    def line(self, text="", indent=0):
+        self._write(f"{_INDENTS[indent]}{text}\n" if text else "\n")
+
+    def rows(self, rows):
+        write = self._write
+        indents = _INDENTS
+        for indent, text in rows:
+            write(f"{indents[indent]}{text}\n")
+
+    def section(self, isa, rows):
+        self.line(f"/* Begin {isa} section */")
+        self.rows(rows)
+        self.line(f"/* End {isa} section */")
+        self.line()
+
+
+def object_list(key, entries, indent):
+    """Rows for a ``key = ( ... );`` list of ``(id, comment)`` pairs."""
+    yield indent, f"{key} = ("
+    for identifier, comment in entries:
+        yield indent + 1, f"{identifier} /* {comment} */,"
+    yield indent, ");"
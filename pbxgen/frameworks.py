@@ -0,0 +1,235 @@
+"""Move groups of app sources into their own framework targets.
+
+``split_frameworks`` works on the model after the app target is built: the
+Sources build files that live under a framework's directory move out of the
+app's Sources phase into a new framework target, which gets its own build
+phases, configuration list, product, target dependencies and link phase
+entries. The app links and embeds every framework and depends on all of them,
+so Xcode schedules the frameworks in parallel wherever the dependency graph
+allows and an edit only recompiles the module it touches.
+
+New IDs are stable IDs keyed on target names, so they do not move between
+runs or between table and scan mode.
+
+The split only moves build files and never edits the Swift sources.
+``module_errors`` lists what still has to change in them before the modules
+compile: names used from another module that are not ``public``, missing
+imports, and uses no dependency can satisfy. ``generate_pbx.py frameworks``
+prints that list; nothing writes a split project yet.
+"""
+import posixpath
+from pathlib import Path
+
+from .ids import stable_id
+from .model import (
+    BuildConfiguration,
+    BuildFile,
+    BuildPhase,
+    ConfigurationList,
+    CopyFilesPhase,
+    FileReference,
+    Group,
+    ModelError,
+    Target,
+    TargetDependency,
+)
+from .swiftindex import DEFAULT_CACHE, Index
+
+FRAMEWORK = "com.apple.product-type.framework"
+UNIT_TEST = "com.apple.product-type.bundle.unit-test"
+EMBED_ATTRIBUTES = ("CodeSignOnCopy", "RemoveHeadersOnCopy")
+APP_RUNPATH = ("LD_RUNPATH_SEARCH_PATHS", '"$(inherited) @executable_path/Frameworks"')
+
+
+def file_directories(main_group):
+    """Map every file reference and variant group under ``main_group`` to its
+    directory, relative to the project directory."""
+    directories = {}
+    stack = [(main_group, "")]
+    while stack:
+        group, directory = stack.pop()
+        for child in group.children:
+            if isinstance(child, Group):
+                stack.append((child, f"{directory}/{child.path}".lstrip("/") if child.path else directory))
+            else:
+                directories[child.id] = directory
+    return directories
+
+
+def _owner(directory, layout):
+    # The deepest framework directory containing ``directory`` wins, so
+    # Features/Shared can be its own module next to Features/<Name>.
+    best = None
+    for name, root, _ in layout:
+        if directory == root or directory.startswith(f"{root}/"):
+            if best is None or len(root) > len(best[1]):
+                best = (name, root)
+    return best[0] if best else None
+
+
+def _with_setting(settings, key, value):
+    if any(existing == key for existing, _ in settings):
+        return list(settings)
+    return sorted([*settings, (key, value)])
+
+
+def _dependency(index, owner, target, project_id):
+    return index.add(TargetDependency(
+        stable_id("PBXTargetDependency", owner.name, target.name),
+        stable_id("PBXContainerItemProxy", owner.name, target.name),
+        target,
+        project_id,
+    ))
+
+
+def _link(index, owner, framework):
+    return index.add(BuildFile(
+        stable_id("PBXBuildFile", owner.name, framework.product.path, "Frameworks"),
+        f"{framework.product.path} in Frameworks",
+        file=framework.product,
+    ))
+
+
+def split_frameworks(index, app, layout, main_group, product_group, project_id, settings, bundle_prefix):
+    """Split ``app``'s sources into the framework targets ``layout`` describes.
+
+    ``layout`` lists ``(target name, directory, [dependency names])`` with
+    dependencies declared before the targets that need them. ``settings`` is
+    the build settings list shared by every framework's Debug and Release
+    configurations; each also gets ``PRODUCT_BUNDLE_IDENTIFIER`` from
+    ``bundle_prefix``. Returns the new targets in ``layout`` order.
+    """
+    directories = file_directories(main_group)
+    sources = app.phase("Sources")
+    moved = {name: [] for name, _, _ in layout}
+    kept = []
+    for build_file in sources.files:
+        name = _owner(directories.get(build_file.file.id, ""), layout)
+        (moved[name] if name else kept).append(build_file)
+    sources.files = kept
+
+    frameworks = {}
+    for name, directory, dependencies in layout:
+        if not moved[name]:
+            raise ModelError(f"framework {name}: no app sources under {directory}")
+        product = index.add(FileReference(
+            stable_id("PBXFileReference", "BUILT_PRODUCTS_DIR", f"{name}.framework"),
+            f"{name}.framework",
+            "wrapper.framework",
+            f"{name}.framework",
+            "BUILT_PRODUCTS_DIR",
+        ))
+        product_group.children.append(product)
+        target_settings = _with_setting(settings, "PRODUCT_BUNDLE_IDENTIFIER", f"{bundle_prefix}.{name}")
+        configurations = [
+            index.add(BuildConfiguration(stable_id("XCBuildConfiguration", name, config), config, target_settings))
+            for config in ("Debug", "Release")
+        ]
+        configuration_list = index.add(ConfigurationList(
+            stable_id("XCConfigurationList", name),
+            f'PBXNativeTarget "{name}"',
+            configurations,
+        ))
+        phases = [
+            index.add(BuildPhase(stable_id("PBXFrameworksBuildPhase", name), "Frameworks")),
+            index.add(BuildPhase(stable_id("PBXSourcesBuildPhase", name), "Sources", moved[name])),
+            index.add(BuildPhase(stable_id("PBXResourcesBuildPhase", name), "Resources")),
+        ]
+        target = index.add(Target(
+            stable_id("PBXNativeTarget", name),
+            name,
+            product,
+            FRAMEWORK,
+            configuration_list,
+            phases,
+        ))
+        for dependency in dependencies:
+            if dependency not in frameworks:
+                raise ModelError(f"framework {name} depends on {dependency}, which is not declared before it")
+            upstream = frameworks[dependency]
+            target.dependencies.append(_dependency(index, target, upstream, project_id))
+            phases[0].files.append(_link(index, target, upstream))
+        frameworks[name] = target
+
+    embed = index.add(CopyFilesPhase(stable_id("PBXCopyFilesBuildPhase", app.name, "Embed Frameworks"), "Embed Frameworks", CopyFilesPhase.FRAMEWORKS))
+    app.phases.append(embed)
+    for target in frameworks.values():
+        app.dependencies.append(_dependency(index, app, target, project_id))
+        app.phase("Frameworks").files.append(_link(index, app, target))
+        embed.files.append(index.add(BuildFile(
+            stable_id("PBXBuildFile", app.name, target.product.path, "Embed Frameworks"),
+            f"{target.product.path} in Embed Frameworks",
+            file=target.product,
+            attributes=EMBED_ATTRIBUTES,
+        )))
+    for configuration in app.configuration_list.configurations:
+        configuration.settings = _with_setting(configuration.settings, *APP_RUNPATH)
+    return list(frameworks.values())
+
+
+def _importable(target):
+    """Targets whose module ``target`` can import: what it depends on,
+    directly or not, plus the host app and its dependencies for tests."""
+    found = {}
+    stack = [target.test_host] if target.test_host else []
+    stack += [dependency.target for dependency in target.dependencies]
+    while stack:
+        upstream = stack.pop()
+        if upstream.name not in found:
+            found[upstream.name] = upstream
+            stack.extend(dependency.target for dependency in upstream.dependencies)
+    return found
+
+
+def module_errors(targets, main_group, project_dir=".", cache_path=DEFAULT_CACHE):
+    """What the Swift sources of ``targets`` need before each target builds
+    as its own module; empty when they already do.
+
+    Uses the name-level index of pbxgen.swiftindex: a file uses a name when
+    it mentions one another file declares at the top level. For every name a
+    file uses from another target's module, that module must be one the
+    file's target can import, the file must import it, and, except from a
+    unit test (``@testable``), the declaration must be ``public`` or
+    ``open``. Members of a type are not checked.
+    """
+    directories = file_directories(main_group)
+    owner = {}
+    for target in targets:
+        sources = target.phase("Sources")
+        for build_file in sources.files if sources else ():
+            reference = build_file.file
+            if isinstance(reference, FileReference) and reference.file_type == "sourcecode.swift":
+                path = posixpath.join(directories.get(reference.id, ""), reference.path)
+                owner[str(Path(project_dir, path))] = target
+    index = Index(sorted(owner), cache_path)
+    index.save()
+    declared_in = {}
+    for path, entry in index.files.items():
+        for name in entry["declarations"]:
+            declared_in.setdefault(name, []).append(path)
+
+    errors = []
+    private = {}
+    for path, entry in sorted(index.files.items()):
+        target = owner[path]
+        importable = _importable(target)
+        missing_imports = {}
+        for name in entry["identifiers"]:
+            homes = [source for source in declared_in.get(name, ()) if owner[source] is not target]
+            if len(homes) != len(declared_in.get(name, ())):
+                continue  # declared in the file's own module too
+            for source in homes:
+                home = owner[source]
+                if home.name not in importable:
+                    errors.append(f"{path}: uses {name} from {source}, but {target.name} cannot import {home.name}")
+                    continue
+                if home.name not in entry["imports"]:
+                    missing_imports.setdefault(home.name, []).append(name)
+                if target.product_type != UNIT_TEST and name not in index.files[source]["public"]:
+                    private.setdefault((source, name), set()).add(target.name)
+        for module, names in sorted(missing_imports.items()):
+            errors.append(f"{path}: uses {', '.join(sorted(names))} from {module} without 'import {module}'")
+    for (source, name), users in sorted(private.items()):
+        errors.append(f"{source}: {name} is used from {', '.join(sorted(users))} but is not public")
+    errors.extend(f"{path}: missing on disk" for path in index.missing)
+    return errors
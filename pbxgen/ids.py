@@ -0,0 +1,71 @@
+"""Object ID allocation for project.pbxproj.
+
+Xcode object IDs are 24 uppercase hex characters. Hand-written table IDs are
+32-char UUID hex strings truncated to 24; scanned objects get IDs derived from
+a SHA-1 of their kind and path, so the same file always gets the same ID and
+regenerating from an unchanged tree produces an unchanged project.
+
+Every ID handed out is recorded in one dict (ID -> owner key), which makes the
+collision check O(1) per object regardless of project size.
+"""
+import hashlib
+
+ID_LENGTH = 24
+HEX_DIGITS = frozenset("0123456789ABCDEF")
+
+
+class IdCollisionError(ValueError):
+    def __init__(self, identifier, other, short):
+        super().__init__(f"table IDs {identifier} and {other} both truncate to {short}; change one of them")
+        self.identifier = identifier
+        self.other = other
+        self.short = short
+
+
+class IdRegistry:
+    def __init__(self):
+        self._owners = {}
+        self._legacy = {}
+
+    def __contains__(self, identifier):
+        return identifier in self._owners
+
+    def __len__(self):
+        return len(self._owners)
+
+    def stable(self, kind, *parts):
+        key = "\0".join((kind,) + parts)
+        identifier = _digest(key)
+        owner = self._owners.get(identifier)
+        salt = 0
+        while owner is not None and owner != key:
+            salt += 1
+            identifier = _digest(f"{key}\0{salt}")
+            owner = self._owners.get(identifier)
+        self._owners[identifier] = key
+        return identifier
+
+    def normalize(self, identifier):
+        if not isinstance(identifier, str):
+            return identifier
+        cached = self._legacy.get(identifier)
+        if cached is not None:
+            return cached
+        short = identifier
+        if len(identifier) == 32 and HEX_DIGITS.issuperset(identifier):
+            short = identifier[:ID_LENGTH]
+        owner = self._owners.get(short)
+        if owner is not None and short != identifier and owner != identifier:
+            raise IdCollisionError(identifier, owner, short)
+        self._owners.setdefault(short, identifier)
+        self._legacy[identifier] = short
+        return short
+
+
+def _digest(key):
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:ID_LENGTH].upper()
+
+
+registry = IdRegistry()
+normalize_id = registry.normalize
+stable_id = registry.stable
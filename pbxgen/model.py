@@ -0,0 +1,450 @@
+"""Typed project objects and the single ID index they are registered in.
+
+Every object is a slotted dataclass that holds the objects it refers to, not
+their IDs, so a reference can only be made to something that already exists.
+``ObjectIndex.resolve`` is the one place table IDs are turned into objects;
+an unknown or wrongly typed ID fails there with the name of the referring
+object instead of surfacing later as a bare KeyError. Comments for child
+lists come straight from the referenced object.
+
+Each class knows how to render itself as emitter rows (see pbxgen.emitter).
+"""
+import json
+from dataclasses import dataclass, field
+from typing import ClassVar, List, Optional, Tuple, Union
+
+from .emitter import object_list
+from .parser import quote
+
+
+class ModelError(ValueError):
+    pass
+
+
+@dataclass(slots=True, eq=False)
+class FileReference:
+    isa: ClassVar[str] = "PBXFileReference"
+    id: str
+    comment: str
+    file_type: str
+    path: str
+    source_tree: str = "<group>"
+    name: Optional[str] = None
+
+    def rows(self):
+        attrs = ["isa = PBXFileReference", f"lastKnownFileType = {self.file_type}"]
+        if self.name is not None:
+            attrs.append(f"name = {quote(self.name)}")
+        attrs.append(f"path = {quote(self.path)}")
+        attrs.append(f"sourceTree = {quote(self.source_tree)}")
+        yield 2, f"{self.id} /* {self.comment} */ = {{{'; '.join(attrs)}; }};"
+
+
+@dataclass(slots=True, eq=False)
+class VariantGroup:
+    isa: ClassVar[str] = "PBXVariantGroup"
+    id: str
+    name: str
+    children: List[FileReference]
+
+    @property
+    def comment(self):
+        return self.name
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.name} */ = {{"
+        yield 3, "isa = PBXVariantGroup;"
+        yield from object_list("children", ((child.id, child.comment) for child in self.children), 3)
+        yield 3, f"name = {quote(self.name)};"
+        yield 3, 'sourceTree = "<group>";'
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class Group:
+    isa: ClassVar[str] = "PBXGroup"
+    id: str
+    name: str
+    path: Optional[str]
+    children: List[Union["Group", FileReference, VariantGroup]]
+
+    @property
+    def comment(self):
+        return self.name or self.id
+
+    def rows(self):
+        yield 2, f"{self.id} = {{"
+        yield 3, "isa = PBXGroup;"
+        yield from object_list("children", ((child.id, child.comment) for child in self.children), 3)
+        if self.name:
+            yield 3, f"name = {quote(self.name)};"
+        if self.path:
+            yield 3, f"path = {quote(self.path)};"
+        yield 3, 'sourceTree = "<group>";'
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class PackageReference:
+    isa: ClassVar[str] = "XCRemoteSwiftPackageReference"
+    id: str
+    name: str
+    url: str
+    min_version: str
+    revision: str
+
+    @property
+    def comment(self):
+        return f'XCRemoteSwiftPackageReference "{self.name}"'
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.comment} */ = {{"
+        yield 3, "isa = XCRemoteSwiftPackageReference;"
+        yield 3, f'repositoryURL = "{self.url}";'
+        yield 3, "requirement = {"
+        yield 4, "kind = upToNextMajorVersion;"
+        yield 4, f"minimumVersion = {self.min_version};"
+        yield 3, "};"
+        yield 2, "};"
+
+
+def package_resolved(packages):
+    """Package.resolved text pinning each PackageReference at its revision."""
+    pins = [
+        {
+            "identity": package.name,
+            "kind": "remoteSourceControl",
+            "location": package.url,
+            "state": {
+                "revision": package.revision,
+                "version": package.min_version,
+            },
+        }
+        for package in packages
+    ]
+    return json.dumps({"pins": pins, "version": 2}, indent=2) + "\n"
+
+
+@dataclass(slots=True, eq=False)
+class PackageProduct:
+    isa: ClassVar[str] = "XCSwiftPackageProductDependency"
+    id: str
+    name: str
+    package: PackageReference
+
+    @property
+    def comment(self):
+        return self.name
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.name} */ = {{"
+        yield 3, "isa = XCSwiftPackageProductDependency;"
+        yield 3, f"package = {self.package.id} /* {self.package.comment} */;"
+        yield 3, f"productName = {self.name};"
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class BuildFile:
+    isa: ClassVar[str] = "PBXBuildFile"
+    id: str
+    comment: str
+    file: Union[FileReference, VariantGroup, None] = None
+    product: Optional[PackageProduct] = None
+    attributes: Tuple[str, ...] = ()
+
+    def rows(self):
+        if self.product is not None:
+            ref = f"productRef = {self.product.id} /* {self.product.comment} */"
+        else:
+            ref = f"fileRef = {self.file.id} /* {self.file.comment} */"
+        if self.attributes:
+            ref += f"; settings = {{ATTRIBUTES = ({''.join(f'{a}, ' for a in self.attributes)}); }}"
+        yield 2, f"{self.id} /* {self.comment} */ = {{isa = PBXBuildFile; {ref}; }};"
+
+
+@dataclass(slots=True, eq=False)
+class BuildPhase:
+    KINDS: ClassVar[dict] = {
+        "Frameworks": "PBXFrameworksBuildPhase",
+        "Resources": "PBXResourcesBuildPhase",
+        "Sources": "PBXSourcesBuildPhase",
+    }
+    id: str
+    kind: str
+    files: List[BuildFile] = field(default_factory=list)
+
+    @property
+    def isa(self):
+        return self.KINDS[self.kind]
+
+    @property
+    def comment(self):
+        return self.kind
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.kind} */ = {{"
+        yield 3, f"isa = {self.isa};"
+        yield 3, "buildActionMask = 2147483647;"
+        yield from object_list("files", ((f.id, f.comment) for f in self.files), 3)
+        yield 3, "runOnlyForDeploymentPostprocessing = 0;"
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class CopyFilesPhase:
+    """A PBXCopyFilesBuildPhase; ``destination`` is Xcode's dstSubfolderSpec."""
+
+    FRAMEWORKS: ClassVar[int] = 10
+    isa: ClassVar[str] = "PBXCopyFilesBuildPhase"
+    id: str
+    name: str
+    destination: int
+    files: List[BuildFile] = field(default_factory=list)
+
+    @property
+    def comment(self):
+        return self.name
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.name} */ = {{"
+        yield 3, "isa = PBXCopyFilesBuildPhase;"
+        yield 3, "buildActionMask = 2147483647;"
+        yield 3, 'dstPath = "";'
+        yield 3, f"dstSubfolderSpec = {self.destination};"
+        yield from object_list("files", ((f.id, f.comment) for f in self.files), 3)
+        yield 3, f"name = {quote(self.name)};"
+        yield 3, "runOnlyForDeploymentPostprocessing = 0;"
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class BuildConfiguration:
+    isa: ClassVar[str] = "XCBuildConfiguration"
+    id: str
+    name: str
+    settings: List[Tuple[str, str]]
+    base: Optional[FileReference] = None
+
+    @property
+    def comment(self):
+        return self.name
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.name} */ = {{"
+        yield 3, "isa = XCBuildConfiguration;"
+        if self.base is not None:
+            yield 3, f"baseConfigurationReference = {self.base.id} /* {self.base.comment} */;"
+        yield 3, "buildSettings = {"
+        for key, value in self.settings:
+            yield 4, f"{key} = {value};"
+        yield 3, "};"
+        yield 3, f"name = {self.name};"
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class ConfigurationList:
+    isa: ClassVar[str] = "XCConfigurationList"
+    id: str
+    owner: str
+    configurations: List[BuildConfiguration]
+    default: str = "Release"
+
+    @property
+    def comment(self):
+        return f"Build configuration list for {self.owner}"
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.comment} */ = {{"
+        yield 3, "isa = XCConfigurationList;"
+        yield from object_list("buildConfigurations", ((c.id, c.name) for c in self.configurations), 3)
+        yield 3, "defaultConfigurationIsVisible = 0;"
+        yield 3, f"defaultConfigurationName = {self.default};"
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class Target:
+    isa: ClassVar[str] = "PBXNativeTarget"
+    id: str
+    name: str
+    product: FileReference
+    product_type: str
+    configuration_list: ConfigurationList
+    phases: List[Union[BuildPhase, CopyFilesPhase]]
+    dependencies: List["TargetDependency"] = field(default_factory=list)
+    packages: List[PackageProduct] = field(default_factory=list)
+    test_host: Optional["Target"] = None
+
+    @property
+    def comment(self):
+        return self.name
+
+    def phase(self, kind):
+        """This target's build phase of ``kind`` ("Sources", ...), or None."""
+        return next((p for p in self.phases if p.comment == kind), None)
+
+    def rows(self):
+        yield 2, f"{self.id} /* {self.name} */ = {{"
+        yield 3, "isa = PBXNativeTarget;"
+        yield 3, f"buildConfigurationList = {self.configuration_list.id} /* {self.configuration_list.comment} */;"
+        yield from object_list("buildPhases", ((p.id, p.comment) for p in self.phases), 3)
+        yield from object_list("buildRules", (), 3)
+        yield from object_list("dependencies", ((d.id, d.comment) for d in self.dependencies), 3)
+        if self.packages:
+            yield from object_list("packageProductDependencies", ((p.id, p.comment) for p in self.packages), 3)
+        yield 3, f"name = {self.name};"
+        yield 3, f"productName = {self.name};"
+        yield 3, f"productReference = {self.product.id} /* {self.product.comment} */;"
+        yield 3, f'productType = "{self.product_type}";'
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class TargetDependency:
+    """A PBXTargetDependency together with the PBXContainerItemProxy it uses."""
+
+    isa: ClassVar[str] = "PBXTargetDependency"
+    id: str
+    proxy_id: str
+    target: Target
+    project_id: str
+
+    @property
+    def comment(self):
+        return "PBXTargetDependency"
+
+    def proxy_rows(self):
+        yield 2, f"{self.proxy_id} /* PBXContainerItemProxy */ = {{"
+        yield 3, "isa = PBXContainerItemProxy;"
+        yield 3, f"containerPortal = {self.project_id} /* Project object */;"
+        yield 3, "proxyType = 1;"
+        yield 3, f"remoteGlobalIDString = {self.target.id};"
+        yield 3, f"remoteInfo = {self.target.name};"
+        yield 2, "};"
+
+    def rows(self):
+        yield 2, f"{self.id} /* PBXTargetDependency */ = {{"
+        yield 3, "isa = PBXTargetDependency;"
+        yield 3, f"target = {self.target.id} /* {self.target.name} */;"
+        yield 3, f"targetProxy = {self.proxy_id} /* PBXContainerItemProxy */;"
+        yield 2, "};"
+
+
+@dataclass(slots=True, eq=False)
+class Project:
+    isa: ClassVar[str] = "PBXProject"
+    id: str
+    main_group: Group
+    product_group: Group
+    configuration_list: ConfigurationList
+    targets: List[Target]
+    packages: List[PackageReference] = field(default_factory=list)
+    known_regions: Tuple[str, ...] = ("en", "Base", "th")
+
+    @property
+    def comment(self):
+        return "Project object"
+
+    def rows(self):
+        yield 2, f"{self.id} /* Project object */ = {{"
+        yield 3, "isa = PBXProject;"
+        yield 3, "attributes = {"
+        yield 4, "BuildIndependentTargetsInParallel = YES;"
+        yield 4, "LastSwiftUpdateCheck = 1500;"
+        yield 4, "LastUpgradeCheck = 1500;"
+        yield 4, "TargetAttributes = {"
+        for target in self.targets:
+            host = f" TestTargetID = {target.test_host.id};" if target.test_host is not None else ""
+            yield 5, f"{target.id} = {{CreatedOnToolsVersion = 15.0;{host}}};"
+        yield 4, "};"
+        yield 3, "};"
+        yield 3, f"buildConfigurationList = {self.configuration_list.id} /* {self.configuration_list.comment} */;"
+        yield 3, 'compatibilityVersion = "Xcode 15.0";'
+        yield 3, "developmentRegion = en;"
+        yield 3, "hasScannedForEncodings = 0;"
+        yield 3, "knownRegions = ("
+        for region in self.known_regions:
+            yield 4, f"{region},"
+        yield 3, ");"
+        if self.packages:
+            yield from object_list("packageReferences", ((p.id, p.comment) for p in self.packages), 3)
+        yield 3, f"mainGroup = {self.main_group.id};"
+        yield 3, f"productRefGroup = {self.product_group.id};"
+        yield 3, 'projectDirPath = "";'
+        yield 3, 'projectRoot = "";'
+        yield from object_list("targets", ((t.id, t.comment) for t in self.targets), 3)
+        yield 2, "};"
+
+
+class ObjectIndex:
+    """All objects of one project, keyed by ID.
+
+    ``sections`` keeps the objects of each isa in the order they were added,
+    which is the order they are written in.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.sections = {}
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, identifier):
+        return identifier in self.objects
+
+    def __getitem__(self, identifier):
+        return self.objects[identifier]
+
+    def add(self, obj):
+        existing = self.objects.get(obj.id)
+        if existing is not None:
+            raise ModelError(f"duplicate object ID {obj.id}: {existing.isa} {existing.comment!r} and {obj.isa} {obj.comment!r}")
+        self.objects[obj.id] = obj
+        self.sections.setdefault(obj.isa, []).append(obj)
+        return obj
+
+    def resolve(self, identifier, types, owner):
+        """Look up ``identifier`` for ``owner``, checking the object's type."""
+        obj = self.objects.get(identifier)
+        if obj is None:
+            raise ModelError(f"{owner} references unknown object {identifier}")
+        if not isinstance(obj, types):
+            raise ModelError(f"{owner} references {identifier}, a {obj.isa}, where {_names(types)} was expected")
+        return obj
+
+    def section(self, isa):
+        return self.sections.get(isa, [])
+
+    def copy(self):
+        """A new index over the same objects; adding to or replacing in it
+        leaves this one alone."""
+        other = ObjectIndex()
+        other.objects = dict(self.objects)
+        other.sections = {isa: list(objects) for isa, objects in self.sections.items()}
+        return other
+
+    def replace(self, obj):
+        """Put ``obj`` where the object with its ID was, keeping the order."""
+        existing = self.objects.get(obj.id)
+        if existing is None:
+            raise ModelError(f"cannot replace unknown object {obj.id}")
+        self.objects[obj.id] = obj
+        section = self.sections[existing.isa]
+        section[next(i for i, candidate in enumerate(section) if candidate is existing)] = obj
+        return obj
+
+    def remove(self, obj):
+        """Drop ``obj``; the caller removes the references to it."""
+        if self.objects.get(obj.id) is not obj:
+            raise ModelError(f"cannot remove unknown object {obj.id}")
+        del self.objects[obj.id]
+        self.sections[obj.isa].remove(obj)
+
+
+def _names(types):
+    if isinstance(types, tuple):
+        return " or ".join(t.isa if isinstance(t.isa, str) else t.__name__ for t in types)
+    return types.isa if isinstance(types.isa, str) else types.__name__
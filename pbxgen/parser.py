@@ -0,0 +1,469 @@
+"""Read project.pbxproj back into an object graph keyed by object ID.
+
+Two ways in:
+
+* The fast path handles the layout generate_pbx.py and Xcode both write:
+  one object per entry at two-tab indent, grouped into ``Begin``/``End``
+  section markers. A single regex pass over the file records where each object
+  starts and ends. Values are tokenized lazily the first time an object's
+  ``props`` is read, so loading a 100k-object project costs one ``finditer``.
+* Anything else falls back to a full tokenize of the document.
+
+Untouched objects are written back from their original text, so a parse/dump
+cycle is byte-for-byte. Objects that were edited or created are rendered in
+the generator's own layout (``render_object``). Comments survive both ways:
+the comment after an object's ID is kept on the object, and comments after
+values come back as ``Annotated`` strings.
+"""
+import re
+
+UNQUOTED = re.compile(r"[A-Za-z0-9_$./]+\Z")
+# Inline dicts come in two flavours in Xcode's output: PBXBuildFile and
+# PBXFileReference use "{a = b; }", TargetAttributes entries use "{a = b;}".
+INLINE_SPACED = "spaced"
+INLINE_COMPACT = "compact"
+
+_TOKEN = re.compile(
+    r"""
+    (?P<ws>[ \t\r\n]+)
+  | (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<word>(?:[^\s{}()=;,"/]|/(?![*/]))+)
+  | (?P<punct>[{}()=;,])
+  | (?P<error>.)
+    """,
+    re.S | re.X,
+)
+
+# Anchored on the preceding newline rather than re.M so the regex engine can
+# skip ahead with a literal search; matches start one character early.
+_ENTRY = re.compile(
+    r"\n(?:/\* (Begin|End) (\w+) section \*/(?=\n)"
+    r"|\t\t([A-Za-z0-9_]+)(?: /\* ([^\n]*?) \*/)? = \{)"
+)
+_PREFIX = re.compile(r"// !\$\*UTF8\*\$!\n\{\n(?:\t.*\n)*?\tobjects = \{\n\n")
+_SUFFIX = re.compile(
+    r"\t\};\n\trootObject = (?P<root>[A-Za-z0-9_]+)(?: /\* (?P<comment>[^*\n]*) \*/)?;\n\}\n\Z"
+)
+_COMMENT_AFTER = re.compile(r"[ \t]*/\*(.*?)\*/", re.S)
+_SIMPLE_LIST = re.compile(r"(?:\s*[A-Za-z0-9_$.]+(?: /\* [^\n]*? \*/)?,)+")
+_SIMPLE_ITEM = re.compile(r"\s*([A-Za-z0-9_$.]+)(?: /\* ([^\n]*?) \*/)?,")
+_SIMPLE_PAIR = re.compile(r'\s*([A-Za-z0-9_$./]+) = ([A-Za-z0-9_$./]+|"[^"\\\n]*")(?:[ \t]*/\*[ \t]*([^\n]*?)[ \t]*\*/)?;')
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+_UNESCAPE = re.compile(r"\\(U[0-9A-Fa-f]{4}|.)", re.S)
+
+
+class ParseError(ValueError):
+    pass
+
+
+class Annotated(str):
+    """A string value followed by a ``/* comment */`` in the source."""
+
+    def __new__(cls, value, comment):
+        self = super().__new__(cls, value)
+        self.comment = comment
+        return self
+
+
+class Dict(dict):
+    """A dict that remembers whether it was written on one line."""
+
+    inline = None
+
+
+class PBXObject:
+    __slots__ = ("id", "isa", "comment", "_project", "_span", "_props")
+
+    def __init__(self, identifier, isa, comment, props=None, project=None, span=None):
+        self.id = identifier
+        self.isa = isa
+        self.comment = comment
+        self._project = project
+        self._span = span
+        self._props = props
+
+    @property
+    def props(self):
+        """Parsed values; reading them does not mark the object as edited."""
+        if self._props is None:
+            start, end = self._span
+            text = self._project.text
+            body = _ENTRY.match(text, start - 1).end() - 1
+            self._props = _Parser(text, body, end).value()
+        return self._props
+
+    @property
+    def span(self):
+        """``(start, end)`` of the object in its project's ``text``, or None
+        once it is edited (or when the document was not in the canonical
+        layout)."""
+        return self._span
+
+    @property
+    def dirty(self):
+        return self._span is None
+
+    def touch(self):
+        """Mark the object as edited so it is re-rendered on dump."""
+        self.props
+        self._span = None
+
+    def get(self, key, default=None):
+        return self.props.get(key, default)
+
+    def __getitem__(self, key):
+        return self.props[key]
+
+    def __repr__(self):
+        return f"<{self.isa} {self.id} {self.comment!r}>"
+
+
+class Project:
+    """An indexed pbxproj document.
+
+    ``objects`` maps ID to PBXObject; ``sections`` maps isa to the ordered
+    list of IDs in that section, in file order.
+    """
+
+    def __init__(self, text, prefix, objects, sections, root, root_comment):
+        self.text = text
+        self.prefix = prefix
+        self.objects = objects
+        self.sections = sections
+        self.root = root
+        self.root_comment = root_comment
+
+    def __getitem__(self, identifier):
+        return self.objects[identifier]
+
+    def __contains__(self, identifier):
+        return identifier in self.objects
+
+    def __len__(self):
+        return len(self.objects)
+
+    def isa(self, isa):
+        objects = self.objects
+        return [objects[i] for i in self.sections.get(isa, ())]
+
+    def add(self, obj, after=None):
+        if obj.id in self.objects:
+            raise ValueError(f"duplicate object ID {obj.id}")
+        self.objects[obj.id] = obj
+        obj._project = self
+        ids = self.sections.get(obj.isa)
+        if ids is None:
+            ids = self._new_section(obj.isa)
+        if after is not None and after in ids:
+            ids.insert(ids.index(after) + 1, obj.id)
+        else:
+            ids.append(obj.id)
+        return obj
+
+    def _new_section(self, isa):
+        # Sections are alphabetical in Xcode's output; slot the new one in
+        # before the first section that sorts after it.
+        items = list(self.sections.items())
+        position = next((i for i, (name, _) in enumerate(items) if name > isa), len(items))
+        items.insert(position, (isa, []))
+        self.sections = dict(items)
+        return self.sections[isa]
+
+    def remove(self, identifier):
+        obj = self.objects.pop(identifier)
+        ids = self.sections[obj.isa]
+        ids.remove(identifier)
+        if not ids:
+            del self.sections[obj.isa]
+        return obj
+
+    def write(self, handle):
+        write = handle.write
+        text = self.text
+        objects = self.objects
+        write(self.prefix)
+        for isa, ids in self.sections.items():
+            write(f"/* Begin {isa} section */\n")
+            for identifier in ids:
+                obj = objects[identifier]
+                if obj._span is not None:
+                    start, end = obj._span
+                    write(text[start:end])
+                else:
+                    write(render_object(obj))
+            write(f"/* End {isa} section */\n\n")
+        root = f"{self.root} /* {self.root_comment} */" if self.root_comment else self.root
+        write(f"\t}};\n\trootObject = {root};\n}}\n")
+
+    def dumps(self):
+        parts = []
+        self.write(_ListWriter(parts))
+        return "".join(parts)
+
+
+class _ListWriter:
+    def __init__(self, parts):
+        self.write = parts.append
+
+
+def load(path):
+    with open(path, encoding="utf-8") as handle:
+        return loads(handle.read())
+
+
+def loads(text):
+    project = _load_canonical(text)
+    if project is None:
+        project = _load_generic(text)
+    return project
+
+
+def _load_canonical(text):
+    prefix = _PREFIX.match(text)
+    suffix = _SUFFIX.search(text)
+    if prefix is None or suffix is None:
+        return None
+    objects = {}
+    sections = {}
+    section = None
+    ids = None
+    pending = None
+    expect = prefix.end()
+    for match in _ENTRY.finditer(text, prefix.end() - 1, suffix.start()):
+        start = match.start() + 1
+        marker, name, identifier, comment = match.groups()
+        if pending is not None:
+            if not text.endswith("};\n", 0, start):
+                return None
+            pending._span = (pending._span, start)
+            pending = None
+        elif start != expect:
+            return None
+        if identifier is not None:
+            if section is None:
+                return None
+            if identifier in objects:
+                raise ParseError(f"duplicate object ID {identifier}")
+            pending = objects[identifier] = PBXObject(identifier, section, comment, span=start)
+            ids.append(identifier)
+        elif marker == "Begin":
+            if section is not None or name in sections:
+                return None
+            section = name
+            ids = sections[section] = []
+            expect = match.end() + 1
+        else:
+            if name != section or text[match.end():match.end() + 2] != "\n\n":
+                return None
+            section = None
+            expect = match.end() + 2
+    if section is not None or pending is not None or expect != suffix.start():
+        return None
+    project = Project(text, prefix.group(0), objects, sections, suffix.group("root"), suffix.group("comment"))
+    for obj in objects.values():
+        obj._project = project
+    return project
+
+
+def _load_generic(text):
+    parser = _Parser(text, 0, len(text))
+    root = parser.value()
+    parser.expect_end()
+    if not isinstance(root, dict) or not isinstance(root.get("objects"), dict):
+        raise ParseError("not a pbxproj document: no objects dictionary")
+    by_isa = {}
+    objects = {}
+    for key, props in root["objects"].items():
+        if not isinstance(props, dict) or "isa" not in props:
+            raise ParseError(f"object {key} has no isa")
+        obj = PBXObject(str(key), str(props["isa"]), getattr(key, "comment", None), props=props)
+        objects[obj.id] = obj
+        by_isa.setdefault(obj.isa, []).append(obj.id)
+    sections = {isa: by_isa[isa] for isa in sorted(by_isa)}
+    header = []
+    for key, value in root.items():
+        if key in ("objects", "rootObject"):
+            continue
+        header.append(f"\t{key} = {_render_value(value, 1, None)};\n")
+    prefix = "// !$*UTF8*$!\n{\n" + "".join(header) + "\tobjects = {\n\n"
+    rootobject = root.get("rootObject", "")
+    project = Project(text, prefix, objects, sections, str(rootobject), getattr(rootobject, "comment", None))
+    for obj in objects.values():
+        obj._project = project
+    return project
+
+
+class _Parser:
+    """Recursive descent over ``text[start:end]``, matching tokens on demand."""
+
+    def __init__(self, text, start, end):
+        self.text = text
+        self.pos = start
+        self.end = end
+
+    def _token(self):
+        """Next significant token as ``(kind, text, offset)``; comments included."""
+        text = self.text
+        while True:
+            match = _TOKEN.match(text, self.pos, self.end)
+            if match is None:
+                return None, None, self.pos
+            self.pos = match.end()
+            kind = match.lastgroup
+            if kind == "ws":
+                continue
+            if kind == "error":
+                raise ParseError(f"unexpected character {match.group()!r} at offset {match.start()}")
+            return kind, match.group(), match.start()
+
+    def _significant(self):
+        while True:
+            kind, text, offset = self._token()
+            if kind != "comment":
+                return kind, text, offset
+
+    def _trailing_comment(self):
+        match = _COMMENT_AFTER.match(self.text, self.pos, self.end)
+        if match is None:
+            return None
+        self.pos = match.end()
+        return match.group(1).strip()
+
+    def expect_end(self):
+        kind, text, offset = self._significant()
+        if kind is not None:
+            raise ParseError(f"trailing content {text!r} at offset {offset}")
+
+    def value(self):
+        kind, text, offset = self._significant()
+        if kind == "punct" and text == "{":
+            return self._dict(offset)
+        if kind == "punct" and text == "(":
+            return self._list()
+        if kind == "string":
+            value = unquote(text)
+        elif kind == "word":
+            value = text
+        elif kind is None:
+            raise ParseError("unexpected end of input")
+        else:
+            raise ParseError(f"unexpected {text!r} at offset {offset}")
+        comment = self._trailing_comment()
+        return value if comment is None else Annotated(value, comment)
+
+    def _expect(self, punct, context):
+        kind, text, offset = self._significant()
+        if text != punct:
+            raise ParseError(f"expected {punct!r} {context}, got {text!r} at offset {offset}")
+
+    def _dict(self, opened):
+        # Most entries are "key = value;" with a bare or escape-free quoted
+        # value; take those by regex and leave the rest to the tokenizer.
+        result = Dict()
+        match_pair = _SIMPLE_PAIR.match
+        while True:
+            pair = match_pair(self.text, self.pos, self.end)
+            if pair is not None:
+                key, value, comment = pair.groups()
+                if value[0] == '"':
+                    value = value[1:-1]
+                result[key] = value if comment is None else Annotated(value, comment)
+                self.pos = pair.end()
+                continue
+            mark = self.pos
+            kind, text, offset = self._significant()
+            if kind == "punct" and text == "}":
+                break
+            self.pos = mark
+            key = self.value()
+            self._expect("=", f"after {key!r}")
+            result[key] = self.value()
+            self._expect(";", f"after value of {key!r}")
+        if "\n" not in self.text[opened:offset]:
+            result.inline = INLINE_SPACED if self.text[offset - 1] == " " else INLINE_COMPACT
+        return result
+
+    def _list(self):
+        # Build phases and group children are long runs of "ID /* name */,";
+        # take those in one regex step before falling back to tokens.
+        result = []
+        simple = _SIMPLE_LIST.match(self.text, self.pos, self.end)
+        if simple is not None:
+            for item in _SIMPLE_ITEM.finditer(self.text, simple.start(), simple.end()):
+                value, comment = item.groups()
+                result.append(value if comment is None else Annotated(value, comment))
+            self.pos = simple.end()
+        while True:
+            mark = self.pos
+            kind, text, offset = self._significant()
+            if kind == "punct" and text == ")":
+                return result
+            self.pos = mark
+            result.append(self.value())
+            kind, text, offset = self._significant()
+            if text == ")":
+                return result
+            if text != ",":
+                raise ParseError(f"expected ',' in list, got {text!r} at offset {offset}")
+
+
+def unquote(token):
+    """The value of a quoted token, with its escapes resolved; the inverse
+    of ``quote``."""
+    body = token[1:-1]
+    if "\\" not in body:
+        return body
+
+    def replace(match):
+        escape = match.group(1)
+        if escape[0] == "U" and len(escape) == 5:
+            return chr(int(escape[1:], 16))
+        return _ESCAPES.get(escape, escape)
+
+    return _UNESCAPE.sub(replace, body)
+
+
+def quote(value):
+    """Render a scalar the way Xcode does: bare when safe, quoted otherwise."""
+    if UNQUOTED.match(value):
+        return value
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+
+def _render_scalar(value):
+    comment = getattr(value, "comment", None)
+    text = quote(value)
+    return f"{text} /* {comment} */" if comment is not None else text
+
+
+def _render_value(value, indent, inline):
+    if isinstance(value, dict):
+        if inline or getattr(value, "inline", None):
+            return _render_inline_dict(value, getattr(value, "inline", None) or inline)
+        pad = "\t" * (indent + 1)
+        close = "\t" * indent
+        body = "".join(f"{pad}{_render_scalar(k)} = {_render_value(v, indent + 1, None)};\n" for k, v in value.items())
+        return f"{{\n{body}{close}}}"
+    if isinstance(value, list):
+        if inline:
+            return "(" + "".join(f"{_render_value(v, indent, inline)}, " for v in value) + ")"
+        pad = "\t" * (indent + 1)
+        close = "\t" * indent
+        body = "".join(f"{pad}{_render_value(v, indent + 1, None)},\n" for v in value)
+        return f"(\n{body}{close})"
+    return _render_scalar(value)
+
+
+def _render_inline_dict(value, style):
+    entries = " ".join(f"{_render_scalar(k)} = {_render_value(v, 0, style)};" for k, v in value.items())
+    return f"{{{entries} }}" if style == INLINE_SPACED else f"{{{entries}}}"
+
+
+def render_object(obj):
+    """Render one object entry, including its trailing newline."""
+    key = f"{obj.id} /* {obj.comment} */" if obj.comment is not None else obj.id
+    props = obj.props
+    inline = getattr(props, "inline", None)
+    return f"\t\t{key} = {_render_value(props, 2, inline)};\n"
@@ -0,0 +1,262 @@
+"""Add or remove individual files in an existing project.pbxproj.
+
+Only the objects a file actually touches are parsed and rewritten: the groups
+along its path, its PBXFileReference and PBXBuildFile, and the one build
+phase it belongs to. Every other object is written back from its original
+text, so the diff is the handful of lines for the file itself.
+
+IDs are derived exactly as in ``generate_pbx.py --scan``, so a later full scan
+of the tree agrees with what was patched in.
+"""
+import os
+import posixpath
+
+from .cache import AtomicWriter
+from .ids import stable_id
+from .parser import INLINE_SPACED, Annotated, Dict, PBXObject, load
+from .scan import FILE_TYPES, LOCALIZED_EXTENSION, TEST_DIRECTORY, WRAPPER_EXTENSIONS
+
+APPLICATION = "com.apple.product-type.application"
+UNIT_TEST = "com.apple.product-type.bundle.unit-test"
+PHASE_ISA = {"Sources": "PBXSourcesBuildPhase", "Resources": "PBXResourcesBuildPhase"}
+
+
+class PatchError(Exception):
+    pass
+
+
+class Patcher:
+    def __init__(self, project, project_dir="."):
+        self.project = project
+        self.project_dir = project_dir
+        self._root = project[project.root]
+
+    def _relative(self, path):
+        rel = os.path.relpath(path, self.project_dir).replace(os.sep, "/")
+        if rel.startswith("../"):
+            raise PatchError(f"{path} is outside the project directory")
+        parts = rel.split("/")
+        if any(part.endswith(LOCALIZED_EXTENSION) for part in parts[:-1]):
+            raise PatchError(f"{rel}: localized resources need a full regenerate")
+        if any(part.endswith(WRAPPER_EXTENSIONS) for part in parts[:-1]):
+            raise PatchError(f"{rel} lives inside a wrapper; patch the wrapper itself")
+        return rel, parts
+
+    def _child(self, group, name, isa):
+        for child in group["children"]:
+            if getattr(child, "comment", None) != name:
+                continue
+            obj = self.project.objects.get(child)
+            if obj is not None and obj.isa == isa and obj.get("path", obj.get("name")) == name:
+                return obj
+        return None
+
+    def _directory(self, group, parent_directory):
+        """The directory ``group`` stands for, relative to the project
+        directory; a group without a ``path`` shares its parent's. None
+        when the group is not under the project directory."""
+        path = group.get("path")
+        if path is None:
+            return parent_directory
+        source_tree = group.get("sourceTree", "<group>")
+        if source_tree == "<group>":
+            directory = posixpath.normpath(posixpath.join(parent_directory, path))
+        elif source_tree == "SOURCE_ROOT":
+            directory = posixpath.normpath(path)
+        else:
+            return None
+        if directory == ".." or directory.startswith("../"):
+            return None
+        return "" if directory == "." else directory
+
+    def _subgroup(self, group, directory, target):
+        """``(group, directory)`` of the child of ``group`` that reaches
+        furthest towards ``target``, looking through groups without a path.
+
+        A group's ``path`` may span several components (in table mode the
+        Tests group hangs off the main group as ``JourneyTH/Tests``), so
+        groups are matched on the whole directory, not one name at a time.
+        """
+        best = None
+        for child in group["children"]:
+            obj = self.project.objects.get(child)
+            if obj is None or obj.isa != "PBXGroup":
+                continue
+            child_directory = self._directory(obj, directory)
+            if child_directory is None:
+                continue
+            if child_directory == directory:
+                found = self._subgroup(obj, directory, target)
+            elif child_directory == target or target.startswith(f"{child_directory}/"):
+                found = (obj, child_directory)
+            else:
+                found = None
+            if found is not None and (best is None or len(found[1]) > len(best[1])):
+                best = found
+        return best
+
+    def _groups(self, parts, create):
+        """The chain of ``(group, directory)`` from the main group down to the
+        directory ``parts``, creating the groups that are missing."""
+        target = "/".join(parts)
+        group = self.project[self._root["mainGroup"]]
+        chain = [(group, "")]
+        while chain[-1][1] != target:
+            found = self._subgroup(*chain[-1], target)
+            if found is None:
+                break
+            chain.append(found)
+        group, directory = chain[-1]
+        if directory == target:
+            return chain
+        if not create:
+            raise PatchError(f"no group for {target}")
+        for part in target[len(directory):].strip("/").split("/"):
+            directory = f"{directory}/{part}" if directory else part
+            gid = stable_id("PBXGroup", directory)
+            child = PBXObject(
+                gid,
+                "PBXGroup",
+                None,
+                Dict(isa="PBXGroup", children=[], name=part, path=part, sourceTree="<group>"),
+            )
+            self._insert_child(group, Annotated(gid, part))
+            self.project.add(child, after=group.id)
+            group = child
+            chain.append((group, directory))
+        return chain
+
+    def _insert_child(self, group, child):
+        children = group["children"]
+        key = child.comment.lower()
+        position = len(children)
+        for index, existing in enumerate(children):
+            if (getattr(existing, "comment", None) or "").lower() > key:
+                position = index
+                break
+        children.insert(position, child)
+        group.touch()
+        return children[position - 1] if position else None
+
+    def _phase(self, chain, in_tests, kind):
+        """The build phase a new file in ``chain[-1]`` belongs to.
+
+        Sources under the test directory only ever join a unit-test target
+        and every other file joins the app or a framework, as in a scan. Within that side, with
+        framework targets or test shards there is more than one home for
+        sources, so a file joins the target its neighbours build in: walk up
+        the group chain to the first group with a file in such a target's
+        ``kind`` phase. Only when no group has one does the product type
+        decide.
+        """
+        targets = [
+            self.project[target_id]
+            for target_id in self._root["targets"]
+            if (self.project[target_id].get("productType") == UNIT_TEST) == in_tests
+        ]
+        phases = [
+            self.project[phase_id]
+            for target in targets
+            for phase_id in target["buildPhases"]
+            if self.project[phase_id].isa == PHASE_ISA[kind]
+        ]
+        for group, _ in reversed(chain):
+            children = {child: child.comment for child in group["children"] if getattr(child, "comment", None)}
+            wanted = {f"{name} in {kind}" for name in children.values()}
+            for phase in phases:
+                for entry in phase["files"]:
+                    if getattr(entry, "comment", None) in wanted and self.project[entry].get("fileRef") in children:
+                        return phase
+        product_type = UNIT_TEST if in_tests else APPLICATION
+        for target in targets:
+            if target.get("productType") != product_type:
+                continue
+            for phase_id in target["buildPhases"]:
+                if self.project[phase_id].isa == PHASE_ISA[kind]:
+                    return self.project[phase_id]
+        raise PatchError(f"no {kind} phase for the {'test' if in_tests else 'app'} target")
+
+    def add(self, path):
+        rel, parts = self._relative(path)
+        name = parts[-1]
+        ext = os.path.splitext(name)[1]
+        file_type = FILE_TYPES.get(ext)
+        if file_type is None:
+            raise PatchError(f"{rel}: no known file type for {ext or 'files without an extension'}")
+        chain = self._groups(parts[:-1], create=True)
+        group = chain[-1][0]
+        if self._child(group, name, "PBXFileReference") is not None:
+            raise PatchError(f"{rel} is already in the project")
+
+        fid = stable_id("PBXFileReference", rel)
+        props = Dict(isa="PBXFileReference", lastKnownFileType=file_type, path=name, sourceTree="<group>")
+        props.inline = INLINE_SPACED
+        previous = self._insert_child(group, Annotated(fid, name))
+        after_ref = previous if previous in self.project and self.project[previous].isa == "PBXFileReference" else None
+        self.project.add(PBXObject(fid, "PBXFileReference", name, props), after=after_ref)
+
+        kind = "Sources" if ext == ".swift" else "Resources"
+        phase = self._phase(chain, kind == "Sources" and TEST_DIRECTORY in parts[:-1], kind)
+        bid = stable_id("PBXBuildFile", rel, kind)
+        comment = f"{name} in {kind}"
+        props = Dict(isa="PBXBuildFile", fileRef=Annotated(fid, name))
+        props.inline = INLINE_SPACED
+        files = phase["files"]
+        after_build = None
+        if previous is not None:
+            sibling = f"{previous.comment} in {kind}"
+            after_build = next((entry for entry in files if getattr(entry, "comment", None) == sibling), None)
+        position = files.index(after_build) + 1 if after_build is not None else len(files)
+        files.insert(position, Annotated(bid, comment))
+        phase.touch()
+        self.project.add(PBXObject(bid, "PBXBuildFile", comment, props), after=after_build)
+        return rel
+
+    def remove(self, path):
+        rel, parts = self._relative(path)
+        name = parts[-1]
+        chain = self._groups(parts[:-1], create=False)
+        group = chain[-1][0]
+        ref = self._child(group, name, "PBXFileReference")
+        if ref is None:
+            raise PatchError(f"{rel} is not in the project")
+        group["children"].remove(ref.id)
+        group.touch()
+        for target_id in self._root["targets"]:
+            for phase_id in self.project[target_id]["buildPhases"]:
+                phase = self.project[phase_id]
+                if phase.isa not in PHASE_ISA.values():
+                    continue
+                files = phase["files"]
+                for entry in list(files):
+                    if not (getattr(entry, "comment", "") or "").startswith(f"{name} in "):
+                        continue
+                    if self.project[entry].get("fileRef") == ref.id:
+                        files.remove(entry)
+                        phase.touch()
+                        self.project.remove(entry)
+        self.project.remove(ref.id)
+        self._prune(chain)
+        return rel
+
+    def _prune(self, chain):
+        # Drop groups left empty whose directory is gone too, deepest first.
+        for depth in range(len(chain) - 1, 0, -1):
+            group, directory = chain[depth]
+            if group["children"] or os.path.isdir(os.path.join(self.project_dir, directory)):
+                return
+            parent, _ = chain[depth - 1]
+            parent["children"].remove(group.id)
+            parent.touch()
+            self.project.remove(group.id)
+
+
+def patch_project(project_path, add=(), remove=(), project_dir="."):
+    """Apply ``add``/``remove`` paths to the project file and rewrite it."""
+    project = load(project_path)
+    patcher = Patcher(project, project_dir)
+    changes = [f"removed {patcher.remove(path)}" for path in remove]
+    changes += [f"added {patcher.add(path)}" for path in add]
+    with AtomicWriter(project_path) as handle:
+        project.write(handle)
+    return changes
@@ -0,0 +1,244 @@
+"""Verify Swift package pins offline against a local mirror cache.
+
+    python -m pbxgen.pins sync      # clone or fetch a bare mirror per package (network)
+    python -m pbxgen.pins verify    # offline: check every pin against its mirror
+    python -m pbxgen.pins config    # point SwiftPM and Xcode at the mirrors
+    python3 generate_pbx.py --verify-pins
+
+Each pinned package gets a bare ``git clone --mirror`` under the mirror
+directory (``$PBXGEN_MIRRORS``, or ``~/.cache/pbxgen/mirrors``), laid out by
+host and path (``github.com/apple/swift-collections.git``), so CI can
+restore it from a cache and never reach the network. A pin is good when its
+revision is a commit in the mirror and its version's tag (``1.0.4`` or
+``v1.0.4``) resolves to that same commit. ``generate_pbx.py --verify-pins``
+checks the pins Xcode resolved, in Package.resolved, and also checks each
+one against its package reference: same URL, and a version inside the
+``upToNextMajorVersion`` range that starts at ``minimumVersion``.
+
+Results are kept in ``.build-cache/pins.json`` keyed on URL, version and
+revision, so a pin that passed is not checked again until it changes;
+``sync`` forgets the results for the packages it fetched, since a tag may
+have moved. ``config`` writes ``mirrors.json`` for ``swift package``
+(``.swiftpm/configuration/``) and for Xcode (the workspace's
+``xcshareddata/swiftpm/configuration/``); both name absolute paths on this
+machine and are git-ignored.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .cache import write_if_changed
+
+RESOLVED_PATH = Path("JourneyTH.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved")
+RESULTS_PATH = Path(".build-cache/pins.json")
+CONFIG_PATHS = [
+    Path(".swiftpm/configuration/mirrors.json"),
+    Path("JourneyTH.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/configuration/mirrors.json"),
+]
+
+# Duck-types model.PackageReference for pins read from Package.resolved.
+Pin = namedtuple("Pin", ["name", "url", "min_version", "revision"])
+VERSION = re.compile(r"v?(\d+)\.(\d+)\.(\d+)")
+
+
+class PinError(ValueError):
+    pass
+
+
+def mirror_root():
+    return Path(os.environ.get("PBXGEN_MIRRORS") or Path.home() / ".cache/pbxgen/mirrors")
+
+
+def mirror_path(url, root=None):
+    """Where ``url``'s bare mirror lives under ``root``."""
+    parts = urlsplit(url)
+    host = parts.hostname or "local"
+    path = (parts.path if parts.scheme else url).strip("/")
+    if not path.endswith(".git"):
+        path += ".git"
+    return Path(root or mirror_root(), host, *path.split("/"))
+
+
+def load_pins(path=RESOLVED_PATH):
+    """Pins from a Package.resolved file (version 1 or 2)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as error:
+        raise PinError(f"{path}: {error}") from error
+    pins = data.get("pins") or data.get("object", {}).get("pins", [])
+    return [
+        Pin(pin.get("identity") or pin.get("package"), pin.get("location") or pin.get("repositoryURL"), pin["state"].get("version"), pin["state"]["revision"])
+        for pin in pins
+    ]
+
+
+def _version(text):
+    match = VERSION.match(text or "")
+    return tuple(int(part) for part in match.groups()) if match else None
+
+
+def _same_url(a, b):
+    return a.lower().rstrip("/").removesuffix(".git") == b.lower().rstrip("/").removesuffix(".git")
+
+
+def requirement_errors(pins, packages):
+    """Problems with ``pins`` (from Package.resolved) against the project's
+    package references, which require ``upToNextMajorVersion`` from their
+    ``min_version``. Pins no reference names are transitive dependencies
+    and are left alone."""
+    problems = []
+    for package in packages:
+        pin = next((pin for pin in pins if _same_url(pin.url, package.url)), None)
+        if pin is None:
+            named = next((pin for pin in pins if pin.name == package.name), None)
+            if named is None:
+                problems.append(f"{package.name}: not pinned in Package.resolved")
+            else:
+                problems.append(f"{package.name}: pinned from {named.url}, but the project references {package.url}")
+            continue
+        minimum = _version(package.min_version)
+        version = _version(pin.min_version)
+        if version is None:
+            problems.append(f"{package.name}: pinned to {pin.min_version or pin.revision}, not a version from {package.min_version}")
+        elif minimum is not None and not (minimum <= version and version[0] == minimum[0]):
+            problems.append(f"{package.name}: pinned {pin.min_version} is outside {package.min_version} up to the next major version")
+    return problems
+
+
+def _git(*args, cwd=None):
+    if shutil.which("git") is None:
+        raise PinError("git is not installed")
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    return result.returncode, result.stdout.strip(), result.stderr.strip()
+
+
+def sync(packages, root=None, results_path=RESULTS_PATH):
+    """Clone missing mirrors and fetch existing ones; returns their paths."""
+    results = load_results(results_path)
+    paths = []
+    for package in packages:
+        mirror = mirror_path(package.url, root)
+        if mirror.is_dir():
+            code, _, error = _git("remote", "update", "--prune", cwd=mirror)
+        else:
+            mirror.parent.mkdir(parents=True, exist_ok=True)
+            code, _, error = _git("clone", "--mirror", "--quiet", package.url, str(mirror))
+        if code:
+            raise PinError(f"{package.name}: cannot update mirror {mirror}: {error}")
+        for key in [key for key in results if key.startswith(f"{package.url} ")]:
+            del results[key]
+        paths.append(mirror)
+    save_results(results, results_path)
+    return paths
+
+
+def load_results(path=RESULTS_PATH):
+    try:
+        return json.loads(Path(path).read_text())["verified"]
+    except (OSError, json.JSONDecodeError, KeyError):
+        # A missing or damaged cache only means checking every pin again.
+        return {}
+
+
+def save_results(results, path=RESULTS_PATH):
+    write_if_changed(path, json.dumps({"version": 1, "verified": dict(sorted(results.items()))}, indent=2) + "\n")
+
+
+def check(package, root=None):
+    """The tag that confirms ``package``'s pin (None for a pin without a
+    version); PinError when none does."""
+    mirror = mirror_path(package.url, root)
+    if not mirror.is_dir():
+        raise PinError(f"{package.name}: no mirror at {mirror}; run python -m pbxgen.pins sync where there is network")
+    code, _, _ = _git("cat-file", "-e", f"{package.revision}^{{commit}}", cwd=mirror)
+    if code:
+        raise PinError(f"{package.name}: revision {package.revision} is not in {package.url}")
+    if not package.min_version:
+        return None
+    tags = [package.min_version, f"v{package.min_version}"]
+    for tag in tags:
+        code, commit, _ = _git("rev-parse", "--verify", "--quiet", f"refs/tags/{tag}^{{commit}}", cwd=mirror)
+        if code:
+            continue
+        if commit != package.revision:
+            raise PinError(f"{package.name}: tag {tag} is {commit}, not the pinned {package.revision}")
+        return tag
+    raise PinError(f"{package.name}: no tag {' or '.join(tags)} in {package.url}")
+
+
+def verify(packages, root=None, results_path=RESULTS_PATH):
+    """Check every pin, skipping those already verified at this revision.
+
+    Returns ``(checked, cached)`` counts; raises PinError listing every bad
+    pin.
+    """
+    results = load_results(results_path)
+    problems = []
+    checked = cached = 0
+    for package in packages:
+        key = f"{package.url} {package.min_version} {package.revision}"
+        if key in results:
+            cached += 1
+            continue
+        try:
+            results[key] = {"tag": check(package, root)}
+        except PinError as error:
+            problems.append(str(error))
+        checked += 1
+    if checked:
+        save_results(results, results_path)
+    if problems:
+        raise PinError("\n".join(problems))
+    return checked, cached
+
+
+def mirrors_config(packages, root=None):
+    """mirrors.json text sending each package's URL to its local mirror."""
+    mirrors = [
+        {"mirror": mirror_path(package.url, root).resolve().as_uri(), "original": package.url}
+        for package in sorted(packages, key=lambda package: package.url)
+    ]
+    return json.dumps({"object": mirrors, "version": 1}, indent=2) + "\n"
+
+
+def write_config(packages, root=None, paths=CONFIG_PATHS):
+    text = mirrors_config(packages, root)
+    for path in paths:
+        write_if_changed(path, text)
+    return list(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolved", type=Path, default=RESOLVED_PATH, help="Package.resolved to read the pins from (default: %(default)s)")
+    parser.add_argument("--mirrors", type=Path, help="mirror directory (default: $PBXGEN_MIRRORS or ~/.cache/pbxgen/mirrors)")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    commands.add_parser("sync", help="clone or fetch a bare mirror of every pinned package, then verify")
+    commands.add_parser("verify", help="check the pins against the mirrors without the network")
+    commands.add_parser("config", help="write mirrors.json so SwiftPM and Xcode resolve from the mirrors")
+    args = parser.parse_args(argv)
+
+    try:
+        packages = load_pins(args.resolved)
+        if args.command == "sync":
+            for path in sync(packages, args.mirrors):
+                print(f"updated {path}")
+        if args.command == "config":
+            for path in write_config(packages, args.mirrors):
+                print(f"wrote {path}")
+            return 0
+        checked, cached = verify(packages, args.mirrors)
+    except PinError as error:
+        parser.exit(1, "".join(f"pbxgen.pins: {line}\n" for line in str(error).splitlines()))
+    print(f"{len(packages)} pins verified ({checked} checked, {cached} from {RESULTS_PATH})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""Derive file references, build files and groups from the source tree.
+
+The walk visits every directory under the source root once and emits the same
+table shapes generate_pbx.py declares by hand (``build_files``,
+``file_refs``, ``groups`` ...), so the emitter does not care which mode
+produced them.
+"""
+import os
+from collections import namedtuple
+
+from .ids import stable_id
+
+FILE_TYPES = {
+    ".swift": "sourcecode.swift",
+    ".json": "text.json",
+    ".strings": "text.plist.strings",
+    ".plist": "text.plist.xml",
+    ".xcassets": "folder.assetcatalog",
+    ".xcdatamodeld": "wrapper.xcdatamodeld",
+}
+
+# Directories Xcode references as a single file instead of a group.
+WRAPPER_EXTENSIONS = (".xcassets", ".xcdatamodeld")
+LOCALIZED_EXTENSION = ".lproj"
+TEST_DIRECTORY = "Tests"
+
+ScannedTree = namedtuple(
+    "ScannedTree",
+    [
+        "build_files",
+        "test_build_files",
+        "resource_build_files",
+        "app_sources",
+        "file_refs",
+        "groups",
+        "variant_groups",
+        "main_group",
+        "product_group",
+        "products",
+    ],
+)
+
+
+def _sort_key(entry):
+    return entry.name.lower()
+
+
+def _extension(name):
+    return os.path.splitext(name)[1]
+
+
+def scan_tree(root, project_dir, products, compiled=()):
+    """Walk ``root`` and return a ScannedTree.
+
+    ``project_dir`` is the directory holding the .xcodeproj; group paths are
+    written relative to it. ``products`` is a list of
+    ``(name, file_type)`` for the built products group. Files in
+    ``compiled`` (paths relative to ``project_dir``) are sources of a
+    build-time compiler: they keep their file reference but are left out of
+    the build phases, which carry the compiled output instead.
+    """
+    compiled = set(compiled)
+    build_files = []
+    test_build_files = []
+    resource_build_files = []
+    app_sources = []
+    file_refs = {}
+    groups = {}
+    variant_groups = {}
+
+    def add_build_file(rel, ref_id, comment, phase, in_tests):
+        bid = stable_id("PBXBuildFile", rel, phase)
+        entry = (bid, f"{comment} in {phase}", ref_id, comment)
+        if in_tests and phase == "Sources":
+            test_build_files.append(entry)
+            return
+        build_files.append(entry)
+        (app_sources if phase == "Sources" else resource_build_files).append(bid)
+
+    def walk(directory, rel, in_tests):
+        gid = stable_id("PBXGroup", rel)
+        groups[gid] = None  # keep parents ahead of their children
+        children = []
+        localized = {}
+        with os.scandir(directory) as it:
+            entries = sorted((e for e in it if not e.name.startswith(".")), key=_sort_key)
+        for entry in entries:
+            child_rel = f"{rel}/{entry.name}"
+            ext = _extension(entry.name)
+            if entry.is_dir() and ext == LOCALIZED_EXTENSION:
+                _collect_localized(entry, localized)
+            elif entry.is_dir() and ext not in WRAPPER_EXTENSIONS:
+                children.append(walk(entry.path, child_rel, in_tests or entry.name == TEST_DIRECTORY))
+            elif ext in FILE_TYPES:
+                fid = stable_id("PBXFileReference", child_rel)
+                file_refs[fid] = (entry.name, FILE_TYPES[ext], entry.name, "<group>", None)
+                children.append(fid)
+                if child_rel not in compiled:
+                    phase = "Sources" if ext == ".swift" else "Resources"
+                    add_build_file(child_rel, fid, entry.name, phase, in_tests)
+        for name in sorted(localized, key=str.lower):
+            vid = stable_id("PBXVariantGroup", rel, name)
+            variant_children = []
+            for language, path in localized[name]:
+                fid = stable_id("PBXFileReference", f"{rel}/{path}")
+                file_refs[fid] = (language, FILE_TYPES[_extension(name)], path, "<group>", language)
+                variant_children.append(fid)
+            variant_groups[vid] = (name, variant_children)
+            children.append(vid)
+            add_build_file(f"{rel}/{name}", vid, name, "Resources", in_tests)
+        name = os.path.basename(directory)
+        groups[gid] = (name, name, children)
+        return gid
+
+    root_rel = os.path.relpath(root, project_dir).replace(os.sep, "/")
+    main_group = stable_id("PBXGroup", "")
+    groups[main_group] = None
+    source_group = walk(root, root_rel, False)
+    name, _, children = groups[source_group]
+    groups[source_group] = (name, root_rel, children)
+
+    product_group = stable_id("PBXGroup", "Products")
+    product_ids = []
+    for name, file_type in products:
+        fid = stable_id("PBXFileReference", "BUILT_PRODUCTS_DIR", name)
+        file_refs[fid] = (name, file_type, name, "BUILT_PRODUCTS_DIR", None)
+        product_ids.append(fid)
+    groups[product_group] = ("Products", None, product_ids)
+    frameworks_group = stable_id("PBXGroup", "Frameworks")
+    groups[frameworks_group] = ("Frameworks", None, [])
+    groups[main_group] = ("", None, [source_group, product_group, frameworks_group])
+
+    return ScannedTree(
+        build_files,
+        test_build_files,
+        resource_build_files,
+        app_sources,
+        file_refs,
+        groups,
+        variant_groups,
+        main_group,
+        product_group,
+        product_ids,
+    )
+
+
+def _collect_localized(entry, localized):
+    language = entry.name[: -len(LOCALIZED_EXTENSION)]
+    with os.scandir(entry.path) as it:
+        for item in it:
+            if item.is_file() and _extension(item.name) in FILE_TYPES:
+                localized.setdefault(item.name, []).append((language, f"{entry.name}/{item.name}"))
+    for variants in localized.values():
+        variants.sort()
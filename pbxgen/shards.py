@@ -0,0 +1,282 @@
+"""Split the unit tests into shard targets balanced by past run time.
+
+    python -m pbxgen.shards import RESULTS...   # JUnit XML, xcresulttool JSON or .xcresult
+    python -m pbxgen.shards plan --shards 4     # print the assignment and CI commands
+    python3 generate_pbx.py --test-shards 4     # emit the shard targets
+
+``test_timings.json`` keeps, per XCTestCase class, an exponentially weighted
+average of its run time in seconds, its test count and how many runs fed
+it. Each import folds the new run in with weight ``ALPHA``; classes the run
+did not include keep their history. A class with no history is weighted at
+its test count times the median seconds per test of the classes that have
+one (``DEFAULT_TEST_SECONDS`` per test when none do).
+
+Shards are filled greedily, heaviest test file first, each into the shard
+with the least time so far (longest-processing-time first, within 4/3 of
+the best possible split). Whole files move because a Sources phase holds
+files, not classes. ``split_test_shards`` keeps the first shard in the
+existing test target, so its IDs do not move, and adds ``<tests>2`` ...
+``<tests>N`` with stable IDs, each hosted by the same app, so CI can build
+once and run ``-only-testing:<target>`` per simulator.
+"""
+import argparse
+import heapq
+import json
+import re
+import shutil
+import statistics
+import subprocess
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+from .cache import write_if_changed
+from .frameworks import file_directories
+from .ids import stable_id
+from .model import BuildConfiguration, BuildFile, BuildPhase, ConfigurationList, FileReference, ModelError, Target, TargetDependency
+
+HISTORY_PATH = Path("test_timings.json")
+TESTS_DIR = Path("JourneyTH/Tests")
+ALPHA = 0.3
+DEFAULT_TEST_SECONDS = 0.5
+
+TEST_CLASS = re.compile(r"\bclass\s+(\w+)\s*:\s*XCTestCase\b")
+TEST_METHOD = re.compile(r"\bfunc\s+test\w*\s*\(")
+
+
+class ShardError(ValueError):
+    pass
+
+
+def test_classes(text):
+    """``[(class name, test method count)]`` for the XCTestCase subclasses in
+    a Swift file; methods count toward the class declared above them."""
+    matches = list(TEST_CLASS.finditer(text))
+    return [
+        (match.group(1), len(TEST_METHOD.findall(text, match.end(), matches[i + 1].start() if i + 1 < len(matches) else len(text))))
+        for i, match in enumerate(matches)
+    ]
+
+
+def load_history(path=HISTORY_PATH):
+    try:
+        return json.loads(Path(path).read_text())["classes"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_history(history, path=HISTORY_PATH):
+    write_if_changed(path, json.dumps({"version": 1, "classes": dict(sorted(history.items()))}, indent=2) + "\n")
+
+
+def _junit(root):
+    results = {}
+    for case in root.iter("testcase"):
+        name = (case.get("classname") or "").rsplit(".", 1)[-1]
+        if name:
+            seconds, tests = results.get(name, (0.0, 0))
+            results[name] = (seconds + float(case.get("time") or 0), tests + 1)
+    return results
+
+
+def _xcresult(node, results, suite=None):
+    # ``xcresulttool get test-results tests`` nests Test Case nodes under
+    # their Test Suite; the legacy format names them "Class/test()".
+    if isinstance(node, list):
+        for item in node:
+            _xcresult(item, results, suite)
+        return
+    if not isinstance(node, dict):
+        return
+    if node.get("nodeType") == "Test Suite":
+        suite = node.get("name")
+    name, seconds = None, None
+    if node.get("nodeType") == "Test Case" and suite:
+        name, seconds = suite, node.get("durationInSeconds")
+    elif isinstance(node.get("identifier"), dict) and isinstance(node.get("duration"), dict):
+        name, seconds = node["identifier"].get("_value", "").split("/")[0], node["duration"].get("_value")
+    if name and seconds is not None:
+        total, tests = results.get(name, (0.0, 0))
+        results[name] = (total + float(seconds), tests + 1)
+        return
+    for value in node.values():
+        _xcresult(value, results, suite)
+
+
+def parse_results(path):
+    """``{class: (seconds, tests)}`` from one test run."""
+    path = Path(path)
+    if path.suffix == ".xcresult":
+        if shutil.which("xcrun") is None:
+            raise ShardError(f"{path}: reading an .xcresult bundle needs xcrun; export it with xcresulttool first")
+        output = subprocess.run(
+            ["xcrun", "xcresulttool", "get", "test-results", "tests", "--path", str(path)], capture_output=True, text=True
+        )
+        if output.returncode:
+            raise ShardError(f"{path}: xcresulttool failed: {output.stderr.strip()}")
+        text = output.stdout
+    else:
+        text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("<"):
+        try:
+            return _junit(ElementTree.fromstring(text))
+        except ElementTree.ParseError as error:
+            raise ShardError(f"{path}: {error}") from error
+    results = {}
+    try:
+        _xcresult(json.loads(text), results)
+    except json.JSONDecodeError as error:
+        raise ShardError(f"{path}: neither JUnit XML nor xcresulttool JSON ({error})") from error
+    return results
+
+
+def update_history(history, results, alpha=ALPHA):
+    """Fold one run's ``{class: (seconds, tests)}`` into ``history``."""
+    for name, (seconds, tests) in results.items():
+        entry = history.get(name)
+        if entry is None:
+            history[name] = {"seconds": round(seconds, 4), "tests": tests, "runs": 1}
+        else:
+            entry["seconds"] = round(entry["seconds"] * (1 - alpha) + seconds * alpha, 4)
+            entry["tests"] = tests
+            entry["runs"] += 1
+    return history
+
+
+def class_weights(classes, history):
+    """Seconds per class; classes without history are estimated from their
+    test count."""
+    per_test = [entry["seconds"] / entry["tests"] for entry in history.values() if entry.get("tests")]
+    default = statistics.median(per_test) if per_test else DEFAULT_TEST_SECONDS
+    return {name: history[name]["seconds"] if name in history else max(tests, 1) * default for name, tests in classes}
+
+
+def assign(weights, count):
+    """Split ``{item: weight}`` into ``count`` lists, heaviest first into the
+    lightest shard; returns ``[(load, [item])]``."""
+    if count < 1:
+        raise ShardError("need at least one shard")
+    if len(weights) < count:
+        raise ShardError(f"{count} shards for {len(weights)} test files")
+    shards = [(0.0, index, []) for index in range(count)]
+    heapq.heapify(shards)
+    for item, weight in sorted(weights.items(), key=lambda pair: (-pair[1], pair[0])):
+        load, index, items = heapq.heappop(shards)
+        items.append(item)
+        heapq.heappush(shards, (load + weight, index, items))
+    return [(load, items) for load, _, items in sorted(shards, key=lambda shard: shard[1])]
+
+
+def plan(paths, history, count):
+    """Assign Swift test files to shards; returns ``[(seconds, [path])]``."""
+    weights = {}
+    for path in paths:
+        classes = test_classes(Path(path).read_text(encoding="utf-8"))
+        weights[path] = sum(class_weights(classes, history).values())
+    return assign(weights, count)
+
+
+def shard_names(base, count):
+    return [base] + [f"{base}{number}" for number in range(2, count + 1)]
+
+
+def split_test_shards(index, tests, count, main_group, product_group, project_id, history, project_dir="."):
+    """Move ``tests``' sources into ``count`` balanced shard targets.
+
+    The first shard stays in ``tests``; returns the new targets.
+    """
+    directories = file_directories(main_group)
+    sources = tests.phase("Sources")
+    by_path = {}
+    for build_file in sources.files:
+        ref = build_file.file
+        path = Path(project_dir) / directories.get(ref.id, "") / ref.path
+        if not path.is_file():
+            raise ModelError(f"test shards: {path} does not exist")
+        by_path[str(path)] = build_file
+    try:
+        shards = plan(sorted(by_path), history, count)
+    except (OSError, ShardError) as error:
+        raise ModelError(f"test shards: {error}") from error
+    sources.files = [by_path[path] for path in shards[0][1]]
+
+    targets = []
+    for name, (_, paths) in zip(shard_names(tests.name, count)[1:], shards[1:]):
+        product = index.add(FileReference(
+            stable_id("PBXFileReference", "BUILT_PRODUCTS_DIR", f"{name}.xctest"),
+            f"{name}.xctest",
+            tests.product.file_type,
+            f"{name}.xctest",
+            "BUILT_PRODUCTS_DIR",
+        ))
+        product_group.children.append(product)
+        configurations = []
+        for configuration in tests.configuration_list.configurations:
+            settings = [
+                (key, f"{value}{name[len(tests.name):]}" if key == "PRODUCT_BUNDLE_IDENTIFIER" else value)
+                for key, value in configuration.settings
+            ]
+            configurations.append(index.add(BuildConfiguration(
+                stable_id("XCBuildConfiguration", name, configuration.name), configuration.name, settings
+            )))
+        links = [
+            index.add(BuildFile(
+                stable_id("PBXBuildFile", name, link.comment, "Frameworks"), link.comment, file=link.file, product=link.product
+            ))
+            for link in tests.phase("Frameworks").files
+        ]
+        target = index.add(Target(
+            stable_id("PBXNativeTarget", name),
+            name,
+            product,
+            tests.product_type,
+            index.add(ConfigurationList(stable_id("XCConfigurationList", name), f'PBXNativeTarget "{name}"', configurations)),
+            [
+                index.add(BuildPhase(stable_id("PBXFrameworksBuildPhase", name), "Frameworks", links)),
+                index.add(BuildPhase(stable_id("PBXSourcesBuildPhase", name), "Sources", [by_path[path] for path in paths])),
+                index.add(BuildPhase(stable_id("PBXResourcesBuildPhase", name), "Resources")),
+            ],
+            test_host=tests.test_host,
+        ))
+        for dependency in tests.dependencies:
+            target.dependencies.append(index.add(TargetDependency(
+                stable_id("PBXTargetDependency", name, dependency.target.name),
+                stable_id("PBXContainerItemProxy", name, dependency.target.name),
+                dependency.target,
+                project_id,
+            )))
+        targets.append(target)
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH, help="timing history file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    import_parser = commands.add_parser("import", help="fold test results into the timing history")
+    import_parser.add_argument("results", nargs="+", type=Path, help="JUnit XML, xcresulttool JSON or .xcresult bundles")
+    plan_parser = commands.add_parser("plan", help="print which test files each shard runs")
+    plan_parser.add_argument("--shards", type=int, required=True)
+    plan_parser.add_argument("--tests", type=Path, default=TESTS_DIR, help="test sources (default: %(default)s)")
+    plan_parser.add_argument("--target", default="JourneyTHTests", help="name of the first shard's target (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    try:
+        if args.command == "import":
+            for path in args.results:
+                results = parse_results(path)
+                update_history(history, results)
+                print(f"{path}: {len(results)} classes, {sum(tests for _, tests in results.values())} tests")
+            save_history(history, args.history)
+            return 0
+        shards = plan(sorted(str(path) for path in args.tests.rglob("*.swift")), history, args.shards)
+    except (OSError, ShardError) as error:
+        parser.exit(1, f"pbxgen.shards: {error}\n")
+    for name, (seconds, paths) in zip(shard_names(args.target, args.shards), shards):
+        print(f"{name}: {seconds:.2f} s, {len(paths)} files: {', '.join(Path(path).stem for path in paths)}")
+        print(f"  xcodebuild test-without-building -scheme JourneyTH -only-testing:{name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
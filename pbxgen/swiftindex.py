@@ -0,0 +1,394 @@
+"""File-level dependency index of the app's Swift sources.
+
+    python -m pbxgen.swiftindex                      # summary report
+    python -m pbxgen.swiftindex --impact JourneyTH/Models/Poi.swift
+    python -m pbxgen.swiftindex --json deps.json     # everything, as JSON
+
+The Swift files are the ``sourcecode.swift`` file references in
+project.pbxproj, resolved through their groups. Each file is lexed once:
+comments and string literals are skipped (string interpolations are code and
+are kept), the names declared at the top level are recorded along with every
+identifier the file mentions; a declaration preceded by ``public`` or
+``open`` is recorded as public. A file depends on another when it mentions a
+name the other declares. This is a name-level approximation: it cannot see
+members an extension adds to a type declared elsewhere, and a local variable
+that shadows a global name counts as a use.
+
+Lexing results are cached in .build-cache/swiftindex.json keyed by each
+file's content hash, so a rerun only lexes the files that changed.
+
+The report covers dependency cycles (strongly connected components of the
+file graph), the directory-level graph as suggested module boundaries in
+build order (directories in a cycle have to share a module), and which files
+recompile when a given file changes.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+from .cache import write_if_changed
+from .parser import load
+
+CACHE_VERSION = 2
+DEFAULT_PROJECT = Path("JourneyTH.xcodeproj/project.pbxproj")
+DEFAULT_CACHE = Path(".build-cache/swiftindex.json")
+DECLARATION_KEYWORDS = frozenset(["actor", "class", "enum", "func", "let", "protocol", "struct", "typealias", "var"])
+ACCESS_PUBLIC = frozenset(["open", "public"])
+
+_TOKEN = re.compile(
+    r"""
+    (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<string>\#*\"\"\"|\#*")
+  | (?P<ident>`?[A-Za-z_][A-Za-z0-9_]*`?)
+  | (?P<number>[0-9][A-Za-z0-9_.]*)
+  | (?P<open_brace>\{)
+  | (?P<close_brace>\})
+  | (?P<open_paren>\()
+  | (?P<close_paren>\))
+  | (?P<other>[^A-Za-z0-9_/"\#{}()`]+|.)
+    """,
+    re.S | re.X,
+)
+_BLOCK = re.compile(r"/\*|\*/")
+_STRING_STOP = re.compile(r'\\|"|\n')
+
+
+class _Collector:
+    def __init__(self):
+        self.identifiers = set()
+        self.declarations = set()
+        self.public = set()
+        self.imports = set()
+        self.depth = 0
+        self._previous = None
+        self._public = False
+
+    def identifier(self, name):
+        if self.depth == 0 and self._previous in DECLARATION_KEYWORDS:
+            self.declarations.add(name)
+            if self._public:
+                self.public.add(name)
+            self._public = False
+        elif self.depth == 0 and self._previous == "import":
+            self.imports.add(name)
+        elif self.depth == 0 and name in ACCESS_PUBLIC:
+            self._public = True
+        self.identifiers.add(name)
+        self._previous = name
+
+    def punctuation(self):
+        self._previous = None
+        self._public = False
+
+
+def _skip_block(text, pos):
+    # Swift block comments nest.
+    depth = 1
+    while depth:
+        match = _BLOCK.search(text, pos)
+        if match is None:
+            return len(text)
+        depth += 1 if match.group() == "/*" else -1
+        pos = match.end()
+    return pos
+
+
+def _skip_string(text, pos, opener, sink):
+    hashes = opener.count("#")
+    closer = ('"""' if opener.endswith('"""') else '"') + "#" * hashes
+    multiline = len(closer) - hashes == 3
+    interpolation = "#" * hashes + "("
+    while True:
+        match = _STRING_STOP.search(text, pos)
+        if match is None:
+            return len(text)
+        stop = match.group()
+        pos = match.end()
+        if stop == "\\":
+            if text.startswith(interpolation, pos):
+                pos = _lex(text, pos + len(interpolation), sink, in_parens=True)
+            elif not hashes:
+                pos += 1
+        elif stop == '"':
+            if text.startswith(closer, pos - 1):
+                return pos - 1 + len(closer)
+        elif not multiline:
+            return pos
+
+
+def _lex(text, pos, sink, in_parens=False):
+    parens = 0
+    match_token = _TOKEN.match
+    while True:
+        match = match_token(text, pos)
+        if match is None:
+            return len(text)
+        kind = match.lastgroup
+        pos = match.end()
+        if kind == "ident":
+            sink.identifier(match.group().strip("`"))
+        elif kind == "other" or kind == "number" or kind == "line_comment":
+            if kind == "other" and not match.group().isspace():
+                sink.punctuation()
+        elif kind == "block_comment":
+            pos = _skip_block(text, pos)
+        elif kind == "string":
+            pos = _skip_string(text, pos, match.group(), sink)
+            sink.punctuation()
+        elif kind == "open_brace":
+            sink.depth += 1
+            sink.punctuation()
+        elif kind == "close_brace":
+            sink.depth = max(0, sink.depth - 1)
+            sink.punctuation()
+        elif kind == "open_paren":
+            parens += 1
+            sink.punctuation()
+        else:
+            if in_parens and parens == 0:
+                return pos
+            parens -= 1
+            sink.punctuation()
+
+
+def lex(text):
+    """Top-level declarations (and which of them are ``public`` or
+    ``open``), imports and identifiers of one Swift file."""
+    sink = _Collector()
+    _lex(text, 0, sink)
+    return {
+        "declarations": sorted(sink.declarations),
+        "public": sorted(sink.public),
+        "imports": sorted(sink.imports),
+        "identifiers": sorted(sink.identifiers - sink.declarations),
+    }
+
+
+def swift_files(project_path):
+    """Paths of the project's Swift file references, relative to its directory."""
+    project = load(project_path)
+    base_dir = Path(project_path).parent.parent
+    root = project[project.root]
+    files = []
+    stack = [(project[root["mainGroup"]], "")]
+    while stack:
+        group, base = stack.pop()
+        for child in group["children"]:
+            obj = project.objects.get(child)
+            if obj is None or obj.get("sourceTree") != "<group>":
+                continue
+            path = obj.get("path")
+            full = f"{base}/{path}".lstrip("/") if path else base
+            if obj.isa == "PBXGroup":
+                stack.append((obj, full))
+            elif obj.isa == "PBXFileReference" and obj.get("lastKnownFileType") == "sourcecode.swift":
+                files.append(os.path.normpath(os.path.join(base_dir, full)))
+    return sorted(files)
+
+
+class Index:
+    """Lexed files plus the dependency graph between them."""
+
+    def __init__(self, files, cache_path=DEFAULT_CACHE):
+        self.cache_path = Path(cache_path)
+        try:
+            cache = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            cache = {}
+        cached = cache.get("files", {}) if cache.get("version") == CACHE_VERSION else {}
+        self.files = {}
+        self.missing = []
+        self.lexed = 0
+        for path in files:
+            try:
+                data = Path(path).read_bytes()
+            except FileNotFoundError:
+                self.missing.append(path)
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            entry = cached.get(path)
+            if entry is None or entry["sha256"] != digest:
+                entry = {"sha256": digest, **lex(data.decode("utf-8", "replace"))}
+                self.lexed += 1
+            self.files[path] = entry
+        self.graph = self._build_graph()
+        self.dependents = {path: [] for path in self.graph}
+        for path, uses in self.graph.items():
+            for used in uses:
+                self.dependents[used].append(path)
+
+    def save(self):
+        payload = {"version": CACHE_VERSION, "files": self.files}
+        # No indent: the C encoder only handles compact output, and this file
+        # is read by the indexer alone.
+        write_if_changed(self.cache_path, json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n")
+
+    def _build_graph(self):
+        declared_in = {}
+        for path, entry in self.files.items():
+            for name in entry["declarations"]:
+                declared_in.setdefault(name, set()).add(path)
+        graph = {}
+        for path, entry in self.files.items():
+            uses = set()
+            for name in entry["identifiers"]:
+                uses |= declared_in.get(name, set())
+            uses.discard(path)
+            graph[path] = sorted(uses)
+        return graph
+
+    def impact(self, path):
+        """Files that recompile when ``path`` changes: everything that reaches
+        it through the graph, directly or not."""
+        seen = set()
+        stack = [path]
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent not in seen and dependent != path:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return sorted(seen)
+
+    def cycles(self):
+        return [component for component in strongly_connected(self.graph) if len(component) > 1]
+
+    def modules(self):
+        """Directories as module candidates, in build order.
+
+        Directories whose files form a cycle are merged, since a module
+        boundary cannot cut a cycle.
+        """
+        directory_of = {path: os.path.dirname(path) for path in self.graph}
+        directory_graph = {}
+        for path, uses in self.graph.items():
+            edges = directory_graph.setdefault(directory_of[path], set())
+            edges.update(directory_of[used] for used in uses if directory_of[used] != directory_of[path])
+        file_counts = Counter(directory_of.values())
+        components = strongly_connected({d: sorted(e) for d, e in directory_graph.items()})
+        module_of = {directory: index for index, component in enumerate(components) for directory in component}
+        modules = []
+        for index, component in enumerate(components):
+            depends = sorted({module_of[e] for d in component for e in directory_graph[d]} - {index})
+            modules.append({
+                "directories": component,
+                "files": sum(file_counts[d] for d in component),
+                "depends_on": depends,
+            })
+        return modules
+
+
+def strongly_connected(graph):
+    """Tarjan's algorithm, iteratively. Components come out dependencies first."""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+    for start in sorted(graph):
+        if start in index:
+            continue
+        work = [(start, iter(graph[start]))]
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, edges = work[-1]
+            for target in edges:
+                if target not in index:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(graph.get(target, ()))))
+                    break
+                if target in on_stack:
+                    low[node] = min(low[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+    return components
+
+
+def report(index, impacts, top=5):
+    lines = [f"{len(index.files)} Swift files, {index.lexed} lexed, {len(index.files) - index.lexed} from cache"]
+    for path in index.missing:
+        lines.append(f"  missing on disk: {path}")
+
+    cycles = index.cycles()
+    lines.append("")
+    lines.append(f"Dependency cycles: {len(cycles) or 'none'}")
+    for component in cycles:
+        lines.append("  " + " <-> ".join(component))
+
+    lines.append("")
+    lines.append("Suggested modules, in build order:")
+    modules = index.modules()
+    for number, module in enumerate(modules):
+        depends = ", ".join(f"#{d}" for d in module["depends_on"]) or "-"
+        lines.append(f"  #{number} {' + '.join(module['directories'])} ({module['files']} files) depends on {depends}")
+
+    lines.append("")
+    if not impacts:
+        sizes = sorted(((len(index.impact(path)), path) for path in index.files), reverse=True)
+        impacts = [path for _, path in sizes[:top]]
+        lines.append(f"Files whose edits recompile the most (top {top}):")
+    for path in impacts:
+        if path not in index.files:
+            lines.append(f"  {path}: not an indexed Swift file")
+            continue
+        rebuilt = index.impact(path)
+        lines.append(f"  {path}: {len(rebuilt)} files rebuilt")
+        lines.extend(f"    {dependent}" for dependent in rebuilt)
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index Swift file dependencies for module splitting and build impact.")
+    parser.add_argument("--project", type=Path, default=DEFAULT_PROJECT, help="project.pbxproj to take the file list from")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE, help="per-file lexing cache (default: %(default)s)")
+    parser.add_argument("--impact", action="append", default=[], metavar="PATH", help="report files rebuilt when PATH changes (repeatable)")
+    parser.add_argument("--json", type=Path, metavar="PATH", help="write the full index, graph, cycles, modules and impact as JSON")
+    args = parser.parse_args(argv)
+
+    index = Index(swift_files(args.project), args.cache)
+    index.save()
+    print("\n".join(report(index, [os.path.normpath(path) for path in args.impact])))
+    if args.json:
+        payload = {
+            "files": {
+                path: {
+                    "declarations": entry["declarations"],
+                    "imports": entry["imports"],
+                    "depends_on": index.graph[path],
+                    "impact": index.impact(path),
+                }
+                for path, entry in index.files.items()
+            },
+            "missing": index.missing,
+            "cycles": index.cycles(),
+            "modules": index.modules(),
+        }
+        args.json.write_text(json.dumps(payload, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
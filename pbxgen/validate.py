@@ -0,0 +1,268 @@
+"""Check a project's object graph for broken references in one pass.
+
+    python -m pbxgen.validate [PROJECT] [--project-dir DIR]   # exit 1 on errors
+
+The checks run over ``Node``s, so the same code validates a parsed
+project.pbxproj (``parsed_nodes``) and generate_pbx.py's tables before it
+builds its model. One pass over the nodes records each object's kind, its
+outgoing references and, per target ID, who refers to it; every check then
+reads those indexes once:
+
+    error    duplicate ID        two objects share an ID once 32-character
+                                 table IDs are truncated to 24
+    error    dangling reference  a reference to an ID with no object
+    error    shared build file   one PBXBuildFile listed in two build phases
+    error    duplicate member    one file compiled or copied twice by a
+                                 target (its Sources and Resources phases)
+    error    missing group path  a group whose directory is not on disk
+    warning  orphan              an object nothing refers to (the root
+                                 object excepted)
+
+Parsed objects in the canonical layout are not tokenized: one regex pass
+over the objects text picks out every reference field and path, and each
+match goes to the object whose span holds it (top-level keys are the lines
+at three tabs, or the whole line for the one-line PBXBuildFile and
+PBXFileReference entries). Edited objects are read through ``props``.
+"""
+import argparse
+import re
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from . import parser as pbxparser
+from .ids import HEX_DIGITS, ID_LENGTH
+from .parser import unquote
+
+DEFAULT_PROJECT = Path("JourneyTH.xcodeproj/project.pbxproj")
+
+# ``refs`` is ``[(key, id)]``; path, name and source_tree only matter for
+# groups and file references.
+Node = namedtuple("Node", ["id", "isa", "label", "refs", "path", "name", "source_tree"], defaults=(None, None, None))
+_MISSING = Node("", "", "", [])
+
+REFERENCE_KEYS = frozenset({
+    "baseConfigurationReference",
+    "buildConfigurationList",
+    "buildConfigurations",
+    "buildPhases",
+    "children",
+    "containerPortal",
+    "dependencies",
+    "fileRef",
+    "files",
+    "mainGroup",
+    "package",
+    "packageProductDependencies",
+    "packageReferences",
+    "productRef",
+    "productRefGroup",
+    "productReference",
+    "remoteGlobalIDString",
+    "target",
+    "targetProxy",
+    "targets",
+})
+
+_FIELD = re.compile(
+    r"(?:\n\t\t\t|[{;] )(" + "|".join(sorted(REFERENCE_KEYS | {"name", "path", "sourceTree"})) + r") = "
+    r'(\((?:/\*.*?\*/|"(?:[^"\\]|\\.)*"|[^()"/]|/(?!\*))*\)|"(?:[^"\\]|\\.)*"|[^;\s]+)',
+    re.S,
+)
+_ITEM = re.compile(r'/\*.*?\*/|("(?:[^"\\]|\\.)*"|[^\s,/()"]+)', re.S)
+
+BUILDING_PHASES = frozenset({"PBXSourcesBuildPhase", "PBXResourcesBuildPhase"})
+
+
+def short_id(identifier):
+    """The ID ``normalize_id`` would give, without registering it."""
+    if len(identifier) == 32 and HEX_DIGITS.issuperset(identifier):
+        return identifier[:ID_LENGTH]
+    return identifier
+
+
+def parsed_nodes(project):
+    """Nodes for every object of a ``pbxgen.parser.Project``."""
+    loaded = sorted((obj for obj in project.objects.values() if obj.span is not None), key=lambda obj: obj.span)
+    if loaded:
+        # One regex pass over the whole objects text, matches handed to the
+        # object whose span holds them.
+        matches = _FIELD.finditer(project.text, loaded[0].span[0], loaded[-1].span[1])
+        match = next(matches, None)
+        for obj in loaded:
+            start, end = obj.span
+            refs, fields = [], {}
+            while match is not None and match.start() < end:
+                if match.start() >= start:
+                    key, value = match.groups()
+                    if key not in REFERENCE_KEYS:
+                        fields[key] = _value(value)
+                    elif value[0] == "(":
+                        refs.extend((key, _value(item)) for item in _ITEM.findall(value, 1, len(value) - 1) if item)
+                    else:
+                        refs.append((key, _value(value)))
+                match = next(matches, None)
+            name, path = fields.get("name"), fields.get("path")
+            yield Node(obj.id, obj.isa, obj.comment or name or path or obj.isa, refs, path, name, fields.get("sourceTree"))
+    for obj in project.objects.values():
+        if obj.span is not None:
+            continue
+        props = obj.props
+        refs = []
+        for key, value in props.items():
+            if key not in REFERENCE_KEYS:
+                continue
+            if isinstance(value, list):
+                refs.extend((key, str(item)) for item in value)
+            elif isinstance(value, str):
+                refs.append((key, str(value)))
+        path, name, source_tree = props.get("path"), props.get("name"), props.get("sourceTree")
+        yield Node(
+            obj.id,
+            obj.isa,
+            obj.comment or name or path or obj.isa,
+            refs,
+            None if path is None else str(path),
+            None if name is None else str(name),
+            None if source_tree is None else str(source_tree),
+        )
+
+
+def _value(token):
+    return unquote(token) if token[0] == '"' else token
+
+
+class Graph:
+    """Forward and reverse reference indexes over a set of nodes."""
+
+    def __init__(self, nodes):
+        self.nodes = {}
+        # {id: [(referrer id, key)]}
+        self.referrers = {}
+        self.duplicates = []
+        nodes_by_id = self.nodes
+        referrers = self.referrers
+        for node in nodes:
+            identifier = short_id(node.id)
+            if identifier != node.id or any(short_id(target) != target for _, target in node.refs):
+                node = node._replace(refs=[(key, short_id(target)) for key, target in node.refs])
+            # The duplicate's references still count, so its children are
+            # not reported as orphans as well.
+            for key, target in node.refs:
+                referrers.setdefault(target, []).append((identifier, key))
+            previous = nodes_by_id.get(identifier)
+            if previous is not None:
+                self.duplicates.append((identifier, previous, node))
+                continue
+            nodes_by_id[identifier] = node
+
+    def describe(self, identifier):
+        node = self.nodes.get(identifier)
+        return f"{node.isa} {identifier} ({node.label})" if node else identifier
+
+
+def validate(nodes, root, project_dir="."):
+    """Return ``(errors, warnings)`` as message lists for ``nodes``, whose
+    root object (the PBXProject) has ID ``root``."""
+    graph = nodes if isinstance(nodes, Graph) else Graph(nodes)
+    root = short_id(root)
+    errors, warnings = [], []
+    describe = graph.describe
+
+    for identifier, first, second in graph.duplicates:
+        origins = " and ".join(dict.fromkeys((first.id, second.id)))
+        errors.append(f"duplicate ID {identifier}: {first.isa} ({first.label}) and {second.isa} ({second.label}) from {origins}")
+
+    phase_of = {}
+    for node in graph.nodes.values():
+        for key, target in node.refs:
+            if target not in graph.nodes:
+                errors.append(f"{describe(node.id)} {key} refers to missing object {target}")
+            elif key == "files" and node.isa.endswith("BuildPhase"):
+                phase_of.setdefault(target, []).append(node.id)
+
+    for build_file, phases in phase_of.items():
+        if len(phases) > 1:
+            errors.append(f"{describe(build_file)} is in {len(phases)} build phases: {', '.join(describe(p) for p in phases)}")
+
+    for node in graph.nodes.values():
+        if not node.isa.endswith("NativeTarget"):
+            continue
+        members = {}
+        for key, phase in node.refs:
+            # Linking and embedding the same framework is normal.
+            if key != "buildPhases" or graph.nodes.get(phase, _MISSING).isa not in BUILDING_PHASES:
+                continue
+            for _, build_file in graph.nodes[phase].refs:
+                file_ref = next((target for key, target in graph.nodes.get(build_file, _MISSING).refs if key in ("fileRef", "productRef")), None)
+                if file_ref is not None:
+                    members.setdefault(file_ref, {})[build_file] = phase
+        for file_ref, phases in members.items():
+            # One build file in two phases is reported above.
+            if len(phases) > 1:
+                phases = list(phases.values())
+                errors.append(
+                    f"{describe(file_ref)} is built {len(phases)} times by target {node.label}: "
+                    f"{', '.join(graph.nodes[phase].label for phase in phases)}"
+                )
+
+    for identifier, node in graph.nodes.items():
+        if identifier != root and identifier not in graph.referrers:
+            warnings.append(f"{describe(identifier)} is not referenced by any object")
+
+    main_group = next((target for key, target in graph.nodes[root].refs if key == "mainGroup"), None) if root in graph.nodes else None
+    if main_group is not None:
+        errors.extend(_missing_paths(graph, main_group, Path(project_dir)))
+    return errors, warnings
+
+
+def _missing_paths(graph, main_group, project_dir):
+    missing = []
+    seen = set()
+    stack = [(main_group, project_dir)]
+    while stack:
+        identifier, directory = stack.pop()
+        if identifier in seen:
+            continue
+        seen.add(identifier)
+        node = graph.nodes.get(identifier, _MISSING)
+        if node.path:
+            if node.source_tree in (None, "<group>"):
+                directory = directory / node.path
+            elif node.source_tree == "SOURCE_ROOT":
+                directory = project_dir / node.path
+            elif node.source_tree == "<absolute>":
+                directory = Path(node.path)
+            else:
+                continue
+            if not directory.is_dir():
+                missing.append(f"{graph.describe(identifier)} path {directory} does not exist")
+                continue
+        for _, child in node.refs:
+            if graph.nodes.get(child, _MISSING).isa == "PBXGroup":
+                stack.append((child, directory))
+    return missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("project", nargs="?", type=Path, default=DEFAULT_PROJECT, help="project.pbxproj to check (default: %(default)s)")
+    parser.add_argument("--project-dir", type=Path, help="directory group paths are relative to (default: the one holding the .xcodeproj)")
+    parser.add_argument("--strict", action="store_true", help="exit 1 on warnings too")
+    args = parser.parse_args(argv)
+
+    try:
+        project = pbxparser.load(args.project)
+    except (OSError, pbxparser.ParseError) as error:
+        parser.exit(1, f"pbxgen.validate: {error}\n")
+    project_dir = args.project_dir or args.project.resolve().parent.parent
+    errors, warnings = validate(parsed_nodes(project), project.root, project_dir)
+    for message in warnings:
+        print(f"{args.project}: warning: {message}", file=sys.stderr)
+    for message in errors:
+        print(f"{args.project}: error: {message}", file=sys.stderr)
+    return 1 if errors or (warnings and args.strict) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,227 @@
+"""Generate one project per branded variant from a single shared model.
+
+    python3 generate_pbx.py --variants variants.json
+
+The manifest lists the variants and what each changes:
+
+    {"variants": [
+        {"name": "Acme",
+         "settings": {"JourneyTH": {"PRODUCT_BUNDLE_IDENTIFIER": "com.acme.journey",
+                                    "ASSETCATALOG_COMPILER_APPICON_NAME": "AcmeIcon"}},
+         "resources": {"add": ["Variants/Acme/Brand.xcassets"], "remove": ["Assets.xcassets"]},
+         "packages": {"swift-collections": {"version": "1.1.0", "revision": "..."}}}
+    ]}
+
+``settings`` sets keys in every configuration of the named target, or of
+the project for ``project``. ``resources`` edits the app's Resources phase:
+``add`` takes paths from the repository root, which join a group named after
+the variant, and ``remove`` matches a file's path or name. ``packages``
+repins packages by name.
+
+Each variant is written as ``JourneyTH-<name>.xcodeproj`` beside the main
+project, so group paths hold, with its layered settings in
+``Configs/<name>/`` and its own Package.resolved. ``derive`` copies only
+what a variant can change (the configurations and the lists, targets and
+project that hold them, the main group, the app's Resources phase and
+repinned packages) and shares every other object with the base model.
+Where fork is the platform's default start method, variants run in a
+ProcessPoolExecutor whose workers inherit that model, so none of it is
+rebuilt or pickled. Elsewhere (spawn on macOS and Windows) a worker would
+re-import generate_pbx.py and rebuild everything, and forking a macOS
+process is not safe, so variants are written one after another instead.
+"""
+import json
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+
+from .cache import AtomicWriter, write_if_changed
+from .emitter import Emitter
+from .ids import stable_id
+from .model import BuildFile, FileReference, Group, ModelError, package_resolved
+from .parser import quote
+from .scan import FILE_TYPES
+from .xcconfig import PROJECT_OWNER, layer_settings, write_files
+
+PROJECT_STEM = "JourneyTH"
+CONFIGS_DIR = Path("Configs")
+RESOLVED_SUBPATH = Path("project.xcworkspace/xcshareddata/swiftpm/Package.resolved")
+NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*\Z")
+KEYS = {"name", "settings", "resources", "packages"}
+
+# (index, project, write, project_dir) in a worker; set by _start_worker.
+_shared = None
+
+
+class VariantError(ValueError):
+    pass
+
+
+def load_manifest(path):
+    """The manifest's variants, checked for shape and unique names."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as error:
+        raise VariantError(f"{path}: {error}") from error
+    variants = data.get("variants") if isinstance(data, dict) else None
+    if not isinstance(variants, list) or not variants:
+        raise VariantError(f"{path}: expected a non-empty \"variants\" list")
+    names = set()
+    for variant in variants:
+        name = variant.get("name") if isinstance(variant, dict) else None
+        if not isinstance(name, str) or not NAME.match(name):
+            raise VariantError(f"{path}: bad variant name {name!r}")
+        if name in names:
+            raise VariantError(f"{path}: variant {name} is listed twice")
+        names.add(name)
+        unknown = set(variant) - KEYS
+        if unknown:
+            raise VariantError(f"{path}: variant {name} has unknown keys {', '.join(sorted(unknown))}")
+    return variants
+
+
+def project_path(name, project_dir="."):
+    return Path(project_dir, f"{PROJECT_STEM}-{name}.xcodeproj", "project.pbxproj")
+
+
+def _matches(build_file, entry):
+    ref = build_file.file
+    path = getattr(ref, "path", None) or ref.name
+    return entry in (path, Path(path).name)
+
+
+def derive(index, project, variant, project_dir="."):
+    """``(index, project)`` for ``variant``: a copy of the base index that
+    holds new objects only where the variant differs."""
+    name = variant["name"]
+    index = index.copy()
+    overrides = variant.get("settings", {})
+    owners = {PROJECT_OWNER, *(target.name for target in project.targets)}
+    unknown = set(overrides) - owners
+    if unknown:
+        raise VariantError(f"variant {name}: no target {', '.join(sorted(unknown))}")
+
+    def configurations(configuration_list, owner):
+        changes = {key: quote(str(value)) for key, value in overrides.get(owner, {}).items()}
+        built = []
+        for configuration in configuration_list.configurations:
+            settings = configuration.settings
+            if changes:
+                settings = sorted({**dict(settings), **changes}.items())
+            # Always copied: layer_settings rewrites settings and bases in place.
+            built.append(index.replace(replace(configuration, settings=list(settings))))
+        return index.replace(replace(configuration_list, configurations=built))
+
+    app = next(target for target in project.targets if target.product_type == "com.apple.product-type.application")
+    main_group = index.replace(replace(project.main_group, children=list(project.main_group.children)))
+    targets = []
+    for target in project.targets:
+        phases = list(target.phases)
+        if target is app and "resources" in variant:
+            resources = target.phase("Resources")
+            phases[phases.index(resources)] = index.replace(
+                replace(resources, files=_resources(index, resources.files, variant, main_group, project.product_group, project_dir))
+            )
+        targets.append(index.replace(replace(target, configuration_list=configurations(target.configuration_list, target.name), phases=phases)))
+
+    packages = list(project.packages)
+    for package_name, pin in variant.get("packages", {}).items():
+        position = next((i for i, package in enumerate(packages) if package.name == package_name), None)
+        if position is None:
+            raise VariantError(f"variant {name}: no package {package_name}")
+        packages[position] = index.replace(replace(
+            packages[position],
+            min_version=pin.get("version", packages[position].min_version),
+            revision=pin.get("revision", packages[position].revision),
+        ))
+
+    project = index.replace(replace(
+        project,
+        main_group=main_group,
+        configuration_list=configurations(project.configuration_list, PROJECT_OWNER),
+        targets=targets,
+        packages=packages,
+    ))
+    return index, project
+
+
+def _resources(index, files, variant, main_group, product_group, project_dir):
+    name = variant["name"]
+    files = list(files)
+    for entry in variant["resources"].get("remove", []):
+        kept = [build_file for build_file in files if not _matches(build_file, entry)]
+        if len(kept) == len(files):
+            raise VariantError(f"variant {name}: no resource {entry} to remove")
+        for build_file in files:
+            if _matches(build_file, entry):
+                index.remove(build_file)
+        files = kept
+    references = []
+    for path in variant["resources"].get("add", []):
+        path = Path(path).as_posix()
+        if not Path(project_dir, path).exists():
+            raise VariantError(f"variant {name}: resource {path} does not exist")
+        file_name = Path(path).name
+        reference = index.add(FileReference(
+            stable_id("PBXFileReference", name, path), file_name, FILE_TYPES.get(Path(path).suffix, "file"), path, name=file_name
+        ))
+        references.append(reference)
+        files.append(index.add(BuildFile(stable_id("PBXBuildFile", name, path, "Resources"), f"{file_name} in Resources", file=reference)))
+    if references:
+        # Paths are from the repository root, so the group has none of its own.
+        children = main_group.children
+        position = children.index(product_group) if product_group in children else len(children)
+        children.insert(position, index.add(Group(stable_id("PBXGroup", name, "resources"), f"{name} Resources", None, references)))
+    return files
+
+
+def _start_worker(state):
+    global _shared
+    _shared = state
+
+
+def _forks():
+    """Whether new processes start by forking unless told otherwise."""
+    method = multiprocessing.get_start_method(allow_none=True)
+    return (method or multiprocessing.get_all_start_methods()[0]) == "fork"
+
+
+def _generate(variant, state=None):
+    index, project, write, project_dir = state or _shared
+    start = time.perf_counter()
+    name = variant["name"]
+    variant_index, variant_project = derive(index, project, variant, project_dir)
+    layering = layer_settings(variant_index, variant_project, (CONFIGS_DIR / name).as_posix())
+    path = project_path(name, project_dir)
+    with AtomicWriter(path) as handle:
+        write(Emitter(handle), variant_index, variant_project)
+    outputs = [path, *write_files(layering, Path(project_dir, CONFIGS_DIR, name))]
+    if variant_project.packages:
+        resolved = path.parent / RESOLVED_SUBPATH
+        write_if_changed(resolved, package_resolved(variant_project.packages))
+        outputs.append(resolved)
+    shared = sum(1 for identifier, obj in variant_index.objects.items() if index.objects.get(identifier) is obj)
+    return name, outputs, len(variant_index), shared, (time.perf_counter() - start) * 1000
+
+
+def generate_variants(index, project, variants, write, project_dir=".", jobs=None):
+    """Write every variant's project; returns ``[(name, outputs, objects,
+    objects shared with the base, ms)]`` in manifest order.
+
+    ``write(emitter, index, project)`` emits one project.pbxproj. The base
+    model is left as it was, so it can be layered and written afterwards.
+    Variants are written in parallel only where fork is the default start
+    method; see the module docstring.
+    """
+    state = (index, project, write, project_dir)
+    try:
+        if len(variants) == 1 or jobs == 1 or not _forks():
+            return [_generate(variant, state) for variant in variants]
+        # Forked workers get ``state`` as it is in memory; nothing is pickled.
+        with ProcessPoolExecutor(jobs, initializer=_start_worker, initargs=(state,)) as pool:
+            return list(pool.map(_generate, variants))
+    except ModelError as error:
+        raise VariantError(str(error)) from error
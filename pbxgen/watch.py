@@ -0,0 +1,328 @@
+"""Keep project.pbxproj in step with the source tree while files come and go.
+
+``watch`` holds the parsed project and the set of files it references in
+memory. Changes are collected from inotify on Linux (through ctypes, no extra
+packages) or, elsewhere and when inotify is unavailable, by polling directory
+mtimes. A burst of events is debounced into one batch; the batch is turned
+into file additions and removals, applied with the same Patcher the ``patch``
+subcommand uses, and the project is written once. Only changes a patch cannot
+express (localized resources, files the project disagrees about) fall back to
+a full regeneration, after which the project is reloaded.
+
+Patching only makes sense for a project generated with ``--scan``: a
+table-mode run rebuilds the project from generate_pbx.py's tables and drops
+anything patched in, so ``generate_pbx.py watch`` requires ``--scan``.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from .cache import AtomicWriter
+from .parser import load
+from .patch import PatchError, Patcher
+from .scan import FILE_TYPES, LOCALIZED_EXTENSION, WRAPPER_EXTENSIONS
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+
+def _visible(name):
+    return not name.startswith(".")
+
+
+def _is_localized(rel):
+    return any(part.endswith(LOCALIZED_EXTENSION) for part in rel.split("/")[:-1]) or rel.endswith(LOCALIZED_EXTENSION)
+
+
+def project_files(directory, rel):
+    """The set of paths under ``directory`` that --scan gives a file reference.
+
+    Wrappers count as one file and are not descended into; .lproj contents
+    are left out because they become variant groups, not files.
+    """
+    found = set()
+    stack = [(directory, rel)]
+    while stack:
+        current, current_rel = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = [e for e in it if _visible(e.name)]
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in entries:
+            ext = os.path.splitext(entry.name)[1]
+            child_rel = f"{current_rel}/{entry.name}"
+            if entry.is_dir() and ext not in WRAPPER_EXTENSIONS:
+                if ext != LOCALIZED_EXTENSION:
+                    stack.append((entry.path, child_rel))
+            elif ext in FILE_TYPES:
+                found.add(child_rel)
+    return found
+
+
+class InotifyWatcher:
+    """Recursive inotify watch on Linux. Raises OSError when unavailable."""
+
+    def __init__(self, root):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is Linux only")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self._paths = {}
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, directory):
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            wd = self._add_watch(self._fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise OSError(code, f"inotify_add_watch {current}: {os.strerror(code)}")
+            self._paths[wd] = current
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        ext = os.path.splitext(entry.name)[1]
+                        if _visible(entry.name) and entry.is_dir() and ext not in WRAPPER_EXTENSIONS:
+                            stack.append(entry.path)
+            except FileNotFoundError:
+                continue
+
+    def _forget(self, directory):
+        # A moved directory keeps its watches, which would go on reporting
+        # the old path; drop them and let IN_MOVED_TO add fresh ones.
+        prefix = directory + os.sep
+        for wd, path in list(self._paths.items()):
+            if path == directory or path.startswith(prefix):
+                self._rm_watch(self._fd, wd)
+                del self._paths[wd]
+
+    def changes(self, timeout):
+        """Paths that changed, waiting up to ``timeout`` seconds (None: forever)."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        dirty = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size: offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                dirty.add(self.root)
+                continue
+            directory = self._paths.get(wd)
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            if directory is None:
+                continue
+            if not name:
+                dirty.add(directory)
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            dirty.add(path)
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                self._forget(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                ext = os.path.splitext(path)[1]
+                if ext not in WRAPPER_EXTENSIONS and _visible(os.path.basename(path)):
+                    self._watch_tree(path)
+        return dirty
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Portable fallback: compare directory mtimes every ``interval`` seconds."""
+
+    def __init__(self, root, interval=0.5):
+        self.root = root
+        self.interval = interval
+        self._mtimes = self._snapshot()
+
+    def _snapshot(self):
+        mtimes = {}
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                mtimes[current] = os.stat(current).st_mtime_ns
+                with os.scandir(current) as it:
+                    for entry in it:
+                        ext = os.path.splitext(entry.name)[1]
+                        if _visible(entry.name) and entry.is_dir() and ext not in WRAPPER_EXTENSIONS:
+                            stack.append(entry.path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return mtimes
+
+    def changes(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            mtimes = self._snapshot()
+            dirty = {path for path in mtimes.keys() | self._mtimes.keys() if mtimes.get(path) != self._mtimes.get(path)}
+            self._mtimes = mtimes
+            if dirty:
+                return dirty
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, poll=False, interval=0.5):
+    if not poll:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            # AttributeError: libc without inotify symbols
+            pass
+    return PollingWatcher(root, interval)
+
+
+def batches(watcher, debounce):
+    """Yield sets of changed paths, one per burst of events."""
+    while True:
+        dirty = watcher.changes(None)
+        while True:
+            more = watcher.changes(debounce)
+            if not more:
+                break
+            dirty |= more
+        yield dirty
+
+
+class ProjectMirror:
+    """The parsed project plus the set of files it references."""
+
+    def __init__(self, project_path, root, regenerate, project_dir="."):
+        self.project_path = project_path
+        self.root = root
+        self.root_rel = os.path.relpath(root, project_dir).replace(os.sep, "/")
+        self.project_dir = project_dir
+        self.regenerate = regenerate
+        self.reload(force=False)
+
+    def reload(self, force):
+        self.regenerate(force)
+        self.project = load(self.project_path)
+        self.patcher = Patcher(self.project, self.project_dir)
+        self.known = project_files(self.root, self.root_rel)
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.project_dir).replace(os.sep, "/")
+
+    def diff(self, paths):
+        """Files to add and remove for a batch of changed paths.
+
+        Returns None when the batch touches something only a full
+        regeneration handles.
+        """
+        added, removed = set(), set()
+        for path in paths:
+            rel = self._rel(path)
+            if rel != self.root_rel and not rel.startswith(f"{self.root_rel}/"):
+                continue
+            if any(not _visible(part) for part in rel.split("/")):
+                continue
+            if _is_localized(rel):
+                return None
+            ext = os.path.splitext(rel)[1]
+            if os.path.isdir(path) and ext not in WRAPPER_EXTENSIONS:
+                prefix = f"{rel}/"
+                present = project_files(path, rel)
+                known = {known for known in self.known if known.startswith(prefix)}
+                added |= present - known
+                removed |= known - present
+            elif os.path.exists(path):
+                if ext in FILE_TYPES and rel not in self.known:
+                    added.add(rel)
+            else:
+                if rel in self.known:
+                    removed.add(rel)
+                prefix = f"{rel}/"
+                removed |= {known for known in self.known if known.startswith(prefix)}
+        return added, removed
+
+    def apply(self, paths):
+        """Bring the project up to date with ``paths``; returns change lines."""
+        changes = self.diff(paths)
+        if changes is None:
+            reason = "localized resources changed"
+        else:
+            added, removed = changes
+            if not added and not removed:
+                return []
+            try:
+                lines = [f"removed {self.patcher.remove(os.path.join(self.project_dir, rel))}" for rel in sorted(removed)]
+                lines += [f"added {self.patcher.add(os.path.join(self.project_dir, rel))}" for rel in sorted(added)]
+            except PatchError as error:
+                reason = str(error)
+            else:
+                with AtomicWriter(self.project_path) as handle:
+                    self.project.write(handle)
+                self.known = (self.known - removed) | added
+                return lines
+        # The in-memory project may be half patched; start again from disk.
+        self.reload(force=True)
+        return [f"regenerated ({reason})"]
+
+
+def watch(project_path, root, regenerate, debounce=0.2, poll=False, interval=0.5, log=print):
+    """Watch ``root`` until interrupted, keeping ``project_path`` current.
+
+    ``regenerate(force)`` runs a full ``--scan`` generation. It is
+    called once at start (unforced, so an up-to-date project is left alone)
+    to make the project and the tree agree before patches are applied, and
+    again, forced, whenever a batch cannot be patched.
+    """
+    mirror = ProjectMirror(project_path, root, regenerate)
+    watcher = open_watcher(root, poll, interval)
+    log(f"watching {root} ({type(watcher).__name__}); {len(mirror.known)} files in the project")
+    try:
+        for paths in batches(watcher, debounce):
+            start = time.perf_counter()
+            lines = mirror.apply(paths)
+            if lines:
+                elapsed = (time.perf_counter() - start) * 1000
+                log("\n".join(lines + [f"updated {project_path} in {elapsed:.0f} ms"]))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
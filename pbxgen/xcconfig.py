@@ -0,0 +1,238 @@
+"""Factor inline build settings into layered .xcconfig files.
+
+Xcode resolves a target configuration's settings from, lowest first: the
+project's base configuration file, the project configuration's own settings,
+the target's base configuration file and the target configuration's own
+settings. ``layer_settings`` takes a model whose settings are all inline and
+moves them as far down that stack as they go:
+
+    Project.xcconfig    what every project configuration shares
+    <Kind>.xcconfig     what every target of one product type shares, when
+                        there are two or more (test shards, say); each
+                        target's own file includes it
+    <Target>.xcconfig   what every configuration of the target shares
+    inline              only what differs between Debug and Release
+
+A target setting whose value it would inherit from the project
+configuration of the same name anyway is dropped. The layered model must
+resolve every configuration to exactly the settings it had inline, or
+ModelError is raised. A settings tweak then rewrites an .xcconfig and leaves
+project.pbxproj alone unless a key moves between layers.
+"""
+from pathlib import Path
+
+from .cache import write_if_changed
+from .ids import stable_id
+from .model import FileReference, Group, ModelError
+
+HEADER = "// Generated by generate_pbx.py from its build settings tables; edit those instead.\n"
+PROJECT_LAYER = "Project"
+PROJECT_OWNER = "project"
+INHERITED = "$(inherited)"
+
+
+def plain(value):
+    """A pbxproj settings value as it reads in an .xcconfig file."""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _common(settings_lists):
+    """Settings with the same value in every list, in the first list's order."""
+    first, *rest = settings_lists
+    others = [dict(settings) for settings in rest]
+    return [(key, value) for key, value in first if all(other.get(key) == value for other in others)]
+
+
+def _without(settings, removed):
+    keys = {key for key, _ in removed}
+    return [(key, value) for key, value in settings if key not in keys]
+
+
+def effective(stack):
+    """``{key: (value, layer)}`` for ``[(layer, settings)]``, lowest first,
+    with ``$(inherited)`` expanded."""
+    resolved = {}
+    for layer, settings in stack:
+        for key, value in settings:
+            value = plain(value)
+            if INHERITED in value:
+                value = value.replace(INHERITED, resolved.get(key, ("", None))[0]).strip()
+            resolved[key] = (value, layer)
+    return resolved
+
+
+class Layering:
+    """The .xcconfig files to write and, for every configuration, the
+    layers its settings now resolve through."""
+
+    def __init__(self):
+        self.files = {}
+        # {owner: {configuration: [(layer, settings)]}}, lowest layer first.
+        self.stacks = {}
+
+    def add_file(self, name, settings, include=None):
+        text = HEADER
+        if include:
+            text += f'\n#include "{include}"\n'
+        if settings:
+            text += "\n" + "".join(f"{key} = {plain(value)}\n" for key, value in settings)
+        self.files[name] = text
+
+    def report(self):
+        """``{owner: {configuration: {key: (value, layer)}}}``."""
+        return {
+            owner: {name: effective(stack) for name, stack in configurations.items()}
+            for owner, configurations in self.stacks.items()
+        }
+
+
+def layer_settings(index, project, directory):
+    """Move ``project``'s inline settings into .xcconfig files under
+    ``directory`` and point each configuration at its file.
+
+    The files join the main group in a group of their own, with IDs keyed on
+    their paths, so table and scan mode agree. Returns the Layering; nothing
+    is written.
+    """
+    directory = Path(directory).as_posix()
+    layering = Layering()
+    project_configs = project.configuration_list.configurations
+    before = {config.name: [("project", config.settings)] for config in project_configs}
+    inherited = {name: effective(stack) for name, stack in before.items()}
+    expected = {PROJECT_OWNER: {name: effective(stack) for name, stack in before.items()}}
+
+    project_layer = _common([config.settings for config in project_configs]) if project_configs else []
+    layers = {PROJECT_LAYER: project_layer}
+    includes = {}
+    owners = {PROJECT_LAYER: project_configs}
+    for config in project_configs:
+        config.settings = _without(config.settings, project_layer)
+
+    remaining = {}
+    for target in project.targets:
+        configs = target.configuration_list.configurations
+        expected[target.name] = {
+            config.name: effective([*before.get(config.name, []), ("target", config.settings)]) for config in configs
+        }
+        remaining[target.name] = [
+            [
+                (key, value)
+                for key, value in config.settings
+                if INHERITED in value or inherited.get(config.name, {}).get(key, (None,))[0] != plain(value)
+            ]
+            for config in configs
+        ]
+        layers[target.name] = _common(remaining[target.name]) if configs else []
+        owners[target.name] = configs
+
+    kinds = {}
+    for target in project.targets:
+        kinds.setdefault(target.product_type, []).append(target.name)
+    for product_type, names in kinds.items():
+        if len(names) < 2:
+            continue
+        kind = product_type.rsplit(".", 1)[-1].replace("-", " ").title().replace(" ", "")
+        if kind in layers:
+            raise ModelError(f"{kind}.xcconfig would serve both the {product_type} targets and target {kind}")
+        layers[kind] = _common([layers[name] for name in names])
+        if not layers[kind]:
+            del layers[kind]
+            continue
+        for name in names:
+            layers[name] = _without(layers[name], layers[kind])
+            includes[name] = kind
+
+    for target in project.targets:
+        configs = target.configuration_list.configurations
+        shared = layers[target.name] + layers.get(includes.get(target.name), [])
+        for config, settings in zip(configs, remaining[target.name]):
+            config.settings = _without(settings, shared)
+
+    references = {}
+    for name, settings in layers.items():
+        if not settings and name not in includes:
+            continue
+        include = f"{includes[name]}.xcconfig" if name in includes else None
+        layering.add_file(f"{name}.xcconfig", settings, include)
+        references[name] = FileReference(
+            stable_id("PBXFileReference", f"{directory}/{name}.xcconfig"), f"{name}.xcconfig", "text.xcconfig", f"{name}.xcconfig"
+        )
+    if references:
+        files = [index.add(reference) for reference in sorted(references.values(), key=lambda reference: reference.path)]
+        group = index.add(Group(stable_id("PBXGroup", directory), Path(directory).name, directory, files))
+        children = project.main_group.children
+        position = children.index(project.product_group) if project.product_group in children else len(children)
+        children.insert(position, group)
+
+    for name, configs in owners.items():
+        for config in configs:
+            config.base = references.get(name)
+    for config in project_configs:
+        layering.stacks.setdefault(PROJECT_OWNER, {})[config.name] = [
+            (f"{PROJECT_LAYER}.xcconfig", project_layer),
+            (f"project {config.name}", config.settings),
+        ]
+    for target in project.targets:
+        kind = includes.get(target.name)
+        for config in target.configuration_list.configurations:
+            layering.stacks.setdefault(target.name, {})[config.name] = [
+                *layering.stacks.get(PROJECT_OWNER, {}).get(config.name, []),
+                *([(f"{kind}.xcconfig", layers[kind])] if kind else []),
+                (f"{target.name}.xcconfig", layers[target.name]),
+                (config.name, config.settings),
+            ]
+
+    report = layering.report()
+    for owner, configurations in expected.items():
+        for name, settings in configurations.items():
+            got = {key: value for key, (value, _) in report[owner][name].items()}
+            want = {key: value for key, (value, _) in settings.items()}
+            if got != want:
+                changed = sorted(key for key in got.keys() | want.keys() if got.get(key) != want.get(key))
+                raise ModelError(f"layered settings change {owner} {name}: {', '.join(changed)}")
+    return layering
+
+
+def write_files(layering, directory):
+    """Write the layering's files under ``directory`` and delete generated
+    .xcconfig files it no longer has; returns the paths kept."""
+    directory = Path(directory)
+    for stale in directory.glob("*.xcconfig"):
+        if stale.name not in layering.files and stale.read_text(encoding="utf-8").startswith(HEADER):
+            stale.unlink()
+    paths = []
+    for name, text in sorted(layering.files.items()):
+        write_if_changed(directory / name, text)
+        paths.append(directory / name)
+    return paths
+
+
+def format_report(report, differing_only=False, owners=None):
+    """Effective settings per owner, one column per configuration; ``*``
+    marks values that differ between configurations."""
+    lines = []
+    for owner, configurations in report.items():
+        if owners and owner not in owners:
+            continue
+        names = list(configurations)
+        keys = sorted({key for settings in configurations.values() for key in settings})
+        rows = []
+        for key in keys:
+            values = [configurations[name].get(key, ("", None)) for name in names]
+            differs = len({value for value, _ in values}) > 1
+            if differing_only and not differs:
+                continue
+            layers = ", ".join(dict.fromkeys(layer for _, layer in values if layer))
+            rows.append((key, [value for value, _ in values], "*" if differs else " ", layers))
+        if not rows:
+            continue
+        width = max(len(key) for key, *_ in rows)
+        columns = [max([len(name)] + [len(values[i]) for _, values, _, _ in rows]) for i, name in enumerate(names)]
+        lines.append(owner)
+        lines.append(f"  {'':<{width}}   " + "  ".join(f"{name:<{column}}" for name, column in zip(names, columns)) + "  from")
+        for key, values, marker, layers in rows:
+            lines.append(f"  {key:<{width}} {marker} " + "  ".join(f"{value:<{column}}" for value, column in zip(values, columns)) + f"  {layers}")
+        lines.append("")
+    return lines
@@ -0,0 +1,38 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# The tools run as ``python3 -m pbxgen...`` from the repository root.
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# What generate_pbx.py reads and writes, relative to the repository root.
+WORKSPACE = ["generate_pbx.py", "pbxgen", "bundletools", "JourneyTH", "JourneyTH.xcodeproj", "Configs"]
+
+
+def copy_workspace(root):
+    """Copy the repository into ``root`` to run generate_pbx.py in; returns
+    a ``run(*args)`` helper bound to it, with the copy as ``run.root``."""
+    for name in WORKSPACE:
+        source = ROOT / name
+        if source.is_dir():
+            shutil.copytree(source, root / name, ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy2(source, root / name)
+
+    def run(*args, check=True):
+        result = subprocess.run([sys.executable, "generate_pbx.py", *args], cwd=root, capture_output=True, text=True, timeout=120)
+        if check and result.returncode:
+            raise AssertionError(f"generate_pbx.py {' '.join(args)} failed:\n{result.stderr}")
+        return result
+
+    run.root = root
+    return run
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    return copy_workspace(tmp_path)
@@ -0,0 +1,79 @@
+import json
+import struct
+import zlib
+
+from bundletools import assets
+
+
+def chunk(kind, body):
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def png(width=32, height=32, level=0, extra=()):
+    """An RGB PNG of horizontal stripes, its pixels stored at ``level``."""
+    rows = b"".join(b"\0" + bytes([(y * 8) % 256, 0, 255 - y]) * width for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        assets.PNG_SIGNATURE
+        + chunk(b"IHDR", header)
+        + b"".join(chunk(kind, body) for kind, body in extra)
+        + chunk(b"IDAT", zlib.compress(rows, level))
+        + chunk(b"IEND", b"")
+    )
+
+
+def chunks(data):
+    out, position = [], len(assets.PNG_SIGNATURE)
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        (crc,) = struct.unpack(">I", data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + body)
+        out.append((kind, body))
+        position += 12 + length
+    return out
+
+
+def pixels(data):
+    return zlib.decompress(b"".join(body for kind, body in chunks(data) if kind == b"IDAT"))
+
+
+def test_recompress_keeps_pixels_and_drops_text():
+    original = png(extra=[(b"tEXt", b"Software\0test"), (b"gAMA", struct.pack(">I", 45455))])
+    smaller = assets.recompress_png(original)
+    assert len(smaller) < len(original)
+    assert pixels(smaller) == pixels(original)
+    assert [kind for kind, _ in chunks(smaller)] == [b"IHDR", b"gAMA", b"IDAT", b"IEND"]
+
+
+def test_recompress_returns_input_when_not_smaller():
+    best = assets.recompress_png(png())
+    assert assets.recompress_png(best) is best
+
+
+def test_recompress_leaves_unknown_input_alone():
+    for data in (b"GIF89a...", png(extra=[(b"acTL", struct.pack(">II", 1, 0))])):
+        assert assets.recompress_png(data) is data
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    broken = assets.PNG_SIGNATURE + chunk(b"IHDR", header) + chunk(b"IDAT", b"not zlib" * 8) + chunk(b"IEND", b"")
+    assert assets.recompress_png(broken) is broken
+
+
+def test_optimize_skips_unchanged_imagesets(tmp_path):
+    imageset = tmp_path / "Assets.xcassets" / "photo.imageset"
+    imageset.mkdir(parents=True)
+    (imageset / "photo@3x.png").write_bytes(png())
+    (imageset / "Contents.json").write_text(json.dumps({"images": [{"idiom": "universal", "filename": "photo@3x.png", "scale": "3x"}]}))
+    cache = tmp_path / "assets.json"
+
+    reports, skipped = assets.optimize(tmp_path / "Assets.xcassets", jobs=1, cache_path=cache)
+    [report] = reports
+    assert skipped == 0
+    assert report["after"] < report["before"]
+    assert "photo@3x.png" in report["written"]
+    assert pixels((imageset / "photo@3x.png").read_bytes()) == pixels(png())
+
+    assert assets.optimize(tmp_path / "Assets.xcassets", jobs=1, cache_path=cache) == ([], 1)
+    cache.write_text("{broken")
+    reports, skipped = assets.optimize(tmp_path / "Assets.xcassets", jobs=1, cache_path=cache)
+    assert skipped == 0 and reports[0]["written"] == []
@@ -0,0 +1,43 @@
+import shutil
+
+from bundletools import coredata
+from conftest import ROOT
+
+MODEL = ROOT / coredata.MODEL
+SOURCES = ROOT / coredata.SOURCE_DIR
+
+
+def test_write_version_round_trip(tmp_path):
+    # Start from the first version alone, before any index was proposed.
+    model = tmp_path / MODEL.name
+    shutil.copytree(MODEL / "JourneyTH.xcdatamodel", model / "JourneyTH.xcdatamodel")
+    version = coredata.current_model(model)
+    rows, proposals, warnings = coredata.analyze(coredata.load_entities(version), coredata.find_fetches(SOURCES))
+    assert warnings == []
+    assert [covering for _, covering in rows] == [None] * 7
+    assert proposals == {"ItineraryItem": {"byIdIndex": ["id"], "byItineraryIdOrderIndex": ["itineraryId", "order"]}}
+
+    target = coredata.write_version(model, version, proposals)
+    assert target.name == "JourneyTH 2.xcdatamodel"
+    assert coredata.current_model(model) == target
+    entities = coredata.load_entities(target)
+    assert entities["ItineraryItem"].indexes == proposals["ItineraryItem"]
+    rows, proposals, _ = coredata.analyze(entities, coredata.find_fetches(SOURCES))
+    assert proposals == {}
+    assert {covering for fetch, covering in rows if fetch.key} == {"byIdIndex", "byItineraryIdOrderIndex"}
+    # The committed second version is exactly what --write produces.
+    assert (target / "contents").read_text() == (MODEL / target.name / "contents").read_text()
+
+
+def test_key_puts_equality_first_then_other_comparisons_then_sorts():
+    fetch = coredata.Fetch("ItineraryItem", "here")
+    fetch.equal, fetch.other, fetch.sorts = ["poiId", "itineraryId"], ["order", "poiId"], ["order", "id"]
+    assert fetch.key == ("itineraryId", "poiId", "order", "id")
+
+
+def test_prefix_proposals_fold_into_the_longer_index():
+    entities = {"Item": coredata.Entity("Item", {"a", "b"}, {})}
+    short, long = coredata.Fetch("Item", "x:1"), coredata.Fetch("Item", "x:2")
+    short.equal, long.equal, long.sorts = ["a"], ["a"], ["b"]
+    _, proposals, _ = coredata.analyze(entities, [short, long])
+    assert proposals == {"Item": {"byABIndex": ["a", "b"]}}
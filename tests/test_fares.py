@@ -0,0 +1,54 @@
+import json
+import plistlib
+import struct
+
+import pytest
+
+from bundletools import data, fares
+from bundletools.data import DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def config():
+    return json.loads((DATA_DIR / "fares_config.json").read_bytes())["fareConfig"]
+
+
+def test_tier_walk_known_fares(config):
+    assert fares.swift_taxi_fare(0.5, config["taxi"]) == 35
+    assert fares.swift_taxi_fare(10, config["taxi"]) == pytest.approx(35 + 9 * 6.5)
+    assert fares.swift_taxi_fare(15, config["taxi"]) == pytest.approx(35 + 9 * 6.5 + 5 * 7.5)
+    assert fares.swift_moto_fare(7, config["moto"]) == pytest.approx(25 + 3 * 8 + 2 * 10)
+
+
+def test_tables_match_tier_walk(config):
+    tables = fares.build_tables(config)
+    assert all(len(values) == fares.MAX_KM * fares.STEPS_PER_KM + 1 for values in tables.values())
+    assert fares.check_parity(tables, config) <= fares.TOLERANCE
+    for step in (0, 5, 10, 37, 100, 151, 2000):
+        expected = fares.swift_fares(step / fares.STEPS_PER_KM, config)
+        for name in fares.TABLES:
+            assert tables[name][step] == pytest.approx(expected[name], abs=1e-6)
+
+
+def test_boundary_between_steps_fails_parity(config):
+    config = {**config, "taxi": [dict(tier) for tier in config["taxi"]]}
+    config["taxi"][1]["upToKm"] = 10.05
+    with pytest.raises(fares.FareParityError, match="taxi at 10.10 km"):
+        fares.check_parity(fares.build_tables(config), config)
+
+
+def test_committed_tables_are_current(config):
+    shipped = plistlib.loads((DATA_DIR / fares.OUTPUT_NAME).read_bytes())
+    assert shipped["stepKm"] == fares.STEP_KM
+    for name, values in fares.build_tables(config).items():
+        assert shipped[name] == struct.pack(f"<{len(values)}f", *values)
+
+
+def test_null_last_tier_is_open_ended(config):
+    null = {**config, "taxi": [*config["taxi"][:-1], {**config["taxi"][-1], "upToKm": None}]}
+    data.check_fares({"fareConfig": null})
+    for distance in (0.5, 15, 45, 150):
+        assert fares.swift_taxi_fare(distance, null["taxi"]) == fares.swift_taxi_fare(distance, config["taxi"])
+    tables = fares.build_tables(null)
+    assert fares.check_parity(tables, null) <= fares.TOLERANCE
+    assert tables == fares.build_tables(config)
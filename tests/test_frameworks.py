@@ -0,0 +1,56 @@
+from pbxgen.frameworks import FRAMEWORK, module_errors
+from pbxgen.model import BuildFile, BuildPhase, FileReference, Group, Target, TargetDependency
+
+APPLICATION = "com.apple.product-type.application"
+
+
+def _target(name, product_type, group, files, dependencies=()):
+    build_files = []
+    for file_name in files:
+        reference = FileReference(f"{name}-{file_name}", file_name, "sourcecode.swift", file_name, "<group>")
+        group.children.append(reference)
+        build_files.append(BuildFile(f"{name}-{file_name}-build", f"{file_name} in Sources", file=reference))
+    target = Target(name, name, None, product_type, None, [BuildPhase(f"{name}-sources", "Sources", build_files)])
+    target.dependencies = [TargetDependency(f"{name}-{d.name}", f"{name}-{d.name}-proxy", d, "project") for d in dependencies]
+    return target
+
+
+def _layout(tmp_path, model_source, app_source):
+    (tmp_path / "Models").mkdir()
+    (tmp_path / "App").mkdir()
+    (tmp_path / "Models" / "Poi.swift").write_text(model_source)
+    (tmp_path / "App" / "Main.swift").write_text(app_source)
+    models_group = Group("models", "Models", "Models", [])
+    app_group = Group("app", "App", "App", [])
+    main_group = Group("main", "", None, [models_group, app_group])
+    models = _target("Models", FRAMEWORK, models_group, ["Poi.swift"])
+    app = _target("App", APPLICATION, app_group, ["Main.swift"], [models])
+    return [app, models], main_group
+
+
+def test_cross_module_use_needs_public_and_import(tmp_path):
+    targets, main_group = _layout(tmp_path, "struct Poi {}\n", "let first = Poi()\n")
+    errors = module_errors(targets, main_group, tmp_path, tmp_path / "index.json")
+    assert any("without 'import Models'" in error for error in errors)
+    assert any("Poi is used from App but is not public" in error for error in errors)
+
+
+def test_public_and_imported_is_clean(tmp_path):
+    targets, main_group = _layout(tmp_path, "public struct Poi {}\n", "import Models\nlet first = Poi()\n")
+    assert module_errors(targets, main_group, tmp_path, tmp_path / "index.json") == []
+
+
+def test_use_against_dependency_direction(tmp_path):
+    targets, main_group = _layout(tmp_path, "public struct Poi { let app = Main() }\n", "struct Main {}\n")
+    errors = module_errors(targets, main_group, tmp_path, tmp_path / "index.json")
+    assert any("Models cannot import App" in error for error in errors)
+
+
+def test_frameworks_command_reports_and_writes_nothing(workspace):
+    project = workspace.root / "JourneyTH.xcodeproj" / "project.pbxproj"
+    before = project.read_bytes()
+    result = workspace("frameworks", check=False)
+    assert result.returncode == 1
+    assert "source changes needed before the split compiles" in result.stderr
+    assert "is used from JourneyTHDiscover but is not public" in result.stdout
+    assert project.read_bytes() == before
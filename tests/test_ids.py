@@ -0,0 +1,29 @@
+import pytest
+
+from pbxgen.ids import IdCollisionError, IdRegistry
+
+DEBUG = "0B53C482991D4CB3A5D001140109523E"
+CLASH = "0B53C482991D4CB3A5D00114FFFFFFFF"
+
+
+def test_normalize_truncates_table_ids_once():
+    registry = IdRegistry()
+    assert registry.normalize(DEBUG) == DEBUG[:24]
+    assert registry.normalize(DEBUG) == DEBUG[:24]
+    assert registry.normalize("NOT-HEX") == "NOT-HEX"
+
+
+def test_truncation_collision_names_both_ids():
+    registry = IdRegistry()
+    registry.normalize(DEBUG)
+    with pytest.raises(IdCollisionError) as caught:
+        registry.normalize(CLASH)
+    assert (caught.value.identifier, caught.value.other, caught.value.short) == (CLASH, DEBUG, DEBUG[:24])
+
+
+def test_generate_reports_a_collision(workspace):
+    script = workspace.root / "generate_pbx.py"
+    script.write_text(script.read_text().replace("77E183D9A2774B0D8B985CED6707BC7F", CLASH))
+    result = workspace("--force", check=False)
+    assert result.returncode == 1
+    assert result.stderr == f"generate_pbx.py: table IDs {CLASH} and {DEBUG} both truncate to {DEBUG[:24]}; change one of them\n"
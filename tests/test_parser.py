@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import ROOT
+from pbxgen import parser
+
+PROJECT_TEXT = (ROOT / "JourneyTH.xcodeproj/project.pbxproj").read_text(encoding="utf-8")
+
+
+def test_untouched_project_dumps_byte_for_byte():
+    assert parser.loads(PROJECT_TEXT).dumps() == PROJECT_TEXT
+
+
+def test_rendered_objects_match_the_generator_layout():
+    project = parser.loads(PROJECT_TEXT)
+    for obj in project.objects.values():
+        obj.touch()
+    assert project.dumps() == PROJECT_TEXT
+
+
+def test_edit_rewrites_only_that_object():
+    project = parser.loads(PROJECT_TEXT)
+    [reference] = [obj for obj in project.isa("PBXFileReference") if obj.get("path") == "OrderService.swift"]
+    reference.props["path"] = "Order Service.swift"
+    reference.touch()
+    before, after = PROJECT_TEXT.splitlines(), project.dumps().splitlines()
+    changed = [(old, new) for old, new in zip(before, after) if old != new]
+    assert len(before) == len(after)
+    assert len(changed) == 1
+    assert 'path = "Order Service.swift";' in changed[0][1]
+
+
+def test_generic_fallback_reads_the_same_graph():
+    # Two-space indent does not fit the fast path's layout.
+    fast = parser.loads(PROJECT_TEXT)
+    generic = parser.loads(PROJECT_TEXT.replace("\t", "  "))
+    assert generic.root == fast.root
+    assert {identifier: obj.props for identifier, obj in generic.objects.items()} == {
+        identifier: obj.props for identifier, obj in fast.objects.items()
+    }
+
+
+@pytest.mark.parametrize("value", ["plain", "with space", 'quote " and \\ back', "tab\tnew\nline", "$(TARGET_NAME)", ""])
+def test_quote_round_trips(value):
+    quoted = parser.quote(value)
+    assert (parser.unquote(quoted) if quoted.startswith('"') else quoted) == value
+
+
+def test_parse_error_names_the_offset():
+    with pytest.raises(parser.ParseError, match="offset"):
+        parser.loads("// !$*UTF8*$!\n{\n\tobjects = {\n\t\tABC = {isa = PBXGroup; children = (A B);};\n\t};\n}\n")
@@ -0,0 +1,100 @@
+import shutil
+
+import pytest
+
+from pbxgen.ids import stable_id
+from pbxgen.parser import load
+from pbxgen.patch import UNIT_TEST, patch_project
+
+from conftest import ROOT
+
+PROJECT = ROOT / "JourneyTH.xcodeproj" / "project.pbxproj"
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """The committed project (table mode) beside an empty JourneyTH tree."""
+    (tmp_path / "JourneyTH.xcodeproj").mkdir()
+    shutil.copy(PROJECT, tmp_path / "JourneyTH.xcodeproj" / "project.pbxproj")
+    for directory in ("Tests", "Services"):
+        (tmp_path / "JourneyTH" / directory).mkdir(parents=True)
+    return tmp_path
+
+
+def _phase_of(project, build_file_id):
+    for target_id in project[project.root]["targets"]:
+        target = project[target_id]
+        for phase_id in target["buildPhases"]:
+            if build_file_id in project[phase_id].get("files", []):
+                return target, project[phase_id]
+    return None, None
+
+
+def _patch(project_dir, add=(), remove=()):
+    path = project_dir / "JourneyTH.xcodeproj" / "project.pbxproj"
+    for rel in add:
+        (project_dir / rel).touch()
+    patch_project(path, [project_dir / rel for rel in add], [project_dir / rel for rel in remove], project_dir)
+    return load(path)
+
+
+def test_add_test_file_joins_existing_tests_group_and_test_target(project_dir):
+    before = load(project_dir / "JourneyTH.xcodeproj" / "project.pbxproj")
+    project = _patch(project_dir, add=["JourneyTH/Tests/FooTests.swift"])
+
+    assert len(project.isa("PBXGroup")) == len(before.isa("PBXGroup"))
+    fid = stable_id("PBXFileReference", "JourneyTH/Tests/FooTests.swift")
+    (tests_group,) = [group for group in project.isa("PBXGroup") if fid in group["children"]]
+    assert tests_group.get("path") == "JourneyTH/Tests"
+
+    target, phase = _phase_of(project, stable_id("PBXBuildFile", "JourneyTH/Tests/FooTests.swift", "Sources"))
+    assert target.get("productType") == UNIT_TEST
+    assert phase.isa == "PBXSourcesBuildPhase"
+
+
+def test_add_app_source_stays_in_app_target(project_dir):
+    project = _patch(project_dir, add=["JourneyTH/Services/Foo.swift"])
+    target, _ = _phase_of(project, stable_id("PBXBuildFile", "JourneyTH/Services/Foo.swift", "Sources"))
+    assert target.get("productType") == "com.apple.product-type.application"
+
+
+def test_add_then_remove_restores_bytes(project_dir):
+    _patch(project_dir, add=["JourneyTH/Tests/FooTests.swift", "JourneyTH/Services/Foo.swift"])
+    _patch(project_dir, remove=["JourneyTH/Tests/FooTests.swift", "JourneyTH/Services/Foo.swift"])
+    assert (project_dir / "JourneyTH.xcodeproj" / "project.pbxproj").read_bytes() == PROJECT.read_bytes()
+
+
+def test_add_creates_missing_groups_once(project_dir):
+    (project_dir / "JourneyTH" / "New" / "Dir").mkdir(parents=True)
+    project = _patch(project_dir, add=["JourneyTH/New/Dir/Bar.swift", "JourneyTH/New/Dir/Baz.swift"])
+    created = [group for group in project.isa("PBXGroup") if group.id in {
+        stable_id("PBXGroup", "JourneyTH/New"),
+        stable_id("PBXGroup", "JourneyTH/New/Dir"),
+    }]
+    assert [group.get("path") for group in created] == ["New", "Dir"]
+    assert len(created[1]["children"]) == 2
+
+
+def test_scan_regenerate_keeps_a_patch(workspace):
+    project = workspace.root / "JourneyTH.xcodeproj" / "project.pbxproj"
+    workspace("--scan")
+    (workspace.root / "JourneyTH" / "Services" / "Foo.swift").touch()
+    workspace("patch", "--add", "JourneyTH/Services/Foo.swift")
+    patched = project.read_text()
+    assert sum("Foo.swift" in line for line in patched.splitlines()) == 4
+    # The pre-build hook's run: same objects, the scan's own ordering.
+    workspace("--scan")
+    assert sorted(project.read_text().splitlines()) == sorted(patched.splitlines())
+
+
+def test_patch_refuses_a_table_mode_project(workspace):
+    project = workspace.root / "JourneyTH.xcodeproj" / "project.pbxproj"
+    workspace()
+    before = project.read_bytes()
+    (workspace.root / "JourneyTH" / "Services" / "Foo.swift").touch()
+    result = workspace("patch", "--add", "JourneyTH/Services/Foo.swift", check=False)
+    assert result.returncode == 1
+    assert "not last generated with --scan" in result.stderr
+    assert project.read_bytes() == before
+    workspace()
+    assert "Foo.swift" not in project.read_text()
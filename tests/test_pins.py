@@ -0,0 +1,82 @@
+import shutil
+import subprocess
+
+import pytest
+
+from pbxgen import pins
+from pbxgen.pins import Pin, PinError
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(*args, cwd):
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """A package repository with 1.0.4 tagged on its first commit and an
+    untagged second commit; ``(url, tagged revision, later revision)``."""
+    repo = tmp_path / "upstream" / "swift-collections"
+    repo.mkdir(parents=True)
+    git("init", "--quiet", cwd=repo)
+    (repo / "Package.swift").write_text("// 1.0.4\n")
+    git("add", "Package.swift", cwd=repo)
+    git("commit", "--quiet", "-m", "1.0.4", cwd=repo)
+    git("tag", "1.0.4", cwd=repo)
+    tagged = git("rev-parse", "HEAD", cwd=repo)
+    (repo / "Package.swift").write_text("// next\n")
+    git("commit", "--quiet", "-am", "next", cwd=repo)
+    return str(repo), tagged, git("rev-parse", "HEAD", cwd=repo)
+
+
+@needs_git
+def test_verify_against_local_mirror(tmp_path, upstream):
+    url, tagged, later = upstream
+    mirrors, results = tmp_path / "mirrors", tmp_path / "pins.json"
+    good = Pin("swift-collections", url, "1.0.4", tagged)
+    pins.sync([good], mirrors, results)
+    assert pins.verify([good], mirrors, results) == (1, 0)
+    assert pins.verify([good], mirrors, results) == (0, 1)
+
+    with pytest.raises(PinError, match="tag 1.0.4 is"):
+        pins.verify([good._replace(revision=later)], mirrors, results)
+    with pytest.raises(PinError, match="is not in"):
+        pins.verify([good._replace(revision="0" * 40)], mirrors, results)
+    with pytest.raises(PinError, match="no tag 1.0.5 or v1.0.5"):
+        pins.verify([good._replace(min_version="1.0.5", revision=later)], mirrors, results)
+
+
+@needs_git
+def test_verify_without_mirror(tmp_path, upstream):
+    url, tagged, _ = upstream
+    with pytest.raises(PinError, match="no mirror"):
+        pins.verify([Pin("swift-collections", url, "1.0.4", tagged)], tmp_path / "mirrors", tmp_path / "pins.json")
+
+
+def test_requirement_errors():
+    url = "https://github.com/apple/swift-collections"
+    reference = Pin("swift-collections", url, "1.0.4", "a" * 40)
+    assert pins.requirement_errors([Pin("swift-collections", f"{url}.git", "1.1.0", "b" * 40)], [reference]) == []
+    assert pins.requirement_errors([Pin("swift-numerics", "https://github.com/apple/swift-numerics", "1.0.0", "c" * 40), reference], [reference]) == []
+    for pin, message in [
+        (reference._replace(min_version="1.0.3"), "outside 1.0.4"),
+        (reference._replace(min_version="2.0.0"), "outside 1.0.4"),
+        (reference._replace(min_version=None), "not a version"),
+        (reference._replace(url="https://example.com/fork/swift-collections"), "pinned from https://example.com"),
+    ]:
+        [problem] = pins.requirement_errors([pin], [reference])
+        assert message in problem
+    assert pins.requirement_errors([], [reference]) == ["swift-collections: not pinned in Package.resolved"]
+
+
+def test_damaged_results_are_an_empty_cache(tmp_path):
+    path = tmp_path / "pins.json"
+    assert pins.load_results(path) == {}
+    path.write_text("{not json")
+    assert pins.load_results(path) == {}
+    path.write_text('{"version": 1}')
+    assert pins.load_results(path) == {}
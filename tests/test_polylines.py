@@ -0,0 +1,65 @@
+import json
+import plistlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from bundletools import polylines
+from bundletools.data import DATA_DIR
+
+
+def test_straight_line_keeps_endpoints():
+    xs, ys = [0.0, 1.0, 2.0, 3.0, 4.0], [0.0, 0.0, 0.0, 0.0, 0.0]
+    assert polylines.douglas_peucker(xs, ys, 0.0) == [0, 4]
+
+
+def test_spike_kept_only_above_tolerance():
+    xs, ys = [0.0, 5.0, 10.0], [0.0, 3.0, 0.0]
+    assert polylines.douglas_peucker(xs, ys, 2.9) == [0, 1, 2]
+    assert polylines.douglas_peucker(xs, ys, 3.0) == [0, 2]
+
+
+def test_short_lines_are_kept_whole():
+    assert polylines.douglas_peucker([0.0], [0.0], 1.0) == [0]
+    assert polylines.douglas_peucker([0.0, 1.0], [0.0, 1.0], 1.0) == [0, 1]
+
+
+@pytest.mark.parametrize("tolerance", polylines.TOLERANCES_M)
+def test_simplified_line_stays_within_tolerance(tolerance):
+    xs, ys = polylines._project(polylines.synthetic_line(2000))
+    kept = polylines.douglas_peucker(xs, ys, tolerance)
+    assert kept[0] == 0 and kept[-1] == len(xs) - 1
+    assert kept == sorted(kept)
+    assert polylines.max_deviation(xs, ys, kept) <= tolerance
+
+
+def test_levels_get_coarser():
+    levels = polylines.simplify_line(polylines.synthetic_line(2000))
+    counts = [kept for _, kept, _ in levels]
+    assert counts == sorted(counts, reverse=True)
+    assert counts[-1] < counts[0]
+
+
+def test_varint_round_trip():
+    points = [(13.7374, 100.5163), (-33.868820, 151.209296), (0.0, -179.999999), (13.7374, 100.5163)]
+    assert polylines.decode(polylines.encode(points)) == points
+
+
+def test_committed_geometry_is_current():
+    payload = json.loads((DATA_DIR / "stations.json").read_bytes())
+    built, _ = polylines.build_geometry(payload)
+    assert plistlib.loads((DATA_DIR / polylines.OUTPUT_NAME).read_bytes()) == built
+
+
+def test_geometry_rebuilds_when_spatial_changes(tmp_path, monkeypatch):
+    (tmp_path / "stations.json").write_bytes((DATA_DIR / "stations.json").read_bytes())
+    spatial_copy = tmp_path / "spatial.py"
+    spatial_copy.write_text(Path(polylines.spatial.__file__).read_text())
+    monkeypatch.setattr(polylines, "spatial", SimpleNamespace(__file__=str(spatial_copy)))
+    manifest = tmp_path / "manifest.json"
+
+    assert polylines.write_geometry(tmp_path, manifest)[1] is not None
+    assert polylines.write_geometry(tmp_path, manifest)[1] is None
+    spatial_copy.write_text(spatial_copy.read_text() + "\n# edited\n")
+    assert polylines.write_geometry(tmp_path, manifest)[1] is not None
@@ -0,0 +1,62 @@
+import json
+import math
+import plistlib
+import struct
+
+from bundletools import rail
+from bundletools.data import DATA_DIR
+from bundletools.spatial import haversine
+
+
+def station(station_id, lat, lng, system="BTS"):
+    return {"id": station_id, "lat": lat, "lng": lng, "system": system}
+
+
+def payload():
+    # a-b-c bends through a corner, so the track is longer than the chord.
+    return {
+        "stations": [station("a", 13.0, 100.0), station("b", 13.0, 100.1), station("c", 13.1, 100.1), station("x", 13.5, 100.5, "MRT")],
+        "lines": [
+            {"id": "line", "stationIds": ["a", "b", "c"], "coordinates": [[13.0, 100.0], [13.0, 100.1], [13.1, 100.1]]},
+            {"id": "other", "stationIds": ["x"], "coordinates": []},
+        ],
+    }
+
+
+def test_track_distance_follows_the_line():
+    ids, systems, edges = rail.build_network(payload())
+    distances = rail.track_distances(len(ids), edges)
+    along = haversine(13.0, 100.0, 13.0, 100.1) + haversine(13.0, 100.1, 13.1, 100.1)
+    assert math.isclose(distances[0 * 4 + 2], along, rel_tol=1e-9)
+    assert distances[0 * 4 + 2] > haversine(13.0, 100.0, 13.1, 100.1)
+    assert math.isinf(distances[0 * 4 + 3])
+
+
+def test_stop_counts_stay_within_a_system():
+    ids, systems, edges = rail.build_network(payload())
+    stops = rail.stop_counts(ids, systems, edges)
+    assert stops[0 * 4 + 2] == 2
+    assert stops[2 * 4 + 1] == 1
+    assert stops[0 * 4 + 3] == rail.NO_STOPS
+
+
+def test_urban_fare_repeats_last_step_and_caps():
+    pricing = {"base": 16, "perStop": [4, 3], "max": 30}
+    assert rail.urban_fare(pricing, 0) == 16
+    assert rail.urban_fare(pricing, 3) == 26
+    assert rail.urban_fare(pricing, 10) == 30
+
+
+def test_committed_matrix_has_hua_lamphong_to_ayutthaya_track_distance():
+    # OrderServiceTests.testIntercityFareFollowsTrackDistance prices this pair.
+    matrix = plistlib.loads((DATA_DIR / rail.OUTPUT_NAME).read_bytes())
+    ids = matrix["stationIds"]
+    count = len(ids)
+    a, b = ids.index("srt_hua_lamphong"), ids.index("srt_ayutthaya")
+    meters = struct.unpack(f"<{count * count}I", matrix["distanceMeters"])[a * count + b]
+    assert meters == 69400
+    rebuilt = rail.build_matrix(
+        json.loads((DATA_DIR / "stations.json").read_bytes()),
+        json.loads((DATA_DIR / "fares_config.json").read_bytes()),
+    )
+    assert rebuilt["distanceMeters"] == matrix["distanceMeters"]
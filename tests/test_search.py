@@ -0,0 +1,73 @@
+import json
+import plistlib
+import random
+
+import pytest
+
+from bundletools import search
+from bundletools.data import DATA_DIR
+
+
+def poi(poi_id, name_en, name_th, rating, area="Bangkok", tags=("Temple",)):
+    return {"id": poi_id, "nameEN": name_en, "nameTH": name_th, "rating": rating, "area": area, "tags": list(tags)}
+
+
+POIS = [
+    poi("arun", "Wat Arun", "วัดอรุณ", 4.7),
+    poi("pho", "Wat Pho", "วัดโพธิ์", 4.8),
+    poi("chatuchak", "Chatuchak Weekend Market", "ตลาดนัดจตุจักร", 4.5, tags=("Market", "Shopping")),
+    poi("doi", "Wat Phra That Doi Suthep", "วัดพระธาตุดอยสุเทพ", 4.8, area="Chiang Mai"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return search.Index(search.build_index(POIS))
+
+
+def ids(index, *args, **kwargs):
+    return [index.ids[document] for document in index.search(*args, **kwargs)]
+
+
+def test_normalize_folds_case_width_and_punctuation():
+    assert search.normalize("  Wat　ARUN -- (Temple)! ") == "wat arun temple"
+    assert search.normalize("ＡＢＣ") == "abc"
+
+
+def test_results_come_in_rating_order(index):
+    # Ties go by English name: "Wat Pho" before "Wat Phra That".
+    assert ids(index) == ["pho", "doi", "arun", "chatuchak"]
+    assert ids(index, "wat") == ["pho", "doi", "arun"]
+
+
+def test_substring_and_prefix_queries(index):
+    assert ids(index, "run") == ["arun"]
+    assert ids(index, "ar") == ["arun"]
+    assert ids(index, "ตลาด") == ["chatuchak"]
+    assert ids(index, "จตุ") == ["chatuchak"]
+    assert ids(index, "nothing here") == []
+
+
+def test_filters_intersect(index):
+    assert ids(index, area="Chiang Mai") == ["doi"]
+    assert ids(index, "wat", area="Bangkok") == ["pho", "arun"]
+    assert ids(index, tag="shopping") == ["chatuchak"]
+    assert ids(index, "wat", tag="Market") == []
+
+
+def test_index_agrees_with_linear_scan():
+    pois = search.synthetic_pois(200)
+    queries = search._queries(pois, random.Random(1), 200)
+    search.verify(search.Index(search.build_index(pois)), pois, queries)
+
+
+def test_verify_catches_a_wrong_order():
+    data = search.build_index(POIS)
+    data["ids"] = list(reversed(data["ids"]))
+    with pytest.raises(search.SearchIndexError):
+        search.verify(search.Index(data), POIS, [("wat", None, None)])
+
+
+def test_committed_index_is_current():
+    pois = json.loads((DATA_DIR / "pois.json").read_bytes())
+    assert plistlib.loads((DATA_DIR / search.OUTPUT_NAME).read_bytes()) == search.build_index(pois)
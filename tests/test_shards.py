@@ -0,0 +1,50 @@
+import pytest
+
+from pbxgen import shards
+
+SLOW = "import XCTest\n\nfinal class SlowTests: XCTestCase {\n    func testA() {}\n    func testB() {}\n}\n"
+NEW = "final class NewTests: XCTestCase {\n    func testOne() {}\n    func testTwo() {}\n    func testThree() {}\n}\n"
+JUNIT = """<testsuites><testsuite name="JourneyTHTests">
+<testcase classname="JourneyTHTests.SlowTests" name="testA" time="3.0"/>
+<testcase classname="JourneyTHTests.SlowTests" name="testB" time="1.0"/>
+<testcase classname="JourneyTHTests.FastTests" name="testC" time="0.5"/>
+</testsuite></testsuites>"""
+
+
+def test_test_classes_counts_methods_per_class():
+    assert shards.test_classes(SLOW + NEW) == [("SlowTests", 2), ("NewTests", 3)]
+
+
+def test_history_is_an_exponential_average(tmp_path):
+    results = tmp_path / "junit.xml"
+    results.write_text(JUNIT)
+    history = shards.update_history({}, shards.parse_results(results))
+    assert history == {"SlowTests": {"seconds": 4.0, "tests": 2, "runs": 1}, "FastTests": {"seconds": 0.5, "tests": 1, "runs": 1}}
+    shards.update_history(history, {"SlowTests": (2.0, 2)})
+    assert history["SlowTests"] == {"seconds": 4.0 * (1 - shards.ALPHA) + 2.0 * shards.ALPHA, "tests": 2, "runs": 2}
+    assert history["FastTests"]["runs"] == 1
+
+
+def test_new_classes_get_the_median_seconds_per_test():
+    history = {"A": {"seconds": 2.0, "tests": 1, "runs": 3}, "B": {"seconds": 1.0, "tests": 4, "runs": 1}, "C": {"seconds": 3.0, "tests": 3, "runs": 2}}
+    # Per test: 2.0, 0.25 and 1.0, so the median is 1.0.
+    assert shards.class_weights([("A", 1), ("New", 3), ("Empty", 0)], history) == {"A": 2.0, "New": 3.0, "Empty": 1.0}
+    assert shards.class_weights([("New", 3)], {}) == {"New": 3 * shards.DEFAULT_TEST_SECONDS}
+
+
+def test_assign_fills_the_lightest_shard_heaviest_first():
+    weights = {"a": 7.0, "b": 5.0, "c": 4.0, "d": 3.0, "e": 3.0, "f": 2.0}
+    assert shards.assign(weights, 2) == [(12.0, ["a", "d", "f"]), (12.0, ["b", "c", "e"])]
+    # Equal weights go by name, and equal loads to the lower shard.
+    assert shards.assign(weights, 3) == [(9.0, ["a", "f"]), (8.0, ["b", "e"]), (7.0, ["c", "d"])]
+    with pytest.raises(shards.ShardError):
+        shards.assign(weights, 7)
+
+
+def test_plan_weighs_files_from_history(tmp_path):
+    slow, new = tmp_path / "SlowTests.swift", tmp_path / "NewTests.swift"
+    slow.write_text(SLOW)
+    new.write_text(NEW)
+    history = {"SlowTests": {"seconds": 10.0, "tests": 2, "runs": 4}}
+    # NewTests has no history: three tests at SlowTests' 5 s per test.
+    assert shards.plan([str(slow), str(new)], history, 2) == [(15.0, [str(new)]), (10.0, [str(slow)])]
@@ -0,0 +1,53 @@
+import json
+import plistlib
+import random
+
+import pytest
+
+from bundletools import spatial
+
+
+def _points(count, seed=1):
+    rng = random.Random(seed)
+    ids = [f"p{i}" for i in range(count)]
+    lats = [rng.uniform(13.6, 13.9) for _ in ids]
+    lngs = [rng.uniform(100.4, 100.7) for _ in ids]
+    return ids, lats, lngs
+
+
+def test_grid_matches_brute_force():
+    ids, lats, lngs = _points(200)
+    grid = spatial.Grid.build(ids, lats, lngs)
+    queries = [*zip(lats, lngs), *spatial._lattice(lats, lngs)]
+    assert spatial.verify(grid, ids, lats, lngs, queries) == len(queries)
+
+
+def test_verify_catches_a_broken_grid():
+    ids, lats, lngs = _points(50)
+    grid = spatial.Grid.build(ids, lats, lngs)
+    grid.lat[0] += 1.0  # one point moved away from where the cells say
+    with pytest.raises(spatial.SpatialIndexError):
+        spatial.verify(grid, ids, lats, lngs, [*zip(lats, lngs)])
+
+
+def test_empty_grid():
+    grid = spatial.Grid.build([], [], [])
+    assert grid.nearest(13.7, 100.5) is None
+    assert grid.within(13.7, 100.5, 5.0) == []
+
+
+def test_write_index_skips_unchanged_inputs(tmp_path, monkeypatch):
+    ids, lats, lngs = _points(20)
+    pois = [{"id": i, "lat": la, "lng": ln} for i, la, ln in zip(ids, lats, lngs)]
+    (tmp_path / "pois.json").write_text(json.dumps(pois))
+    manifest = tmp_path / "spatial_index.json"
+    output = spatial.write_index(tmp_path, manifest)
+    assert set(plistlib.loads(output.read_bytes())) == {"pois"}
+
+    def fail(*args):
+        raise AssertionError("rebuilt with unchanged inputs")
+
+    monkeypatch.setattr(spatial, "build_index", fail)
+    assert spatial.write_index(tmp_path, manifest) == output
+    with pytest.raises(AssertionError):
+        spatial.write_index(tmp_path, manifest, force=True)
@@ -0,0 +1,47 @@
+import plistlib
+
+from bundletools import strings
+
+TEXT = '''\ufeff/* Greeting */
+"greeting" = "Hello, %@!";
+// shown on the map
+"map.distance" = "%1$.1f km from \\"%2$@\\"\\n\\U0E01";
+bare = "unquoted key";
+"echo";
+'''
+
+
+def test_parse_compile_round_trip():
+    entries = strings.parse(TEXT, "en")
+    assert [(entry.key, entry.line) for entry in entries] == [("greeting", 2), ("map.distance", 4), ("bare", 5), ("echo", 6)]
+    assert plistlib.loads(strings.compile_table(entries)) == {
+        "greeting": "Hello, %@!",
+        "map.distance": '%1$.1f km from "%2$@"\nก',
+        "bare": "unquoted key",
+        "echo": "echo",
+    }
+
+
+def test_committed_tables_round_trip():
+    for language, entries in strings.load_tables().items():
+        compiled = plistlib.loads(strings.compile_table(entries))
+        assert compiled == {entry.key: entry.value for entry in entries}, language
+
+
+def test_check_reports_parity_duplicates_and_formats():
+    tables = {
+        "en": strings.parse('"a" = "%d stops"; "b" = "B"; "c" = "C";', "en"),
+        "th": strings.parse('"a" = "%@ stops"; "b" = "B"; "b" = "B2";', "th"),
+    }
+    errors, warnings = strings.check(tables, {"a": "Main.swift:3", "z": "Main.swift:9"}, prefixes=("c",))
+    assert errors == [
+        "th: 'b' defined on lines 1 and 1",
+        "th: 'a' line 1 formats %1$@, en has %1$d",
+        "'c' missing from th",
+    ]
+    assert warnings == ["Main.swift:9: 'z' is not in any Localizable.strings", "'b' is not used in the Swift sources"]
+
+
+def test_specifiers_number_implicit_arguments():
+    assert strings.specifiers("%@ is %.1f%% of %ld") == [(1, "@"), (2, "f"), (3, "ld")]
+    assert strings.specifiers("%2$@ %1$d") == [(1, "d"), (2, "@")]
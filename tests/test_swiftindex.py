@@ -0,0 +1,86 @@
+import pytest
+
+from pbxgen import swiftindex
+
+SOURCES = {
+    "Models/Poi.swift": "public struct Poi { let area: Area }\n",
+    "Models/Area.swift": "struct Area { var pois: [Poi] }\n",
+    "Services/PoiService.swift": "import Foundation\nfinal class PoiService { func all() -> [Poi] { [] } }\n",
+    "App/Main.swift": '// PoiService is not used here\nlet title = "Area \\(PoiService())"\n',
+}
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for path, text in SOURCES.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(text)
+    return tmp_path
+
+
+def test_lex_skips_comments_and_strings_but_not_interpolations():
+    lexed = swiftindex.lex(SOURCES["App/Main.swift"])
+    assert lexed["declarations"] == ["title"]
+    assert "PoiService" in lexed["identifiers"]
+    assert "Area" not in lexed["identifiers"]
+    assert swiftindex.lex(SOURCES["Models/Poi.swift"])["public"] == ["Poi"]
+    assert swiftindex.lex(SOURCES["Services/PoiService.swift"])["imports"] == ["Foundation"]
+
+
+def test_graph_cycles_and_modules(tree):
+    index = swiftindex.Index(sorted(SOURCES), "cache.json")
+    assert index.graph == {
+        "App/Main.swift": ["Services/PoiService.swift"],
+        "Models/Area.swift": ["Models/Poi.swift"],
+        "Models/Poi.swift": ["Models/Area.swift"],
+        "Services/PoiService.swift": ["Models/Poi.swift"],
+    }
+    assert index.cycles() == [["Models/Area.swift", "Models/Poi.swift"]]
+    assert index.modules() == [
+        {"directories": ["Models"], "files": 2, "depends_on": []},
+        {"directories": ["Services"], "files": 1, "depends_on": [0]},
+        {"directories": ["App"], "files": 1, "depends_on": [1]},
+    ]
+
+
+def test_impact_follows_dependents_transitively(tree):
+    index = swiftindex.Index(sorted(SOURCES), "cache.json")
+    assert index.impact("Models/Area.swift") == ["App/Main.swift", "Models/Poi.swift", "Services/PoiService.swift"]
+    assert index.impact("App/Main.swift") == []
+
+
+def test_directories_in_a_cycle_share_a_module():
+    assert swiftindex.strongly_connected({"a": ["b"], "b": ["c"], "c": ["b"], "d": []}) == [["b", "c"], ["a"], ["d"]]
+
+
+def test_report_lists_cycles_modules_and_impact(tree):
+    index = swiftindex.Index(sorted(SOURCES), "cache.json")
+    assert swiftindex.report(index, ["Services/PoiService.swift", "Nope.swift"]) == [
+        "4 Swift files, 4 lexed, 0 from cache",
+        "",
+        "Dependency cycles: 1",
+        "  Models/Area.swift <-> Models/Poi.swift",
+        "",
+        "Suggested modules, in build order:",
+        "  #0 Models (2 files) depends on -",
+        "  #1 Services (1 files) depends on #0",
+        "  #2 App (1 files) depends on #1",
+        "",
+        "  Services/PoiService.swift: 1 files rebuilt",
+        "    App/Main.swift",
+        "  Nope.swift: not an indexed Swift file",
+    ]
+
+
+def test_cache_reuses_unchanged_files(tree):
+    swiftindex.Index(sorted(SOURCES), "cache.json").save()
+    assert swiftindex.Index(sorted(SOURCES), "cache.json").lexed == 0
+
+    (tree / "App/Main.swift").write_text("let title = Area.self\n")
+    index = swiftindex.Index(sorted(SOURCES), "cache.json")
+    assert index.lexed == 1
+    assert index.graph["App/Main.swift"] == ["Models/Area.swift"]
+
+    (tree / "cache.json").write_text("{broken")
+    assert swiftindex.Index(sorted(SOURCES), "cache.json").lexed == 4
@@ -0,0 +1,90 @@
+import pytest
+
+from conftest import ROOT
+from pbxgen import parser
+from pbxgen.validate import Node, main, parsed_nodes, validate
+
+ROOT_ID = "P" * 24
+
+
+def graph(*extra, sources=("B1",), resources=(), group_path=None):
+    """A minimal valid graph: one target building Main.swift from B1."""
+    nodes = {
+        ROOT_ID: Node(ROOT_ID, "PBXProject", "Project object", [("mainGroup", "G"), ("targets", "T")]),
+        "G": Node("G", "PBXGroup", "main", [("children", "F")], group_path, None, "<group>"),
+        "F": Node("F", "PBXFileReference", "Main.swift", [], "Main.swift", None, "<group>"),
+        "T": Node("T", "PBXNativeTarget", "App", [("buildPhases", "S"), ("buildPhases", "R")]),
+        "S": Node("S", "PBXSourcesBuildPhase", "Sources", [("files", file) for file in sources]),
+        "R": Node("R", "PBXResourcesBuildPhase", "Resources", [("files", file) for file in resources]),
+        "B1": Node("B1", "PBXBuildFile", "Main.swift in Sources", [("fileRef", "F")]),
+    }
+    return [*nodes.values(), *extra]
+
+
+def test_minimal_graph_is_clean(tmp_path):
+    assert validate(graph(), ROOT_ID, tmp_path) == ([], [])
+
+
+def test_committed_project_is_clean():
+    project = parser.load(ROOT / "JourneyTH.xcodeproj/project.pbxproj")
+    assert validate(parsed_nodes(project), project.root, ROOT) == ([], [])
+
+
+def test_dangling_reference(tmp_path):
+    nodes = graph(Node("B2", "PBXBuildFile", "Gone.swift in Sources", [("fileRef", "X")]), sources=("B1", "B2"))
+    errors, _ = validate(nodes, ROOT_ID, tmp_path)
+    assert errors == ["PBXBuildFile B2 (Gone.swift in Sources) fileRef refers to missing object X"]
+
+
+def test_shared_build_file(tmp_path):
+    errors, _ = validate(graph(resources=("B1",)), ROOT_ID, tmp_path)
+    assert errors == [
+        "PBXBuildFile B1 (Main.swift in Sources) is in 2 build phases: "
+        "PBXSourcesBuildPhase S (Sources), PBXResourcesBuildPhase R (Resources)"
+    ]
+
+
+def test_duplicate_member(tmp_path):
+    nodes = graph(Node("B2", "PBXBuildFile", "Main.swift in Resources", [("fileRef", "F")]), resources=("B2",))
+    errors, _ = validate(nodes, ROOT_ID, tmp_path)
+    assert errors == ["PBXFileReference F (Main.swift) is built 2 times by target App: Sources, Resources"]
+
+
+def test_duplicate_id_after_truncation(tmp_path):
+    first, second = "A" * 24 + "00000000", "A" * 24 + "FFFFFFFF"
+    nodes = graph(
+        Node(first, "PBXFileReference", "One.swift", [], "One.swift"),
+        Node(second, "PBXFileReference", "Two.swift", [], "Two.swift"),
+    )
+    nodes[1] = nodes[1]._replace(refs=[("children", "F"), ("children", first), ("children", second)])
+    errors, _ = validate(nodes, ROOT_ID, tmp_path)
+    assert errors == [
+        f"duplicate ID {'A' * 24}: PBXFileReference (One.swift) and PBXFileReference (Two.swift) from {first} and {second}"
+    ]
+
+
+def test_missing_group_path(tmp_path):
+    errors, _ = validate(graph(group_path="Sources"), ROOT_ID, tmp_path)
+    assert errors == [f"PBXGroup G (main) path {tmp_path / 'Sources'} does not exist"]
+    (tmp_path / "Sources").mkdir()
+    assert validate(graph(group_path="Sources"), ROOT_ID, tmp_path) == ([], [])
+
+
+def test_orphan_is_a_warning(tmp_path):
+    nodes = graph(Node("F2", "PBXFileReference", "Stray.swift", [], "Stray.swift"))
+    assert validate(nodes, ROOT_ID, tmp_path) == ([], ["PBXFileReference F2 (Stray.swift) is not referenced by any object"])
+
+
+@pytest.mark.parametrize("strict, code", [(False, 0), (True, 1)])
+def test_cli_strict_fails_on_warnings(tmp_path, capsys, strict, code):
+    text = (ROOT / "JourneyTH.xcodeproj/project.pbxproj").read_text(encoding="utf-8")
+    project = parser.loads(text)
+    [reference] = [obj for obj in project.isa("PBXFileReference") if obj.get("path") == "OrderService.swift"]
+    reference_line = next(line for line in text.splitlines() if line.startswith(f"\t\t{reference.id} "))
+    orphan = reference_line.replace(reference.id, "F" * 24, 1)
+    path = tmp_path / "JourneyTH.xcodeproj" / "project.pbxproj"
+    path.parent.mkdir()
+    path.write_text(text.replace(reference_line, f"{reference_line}\n{orphan}", 1), encoding="utf-8")
+    argv = [str(path), "--project-dir", str(ROOT)] + (["--strict"] if strict else [])
+    assert main(argv) == code
+    assert f"warning: PBXFileReference {'F' * 24} (OrderService.swift) is not referenced by any object" in capsys.readouterr().err
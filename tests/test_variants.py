@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import copy_workspace
+from pbxgen import parser
+
+MANIFEST = {"variants": [
+    {"name": "Acme", "settings": {"JourneyTH": {"PRODUCT_BUNDLE_IDENTIFIER": "com.acme.journey"}}},
+    {"name": "Zen", "settings": {"project": {"SWIFT_VERSION": "6.0"}, "JourneyTH": {"PRODUCT_BUNDLE_IDENTIFIER": "com.zen.journey"}}},
+]}
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory):
+    # One generation serves every test.
+    root = tmp_path_factory.mktemp("variants")
+    run = copy_workspace(root)
+    (root / "variants.json").write_text(json.dumps(MANIFEST))
+    base = (root / "JourneyTH.xcodeproj" / "project.pbxproj").read_bytes()
+    result = run("--force", "--variants", "variants.json")
+    return root, base, result
+
+
+def xcconfig(path):
+    lines = path.read_text().splitlines()
+    return dict(line.split(" = ", 1) for line in lines if " = " in line)
+
+
+def test_each_variant_gets_a_project(generated):
+    root, base, result = generated
+    assert [line.split(":")[0] for line in result.stdout.splitlines()] == ["JourneyTH-Acme.xcodeproj", "JourneyTH-Zen.xcodeproj"]
+    assert (root / "JourneyTH.xcodeproj" / "project.pbxproj").read_bytes() == base
+    for name in ("Acme", "Zen"):
+        assert (root / f"JourneyTH-{name}.xcodeproj" / "project.xcworkspace/xcshareddata/swiftpm/Package.resolved").is_file()
+
+
+@pytest.mark.parametrize("name", ["Acme", "Zen"])
+def test_configurations_use_the_variant_xcconfigs(generated, name):
+    root, _, _ = generated
+    project = parser.load(root / f"JourneyTH-{name}.xcodeproj" / "project.pbxproj")
+    owners = {child: group.get("path") for group in project.isa("PBXGroup") for child in group.get("children", [])}
+    configurations = list(project.isa("XCBuildConfiguration"))
+    assert sorted(configuration.get("name") for configuration in configurations) == ["Debug", "Debug", "Debug", "Release", "Release", "Release"]
+    for configuration in configurations:
+        assert owners[configuration.get("baseConfigurationReference")] == f"Configs/{name}"
+
+
+def test_variant_settings_override_the_base(generated):
+    root, _, _ = generated
+    configs = root / "Configs"
+    assert xcconfig(configs / "JourneyTH.xcconfig")["PRODUCT_BUNDLE_IDENTIFIER"] == "com.example.JourneyTH"
+    assert xcconfig(configs / "Acme" / "JourneyTH.xcconfig")["PRODUCT_BUNDLE_IDENTIFIER"] == "com.acme.journey"
+    assert xcconfig(configs / "Zen" / "JourneyTH.xcconfig")["PRODUCT_BUNDLE_IDENTIFIER"] == "com.zen.journey"
+    assert xcconfig(configs / "Acme" / "Project.xcconfig")["SWIFT_VERSION"] == xcconfig(configs / "Project.xcconfig")["SWIFT_VERSION"]
+    assert xcconfig(configs / "Zen" / "Project.xcconfig")["SWIFT_VERSION"] == "6.0"
+
+
+@pytest.mark.parametrize("name", ["Acme", "Zen"])
+def test_variant_projects_validate(generated, name):
+    root, _, _ = generated
+    project = root / f"JourneyTH-{name}.xcodeproj" / "project.pbxproj"
+    result = subprocess.run([sys.executable, "-m", "pbxgen.validate", "--strict", str(project)], cwd=root, capture_output=True, text=True)
+    assert (result.returncode, result.stderr) == (0, "")
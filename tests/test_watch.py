@@ -0,0 +1,72 @@
+import shutil
+
+import pytest
+
+from pbxgen.parser import load
+from pbxgen.patch import APPLICATION
+from pbxgen.watch import ProjectMirror, project_files
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    """A ProjectMirror over a copy of the committed project, with a
+    regenerate that only records its calls."""
+    project = tmp_path / "JourneyTH.xcodeproj" / "project.pbxproj"
+    project.parent.mkdir()
+    shutil.copy(ROOT / "JourneyTH.xcodeproj" / "project.pbxproj", project)
+    (tmp_path / "JourneyTH" / "Services").mkdir(parents=True)
+    calls = []
+    mirror = ProjectMirror(project, str(tmp_path / "JourneyTH"), calls.append, str(tmp_path))
+    mirror.calls = calls
+    return mirror
+
+
+def _references(project, name):
+    return [obj for obj in project.isa("PBXFileReference") if obj.get("path") == name]
+
+
+def test_add_then_remove_event(mirror, tmp_path):
+    original = mirror.project_path.read_bytes()
+    path = tmp_path / "JourneyTH" / "Services" / "Foo.swift"
+    path.touch()
+    assert mirror.apply({str(path)}) == ["added JourneyTH/Services/Foo.swift"]
+
+    project = load(mirror.project_path)
+    [reference] = _references(project, "Foo.swift")
+    [build_file] = [obj for obj in project.isa("PBXBuildFile") if obj.get("fileRef") == reference.id]
+    app = next(project[target] for target in project[project.root]["targets"] if project[target]["productType"] == APPLICATION)
+    sources = next(project[phase] for phase in app["buildPhases"] if project[phase].isa == "PBXSourcesBuildPhase")
+    assert build_file.id in sources["files"]
+    assert "JourneyTH/Services/Foo.swift" in mirror.known
+
+    path.unlink()
+    assert mirror.apply({str(path)}) == ["removed JourneyTH/Services/Foo.swift"]
+    assert _references(load(mirror.project_path), "Foo.swift") == []
+    assert mirror.project_path.read_bytes() == original
+    # Only the unforced start-up run; both batches were patched.
+    assert mirror.calls == [False]
+
+
+def test_localized_change_regenerates(mirror, tmp_path):
+    strings = tmp_path / "JourneyTH" / "en.lproj" / "Localizable.strings"
+    strings.parent.mkdir()
+    strings.touch()
+    assert mirror.apply({str(strings)}) == ["regenerated (localized resources changed)"]
+    assert mirror.calls == [False, True]
+
+
+def test_project_files_skips_wrapper_contents_and_lproj(tmp_path):
+    (tmp_path / "Assets.xcassets" / "AppIcon.appiconset").mkdir(parents=True)
+    (tmp_path / "en.lproj").mkdir()
+    (tmp_path / "en.lproj" / "Localizable.strings").touch()
+    (tmp_path / "View.swift").touch()
+    (tmp_path / "notes.txt").touch()
+    assert project_files(str(tmp_path), "JourneyTH") == {"JourneyTH/Assets.xcassets", "JourneyTH/View.swift"}
+
+
+def test_watch_needs_scan(workspace):
+    result = workspace("watch", check=False)
+    assert result.returncode == 1
+    assert "needs --scan" in result.stderr
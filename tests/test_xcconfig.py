@@ -0,0 +1,86 @@
+import pytest
+
+from pbxgen import xcconfig
+from pbxgen.model import BuildConfiguration, ConfigurationList, Group, ModelError, ObjectIndex, Project, Target
+
+APPLICATION = "com.apple.product-type.application"
+UNIT_TEST = "com.apple.product-type.bundle.unit-test"
+
+
+def configurations(owner, debug, release):
+    return ConfigurationList(f"{owner}-list", owner, [
+        BuildConfiguration(f"{owner}-debug", "Debug", list(debug)),
+        BuildConfiguration(f"{owner}-release", "Release", list(release)),
+    ])
+
+
+def target(name, product_type, debug, release):
+    return Target(name, name, None, product_type, configurations(name, debug, release), [])
+
+
+def model():
+    products = Group("products", "Products", None, [])
+    project = Project(
+        "project",
+        Group("main", "", None, [products]),
+        products,
+        configurations("project", [("SWIFT_VERSION", "5.9"), ("ONLY_ACTIVE_ARCH", "YES")], [("SWIFT_VERSION", "5.9")]),
+        [
+            target("App", APPLICATION, [("PRODUCT_NAME", "App"), ("SWIFT_VERSION", "5.9")], [("PRODUCT_NAME", "App")]),
+            target("Tests", UNIT_TEST, [("BUNDLE_LOADER", "$(TEST_HOST)"), ("PRODUCT_NAME", "Tests")], [("BUNDLE_LOADER", "$(TEST_HOST)"), ("PRODUCT_NAME", "Tests")]),
+            target("Tests2", UNIT_TEST, [("BUNDLE_LOADER", "$(TEST_HOST)"), ("PRODUCT_NAME", "Tests2")], [("BUNDLE_LOADER", "$(TEST_HOST)"), ("PRODUCT_NAME", "Tests2")]),
+        ],
+    )
+    return ObjectIndex(), project
+
+
+def test_settings_move_down_the_include_stack():
+    index, project = model()
+    layering = xcconfig.layer_settings(index, project, "Configs")
+    header = xcconfig.HEADER
+    assert layering.files == {
+        "Project.xcconfig": header + "\nSWIFT_VERSION = 5.9\n",
+        "App.xcconfig": header + "\nPRODUCT_NAME = App\n",
+        "UnitTest.xcconfig": header + "\nBUNDLE_LOADER = $(TEST_HOST)\n",
+        "Tests.xcconfig": header + '\n#include "UnitTest.xcconfig"\n\nPRODUCT_NAME = Tests\n',
+        "Tests2.xcconfig": header + '\n#include "UnitTest.xcconfig"\n\nPRODUCT_NAME = Tests2\n',
+    }
+    # Only the Debug-only setting stays inline; the app's SWIFT_VERSION
+    # repeated the project's and is dropped.
+    [debug, release] = project.configuration_list.configurations
+    assert (debug.settings, release.settings) == ([("ONLY_ACTIVE_ARCH", "YES")], [])
+    assert all(config.settings == [] for target in project.targets for config in target.configuration_list.configurations)
+    assert [config.base.path for config in project.targets[1].configuration_list.configurations] == ["Tests.xcconfig"] * 2
+    [group] = [child for child in project.main_group.children if isinstance(child, Group) and child.path == "Configs"]
+    assert project.main_group.children == [group, project.product_group]
+    assert sorted(reference.path for reference in group.children) == sorted(layering.files)
+
+
+def test_report_names_the_layer_of_each_setting():
+    index, project = model()
+    report = xcconfig.layer_settings(index, project, "Configs").report()
+    assert report["Tests2"]["Debug"] == {
+        "SWIFT_VERSION": ("5.9", "Project.xcconfig"),
+        "ONLY_ACTIVE_ARCH": ("YES", "project Debug"),
+        "BUNDLE_LOADER": ("$(TEST_HOST)", "UnitTest.xcconfig"),
+        "PRODUCT_NAME": ("Tests2", "Tests2.xcconfig"),
+    }
+
+
+def test_inherited_expands_through_the_layers():
+    assert xcconfig.effective([("a", [("FLAGS", "-a")]), ("b", [("FLAGS", '"$(inherited) -b"')])]) == {"FLAGS": ("-a -b", "b")}
+
+
+def test_kind_file_may_not_shadow_a_target():
+    index, project = model()
+    project.targets[0].name = "UnitTest"
+    with pytest.raises(ModelError, match="UnitTest.xcconfig would serve both"):
+        xcconfig.layer_settings(index, project, "Configs")
+
+
+def test_write_files_removes_only_generated_leftovers(tmp_path):
+    index, project = model()
+    (tmp_path / "Old.xcconfig").write_text(xcconfig.HEADER)
+    (tmp_path / "Mine.xcconfig").write_text("// hand-written\n")
+    paths = xcconfig.write_files(xcconfig.layer_settings(index, project, tmp_path), tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(["Mine.xcconfig", *(path.name for path in paths)])